@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class ConfigConfig(AppConfig):
+    name = 'config'
+    verbose_name = "Configuration du projet"
+
+    def ready(self):
+        from . import base_donnees, partitions  # noqa: F401
+        from . import cache, mesures, requetes
+        cache.connecter_signaux()
+        mesures.connecter_signaux()
+        requetes.connecter_signaux()
@@ -0,0 +1,70 @@
+# config/base_donnees.py
+"""
+Réglages SQLite pour plusieurs processus (workers gunicorn, commandes, exports).
+
+Chaque nouvelle connexion SQLite reçoit les PRAGMA de SQLITE_PRAGMAS (settings) :
+- journal_mode=WAL : les lecteurs ne bloquent plus l'écrivain et ne sont plus
+  bloqués par lui (un export long n'empêche plus la saisie) ;
+- busy_timeout : un écrivain attend le verrou au lieu d'échouer aussitôt ;
+- synchronous=NORMAL : sûr en WAL, une synchronisation disque par checkpoint
+  au lieu d'une par transaction ;
+- mmap_size, cache_size : lectures servies depuis la mémoire.
+
+Les transactions sont ouvertes en BEGIN IMMEDIATE (OPTIONS `transaction_mode`) :
+en mode différé, deux transactions qui lisent puis écrivent se bloquent
+mutuellement et SQLite renvoie « database is locked » sans attendre busy_timeout.
+
+`RepriseEcritureMixin` rejoue en dernier recours une saisie qui a malgré tout
+rencontré le verrou (attente plus longue que busy_timeout).
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.messages.storage import default_storage
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+DELAI_REPRISE = 0.2  # secondes, doublé à chaque tentative
+
+
+def configurer_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as curseur:
+        for nom, valeur in settings.SQLITE_PRAGMAS.items():
+            if nom == 'journal_mode' and connection.alias in settings.DATABASE_REPLIQUES:
+                # Persistant dans le fichier : fixé par la base principale, pas par une connexion en lecture seule
+                continue
+            curseur.execute(f'PRAGMA {nom} = {valeur}')
+
+
+connection_created.connect(configurer_sqlite, dispatch_uid='config.base_donnees.configurer_sqlite')
+
+
+def est_base_verrouillee(erreur):
+    return isinstance(erreur, OperationalError) and 'locked' in str(erreur)
+
+
+class RepriseEcritureMixin:
+    """
+    Exécute le POST dans une transaction et le rejoue si la base est verrouillée.
+    La transaction annulée ne laisse rien en base ; les messages de la tentative
+    échouée sont retirés pour ne pas être affichés deux fois.
+    """
+
+    def post(self, request, *args, **kwargs):
+        tentatives = settings.SQLITE_REPRISES_ECRITURE + 1
+        for tentative in range(1, tentatives + 1):
+            try:
+                with transaction.atomic():
+                    return super().post(request, *args, **kwargs)
+            except OperationalError as erreur:
+                if not est_base_verrouillee(erreur) or tentative == tentatives or transaction.get_connection().in_atomic_block:
+                    raise
+                logger.warning("Base verrouillée pendant %s (tentative %d/%d)", request.path, tentative, tentatives)
+            if hasattr(request, '_messages'):
+                request._messages = default_storage(request)
+            time.sleep(DELAI_REPRISE * 2 ** (tentative - 1))
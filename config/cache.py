@@ -0,0 +1,171 @@
+# config/cache.py
+"""
+Cache des données et fragments de gabarits, invalidé par numéros de version.
+
+Chaque modèle de MODELES_VERSIONNES a un jeton de version dans le cache,
+remplacé après chaque enregistrement ou suppression (signaux post_save /
+post_delete, à la validation de la transaction). Les écritures sans signaux
+(`bulk_create`, `update`) appellent `invalider()` : `journaliser_lot` le fait
+pour les écritures en masse déjà journalisées.
+
+Une clé contient le périmètre de l'utilisateur (`portee`) et les versions des
+modèles lus : un archivage change la version, donc la clé, et l'ancienne entrée
+n'est plus jamais lue (elle expire d'elle-même). Rien n'est supprimé du cache.
+
+Les petites tables de référence (sites, comptes) sont en plus gardées en
+mémoire dans chaque processus (`RegistreReference`) : vidées par les mêmes
+signaux dans le processus qui écrit, et rechargées par les autres processus dès
+que la version du modèle a changé.
+
+Dans les gabarits :
+
+    {% load cache cache_versions %}
+    {% versions_cache 'enfants_gestion.Enfant' 'sites_gestion.SiteOrphelinat' as versions %}
+    {% cache 600 tableau_enfants portee_cache versions page_obj.number %}…{% endcache %}
+"""
+import hashlib
+import threading
+import uuid
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .partitions import partition_active
+
+MODELES_VERSIONNES = (
+    'sites_gestion.SiteOrphelinat',
+    'enfants_gestion.Enfant',
+    # Classe affichée dans la liste des enfants (Enfant.suivi_scolaire_actuel)
+    'enfants_gestion.SuiviScolaire',
+    'gestion_financiere.CompteFinancier',
+    'gestion_financiere.Transaction',
+    'gestion_financiere.Parrainage',
+    'gestion_personnel.Employe',
+)
+
+
+def _cle_version(libelle):
+    return f'version:{libelle.lower()}'
+
+
+def _libelle(modele):
+    return modele if isinstance(modele, str) else modele._meta.label
+
+
+def versions(*modeles):
+    """Jetons de version des modèles, dans l'ordre, en une seule lecture du cache."""
+    cles = [_cle_version(_libelle(modele)) for modele in modeles]
+    jetons = cache.get_many(cles)
+    for cle in cles:
+        if cle not in jetons:
+            # Cache vidé ou première lecture : add() garde le jeton d'un autre processus plus rapide
+            cache.add(cle, uuid.uuid4().hex, timeout=None)
+            jetons[cle] = cache.get(cle)
+    return '.'.join(jetons[cle] for cle in cles)
+
+
+def invalider(*modeles, using=None):
+    """
+    Change la version des modèles, après la validation de la transaction en cours
+    sur la base écrite (`using`). Par défaut, celle où le routeur envoie les
+    écritures du premier modèle : la partition active pour un modèle partitionné.
+    """
+    def changer_versions():
+        libelles = [_libelle(modele) for modele in modeles]
+        cache.set_many({_cle_version(libelle): uuid.uuid4().hex for libelle in libelles}, timeout=None)
+        for libelle in libelles:
+            for registre in _registres.get(libelle.lower(), ()):
+                registre.vider()
+    if using is None:
+        using = router.db_for_write(apps.get_model(_libelle(modeles[0]))) if modeles else DEFAULT_DB_ALIAS
+    transaction.on_commit(changer_versions, using=using)
+
+
+def portee(user, est_global):
+    """
+    Périmètre de l'utilisateur pour les clés : base active (partition du site)
+    puis « tous » ou la liste de ses sites.
+    """
+    if est_global:
+        sites = 'tous'
+    else:
+        sites = '-'.join(str(pk) for pk in user.sites.order_by('pk').values_list('pk', flat=True)) or 'aucun'
+    return f'{partition_active() or DEFAULT_DB_ALIAS}:{sites}'
+
+
+def cle_cache(nom, portee, modeles, *variantes):
+    brut = ':'.join(str(partie) for partie in (portee, versions(*modeles), *variantes))
+    return f'vue:{nom}:{hashlib.md5(brut.encode()).hexdigest()}'
+
+
+def mettre_en_cache(nom, portee, modeles, calcul, *variantes, timeout=DEFAULT_TIMEOUT):
+    """Retourne `calcul()`, mis en cache pour ce périmètre et ces versions des `modeles`."""
+    cle = cle_cache(nom, portee, modeles, *variantes)
+    valeur = cache.get(cle)
+    if valeur is None:
+        valeur = calcul()
+        cache.set(cle, valeur, timeout)
+    return valeur
+
+
+def liste_en_cache(nom, portee, queryset, modeles=(), *variantes, timeout=DEFAULT_TIMEOUT):
+    """Évalue `queryset` une fois par version de son modèle (et des `modeles` joints)."""
+    return mettre_en_cache(
+        nom, portee, (queryset.model, *modeles), lambda: list(queryset), *variantes, timeout=timeout,
+    )
+
+
+# =======================================================================
+# REGISTRES EN MÉMOIRE
+# =======================================================================
+
+_registres = {}
+
+
+class RegistreReference:
+    """
+    Copie en mémoire (propre au processus) de données d'un modèle versionné,
+    rangées par clé et chargées à la première lecture. Chaque lecture compare
+    la version du modèle dans le cache partagé : une seule lecture du cache, au
+    lieu d'une requête SQL.
+    """
+
+    def __init__(self, libelle):
+        self.libelle = libelle
+        self._verrou = threading.Lock()
+        self._version = None
+        self._donnees = {}
+        _registres.setdefault(libelle.lower(), []).append(self)
+
+    def obtenir(self, cle, charger):
+        version = versions(self.libelle)
+        with self._verrou:
+            if version != self._version:
+                self._donnees, self._version = {}, version
+            donnees = self._donnees
+        if cle not in donnees:
+            donnees[cle] = charger()
+        return donnees[cle]
+
+    def vider(self):
+        with self._verrou:
+            self._donnees, self._version = {}, None
+
+
+# =======================================================================
+# SIGNAUX
+# =======================================================================
+
+def _invalider_apres_ecriture(sender, instance, **kwargs):
+    # Base où l'objet vient d'être écrit : une partition a sa propre transaction
+    invalider(sender, using=instance._state.db)
+
+
+def connecter_signaux():
+    for libelle in MODELES_VERSIONNES:
+        modele = apps.get_model(libelle)
+        post_save.connect(_invalider_apres_ecriture, sender=modele, dispatch_uid=f'cache_save_{libelle}')
+        post_delete.connect(_invalider_apres_ecriture, sender=modele, dispatch_uid=f'cache_delete_{libelle}')
@@ -0,0 +1,122 @@
+# config/compression.py
+"""
+Compression et allègement des réponses dynamiques (pages HTML, JSON).
+
+- `CompressionMiddleware` compresse en brotli (si le module est installé) ou en
+  gzip selon l'en-tête Accept-Encoding, uniquement les types textuels : photos,
+  PDF et fichiers statiques déjà compressés passent tels quels.
+- `MinificationHTMLMiddleware` (facultatif, HTML_MINIFICATION) réduit
+  l'indentation des gabarits avant la compression.
+
+Protection BREACH : une page qui contient le jeton CSRF est compressée en gzip
+avec le remplissage aléatoire de Django, jamais en brotli (pas d'équivalent).
+`get_token()` ajoute CSRF_COOKIE_NEEDS_UPDATE à request.META ; CsrfViewMiddleware
+(ou le décorateur csrf_protect, qui passe avant, par exemple sur LoginView) le
+remet à False après avoir posé le cookie : c'est la présence de la clé qui compte.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Dépendance facultative
+    brotli = None
+
+TYPES_COMPRESSIBLES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+TAILLE_MIN_COMPRESSION = 200
+
+# Blocs dont les espaces sont significatifs : laissés intacts par la minification
+BLOCS_PROTEGES_RE = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+ESPACES_LIGNE_RE = re.compile(r'[ \t\r\f\v]*\n\s*')
+
+
+def _est_compressible(response):
+    type_contenu = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return type_contenu.startswith(TYPES_COMPRESSIBLES) and response.status_code != 206
+
+
+def _accepte(request, encodage):
+    for valeur in request.META.get('HTTP_ACCEPT_ENCODING', '').lower().split(','):
+        nom, _separateur, parametre = valeur.partition(';')
+        if nom.strip() != encodage:
+            continue
+        parametre = parametre.replace(' ', '')
+        if not parametre.startswith('q='):
+            return True
+        try:
+            return float(parametre[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware de Django, restreint aux types textuels et complété par brotli."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not _est_compressible(response):
+            return response
+        if (
+            brotli is None
+            or response.streaming
+            or len(response.content) < TAILLE_MIN_COMPRESSION
+            or 'CSRF_COOKIE_NEEDS_UPDATE' in request.META
+            or not _accepte(request, 'br')
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compresse = brotli.compress(response.content, quality=5)
+        if len(compresse) >= len(response.content):
+            return response
+        response.content = compresse
+        response.headers['Content-Length'] = str(len(compresse))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+def minifier_html(html):
+    """Réduit chaque saut de ligne et l'indentation qui l'entoure à un seul saut de ligne."""
+    morceaux = BLOCS_PROTEGES_RE.split(html)
+    resultat = []
+    # split() intercale [texte, bloc protégé, nom de balise, texte, ...]
+    for position in range(0, len(morceaux), 3):
+        resultat.append(ESPACES_LIGNE_RE.sub('\n', morceaux[position]))
+        if position + 1 < len(morceaux):
+            resultat.append(morceaux[position + 1])
+    return ''.join(resultat)
+
+
+class MinificationHTMLMiddleware:
+    """
+    Retire l'indentation des pages HTML rendues. Le saut de ligne est conservé
+    (il vaut une espace en HTML et sépare les instructions dans les attributs Alpine).
+    """
+
+    def __init__(self, get_response):
+        if not settings.HTML_MINIFICATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith('text/html')
+        ):
+            return response
+        contenu = response.content.decode(response.charset)
+        response.content = minifier_html(contenu).encode(response.charset)
+        if response.has_header('Content-Length'):
+            response.headers['Content-Length'] = str(len(response.content))
+        return response
@@ -0,0 +1,133 @@
+# config/management/commands/benchmark_sqlite.py
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+LIGNES_INITIALES = 50000
+
+
+def _modes():
+    return {
+        # Réglages d'origine : journal DELETE, transactions différées, attente de 5 s (défaut du module sqlite3)
+        'origine': {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5.0},
+        'réglé': {
+            'pragmas': settings.SQLITE_PRAGMAS,
+            'begin': f"BEGIN {settings.SQLITE_OPTIONS['transaction_mode']}",
+            'timeout': settings.SQLITE_PRAGMAS['busy_timeout'] / 1000,
+        },
+    }
+
+
+def _connecter(chemin, mode):
+    connexion = sqlite3.connect(chemin, timeout=mode['timeout'], isolation_level=None)
+    for nom, valeur in mode['pragmas'].items():
+        connexion.execute(f'PRAGMA {nom} = {valeur}')
+    return connexion
+
+
+def _ecrivain(chemin, mode, ecritures, depart, resultats):
+    """Saisie type : lecture puis écriture dans la même transaction (comme form.save + signaux)."""
+    connexion = _connecter(chemin, mode)
+    depart.wait()
+    reussies = verrouillees = 0
+    for numero in range(ecritures):
+        try:
+            connexion.execute(mode['begin'])
+            connexion.execute('SELECT COUNT(*) FROM saisie WHERE site = ?', (numero % 10,)).fetchone()
+            connexion.execute('INSERT INTO saisie (site, montant, libelle) VALUES (?, ?, ?)', (numero % 10, numero, 'x' * 100))
+            connexion.execute('COMMIT')
+            reussies += 1
+        except sqlite3.OperationalError:
+            verrouillees += 1
+            if connexion.in_transaction:
+                connexion.execute('ROLLBACK')
+    resultats.put(('ecrivain', reussies, verrouillees, 0.0))
+
+
+def _lecteur(chemin, mode, fin, depart, resultats):
+    """Export type : agrégat sur toute la table, en boucle pendant les écritures."""
+    connexion = _connecter(chemin, mode)
+    depart.wait()
+    lectures = bloquees = 0
+    pire = 0.0
+    while not fin.is_set():
+        debut = time.perf_counter()
+        try:
+            connexion.execute('SELECT site, SUM(montant), COUNT(*) FROM saisie GROUP BY site').fetchall()
+            lectures += 1
+        except sqlite3.OperationalError:
+            bloquees += 1
+        pire = max(pire, time.perf_counter() - debut)
+    resultats.put(('lecteur', lectures, bloquees, pire))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare les réglages SQLite d'origine et ceux de config/base_donnees.py "
+        "avec plusieurs processus qui écrivent pendant qu'un export lit la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processus', type=int, default=8, help="Nombre de processus écrivains.")
+        parser.add_argument('--ecritures', type=int, default=200, help="Écritures par processus.")
+        parser.add_argument('--lecteurs', type=int, default=1, help="Nombre de processus lecteurs.")
+
+    def handle(self, *args, **options):
+        for nom, mode in _modes().items():
+            with tempfile.TemporaryDirectory() as dossier:
+                chemin = os.path.join(dossier, 'benchmark.sqlite3')
+                self._preparer(chemin, mode)
+                self._afficher(nom, *self._executer(chemin, mode, options))
+
+    def _preparer(self, chemin, mode):
+        connexion = _connecter(chemin, mode)
+        connexion.execute('CREATE TABLE saisie (id INTEGER PRIMARY KEY, site INTEGER, montant INTEGER, libelle TEXT)')
+        connexion.execute('CREATE INDEX saisie_site ON saisie (site)')
+        connexion.execute('BEGIN')
+        connexion.executemany(
+            'INSERT INTO saisie (site, montant, libelle) VALUES (?, ?, ?)',
+            ((numero % 10, numero, 'x' * 100) for numero in range(LIGNES_INITIALES)),
+        )
+        connexion.execute('COMMIT')
+        connexion.close()
+
+    def _executer(self, chemin, mode, options):
+        depart, fin = multiprocessing.Event(), multiprocessing.Event()
+        resultats = multiprocessing.Queue()
+        ecrivains = [
+            multiprocessing.Process(target=_ecrivain, args=(chemin, mode, options['ecritures'], depart, resultats))
+            for _ in range(options['processus'])
+        ]
+        lecteurs = [
+            multiprocessing.Process(target=_lecteur, args=(chemin, mode, fin, depart, resultats))
+            for _ in range(options['lecteurs'])
+        ]
+        for processus in ecrivains + lecteurs:
+            processus.start()
+        debut = time.perf_counter()
+        depart.set()
+        for processus in ecrivains:
+            processus.join()
+        duree = time.perf_counter() - debut
+        fin.set()
+        for processus in lecteurs:
+            processus.join()
+        return duree, [resultats.get() for _ in ecrivains + lecteurs]
+
+    def _afficher(self, nom, duree, resultats):
+        reussies = sum(r[1] for r in resultats if r[0] == 'ecrivain')
+        verrouillees = sum(r[2] for r in resultats if r[0] == 'ecrivain')
+        lectures = sum(r[1] for r in resultats if r[0] == 'lecteur')
+        lectures_bloquees = sum(r[2] for r in resultats if r[0] == 'lecteur')
+        pire_lecture = max((r[3] for r in resultats if r[0] == 'lecteur'), default=0.0)
+        style = self.style.SUCCESS if not verrouillees and not lectures_bloquees else self.style.WARNING
+        self.stdout.write(style(
+            f"{nom:8} : {reussies} écritures en {duree:.2f} s ({reussies / duree:.0f}/s), "
+            f"{verrouillees} « database is locked » ; {lectures} lectures, {lectures_bloquees} bloquées, "
+            f"pire lecture {pire_lecture * 1000:.0f} ms"
+        ))
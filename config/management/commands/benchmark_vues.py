@@ -0,0 +1,292 @@
+# config/management/commands/benchmark_vues.py
+"""
+Banc d'essai des pages principales, par rôle et par volume de données.
+
+Pour chaque taille de jeu de données, une base de test jetable est remplie par
+`generer_donnees` (même graine : mêmes données d'une exécution à l'autre), puis
+chaque vue est chargée par le client de test de Django sous quatre rôles :
+
+- un premier chargement, cache vide, compte les requêtes SQL (`requetes`) ;
+- un deuxième, sous tracemalloc, donne le pic de mémoire Python (`memoire_kio`) ;
+- les --repetitions suivants, cache chaud, donnent `p50_ms` et `p95_ms` ;
+- un dernier compte les requêtes cache chaud (`requetes_cache`).
+
+Les résultats sont comparés à la référence enregistrée (--reference) : un
+p95 ou une mémoire en hausse de plus de --tolerance, ou une requête SQL de
+plus, est une régression.
+
+    python manage.py benchmark_vues --tailles petit moyen --enregistrer-reference
+    python manage.py benchmark_vues --tailles petit moyen --strict
+"""
+import importlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+
+from config.mesures import centile
+from config.requetes import ReleveRequetes
+from enfants_gestion.models import Enfant
+from sites_gestion.models import SiteOrphelinat
+
+# Options de generer_donnees pour chaque taille
+TAILLES = {
+    'petit': {'sites': 3, 'enfants': 300, 'parrainages': 100, 'transactions': 5000, 'employes': 30, 'utilisateurs': 20},
+    'moyen': {'sites': 10, 'enfants': 5000, 'parrainages': 2000, 'transactions': 100000, 'employes': 200, 'utilisateurs': 50},
+    'grand': {'sites': 20, 'enfants': 20000, 'parrainages': 8000, 'transactions': 1000000, 'employes': 500, 'utilisateurs': 200},
+}
+
+# Clé -> (nom d'URL, argument « enfant » attendu, paramètres GET)
+VUES = {
+    'tableau_de_bord': ('dashboard:home', False, ''),
+    'liste_enfants': ('enfants_gestion:enfant_list', False, ''),
+    'fiche_enfant': ('enfants_gestion:enfant_detail', True, ''),
+    'historique_enfant': ('enfants_gestion:enfant_history_list', True, ''),
+    'transactions': ('gestion_financiere:transaction_list', False, ''),
+    'recherche_transactions': ('gestion_financiere:transaction_list', False, 'q=Versement'),
+    'parrainages': ('gestion_financiere:parrainage_list', False, ''),
+    'rapport_financier': ('gestion_financiere:rapport_financier', False, ''),
+    'export_enfants': ('enfants_gestion:enfant_download_export', False, 'format=csv'),
+    'export_transactions': ('gestion_financiere:transaction_export', False, 'format=csv'),
+}
+
+ROLES = ('superutilisateur', 'directeur', 'soignant_un_site', 'comptable_central')
+
+# Réglages de production pour les outils qui suivent DEBUG dans settings.py
+REGLAGES_PRODUCTION = {
+    'REQUETES_DETECTEUR': False,
+    'MESURES_ACTIVES': False,
+    'REQUETES_LENTES_SEUIL': 0,
+    'HTML_MINIFICATION': True,
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+}
+
+# Écart absolu (ms) en dessous duquel une hausse du p95 est du bruit
+BRUIT_MS = 5
+
+
+def _creer_utilisateurs(site):
+    """Un compte par rôle mesuré ; le soignant n'a accès qu'au site `site`."""
+    Utilisateur = get_user_model()
+    groupes = {groupe.name: groupe for groupe in Group.objects.filter(name__in=['Directeur', 'Soignant', 'Comptable'])}
+
+    superutilisateur = Utilisateur.objects.create_superuser('banc-superutilisateur', 'banc@exemple.org', None)
+    directeur = Utilisateur.objects.create_user('banc-directeur', role='Directeur')
+    soignant = Utilisateur.objects.create_user('banc-soignant', role='Soignant')
+    comptable = Utilisateur.objects.create_user('banc-comptable', role='Comptable', is_comptable_central=True)
+    directeur.groups.add(groupes['Directeur'])
+    soignant.groups.add(groupes['Soignant'])
+    soignant.sites.add(site)
+    comptable.groups.add(groupes['Comptable'])
+    return dict(zip(ROLES, (superutilisateur, directeur, soignant, comptable)))
+
+
+def _charger(client, url):
+    """Statut de la page, contenu lu jusqu'au bout (exports en flux compris)."""
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response.status_code
+
+
+def _mesurer(client, url, repetitions):
+    cache.clear()
+    with ReleveRequetes() as releve:
+        statut = _charger(client, url)
+    if statut != 200:
+        return {'statut': statut}
+
+    tracemalloc.start()
+    try:
+        _charger(client, url)
+        memoire = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    durees = []
+    for _repetition in range(repetitions):
+        debut = time.perf_counter()
+        _charger(client, url)
+        durees.append((time.perf_counter() - debut) * 1000)
+    durees.sort()
+
+    with ReleveRequetes() as releve_cache:
+        _charger(client, url)
+    return {
+        'statut': statut,
+        'p50_ms': round(centile(durees, 50), 1),
+        'p95_ms': round(centile(durees, 95), 1),
+        'requetes': len(releve),
+        'requetes_cache': len(releve_cache),
+        'memoire_kio': round(memoire / 1024),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les pages principales (p50/p95, requêtes SQL, pic de mémoire) par rôle et "
+        "par volume de données synthétiques, et les compare à une référence enregistrée."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tailles', nargs='+', choices=list(TAILLES), default=['petit', 'moyen'])
+        parser.add_argument('--vues', nargs='+', choices=list(VUES), default=list(VUES))
+        parser.add_argument('--roles', nargs='+', choices=ROLES, default=list(ROLES))
+        parser.add_argument('--repetitions', type=int, default=10, help="Chargements chronométrés par vue et par rôle.")
+        parser.add_argument('--graine', type=int, default=1)
+        parser.add_argument(
+            '--reference', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'reference_vues.json'),
+            help="Fichier JSON des résultats de référence.",
+        )
+        parser.add_argument('--enregistrer-reference', action='store_true', help="Remplace la référence par ces résultats.")
+        parser.add_argument('--sortie', help="Écrit aussi les résultats dans ce fichier JSON.")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Hausse relative tolérée du p95 et de la mémoire.")
+        parser.add_argument('--strict', action='store_true', help="Échoue (code de sortie non nul) en cas de régression.")
+
+    def handle(self, *args, **options):
+        if options['repetitions'] < 1:
+            raise CommandError("Il faut au moins une répétition.")
+        resultats = {
+            'date': date.today().isoformat(),
+            'environnement': {
+                'python': platform.python_version(), 'django': django.get_version(),
+                'machine': platform.machine(), 'repetitions': options['repetitions'],
+            },
+            'tailles': {},
+        }
+
+        setup_test_environment(debug=False)
+        try:
+            # Les documents générés vont dans un dossier media jetable
+            with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media, **REGLAGES_PRODUCTION):
+                for taille in options['tailles']:
+                    resultats['tailles'][taille] = self.mesurer_taille(taille, options)
+        finally:
+            teardown_test_environment()
+
+        reference = self.lire_reference(options['reference'])
+        regressions = self.afficher(resultats, reference, options['tolerance'])
+
+        if options['sortie']:
+            self.ecrire_json(options['sortie'], resultats)
+        if options['enregistrer_reference']:
+            self.ecrire_json(options['reference'], resultats)
+            self.stdout.write(self.style.SUCCESS(f"Référence enregistrée : {options['reference']}"))
+        elif regressions and options['strict']:
+            raise CommandError(f"{regressions} régression(s) par rapport à la référence.")
+
+    # -------------------------------------------------------------------
+
+    def mesurer_taille(self, taille, options):
+        self.stdout.write(f"Jeu de données « {taille} » : génération…")
+        anciennes_bases = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Base neuve : les permissions n'existaient pas encore quand la migration des rôles
+            # a rempli les groupes, on la rejoue pour que chaque rôle ait ses droits réels
+            migration_roles = importlib.import_module('utilisateurs.migrations.0005_align_roles_and_groups')
+            migration_roles.align_roles_with_groups(apps, None)
+            call_command(
+                'generer_donnees', graine=options['graine'], sans_journal=True, stdout=io.StringIO(), **TAILLES[taille],
+            )
+            # Le site le plus peuplé : celui du soignant, et l'enfant mesuré y est pris
+            site = SiteOrphelinat.objects.annotate(nombre=Count('enfant')).order_by('-nombre', 'pk').first()
+            enfant_id = (
+                Enfant.history.model.objects.filter(id__in=Enfant.objects.filter(site=site).values('pk'))
+                .values('id').annotate(versions=Count('history_id')).order_by('-versions', 'id')
+                .values_list('id', flat=True).first()
+            )
+            utilisateurs = _creer_utilisateurs(site)
+
+            mesures = {'parametres': TAILLES[taille], 'roles': {}}
+            for role in options['roles']:
+                client = Client()
+                client.force_login(utilisateurs[role])
+                mesures['roles'][role] = {}
+                for cle in options['vues']:
+                    nom_url, par_enfant, parametres = VUES[cle]
+                    url = reverse(nom_url, kwargs={'pk': enfant_id} if par_enfant else None)
+                    if parametres:
+                        url = f'{url}?{parametres}'
+                    mesures['roles'][role][cle] = _mesurer(client, url, options['repetitions'])
+                self.stdout.write(f"  {role} : {len(options['vues'])} vue(s) mesurée(s)")
+            return mesures
+        finally:
+            teardown_databases(anciennes_bases, verbosity=0)
+
+    def lire_reference(self, chemin):
+        try:
+            with open(chemin, encoding='utf-8') as fichier:
+                return json.load(fichier)
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING(f"Pas de référence ({chemin}) : rien à comparer."))
+        except ValueError as erreur:
+            raise CommandError(f"Référence illisible ({chemin}) : {erreur}")
+        return None
+
+    def ecrire_json(self, chemin, resultats):
+        os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+        with open(chemin, 'w', encoding='utf-8') as fichier:
+            json.dump(resultats, fichier, ensure_ascii=False, indent=2)
+            fichier.write('\n')
+
+    def afficher(self, resultats, reference, tolerance):
+        """Tableau des mesures, écarts à la référence ; retourne le nombre de régressions."""
+        regressions = 0
+        for taille, mesures in resultats['tailles'].items():
+            ref_taille = (reference or {}).get('tailles', {}).get(taille)
+            if ref_taille and ref_taille['parametres'] != mesures['parametres']:
+                self.stdout.write(self.style.WARNING(f"« {taille} » : paramètres différents de la référence, pas de comparaison."))
+                ref_taille = None
+
+            self.stdout.write(f"\n== {taille} ({mesures['parametres']['transactions']} transactions) ==")
+            self.stdout.write(
+                f"{'rôle':<20}{'vue':<24}{'p50 ms':>9}{'p95 ms':>9}{'écart':>9}{'requêtes':>24}{'mémoire Kio':>13}"
+            )
+            for role, vues in mesures['roles'].items():
+                for cle, mesure in vues.items():
+                    if mesure['statut'] != 200:
+                        self.stdout.write(f"{role:<20}{cle:<24}{'HTTP ' + str(mesure['statut']):>18}")
+                        continue
+                    ref = ((ref_taille or {}).get('roles', {}).get(role, {})).get(cle) or {}
+                    problemes = self.comparer(mesure, ref, tolerance)
+                    regressions += len(problemes)
+
+                    ecart = f"{(mesure['p95_ms'] / ref['p95_ms'] - 1) * 100:+.0f} %" if ref.get('p95_ms') else ''
+                    requetes = f"{mesure['requetes']}/{mesure['requetes_cache']}"
+                    if ref.get('requetes') is not None:
+                        requetes += f" ({ref['requetes']}/{ref['requetes_cache']})"
+                    ligne = (
+                        f"{role:<20}{cle:<24}{mesure['p50_ms']:>9}{mesure['p95_ms']:>9}{ecart:>9}"
+                        f"{requetes:>24}{mesure['memoire_kio']:>13}"
+                    )
+                    self.stdout.write(self.style.ERROR(f"{ligne}  ← {', '.join(problemes)}") if problemes else ligne)
+        return regressions
+
+    def comparer(self, mesure, ref, tolerance):
+        if ref.get('statut') != 200:
+            return []
+        problemes = []
+        if mesure['p95_ms'] > ref['p95_ms'] * (1 + tolerance) and mesure['p95_ms'] - ref['p95_ms'] > BRUIT_MS:
+            problemes.append("p95")
+        if mesure['requetes'] > ref['requetes'] or mesure['requetes_cache'] > ref['requetes_cache']:
+            problemes.append("requêtes")
+        if mesure['memoire_kio'] > ref['memoire_kio'] * (1 + tolerance):
+            problemes.append("mémoire")
+        return problemes
@@ -0,0 +1,45 @@
+# config/management/commands/copier_replique.py
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+# Pages copiées à chaque pas : la base principale reste accessible en écriture entre deux pas
+PAGES_PAR_PAS = 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Rafraîchit les répliques en lecture seule (DATABASE_REPLIQUES) par copie à chaud "
+        "de la base principale. À lancer périodiquement (cron, timer systemd)."
+    )
+
+    def handle(self, *args, **options):
+        principale = os.path.abspath(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        if not settings.DATABASE_REPLIQUES:
+            raise CommandError("Aucune réplique configurée (variable DATABASE_REPLIQUES).")
+
+        for alias in settings.DATABASE_REPLIQUES:
+            chemin = os.path.abspath(settings.DATABASES[alias]['NAME'].removeprefix('file:').split('?')[0])
+            if chemin == principale:
+                self.stdout.write(f"{alias} : connexion en lecture seule sur la base principale, rien à copier.")
+                continue
+            self._copier(principale, chemin)
+            self.stdout.write(self.style.SUCCESS(f"{alias} : copie à jour ({chemin})."))
+
+    def _copier(self, principale, chemin):
+        # Copie dans un fichier temporaire puis remplacement atomique : les lecteurs
+        # de la réplique voient l'ancienne copie ou la nouvelle, jamais un fichier partiel.
+        temporaire = f'{chemin}.copie'
+        source = sqlite3.connect(principale)
+        destination = sqlite3.connect(temporaire)
+        try:
+            source.backup(destination, pages=PAGES_PAR_PAS)
+            # Copie autonome (sans fichier -wal) : lisible par une connexion en lecture seule
+            destination.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            destination.close()
+            source.close()
+        os.replace(temporaire, chemin)
@@ -0,0 +1,466 @@
+# config/management/commands/generer_donnees.py
+"""
+Jeu de données synthétique pour les essais de montée en charge.
+
+Tout est tiré d'un générateur aléatoire initialisé par --graine : mêmes options
+(dont --jusqu-au) et même base de départ, mêmes données. Les lignes sont
+écrites par bulk_create, sans signaux ; la commande refait ensuite ce que les
+signaux auraient fait : journal de synchronisation, pointeurs vers les derniers
+suivis, compteurs du stockage dédupliqué et versions du cache.
+
+    python manage.py generer_donnees --sites 20 --enfants 20000 --transactions 1000000
+"""
+import random
+import time
+import unicodedata
+from datetime import date, datetime, time as heure, timedelta, timezone
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from config.cache import MODELES_VERSIONNES, invalider
+from enfants_gestion.models import Document, Enfant, SuiviMedical, SuiviScolaire
+from enfants_gestion.stockage import recalculer_references, stockage_deduplique
+from enfants_gestion.suivis import reconstruire_derniers_suivis
+from gestion_financiere.models import CompteFinancier, Parrainage, Transaction
+from gestion_personnel.models import Employe
+from sites_gestion.models import SiteOrphelinat
+from synchronisation.journal import NOMS_PAR_MODELE
+from synchronisation.models import Modification
+
+TAILLE_LOT = 5000
+
+PRENOMS = {
+    'F': ['Aïcha', 'Brigitte', 'Clarisse', 'Danielle', 'Estelle', 'Fatimatou', 'Grâce', 'Hortense', 'Inès',
+          'Joséphine', 'Laure', 'Mireille', 'Nadège', 'Odile', 'Prisca', 'Rachelle', 'Solange', 'Vanessa'],
+    'M': ['Armand', 'Boris', 'Cédric', 'Didier', 'Emmanuel', 'Franck', 'Gaël', 'Hervé', 'Ibrahim', 'Joël',
+          'Landry', 'Moussa', 'Olivier', 'Patrice', 'Rodrigue', 'Serge', 'Thierry', 'Yannick'],
+}
+NOMS = ['Abena', 'Atangana', 'Bello', 'Biya', 'Djoumessi', 'Ebogo', 'Essomba', 'Fotso', 'Kamga', 'Kengne',
+        'Manga', 'Mbarga', 'Mbida', 'Ndongo', 'Ngono', 'Nkoulou', 'Onana', 'Owona', 'Tchinda', 'Tsala']
+VILLES = [('Yaoundé', 'Cameroun'), ('Douala', 'Cameroun'), ('Bafoussam', 'Cameroun'), ('Garoua', 'Cameroun'),
+          ('Bamenda', 'Cameroun'), ('Kribi', 'Cameroun'), ('Libreville', 'Gabon'), ('Brazzaville', 'Congo'),
+          ('Bangui', 'Centrafrique'), ("N'Djamena", 'Tchad')]
+CONSULTATIONS = ['Généraliste', 'Vaccin', 'Dentiste', 'Pédiatre', 'Ophtalmologue', 'Bilan de santé']
+DIAGNOSTICS = ['Paludisme simple', 'Rhume', 'Gastro-entérite', 'Carie dentaire', 'RAS, bonne santé', 'Angine']
+CLASSES = ['Maternelle', 'CP', 'CE1', 'CE2', 'CM1', 'CM2', '6e', '5e', '4e', '3e', '2nde', '1ère', 'Terminale']
+POSTES = {'Directeur': 'Directeur de site', 'Comptable': 'Comptable', 'Soignant': 'Infirmier',
+          'Gestionnaire': 'Gestionnaire', 'Bénévole': 'Animateur', 'Secrétaire': 'Secrétaire', 'RH': 'Chargé RH'}
+# Rôle -> poids dans la population des comptes utilisateurs
+ROLES = {'Directeur': 1, 'Gestionnaire': 2, 'Comptable': 2, 'Soignant': 5, 'Secrétaire': 2, 'RH': 1, 'Bénévole': 2}
+ROLES_GLOBAUX = {'Directeur', 'Gestionnaire', 'RH'}
+COMPTES = ['Caisse', 'Banque', 'Parrainages']
+MONTANTS_PARRAINAGE = [Decimal(montant) for montant in (10000, 15000, 20000, 25000, 50000)]
+
+
+def _slug(texte):
+    return unicodedata.normalize('NFKD', texte).encode('ascii', 'ignore').decode().lower().replace(' ', '-')
+
+
+class Generateur:
+
+    def __init__(self, options, ecrire):
+        self.options = options
+        self.ecrire = ecrire
+        self.hasard = random.Random(options['graine'])
+        self.fin = options['jusqu_au']
+        self.debut = self.fin - relativedelta(years=options['annees'])
+        self.journal = not options['sans_journal']
+
+    # -------------------------------------------------------------------
+    # Outils
+    # -------------------------------------------------------------------
+
+    def date_entre(self, debut, fin):
+        return debut + timedelta(days=self.hasard.randint(0, max((fin - debut).days, 0)))
+
+    def horodatage(self, jour):
+        return datetime.combine(jour, heure(self.hasard.randint(7, 18), self.hasard.randint(0, 59)), tzinfo=timezone.utc)
+
+    def auteur(self, site_id):
+        return self.hasard.choice(self.utilisateurs_par_site[site_id] or [None])
+
+    def creer(self, modele, objets, sites=None):
+        """bulk_create, puis journal de synchronisation (`sites(objet)` : identifiants de ses sites)."""
+        modele._default_manager.bulk_create(objets, batch_size=TAILLE_LOT)
+        if self.journal and sites is not None:
+            nom = NOMS_PAR_MODELE[modele]
+            Modification.objects.bulk_create([
+                Modification(modele=nom, objet_id=objet.pk, site_id=site_id, action='creation')
+                for objet in objets for site_id in sites(objet)
+            ], batch_size=TAILLE_LOT)
+        return objets
+
+    def etape(self, libelle, fonction):
+        debut = time.perf_counter()
+        nombre = fonction()
+        self.ecrire(f"{nombre} {libelle} ({time.perf_counter() - debut:.1f} s)")
+
+    # -------------------------------------------------------------------
+    # Sites, comptes, utilisateurs, employés
+    # -------------------------------------------------------------------
+
+    def sites(self):
+        prefixe = self.options['prefixe']
+        objets = []
+        for numero in range(1, self.options['sites'] + 1):
+            ville, pays = VILLES[(numero - 1) % len(VILLES)]
+            objets.append(SiteOrphelinat(
+                nom=f"{prefixe} {numero:03d} – {ville}", ville=ville, pays=pays,
+                adresse=f"BP {self.hasard.randint(100, 9999)} {ville}",
+            ))
+        self.sites_ids = [site.pk for site in self.creer(SiteOrphelinat, objets)]
+        # Sites de tailles inégales, comme en réalité
+        self.poids_sites = [self.hasard.uniform(0.3, 2.0) for _site in self.sites_ids]
+        return len(objets)
+
+    def comptes(self):
+        objets = []
+        for site_id in self.sites_ids:
+            for nom in COMPTES:
+                objets.append(CompteFinancier(
+                    site_id=site_id, nom=nom, solde_initial=Decimal(self.hasard.randrange(0, 200) * 10000),
+                ))
+        self.creer(CompteFinancier, objets)
+        self.comptes_par_site = {site_id: [] for site_id in self.sites_ids}
+        for compte in objets:
+            self.comptes_par_site[compte.site_id].append(compte.pk)
+        self.site_du_compte = {compte.pk: compte.site_id for compte in objets}
+        return len(objets)
+
+    def utilisateurs(self):
+        Utilisateur = get_user_model()
+        prefixe = _slug(self.options['prefixe'])
+        mot_de_passe = make_password(self.options['mot_de_passe'])  # Hachage coûteux : une seule fois
+        groupes = {groupe.name: groupe.pk for groupe in Group.objects.filter(name__in=ROLES)}
+        roles, poids = list(ROLES), list(ROLES.values())
+
+        objets, affectations = [], []
+        for numero in range(1, self.options['utilisateurs'] + 1):
+            role = self.hasard.choices(roles, poids)[0]
+            central = role == 'Comptable' and self.hasard.random() < 0.3
+            if central or (role in ROLES_GLOBAUX and self.hasard.random() < 0.5):
+                sites = []
+            else:
+                sites = self.hasard.sample(self.sites_ids, min(self.hasard.choice((1, 1, 1, 2)), len(self.sites_ids)))
+            prenom = self.hasard.choice(PRENOMS[self.hasard.choice('FM')])
+            objets.append(Utilisateur(
+                username=f"{prefixe}{numero:05d}", first_name=prenom, last_name=self.hasard.choice(NOMS),
+                email=f"{prefixe}{numero:05d}@exemple.org", password=mot_de_passe, role=role,
+                is_comptable_central=central,
+            ))
+            affectations.append(sites)
+        Utilisateur.objects.bulk_create(objets, batch_size=TAILLE_LOT)
+
+        Utilisateur.sites.through.objects.bulk_create([
+            Utilisateur.sites.through(customuser_id=utilisateur.pk, siteorphelinat_id=site_id)
+            for utilisateur, sites in zip(objets, affectations) for site_id in sites
+        ], batch_size=TAILLE_LOT)
+        Utilisateur.groups.through.objects.bulk_create([
+            Utilisateur.groups.through(customuser_id=utilisateur.pk, group_id=groupes[utilisateur.role])
+            for utilisateur in objets if utilisateur.role in groupes
+        ], batch_size=TAILLE_LOT)
+
+        self.utilisateurs_crees = list(zip(objets, affectations))
+        self.utilisateurs_par_site = {site_id: [] for site_id in self.sites_ids}
+        for utilisateur, sites in self.utilisateurs_crees:
+            for site_id in sites or self.sites_ids:
+                self.utilisateurs_par_site[site_id].append(utilisateur.pk)
+        return len(objets)
+
+    def employes(self):
+        objets, affectations = [], []
+        comptes = iter(self.utilisateurs_crees)
+        for _numero in range(self.options['employes']):
+            utilisateur, sites = next(comptes, (None, None))
+            if utilisateur is None or not sites:
+                sites = self.hasard.sample(self.sites_ids, min(self.hasard.choice((1, 1, 2)), len(self.sites_ids)))
+            role = utilisateur.role if utilisateur else self.hasard.choice(list(ROLES))
+            objets.append(Employe(
+                utilisateur_id=utilisateur.pk if utilisateur else None,
+                nom=utilisateur.last_name if utilisateur else self.hasard.choice(NOMS),
+                prenom=utilisateur.first_name if utilisateur else self.hasard.choice(PRENOMS[self.hasard.choice('FM')]),
+                poste=POSTES[role], type_contrat=self.hasard.choices(('CDI', 'CDD', 'Benevole'), (6, 3, 1))[0],
+                date_embauche=self.date_entre(self.debut, self.fin),
+                telephone=f"+237 6{self.hasard.randint(10000000, 99999999)}",
+                salaire=None if role == 'Bénévole' else Decimal(self.hasard.randrange(60, 400) * 1000),
+                is_active=self.hasard.random() > 0.05,
+            ))
+            affectations.append(sites)
+        Employe.objects.bulk_create(objets, batch_size=TAILLE_LOT)
+        Employe.sites.through.objects.bulk_create([
+            Employe.sites.through(employe_id=employe.pk, siteorphelinat_id=site_id)
+            for employe, sites in zip(objets, affectations) for site_id in sites
+        ], batch_size=TAILLE_LOT)
+        # Journalisé après les affectations : le journal d'un employé porte sur ses sites
+        if self.journal:
+            Modification.objects.bulk_create([
+                Modification(modele=NOMS_PAR_MODELE[Employe], objet_id=employe.pk, site_id=site_id, action='creation')
+                for employe, sites in zip(objets, affectations) for site_id in sites
+            ], batch_size=TAILLE_LOT)
+
+        self.employes_par_site = {site_id: [] for site_id in self.sites_ids}
+        for employe, sites in zip(objets, affectations):
+            if employe.salaire is not None:
+                for site_id in sites:
+                    self.employes_par_site[site_id].append(employe.pk)
+        return len(objets)
+
+    # -------------------------------------------------------------------
+    # Enfants, suivis, documents, historique
+    # -------------------------------------------------------------------
+
+    def modeles_documents(self):
+        """Un fichier par type de document : les documents générés partagent ces blobs (stockage dédupliqué)."""
+        stockage = stockage_deduplique()
+        return {
+            type_document: stockage.save(
+                f"{type_document}.txt", ContentFile(f"{libelle} – document de démonstration.\n".encode()),
+            )
+            for type_document, libelle in Document.TYPE_DOCUMENT_CHOICES
+        }
+
+    def enfants(self):
+        self.fichiers = self.modeles_documents()
+        self.enfants_crees = []
+        total = self.options['enfants']
+        for debut in range(0, total, TAILLE_LOT):
+            self._lot_enfants(min(TAILLE_LOT, total - debut))
+        return total
+
+    def _lot_enfants(self, nombre):
+        hasard = self.hasard
+        enfants = []
+        for _numero in range(nombre):
+            site_id = hasard.choices(self.sites_ids, self.poids_sites)[0]
+            sexe = hasard.choice('FM')
+            naissance = self.date_entre(self.fin - relativedelta(years=18), self.fin - relativedelta(years=1))
+            arrivee = self.date_entre(max(naissance, self.debut - relativedelta(years=5)), self.fin)
+            statut = hasard.choices(('accueilli', 'adopte', 'reunifie', 'majeur'), (85, 5, 6, 4))[0]
+            enfants.append(Enfant(
+                site_id=site_id, nom=hasard.choice(NOMS), prenom=hasard.choice(PRENOMS[sexe]), sexe=sexe,
+                date_naissance=naissance, date_arrivee=arrivee, lieu_naissance=hasard.choice(VILLES)[0],
+                motif_admission=hasard.choice(("Orphelin de père et de mère", "Abandon", "Placement judiciaire")),
+                histoire=f"Arrivé(e) le {arrivee:%d/%m/%Y}.", statut=statut,
+                date_depart=self.date_entre(arrivee, self.fin) if statut != 'accueilli' else None,
+                is_active=hasard.random() > 0.03,
+            ))
+        self.creer(Enfant, enfants, lambda enfant: [enfant.site_id])
+
+        historique, medicaux, scolaires, documents = [], [], [], []
+        for enfant in enfants:
+            self.enfants_crees.append((enfant.pk, enfant.site_id, enfant.date_arrivee, enfant.date_depart, enfant.is_active))
+            historique.extend(self._versions(enfant))
+            medicaux.extend(self._suivis_medicaux(enfant))
+            scolaires.extend(self._suivis_scolaires(enfant))
+            documents.extend(self._documents(enfant))
+
+        Enfant.history.model.objects.bulk_create(historique, batch_size=TAILLE_LOT)
+        par_enfant = {enfant.pk: enfant.site_id for enfant in enfants}
+        self.creer(SuiviMedical, medicaux, lambda suivi: [par_enfant[suivi.enfant_id]])
+        self.creer(SuiviScolaire, scolaires, lambda suivi: [par_enfant[suivi.enfant_id]])
+        Document.objects.bulk_create(documents, batch_size=TAILLE_LOT)
+        self.compteurs['versions'] += len(historique)
+        self.compteurs['suivis'] += len(medicaux) + len(scolaires)
+        self.compteurs['documents'] += len(documents)
+
+    def _versions(self, enfant):
+        """Création puis modifications ; la dernière version est l'état actuel du dossier."""
+        Historique = Enfant.history.model
+        champs = [champ.attname for champ in Historique._meta.concrete_fields if not champ.name.startswith('history_')]
+        etat = {attname: getattr(enfant, attname) for attname in champs}
+        nombre = self.hasard.randint(1, max(2 * self.options['versions_par_enfant'] - 1, 1))
+        dates = sorted(self.date_entre(enfant.date_arrivee, self.fin) for _version in range(nombre - 1))
+        versions = []
+        for numero, jour in enumerate([enfant.date_arrivee, *dates]):
+            derniere = numero == nombre - 1
+            donnees = dict(etat) if derniere else {
+                **etat, 'statut': 'accueilli', 'date_depart': None, 'is_active': True,
+                'histoire': etat['histoire'] + ' Suivi en cours.' * numero,
+            }
+            versions.append(Historique(
+                **donnees, history_date=self.horodatage(jour), history_type='+' if numero == 0 else '~',
+                history_user_id=self.auteur(enfant.site_id),
+            ))
+        return versions
+
+    def _suivis_medicaux(self, enfant):
+        fin = enfant.date_depart or self.fin
+        return [
+            SuiviMedical(
+                enfant_id=enfant.pk, date_consultation=self.date_entre(enfant.date_arrivee, fin),
+                type_consultation=self.hasard.choice(CONSULTATIONS), medecin=f"Dr {self.hasard.choice(NOMS)}",
+                diagnostic=self.hasard.choice(DIAGNOSTICS), traitement=self.hasard.choice(('', 'Repos', 'Antipaludéen')),
+                is_active=self.hasard.random() > 0.02,
+            )
+            for _numero in range(self.hasard.randint(0, 2 * self.options['suivis_par_enfant']))
+        ]
+
+    def _suivis_scolaires(self, enfant):
+        """Une année scolaire par rentrée passée au centre après 3 ans (au plus --suivis-par-enfant)."""
+        fin = enfant.date_depart or self.fin
+        premiere = max(enfant.date_arrivee.year, enfant.date_naissance.year + 3)
+        annees = list(range(premiere, fin.year + (1 if fin.month >= 9 else 0)))[-self.options['suivis_par_enfant']:]
+        return [
+            SuiviScolaire(
+                enfant_id=enfant.pk, annee_scolaire=f"{annee}-{annee + 1}",
+                ecole=f"École publique de {self.hasard.choice(VILLES)[0]}",
+                classe=CLASSES[min(max(annee - enfant.date_naissance.year - 3, 0), len(CLASSES) - 1)],
+                resultats=self.hasard.choice(('Passable', 'Assez bien', 'Bien', 'Très bien')),
+            )
+            for annee in annees
+        ]
+
+    def _documents(self, enfant):
+        types = [type_document for type_document, _libelle in Document.TYPE_DOCUMENT_CHOICES]
+        return [
+            Document(enfant_id=enfant.pk, type_document=type_document, fichier=self.fichiers[type_document],
+                     description=f"{type_document.replace('_', ' ').capitalize()} de {enfant.prenom}")
+            for type_document in (
+                self.hasard.choice(types) for _numero in range(self.hasard.randint(0, 2 * self.options['documents_par_enfant']))
+            )
+        ]
+
+    # -------------------------------------------------------------------
+    # Parrainages et transactions
+    # -------------------------------------------------------------------
+
+    def parrainages(self):
+        candidats = [enfant for enfant in self.enfants_crees if enfant[4]]
+        choisis = self.hasard.sample(candidats, min(self.options['parrainages'], len(candidats)))
+        parrainages = []
+        for enfant_id, site_id, arrivee, depart, _actif in choisis:
+            debut = self.date_entre(max(arrivee, self.debut), self.fin).replace(day=1)
+            termine = depart or (self.date_entre(debut, self.fin) if self.hasard.random() < 0.15 else None)
+            parrainages.append(Parrainage(
+                enfant_id=enfant_id, parrain_nom=f"{self.hasard.choice(PRENOMS['F'] + PRENOMS['M'])} {self.hasard.choice(NOMS)}",
+                montant_mensuel=self.hasard.choice(MONTANTS_PARRAINAGE), date_debut=debut, date_fin=termine,
+            ))
+        sites = {enfant_id: site_id for enfant_id, site_id, *_reste in choisis}
+        self.creer(Parrainage, parrainages, lambda parrainage: [sites[parrainage.enfant_id]])
+
+        versements = []
+        for parrainage in parrainages:
+            site_id = sites[parrainage.enfant_id]
+            versements.extend(self._versements(parrainage, site_id))
+            if len(versements) >= TAILLE_LOT:
+                self._creer_transactions(versements)
+                versements = []
+        self._creer_transactions(versements)
+        return len(parrainages)
+
+    def _versements(self, parrainage, site_id):
+        """Un versement par mois, avec des oublis et quelques parrains en retard sur les derniers mois."""
+        compte = self.comptes_par_site[site_id][COMPTES.index('Parrainages')]
+        fin = min(parrainage.date_fin or self.fin, self.fin)
+        if self.hasard.random() < 0.1:
+            fin -= relativedelta(months=self.hasard.randint(1, 4))
+        mois = parrainage.date_debut
+        while mois <= fin:
+            if self.hasard.random() > 0.05:
+                yield Transaction(
+                    compte_id=compte, type_transaction='entree', categorie='Parrainage',
+                    montant=parrainage.montant_mensuel, date_transaction=mois + timedelta(days=self.hasard.randint(0, 9)),
+                    description=f"Versement {mois:%m/%Y} de {parrainage.parrain_nom}", parrainage_lie_id=parrainage.pk,
+                    cree_par_id=self.auteur(site_id),
+                )
+            mois += relativedelta(months=1)
+
+    def transactions(self):
+        hasard = self.hasard
+        entrees = [categorie for categorie, _libelle in Transaction.CATEGORIE_ENTREE_CHOICES if categorie != 'Parrainage']
+        sorties = [categorie for categorie, _libelle in Transaction.CATEGORIE_SORTIE_CHOICES]
+        total = self.options['transactions']
+        lot = []
+        for _numero in range(total):
+            site_id = hasard.choices(self.sites_ids, self.poids_sites)[0]
+            entree = hasard.random() < 0.35
+            categorie = hasard.choice(entrees if entree else sorties)
+            employe = None
+            if categorie == 'Salaires' and self.employes_par_site[site_id]:
+                employe = hasard.choice(self.employes_par_site[site_id])
+            lot.append(Transaction(
+                compte_id=hasard.choice(self.comptes_par_site[site_id][:2]),
+                type_transaction='entree' if entree else 'sortie', categorie=categorie,
+                montant=Decimal(hasard.randrange(1, 400) * 500), date_transaction=self.date_entre(self.debut, self.fin),
+                description=f"{categorie} – pièce n° {hasard.randint(1000, 99999)}", employe_id=employe,
+                is_active=hasard.random() > 0.02, cree_par_id=self.auteur(site_id),
+            ))
+            if len(lot) == TAILLE_LOT:
+                self._creer_transactions(lot)
+                lot = []
+        self._creer_transactions(lot)
+        return total
+
+    def _creer_transactions(self, transactions):
+        self.creer(Transaction, transactions, lambda transaction: [self.site_du_compte[transaction.compte_id]])
+        self.compteurs['transactions'] += len(transactions)
+
+    # -------------------------------------------------------------------
+
+    def executer(self):
+        self.compteurs = {'versions': 0, 'suivis': 0, 'documents': 0, 'transactions': 0}
+        self.etape("sites", self.sites)
+        self.etape("comptes financiers", self.comptes)
+        self.etape("utilisateurs", self.utilisateurs)
+        self.etape("employés", self.employes)
+        self.etape("enfants", self.enfants)
+        self.etape("parrainages", self.parrainages)
+        self.etape("autres transactions", self.transactions)
+        # Ce que les signaux auraient fait
+        self.etape("pointeurs de suivis recalculés", reconstruire_derniers_suivis)
+        recalculer_references()
+        invalider(*MODELES_VERSIONNES)
+        return self.compteurs
+
+
+class Command(BaseCommand):
+    help = (
+        "Remplit la base avec un jeu de données synthétique, reproductible (--graine), "
+        "pour mesurer les pages et les exports à grande échelle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sites', type=int, default=10)
+        parser.add_argument('--enfants', type=int, default=5000)
+        parser.add_argument('--suivis-par-enfant', type=int, default=3, help="Moyenne de suivis médicaux (et maximum d'années scolaires).")
+        parser.add_argument('--documents-par-enfant', type=int, default=2, help="Moyenne.")
+        parser.add_argument('--versions-par-enfant', type=int, default=3, help="Moyenne des versions d'historique.")
+        parser.add_argument('--parrainages', type=int, default=2000)
+        parser.add_argument('--transactions', type=int, default=100000, help="Transactions hors versements de parrainage.")
+        parser.add_argument('--annees', type=int, default=5, help="Profondeur des comptes, en années.")
+        parser.add_argument('--employes', type=int, default=200)
+        parser.add_argument('--utilisateurs', type=int, default=50)
+        parser.add_argument('--graine', type=int, default=1)
+        parser.add_argument('--jusqu-au', type=date.fromisoformat, default=date.today(),
+                            help="Date la plus récente des données (AAAA-MM-JJ, aujourd'hui par défaut).")
+        parser.add_argument('--prefixe', default="Synthèse", help="Début du nom des sites et des identifiants.")
+        parser.add_argument('--mot-de-passe', default="synthese", help="Mot de passe de tous les comptes créés.")
+        parser.add_argument('--sans-journal', action='store_true', help="N'écrit pas le journal de synchronisation.")
+
+    def handle(self, *args, **options):
+        if settings.SITES_PARTITIONS:
+            raise CommandError(
+                "Mode une base par site actif : générez les données sur la base principale, "
+                "puis répartissez-les avec `partitionner_sites`."
+            )
+        if not options['sites']:
+            raise CommandError("Il faut au moins un site.")
+        if SiteOrphelinat.objects.filter(nom__startswith=options['prefixe']).exists():
+            raise CommandError(f"La base contient déjà des sites « {options['prefixe']} … » : choisissez un autre --prefixe.")
+
+        debut = time.perf_counter()
+        with transaction.atomic():
+            compteurs = Generateur(options, self.stdout.write).executer()
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé en {time.perf_counter() - debut:.0f} s : {compteurs['transactions']} transactions, "
+            f"{compteurs['suivis']} suivis, {compteurs['documents']} documents, "
+            f"{compteurs['versions']} versions d'historique. Mot de passe des comptes : {options['mot_de_passe']}"
+        ))
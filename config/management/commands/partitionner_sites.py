@@ -0,0 +1,111 @@
+# config/management/commands/partitionner_sites.py
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from config.cache import invalider
+from config.partitions import (
+    AFFECTATIONS_MIROIR, APPLICATIONS_PARTITIONNEES, MODELES_MIROIR, PLAGE_IDENTIFIANTS,
+    copier_affectations, copier_referentiel, est_partitionne,
+)
+
+# Chemin de chaque modèle partitionné vers son site
+CHEMINS_SITE = {
+    'enfant': 'site',
+    'historicalenfant': 'site',
+    'document': 'enfant__site',
+    'suivimedical': 'enfant__site',
+    'suiviscolaire': 'enfant__site',
+    'noteevolutive': 'enfant__site',
+    'textedocument': 'document__enfant__site',
+    'comptefinancier': 'site',
+    'parrainage': 'enfant__site',
+    'paie': 'site',
+    'transaction': 'compte__site',
+}
+TAILLE_LOT = 500
+
+
+def modeles_partitionnes():
+    modeles = [
+        modele
+        for application in sorted(APPLICATIONS_PARTITIONNEES)
+        for modele in apps.get_app_config(application).get_models(include_auto_created=True)
+        if est_partitionne(modele)
+    ]
+    sans_chemin = [modele._meta.label for modele in modeles if modele._meta.model_name not in CHEMINS_SITE]
+    if sans_chemin:
+        raise CommandError(f"Chemin vers le site inconnu pour : {', '.join(sans_chemin)}.")
+    return modeles
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée ou met à jour la base de chaque site partitionné (SITES_PARTITIONS) : migrations, "
+        "copie des référentiels, puis déplacement des données du site depuis la base principale."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sans-deplacement', action='store_true',
+            help="Migre les bases et copie les référentiels sans déplacer de données.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.SITES_PARTITIONS:
+            raise CommandError("Aucun site partitionné (variables SITES_PARTITIONS_DOSSIER et SITES_PARTITIONS).")
+        modeles = modeles_partitionnes()
+
+        for site_id, alias in settings.SITES_PARTITIONS.items():
+            call_command('migrate', database=alias, interactive=False, verbosity=0)
+            self._decaler_identifiants(alias, site_id, modeles)
+            for libelle in MODELES_MIROIR:
+                modele = apps.get_model(libelle)
+                copier_referentiel(modele, modele._base_manager.using(DEFAULT_DB_ALIAS).all(), bases=[alias])
+            for libelle, champ in AFFECTATIONS_MIROIR:
+                copier_affectations(apps.get_model(libelle), champ, bases=[alias])
+
+            deplaces = 0 if options['sans_deplacement'] else self._deplacer(site_id, alias, modeles)
+            self.stdout.write(self.style.SUCCESS(f"Site {site_id} ({alias}) : {deplaces} ligne(s) déplacée(s)."))
+
+    def _decaler_identifiants(self, alias, site_id, modeles):
+        """Les nouveaux objets du site reçoivent des identifiants à partir de site_id × PLAGE_IDENTIFIANTS."""
+        debut = site_id * PLAGE_IDENTIFIANTS
+        with transaction.atomic(using=alias), connections[alias].cursor() as curseur:
+            for modele in modeles:
+                table = modele._meta.db_table
+                curseur.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+                ligne = curseur.fetchone()
+                if ligne is None:
+                    curseur.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, debut])
+                elif ligne[0] < debut:
+                    curseur.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [debut, table])
+
+    def _deplacer(self, site_id, alias, modeles):
+        """
+        Copie les lignes du site dans sa base (les clés étrangères SQLite sont vérifiées à la
+        validation), puis les supprime de la base principale. Relancer la commande après un
+        échec est sans risque : les lignes déjà copiées sont ignorées.
+        """
+        lignes = {
+            modele: list(modele._base_manager.using(DEFAULT_DB_ALIAS).filter(**{CHEMINS_SITE[modele._meta.model_name]: site_id}))
+            for modele in modeles
+        }
+        with transaction.atomic(using=alias):
+            for modele, objets in lignes.items():
+                modele._base_manager.using(alias).bulk_create(objets, batch_size=TAILLE_LOT, ignore_conflicts=True)
+
+        # Suppression directe : les objets existent toujours (dans la partition), pas de signal ni d'historique
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), connections[DEFAULT_DB_ALIAS].cursor() as curseur:
+            for modele, objets in lignes.items():
+                table, colonne = modele._meta.db_table, modele._meta.pk.column
+                pks = [objet.pk for objet in objets]
+                for debut in range(0, len(pks), TAILLE_LOT):
+                    lot = pks[debut:debut + TAILLE_LOT]
+                    curseur.execute(
+                        f'DELETE FROM "{table}" WHERE "{colonne}" IN ({", ".join(["%s"] * len(lot))})', lot,
+                    )
+        invalider(*modeles)
+        return sum(len(objets) for objets in lignes.values())
@@ -0,0 +1,193 @@
+# config/mesures.py
+"""
+Temps passé par chaque requête HTTP, pour savoir où une page lente perd son temps.
+
+Le total est découpé sans recouvrement :
+- `sql` : requêtes SQL (nombre et durée), y compris celles lancées par les gabarits ;
+- `gabarits` : rendu des gabarits, hors SQL ;
+- `vue` : le reste (code Python de la vue et des middlewares).
+
+Chaque réponse reçoit un en-tête `Server-Timing` (lisible dans l'onglet Réseau
+du navigateur), chaque requête une ligne JSON dans le journal `config.mesures`
+(MESURES_JOURNAL), et les centiles par vue de ce processus sont consultables
+par le personnel sur /outils/mesures/.
+
+Désactivé (MESURES_ACTIVES), le middleware se retire et aucune fonction
+n'enveloppe les requêtes SQL ; seul reste un test de ContextVar par rendu de
+gabarit. Fonctionne en WSGI comme en ASGI : la mesure en cours est portée par
+une ContextVar, que les vues synchrones exécutées dans un fil par ASGI héritent.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+_mesure = ContextVar('mesure', default=None)
+
+
+class Mesure:
+    __slots__ = ('debut', 'requetes', 'duree_sql', 'duree_gabarits', 'profondeur_gabarits')
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.requetes = 0
+        self.duree_sql = 0.0
+        self.duree_gabarits = 0.0
+        self.profondeur_gabarits = 0
+
+    def resultats(self):
+        """Durées en millisecondes."""
+        total = (time.perf_counter() - self.debut) * 1000
+        sql, gabarits = self.duree_sql * 1000, self.duree_gabarits * 1000
+        return {
+            'total': total, 'sql': sql, 'gabarits': gabarits,
+            'vue': max(total - sql - gabarits, 0.0), 'requetes': self.requetes,
+        }
+
+
+# =======================================================================
+# SQL ET GABARITS
+# =======================================================================
+
+def _mesurer_requete(execute, sql, params, many, context):
+    mesure = _mesure.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        mesure.requetes += 1
+        mesure.duree_sql += time.perf_counter() - debut
+
+
+def _envelopper_connexion(sender, connection, **kwargs):
+    if _mesurer_requete not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_mesurer_requete)
+
+
+def connecter_signaux():
+    if settings.MESURES_ACTIVES:
+        connection_created.connect(_envelopper_connexion, dispatch_uid='mesures_sql')
+
+
+class GabaritMesure(Template):
+
+    def render(self, context=None, request=None):
+        mesure = _mesure.get()
+        # Un gabarit rendu pendant un autre (render_to_string dans une balise) est déjà compté
+        if mesure is None or mesure.profondeur_gabarits:
+            return super().render(context, request)
+        debut, sql_avant = time.perf_counter(), mesure.duree_sql
+        mesure.profondeur_gabarits += 1
+        try:
+            return super().render(context, request)
+        finally:
+            mesure.profondeur_gabarits -= 1
+            mesure.duree_gabarits += time.perf_counter() - debut - (mesure.duree_sql - sql_avant)
+
+
+class DjangoTemplatesMesures(DjangoTemplates):
+    """Moteur de gabarits Django dont les rendus sont chronométrés (TEMPLATES['BACKEND'])."""
+
+    def from_string(self, template_code):
+        return GabaritMesure(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return GabaritMesure(super().get_template(template_name).template, self)
+
+
+# =======================================================================
+# MIDDLEWARE
+# =======================================================================
+
+_echantillons = defaultdict(lambda: deque(maxlen=settings.MESURES_ECHANTILLONS))
+_verrou_echantillons = threading.Lock()
+
+
+class ServerTimingMiddleware:
+    """En tête de MIDDLEWARE, pour que le total couvre les autres middlewares."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.MESURES_ACTIVES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        mesure = Mesure()
+        jeton = _mesure.set(mesure)
+        try:
+            response = self.get_response(request)
+        finally:
+            _mesure.reset(jeton)
+        return self._terminer(request, response, mesure)
+
+    async def __acall__(self, request):
+        mesure = Mesure()
+        jeton = _mesure.set(mesure)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _mesure.reset(jeton)
+        return self._terminer(request, response, mesure)
+
+    def _terminer(self, request, response, mesure):
+        resultats = mesure.resultats()
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={resultats["sql"]:.1f};desc="{resultats["requetes"]} req"',
+            f'gabarits;dur={resultats["gabarits"]:.1f}',
+            f'vue;dur={resultats["vue"]:.1f}',
+            f'total;dur={resultats["total"]:.1f}',
+        ])
+        nom_vue = request.resolver_match.view_name if request.resolver_match else '(aucune vue)'
+        with _verrou_echantillons:
+            _echantillons[nom_vue].append(resultats)
+        logger.info(json.dumps({
+            'nom_vue': nom_vue, 'methode': request.method, 'chemin': request.path, 'statut': response.status_code,
+            **{cle: round(valeur, 2) for cle, valeur in resultats.items()},
+        }, ensure_ascii=False))
+        return response
+
+
+# =======================================================================
+# CENTILES
+# =======================================================================
+
+def centile(valeurs_triees, pourcentage):
+    """Rang le plus proche (nearest-rank)."""
+    rang = max(math.ceil(pourcentage / 100 * len(valeurs_triees)) - 1, 0)
+    return valeurs_triees[min(rang, len(valeurs_triees) - 1)]
+
+
+def statistiques_vues():
+    """[{nom_vue, nombre, total_p50, total_p95, …}] des requêtes mesurées dans ce processus."""
+    with _verrou_echantillons:
+        copies = {nom_vue: list(echantillons) for nom_vue, echantillons in _echantillons.items()}
+    lignes = []
+    for nom_vue, echantillons in copies.items():
+        ligne = {'nom_vue': nom_vue, 'nombre': len(echantillons)}
+        for cle in ('total', 'vue', 'sql', 'gabarits', 'requetes'):
+            valeurs = sorted(echantillon[cle] for echantillon in echantillons)
+            for rang in (50, 95, 99):
+                ligne[f'{cle}_p{rang}'] = round(centile(valeurs, rang), 2)
+        lignes.append(ligne)
+    return lignes
+
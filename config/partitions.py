@@ -0,0 +1,231 @@
+# config/partitions.py
+"""
+Mode facultatif : une base SQLite par site (SITES_PARTITIONS_DOSSIER, SITES_PARTITIONS).
+
+Les données opérationnelles d'un site partitionné (enfants, suivis, documents,
+historique, comptes, transactions, parrainages, paies) vivent dans
+`site_<id>.sqlite3` : un import en masse sur un site ne verrouille plus que sa
+base. Les référentiels (sites, utilisateurs, personnel, journal de
+synchronisation, sessions) restent dans la base principale, avec les données
+des sites non partitionnés.
+
+Chaque partition garde une copie des sites, utilisateurs et employés (mise à jour
+par signal après chaque enregistrement, et par `partitionner_sites`) : les clés
+étrangères et les jointures (`site__nom`, `select_related('site')`, `cree_par`)
+restent locales à la partition.
+
+Une requête s'exécute dans la partition de son site (PartitionSiteMiddleware) :
+le site choisi avec `?site=` (mémorisé en session) ou l'unique site de
+l'utilisateur. Un utilisateur multi-sites travaille donc dans un site actif à la
+fois ; sans site actif, il voit les sites non partitionnés. Le tableau de bord et
+le rapport financier des rôles globaux interrogent toutes les bases en parallèle
+avec `repartir()` et fusionnent les résultats.
+
+Limites : le transfert d'un enfant vers un site d'une autre partition n'est pas
+géré par le formulaire, et le flux de synchronisation d'un utilisateur global ne
+couvre que son site actif.
+"""
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+APPLICATIONS_PARTITIONNEES = {'enfants_gestion', 'gestion_financiere'}
+# Archive de l'historique (sa propre base) et blobs du stockage dédupliqué (partagés entre sites)
+MODELES_NON_PARTITIONNES = {'historiqueenfantarchive', 'fichierstocke'}
+# Référentiels copiés dans chaque partition (cibles des clés étrangères des données partitionnées)
+MODELES_MIROIR = ('sites_gestion.SiteOrphelinat', settings.AUTH_USER_MODEL, 'gestion_personnel.Employe')
+# Affectations aux sites copiées avec eux (sous-requêtes `site__in=user.sites.all()` des vues)
+AFFECTATIONS_MIROIR = ((settings.AUTH_USER_MODEL, 'sites'), ('gestion_personnel.Employe', 'sites'))
+# Écart entre les identifiants de deux partitions : un même id ne désigne jamais deux objets
+PLAGE_IDENTIFIANTS = 10 ** 9
+
+_partition = ContextVar('partition', default=None)
+
+
+def est_partitionne(modele):
+    meta = modele._meta
+    return meta.app_label in APPLICATIONS_PARTITIONNEES and meta.model_name not in MODELES_NON_PARTITIONNES
+
+
+def partition_du_site(site_id):
+    """Alias de la base du site, ou None si le site n'est pas partitionné."""
+    return settings.SITES_PARTITIONS.get(int(site_id)) if site_id else None
+
+
+def partitions():
+    return list(settings.SITES_PARTITIONS.values())
+
+
+def partition_active():
+    """Alias de la partition de la requête ou du bloc en cours (None : base principale)."""
+    return _partition.get()
+
+
+@contextmanager
+def dans_partition(alias):
+    """Exécute le bloc dans la base `alias` (None : base principale)."""
+    jeton = _partition.set(alias)
+    try:
+        yield
+    finally:
+        _partition.reset(jeton)
+
+
+def repartir(fonction):
+    """
+    Exécute `fonction()` dans la base principale et dans chaque partition, en
+    parallèle. Retourne la liste des résultats (la base principale en premier).
+    """
+    def executer(alias):
+        with dans_partition(alias):
+            try:
+                return fonction()
+            finally:
+                # Connexions propres au fil d'exécution du pool
+                connections.close_all()
+
+    bases = [None] + partitions()
+    with ThreadPoolExecutor(max_workers=len(bases)) as pool:
+        return list(pool.map(executer, bases))
+
+
+# =======================================================================
+# ROUTAGE
+# =======================================================================
+
+class PartitionsRouter:
+
+    def _base(self, model, hints):
+        if not est_partitionne(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in settings.SITES_PARTITIONS.values():
+            return instance._state.db
+        return _partition.get() or DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        return self._base(model, hints)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label in MODELES_MIROIR:
+            # Les copies sont écrites par `copier_referentiel`, jamais par l'application
+            return DEFAULT_DB_ALIAS
+        return self._base(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, *settings.SITES_PARTITIONS.values()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+
+class PartitionSiteMiddleware:
+    """Place la requête dans la partition du site actif de l'utilisateur (après AuthenticationMiddleware)."""
+    CLE_SESSION = 'site_actif'
+
+    def __init__(self, get_response):
+        if not settings.SITES_PARTITIONS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with dans_partition(partition_du_site(self._site_actif(request))):
+            return self.get_response(request)
+
+    def _site_actif(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            return None
+        site_id = request.GET.get('site', '')
+        if site_id.isdigit() and self._site_autorise(user, int(site_id)):
+            request.session[self.CLE_SESSION] = int(site_id)
+            return int(site_id)
+        site_id = request.session.get(self.CLE_SESSION)
+        if site_id and self._site_autorise(user, site_id):
+            return site_id
+        sites = list(user.sites.values_list('pk', flat=True)[:2])
+        return sites[0] if len(sites) == 1 else None
+
+    def _site_autorise(self, user, site_id):
+        if user.sites.filter(pk=site_id).exists():
+            return True
+        est_global = user.is_superuser or user.is_comptable_central or (
+            user.groups.filter(name__in=['Directeur', 'Gestionnaire', 'RH']).exists() and not user.sites.exists()
+        )
+        return est_global
+
+
+# =======================================================================
+# COPIE DES RÉFÉRENTIELS
+# =======================================================================
+
+def copier_referentiel(modele, objets, bases=None):
+    """Écrit (insertion ou mise à jour) `objets` dans chaque partition, sans signaux d'historique."""
+    # Copies : save_base(using=...) rattacherait l'objet d'origine à la partition
+    objets = [copy.copy(objet) for objet in objets]
+    for alias in bases or partitions():
+        with transaction.atomic(using=alias):
+            for objet in objets:
+                objet.save_base(raw=True, using=alias)
+
+
+def copier_affectations(modele, champ, pks=None, bases=None):
+    """Recopie les lignes de la table d'affectation `modele.champ` des objets `pks` (None : toutes)."""
+    relation = modele._meta.get_field(champ)
+    intermediaire = relation.remote_field.through
+    filtre = {} if pks is None else {f'{relation.m2m_field_name()}__in': list(pks)}
+    lignes = list(intermediaire.objects.using(DEFAULT_DB_ALIAS).filter(**filtre))
+    for alias in bases or partitions():
+        with transaction.atomic(using=alias):
+            intermediaire.objects.using(alias).filter(**filtre).delete()
+            intermediaire.objects.using(alias).bulk_create(lignes)
+
+
+def _copier_apres_enregistrement(sender, instance, raw=False, using=DEFAULT_DB_ALIAS, **kwargs):
+    if raw or using != DEFAULT_DB_ALIAS:
+        return
+    transaction.on_commit(lambda: copier_referentiel(sender, [instance]), using=using)
+
+
+def _supprimer_copies(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    pk = instance.pk
+
+    def supprimer():
+        for alias in partitions():
+            sender._base_manager.using(alias).filter(pk=pk).delete()
+    transaction.on_commit(supprimer, using=using)
+
+
+def _copier_affectations_apres_modification(sender, instance, action, reverse, pk_set, using=DEFAULT_DB_ALIAS, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear') or using != DEFAULT_DB_ALIAS:
+        return
+    modele, champ = _affectations_par_table[sender]
+    # Depuis le site (relation inverse), les objets concernés sont dans pk_set ; après clear(), inconnus
+    pks = (set(pk_set) if pk_set is not None else None) if reverse else {instance.pk}
+    transaction.on_commit(lambda: copier_affectations(modele, champ, pks), using=using)
+
+
+_affectations_par_table = {}
+
+if settings.SITES_PARTITIONS:
+    from django.apps import apps
+
+    for libelle in MODELES_MIROIR:
+        modele = apps.get_model(libelle)
+        post_save.connect(_copier_apres_enregistrement, sender=modele, dispatch_uid=f'partitions_copie_{libelle}')
+        post_delete.connect(_supprimer_copies, sender=modele, dispatch_uid=f'partitions_suppression_{libelle}')
+    for libelle, champ in AFFECTATIONS_MIROIR:
+        modele = apps.get_model(libelle)
+        intermediaire = modele._meta.get_field(champ).remote_field.through
+        _affectations_par_table[intermediaire] = (modele, champ)
+        m2m_changed.connect(
+            _copier_affectations_apres_modification, sender=intermediaire, dispatch_uid=f'partitions_affectations_{libelle}',
+        )
@@ -0,0 +1,370 @@
+# config/requetes.py
+"""
+Relevé des requêtes SQL d'une requête HTTP, pour repérer les N+1.
+
+- `DetecteurRequetesMiddleware` (développement, REQUETES_DETECTEUR) compte les
+  requêtes de chaque page, signale un dépassement de REQUETES_BUDGET et toute
+  requête de même forme répétée au moins REQUETES_SEUIL_REPETITION fois, avec
+  la vue, la ligne de code et la ligne de gabarit qui l'ont déclenchée.
+- `BudgetRequetesMixin` (tests) vérifie qu'une page reste sous son budget et
+  que son nombre de requêtes ne dépend pas du volume de données (10 puis
+  1 000 lignes) : un N+1 ajouté plus tard fait échouer les tests.
+
+- Journal des requêtes lentes (toujours actif, REQUETES_LENTES_SEUIL) : toute
+  requête plus longue que le seuil est journalisée avec ses paramètres et la vue
+  qui l'a lancée, et son plan (EXPLAIN QUERY PLAN) est relevé une fois par
+  forme. Le personnel consulte le cumul par forme sur /outils/requetes-lentes/.
+
+La « forme » d'une requête est son SQL sans les paramètres (Django les passe à
+part), listes `IN (...)` réduites : les requêtes d'une boucle ont la même forme.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+LISTE_IN_RE = re.compile(r'IN \((?:%s, )*%s\)')
+ESPACES_RE = re.compile(r'\s+')
+LECTURE_RE = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+# Code de Django, des bibliothèques et de la mesure des requêtes : ignoré pour situer l'origine d'une requête
+DOSSIERS_IGNORES = tuple({sys.prefix, sys.base_prefix})
+FICHIERS_IGNORES = {__file__, os.path.join(os.path.dirname(__file__), 'mesures.py')}
+
+
+def forme_requete(sql):
+    return ESPACES_RE.sub(' ', LISTE_IN_RE.sub('IN (…)', sql)).strip()
+
+
+def _origine():
+    """
+    (fichier:ligne du code du projet, gabarit:ligne) les plus proches de la requête
+    en cours. Le code qui a lancé le rendu du gabarit n'est pas retenu : seul
+    compte celui appelé par le gabarit (méthode de modèle, balise).
+    """
+    code = gabarit = None
+    cadre = sys._getframe(2)
+    while cadre is not None and gabarit is None:
+        nom_fichier = cadre.f_code.co_filename
+        if cadre.f_code.co_name == 'render_annotated':
+            noeud = cadre.f_locals.get('self')
+            origine = getattr(noeud, 'origin', None)
+            if origine is not None and getattr(noeud, 'token', None) is not None:
+                gabarit = f'{origine.template_name}:{noeud.token.lineno}'
+        elif (
+            code is None and nom_fichier.startswith(str(settings.BASE_DIR))
+            and not nom_fichier.startswith(DOSSIERS_IGNORES) and nom_fichier not in FICHIERS_IGNORES
+        ):
+            code = f'{os.path.relpath(nom_fichier, settings.BASE_DIR)}:{cadre.f_lineno}'
+        cadre = cadre.f_back
+    return code, gabarit
+
+
+@dataclass
+class RequeteSQL:
+    forme: str
+    base: str
+    duree: float
+    code: str
+    gabarit: str
+
+    @property
+    def origine(self):
+        return ' / '.join(filter(None, (self.code, self.gabarit))) or '?'
+
+
+class ReleveRequetes:
+    """
+    Enregistre les requêtes SQL exécutées dans le bloc `with`, sur toutes les
+    bases, dans le fil d'exécution courant.
+    """
+
+    def __init__(self):
+        self.requetes = []
+
+    def __len__(self):
+        return len(self.requetes)
+
+    def __enter__(self):
+        self._pile = ExitStack()
+        for connexion in connections.all():
+            self._pile.enter_context(connexion.execute_wrapper(self._enregistrer))
+        return self
+
+    def __exit__(self, *exc):
+        return self._pile.__exit__(*exc)
+
+    def _enregistrer(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.requetes.append(RequeteSQL(
+                forme_requete(sql), context['connection'].alias, time.perf_counter() - debut, *_origine(),
+            ))
+
+    def repetitions(self, seuil):
+        """[(forme, [requêtes])] des formes exécutées au moins `seuil` fois, de la plus fréquente à la moins fréquente."""
+        par_forme = defaultdict(list)
+        for requete in self.requetes:
+            par_forme[(requete.base, requete.forme)].append(requete)
+        repetees = [(forme, requetes) for (_base, forme), requetes in par_forme.items() if len(requetes) >= seuil]
+        return sorted(repetees, key=lambda element: len(element[1]), reverse=True)
+
+    def rapport(self, seuil=2):
+        lignes = [f"{len(self.requetes)} requête(s) SQL."]
+        for forme, requetes in self.repetitions(seuil):
+            origines = Counter(requete.origine for requete in requetes).most_common(3)
+            lignes.append(
+                f"  {len(requetes)}× depuis {', '.join(origine for origine, _nombre in origines)} : {forme[:300]}"
+            )
+        return '\n'.join(lignes)
+
+
+# =======================================================================
+# DÉVELOPPEMENT
+# =======================================================================
+
+class DetecteurRequetesMiddleware:
+    """À placer en tête de MIDDLEWARE : les requêtes de session et d'authentification comptent aussi."""
+
+    def __init__(self, get_response):
+        if not settings.REQUETES_DETECTEUR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ReleveRequetes() as releve:
+            # Les TemplateResponse sont rendues ici : les requêtes des gabarits sont comptées
+            response = self.get_response(request)
+        response['X-Requetes-SQL'] = str(len(releve))
+
+        vue = request.resolver_match.view_name if request.resolver_match else request.path
+        if len(releve) > settings.REQUETES_BUDGET:
+            logger.warning(
+                "%s %s (%s) : %d requêtes SQL, budget %d.",
+                request.method, request.path, vue, len(releve), settings.REQUETES_BUDGET,
+            )
+        for forme, requetes in releve.repetitions(settings.REQUETES_SEUIL_REPETITION):
+            origines = Counter(requete.origine for requete in requetes).most_common(3)
+            logger.warning(
+                "N+1 probable dans %s : %d requêtes identiques depuis %s\n    %s",
+                vue, len(requetes), ', '.join(f'{origine} ({nombre}×)' for origine, nombre in origines), forme[:500],
+            )
+        return response
+
+
+# =======================================================================
+# TESTS
+# =======================================================================
+
+class BudgetRequetesMixin:
+    """
+    Pour django.test.TestCase (client connecté par le test) :
+
+        self.assertBudgetRequetes(url, 12, remplir)
+
+    `remplir(n)` porte les données de la page à n lignes. La page est chargée à
+    chaque volume de `volumes`, cache vide (le cas le plus coûteux).
+    """
+    volumes = (10, 1000)
+
+    def setUp(self):
+        from django.test import override_settings
+
+        super().setUp()
+        self.enterContext(override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        }))
+
+    def assertBudgetRequetes(self, url, budget, remplir):
+        releves = {}
+        for volume in self.volumes:
+            remplir(volume)
+            cache.clear()
+            with ReleveRequetes() as releve:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, f"{url} ({volume} lignes)")
+            releves[volume] = releve
+
+        for volume, releve in releves.items():
+            self.assertLessEqual(
+                len(releve), budget, f"{url} ({volume} lignes) dépasse son budget.\n{releve.rapport()}",
+            )
+        (petit, releve_petit), *_autres, (grand, releve_grand) = releves.items()
+        self.assertEqual(
+            len(releve_petit), len(releve_grand),
+            f"{url} : le nombre de requêtes dépend du volume ({petit} lignes : {len(releve_petit)}, "
+            f"{grand} lignes : {len(releve_grand)}).\n{releve_grand.rapport()}",
+        )
+
+
+# =======================================================================
+# REQUÊTES LENTES
+# =======================================================================
+
+# Au-delà, les nouvelles formes ne sont plus cumulées (seulement journalisées)
+MAX_FORMES_LENTES = 1000
+
+_requete_http = ContextVar('requete_http', default=None)
+_plan_en_cours = ContextVar('plan_en_cours', default=False)
+_requetes_lentes = {}
+_verrou_lentes = threading.Lock()
+
+
+@dataclass
+class RequeteLente:
+    """Cumul, dans ce processus, des exécutions lentes d'une forme de requête."""
+    forme: str
+    base: str
+    sql: str
+    parametres: str
+    plan: str = None
+    nombre: int = 0
+    duree_totale: float = 0.0
+    duree_max: float = 0.0
+    vues: Counter = field(default_factory=Counter)
+    origines: Counter = field(default_factory=Counter)
+
+    @property
+    def balayage_complet(self):
+        """Vrai si le plan parcourt une table entière (SQLite : « SCAN table » sans index)."""
+        return any(
+            ligne.strip().startswith('SCAN ') and ' USING ' not in ligne
+            for ligne in (self.plan or '').splitlines()
+        )
+
+    def ligne(self):
+        """Ligne du rapport, durées en millisecondes."""
+        return {
+            'forme': self.forme, 'base': self.base, 'nombre': self.nombre,
+            'duree_totale': round(self.duree_totale * 1000, 1),
+            'duree_moyenne': round(self.duree_totale * 1000 / self.nombre, 1),
+            'duree_max': round(self.duree_max * 1000, 1),
+            'balayage_complet': self.balayage_complet,
+            'vues': dict(self.vues.most_common(5)), 'origines': dict(self.origines.most_common(5)),
+            'exemple': {'sql': self.sql, 'parametres': self.parametres}, 'plan': self.plan,
+        }
+
+
+def _plan(connexion, sql, params):
+    """Plan d'exécution d'une lecture, ou None (écriture, EXPLAIN refusé)."""
+    if not LECTURE_RE.match(sql):
+        return None
+    jeton = _plan_en_cours.set(True)
+    try:
+        with ExitStack() as pile:
+            if connexion.in_atomic_block:
+                # Point de sauvegarde : un EXPLAIN en échec n'interrompt pas la transaction de la vue.
+                # Hors transaction, atomic() en ouvrirait une (IMMEDIATE : verrou d'écriture sous SQLite)
+                pile.enter_context(transaction.atomic(using=connexion.alias))
+            curseur = pile.enter_context(connexion.cursor())
+            curseur.execute(f'{connexion.ops.explain_query_prefix()} {sql}', params)
+            lignes = curseur.fetchall()
+    except DatabaseError as exc:
+        return f'(EXPLAIN impossible : {exc})'
+    finally:
+        _plan_en_cours.reset(jeton)
+    if connexion.vendor == 'sqlite':
+        # (id, parent, inutilisé, détail) : détail indenté selon la profondeur
+        profondeurs = {0: -1}
+        sortie = []
+        for identifiant, parent, _inutilise, detail in lignes:
+            profondeurs[identifiant] = profondeurs.get(parent, -1) + 1
+            sortie.append(f"{'  ' * profondeurs[identifiant]}{detail}")
+        return '\n'.join(sortie)
+    return '\n'.join(str(ligne[0]) for ligne in lignes)
+
+
+def _noter_requete_lente(connexion, sql, params, many, duree):
+    requete_http = _requete_http.get()
+    if requete_http is None:
+        vue = '(hors requête HTTP)'
+    elif requete_http.resolver_match is not None:
+        vue = requete_http.resolver_match.view_name
+    else:
+        vue = requete_http.path
+    origine = RequeteSQL('', '', duree, *_origine()).origine
+    forme = forme_requete(sql)
+    parametres = repr(params)[:500]
+
+    cle = (connexion.alias, forme)
+    with _verrou_lentes:
+        lente = _requetes_lentes.get(cle)
+        nouvelle = lente is None and len(_requetes_lentes) < MAX_FORMES_LENTES
+        if nouvelle:
+            lente = _requetes_lentes[cle] = RequeteLente(forme, connexion.alias, sql, parametres)
+    if nouvelle and not many:
+        lente.plan = _plan(connexion, sql, params)
+
+    if lente is not None:
+        with _verrou_lentes:
+            lente.nombre += 1
+            lente.duree_totale += duree
+            lente.vues[vue] += 1
+            lente.origines[origine] += 1
+            if duree > lente.duree_max:
+                lente.duree_max, lente.sql, lente.parametres = duree, sql, parametres
+
+    logger.warning(
+        "Requête lente (%.0f ms, base %s) dans %s depuis %s : %s\n    paramètres : %s%s",
+        duree * 1000, connexion.alias, vue, origine, sql[:1000], parametres,
+        f"\n    plan :\n{lente.plan}" if nouvelle and lente.plan else '',
+    )
+
+
+def _surveiller_duree(execute, sql, params, many, context):
+    if _plan_en_cours.get():
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    resultat = execute(sql, params, many, context)
+    duree = time.perf_counter() - debut
+    # Seuil relu à chaque requête : 0 (override_settings, banc d'essai) coupe le journal
+    if settings.REQUETES_LENTES_SEUIL and duree * 1000 >= settings.REQUETES_LENTES_SEUIL:
+        _noter_requete_lente(context['connection'], sql, params, many, duree)
+    return resultat
+
+
+def _envelopper_connexion(sender, connection, **kwargs):
+    if _surveiller_duree not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_surveiller_duree)
+
+
+def connecter_signaux():
+    if settings.REQUETES_LENTES_SEUIL:
+        connection_created.connect(_envelopper_connexion, dispatch_uid='requetes_lentes')
+
+
+class RequetesLentesMiddleware:
+    """Rend la requête HTTP en cours (donc sa vue) visible du journal des requêtes lentes."""
+
+    def __init__(self, get_response):
+        if not settings.REQUETES_LENTES_SEUIL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        jeton = _requete_http.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _requete_http.reset(jeton)
+
+
+def rapport_requetes_lentes():
+    """Lignes du rapport (voir RequeteLente.ligne), une par forme, pour ce processus."""
+    with _verrou_lentes:
+        return [lente.ligne() for lente in _requetes_lentes.values() if lente.nombre]
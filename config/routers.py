@@ -0,0 +1,84 @@
+# config/routers.py
+"""
+Lectures lourdes (tableau de bord, rapports, exports, historique) servies par
+des répliques en lecture seule, pour qu'elles ne concurrencent plus la saisie
+sur la base principale.
+
+Une réplique est une seconde connexion SQLite en lecture seule (`mode=ro`),
+sur le même fichier (en WAL, les lecteurs ne bloquent pas l'écrivain) ou sur
+une copie rafraîchie par `python manage.py copier_replique`. Elles sont
+déclarées par DATABASE_REPLIQUES (chemins séparés par « : »).
+
+Seules les vues marquées `RepliqueLectureMixin` lisent sur une réplique : les
+écrans de saisie lisent toujours la base principale, sans retard de copie.
+Dans une vue marquée, dès qu'une écriture a lieu (ou qu'une transaction est
+ouverte), les lectures suivantes de la requête repassent sur la base principale.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_lecture_replique = ContextVar('lecture_replique', default=False)
+_ecriture_faite = ContextVar('ecriture_faite', default=False)
+
+
+@contextmanager
+def lecture_replique():
+    """Envoie les lectures du bloc sur une réplique, jusqu'à la première écriture."""
+    jetons = _lecture_replique.set(True), _ecriture_faite.set(False)
+    try:
+        yield
+    finally:
+        _lecture_replique.reset(jetons[0])
+        _ecriture_faite.reset(jetons[1])
+
+
+class RepliqueLectureMixin:
+    """À placer après LoginRequiredMixin / PermissionRequiredMixin : l'authentification lit la base principale."""
+    methodes_replique = ('GET', 'HEAD')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in self.methodes_replique:
+            return super().dispatch(request, *args, **kwargs)
+        with lecture_replique():
+            response = super().dispatch(request, *args, **kwargs)
+            # Les querysets paresseux d'un TemplateResponse sont évalués au rendu : il a lieu dans le bloc
+            if hasattr(response, 'render'):
+                response.render()
+            return response
+
+
+class RepliquesRouter:
+    """
+    Toujours dernier de DATABASE_ROUTERS : les routeurs précédents (archive de
+    l'historique) gardent la main sur leurs modèles.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _lecture_replique.get()
+            and not _ecriture_faite.get()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return random.choice(settings.DATABASE_REPLIQUES)
+        # Explicite : sans routeur, un objet lu sur une réplique y ferait lire ses relations
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if _lecture_replique.get():
+            _ecriture_faite.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLIQUES}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLIQUES:
+            return False
+        return None
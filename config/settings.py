@@ -40,22 +40,36 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     # Mes applications (l'ordre ici est important)
+    'config',
     'sites_gestion',
     'utilisateurs',    
     'enfants_gestion',
     'gestion_financiere',
     'gestion_personnel',
+    'synchronisation',
 
     'simple_history',
     'import_export',
 ]
 
 MIDDLEWARE = [
+    # Temps SQL / gabarits / vue de chaque requête, en-tête Server-Timing (voir config/mesures.py)
+    'config.mesures.ServerTimingMiddleware',
+    # Développement : requêtes SQL par page et N+1 (voir config/requetes.py)
+    'config.requetes.DetecteurRequetesMiddleware',
+    # Vue à l'origine des requêtes lentes (voir config/requetes.py)
+    'config.requetes.RequetesLentesMiddleware',
    'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware', # DOIT ÊTRE AVANT
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    # Compression (brotli / gzip) des réponses textuelles ; gzip seulement pour les
+    # pages qui contiennent le jeton CSRF (voir config/compression.py)
+    'config.compression.CompressionMiddleware',
+    'config.compression.MinificationHTMLMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware', # DOIT ÊTRE AVANT
+    # Base du site actif en mode partitionné (voir config/partitions.py)
+    'config.partitions.PartitionSiteMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     
@@ -65,9 +79,50 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# Détecteur de requêtes SQL (actif en débogage) : budget par page et seuil de répétition d'une même requête
+REQUETES_DETECTEUR = os.environ.get('REQUETES_DETECTEUR', '1' if DEBUG else '') == '1'
+REQUETES_BUDGET = int(os.environ.get('REQUETES_BUDGET', 30))
+REQUETES_SEUIL_REPETITION = int(os.environ.get('REQUETES_SEUIL_REPETITION', 5))
+# Journal des requêtes lentes (en production aussi) : durée en ms au-delà de laquelle une
+# requête est journalisée avec son plan d'exécution, 0 pour désactiver
+REQUETES_LENTES_SEUIL = float(os.environ.get('REQUETES_LENTES_SEUIL', 100))
+
+# Mesure des temps de chaque requête (actif en débogage) : en-tête Server-Timing, une ligne
+# JSON par requête dans MESURES_JOURNAL (sur la console seulement si MESURES_ACTIVES=1 est
+# demandé explicitement) et centiles des MESURES_ECHANTILLONS dernières requêtes de chaque
+# vue sur /outils/mesures/
+MESURES_ACTIVES = os.environ.get('MESURES_ACTIVES', '1' if DEBUG else '') == '1'
+MESURES_JOURNAL = os.environ.get('MESURES_JOURNAL')
+MESURES_ECHANTILLONS = int(os.environ.get('MESURES_ECHANTILLONS', 1000))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'brut': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'mesures': {
+            'class': 'logging.handlers.WatchedFileHandler', 'filename': MESURES_JOURNAL, 'formatter': 'brut',
+        } if MESURES_JOURNAL else {
+            'class': 'logging.StreamHandler', 'formatter': 'brut',
+        } if os.environ.get('MESURES_ACTIVES') == '1' else {
+            # Actif par défaut en débogage : pas une ligne par requête dans runserver ni dans les tests
+            'class': 'logging.NullHandler',
+        },
+    },
+    'loggers': {
+        'config.mesures': {'handlers': ['mesures'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Retrait de l'indentation des pages HTML (avant compression)
+HTML_MINIFICATION = os.environ.get('HTML_MINIFICATION', '' if DEBUG else '1') == '1'
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates dont les rendus sont chronométrés (voir config/mesures.py)
+        'BACKEND': 'config.mesures.DjangoTemplatesMesures',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,13 +141,48 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite partagé par plusieurs workers : voir config/base_donnees.py
+SQLITE_OPTIONS = {'transaction_mode': 'IMMEDIATE'}
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000)),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # Valeur négative : taille en Kio (64 Mio par connexion)
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_KIO', 64 * 1024)),
+}
+# Nombre de reprises d'une saisie qui rencontre encore le verrou après busy_timeout
+SQLITE_REPRISES_ECRITURE = int(os.environ.get('SQLITE_REPRISES_ECRITURE', 2))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
     }
 }
 
+# Cache partagé par tous les workers (fichiers) ; les clés sont versionnées par
+# modèle, voir config/cache.py. CACHE_URL=redis://… pour un serveur Redis.
+CACHE_DUREE = int(os.environ.get('CACHE_DUREE', 600))
+if os.environ.get('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_URL'],
+            'TIMEOUT': CACHE_DUREE,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DOSSIER', BASE_DIR / 'cache'),
+            'TIMEOUT': CACHE_DUREE,
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,18 +219,101 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+# Dossier rempli par `collectstatic` (noms à empreinte + variantes .gz / .br)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Hors débogage, `{% static %}` renvoie le nom à empreinte des fichiers collectés :
+# ils peuvent être gardés en cache un an (voir config/statiques.py).
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'config.statiques.StockageStatiqueCompresse'
+        ),
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Miniatures carrées (en pixels) dérivées des photos d'enfants
+MINIATURES_TAILLES = (48, 96, 192)
+MINIATURES_QUALITE = 80
+
+# Dossier (dans MEDIA_ROOT) du stockage dédupliqué des photos et documents
+STOCKAGE_DEDUPLIQUE_DOSSIER = 'fichiers'
+
+# Les fichiers des enfants ne sont servis qu'à travers les vues protégées.
+# '' : Django envoie le fichier (Range, ETag) ; 'nginx' : X-Accel-Redirect ; 'apache' : X-Sendfile
+MEDIA_SERVEUR_FRONTAL = os.environ.get('MEDIA_SERVEUR_FRONTAL', '')
+# Location nginx `internal` qui pointe vers MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/media-protege/')
+
+# Extraction du texte des documents (commande `indexer_documents`).
+# L'OCR utilise le moteur tesseract installé localement (et pdftoppm pour les PDF scannés).
+DOCUMENTS_OCR_ACTIF = os.environ.get('DOCUMENTS_OCR_ACTIF', '') == '1'
+DOCUMENTS_OCR_LANGUE = os.environ.get('DOCUMENTS_OCR_LANGUE', 'fra')
+DOCUMENTS_OCR_DELAI = 120  # secondes par fichier
+
+# Import en masse des dossiers d'enfants (CSV / XLSX) : lignes validées et enregistrées par lot
+IMPORT_TAILLE_LOT = 500
+IMPORT_DUREE_ATTENTE = 3600  # secondes entre l'aperçu et la confirmation ; au-delà le fichier est supprimé
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-STATIC_URL = 'static/'
-STATICFILES_DIRS = [BASE_DIR / 'static']
-
 AUTH_USER_MODEL = 'utilisateurs.CustomUser'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/' # Redirige vers la page d'accueil (le tableau de bord)
 LOGOUT_REDIRECT_URL = 'login'
+
+# Archivage de l'historique des enfants (commande `compacter_historique`)
+HISTORIQUE_ARCHIVE_AGE_JOURS = int(os.environ.get('HISTORIQUE_ARCHIVE_AGE_JOURS', 365))
+HISTORIQUE_SNAPSHOT_INTERVALLE = int(os.environ.get('HISTORIQUE_SNAPSHOT_INTERVALLE', 10))
+
+# Facultatif : stocker l'archive dans un fichier SQLite séparé
+HISTORIQUE_ARCHIVE_DB_PATH = os.environ.get('HISTORIQUE_ARCHIVE_DB_PATH')
+DATABASE_ROUTERS = []
+if HISTORIQUE_ARCHIVE_DB_PATH:
+    DATABASES['historique_archive'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': HISTORIQUE_ARCHIVE_DB_PATH,
+        'OPTIONS': SQLITE_OPTIONS,
+    }
+    DATABASE_ROUTERS.append('enfants_gestion.routers.HistoriqueArchiveRouter')
+
+# Facultatif : une base SQLite par site (voir config/partitions.py). Créer ou mettre
+# à jour les bases avec : python manage.py partitionner_sites
+SITES_PARTITIONS_DOSSIER = os.environ.get('SITES_PARTITIONS_DOSSIER')
+SITES_PARTITIONS = {}
+if SITES_PARTITIONS_DOSSIER:
+    for site_id in filter(None, os.environ.get('SITES_PARTITIONS', '').replace(' ', '').split(',')):
+        alias = f'site_{site_id}'
+        DATABASES[alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(SITES_PARTITIONS_DOSSIER, f'{alias}.sqlite3'),
+            'OPTIONS': SQLITE_OPTIONS,
+        }
+        SITES_PARTITIONS[int(site_id)] = alias
+if SITES_PARTITIONS:
+    DATABASE_ROUTERS.append('config.partitions.PartitionsRouter')
+
+# Facultatif : répliques en lecture seule pour le tableau de bord, les rapports,
+# les exports et l'historique (voir config/routers.py). Chemins séparés par « : » ;
+# le chemin de db.sqlite3 lui-même donne une seconde connexion en lecture seule.
+DATABASE_REPLIQUES = []
+for numero, chemin in enumerate(filter(None, os.environ.get('DATABASE_REPLIQUES', '').split(os.pathsep))):
+    alias = f'replique_{numero}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{chemin}?mode=ro',
+        'OPTIONS': {'uri': True},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLIQUES.append(alias)
+if DATABASE_REPLIQUES:
+    DATABASE_ROUTERS.append('config.routers.RepliquesRouter')
@@ -0,0 +1,132 @@
+# config/statiques.py
+"""
+Fichiers statiques du projet (CSS Tailwind, icônes) servis avec des noms à
+empreinte et un cache « immutable ». Alpine.js, SweetAlert2, Chart.js et la
+police Poppins restent chargés depuis leurs CDN par les gabarits : ils ne
+sont pas dans static/ et ne passent donc pas par ce stockage.
+
+`collectstatic` copie les fichiers dans STATIC_ROOT sous un nom contenant
+l'empreinte de leur contenu (`output.3f2a9c1b7e4d.css`) et écrit à côté une
+version gzip (`.gz`) et, si le module `brotli` est installé, brotli (`.br`).
+Une nouvelle version d'un fichier change son nom : le navigateur peut donc
+garder l'ancienne un an sans jamais la revalider, et une visite suivante ne
+demande plus aucun fichier statique.
+
+En production, le serveur frontal sert STATIC_ROOT directement (nginx :
+`gzip_static on; brotli_static on;` et `expires max` sur les noms à empreinte).
+Sans serveur frontal, `servir_statique` fait le même travail.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+
+try:
+    import brotli
+except ImportError:  # Dépendance facultative
+    brotli = None
+
+# Types déjà compressés (images, polices woff2, archives) : inutile de les recompresser
+EXTENSIONS_COMPRESSIBLES = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ttf', '.otf', '.eot')
+TAILLE_MIN_COMPRESSION = 256
+EMPREINTE_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+CACHE_IMMUABLE = 'public, max-age=31536000, immutable'
+CACHE_REVALIDATION = 'public, no-cache'
+
+
+# =======================================================================
+# STOCKAGE (collectstatic)
+# =======================================================================
+
+def _compresser(chemin):
+    """Écrit les variantes .gz et .br de `chemin` quand elles sont plus petites que l'original."""
+    with open(chemin, 'rb') as fichier:
+        contenu = fichier.read()
+    if len(contenu) < TAILLE_MIN_COMPRESSION:
+        return
+    variantes = [('.gz', lambda donnees: gzip.compress(donnees, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append(('.br', lambda donnees: brotli.compress(donnees, quality=11)))
+    for suffixe, compresser in variantes:
+        compresse = compresser(contenu)
+        if len(compresse) < len(contenu) * 0.95:
+            with open(chemin + suffixe, 'wb') as fichier:
+                fichier.write(compresse)
+
+
+class StockageStatiqueCompresse(ManifestStaticFilesStorage):
+    """Stockage à manifeste d'empreintes qui précompresse les fichiers collectés."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        noms_empreinte = set()
+        for nom, nom_empreinte, traite in super().post_process(paths, dry_run=dry_run, **options):
+            if nom_empreinte and not isinstance(traite, Exception):
+                noms_empreinte.add(nom_empreinte)
+            yield nom, nom_empreinte, traite
+        if dry_run:
+            return
+        for nom_empreinte in sorted(noms_empreinte):
+            if nom_empreinte.lower().endswith(EXTENSIONS_COMPRESSIBLES):
+                _compresser(self.path(nom_empreinte))
+
+
+# =======================================================================
+# ENVOI (sans serveur frontal)
+# =======================================================================
+
+def _variante(chemin, accept_encoding):
+    """Choisit la meilleure variante précompressée acceptée par le client."""
+    encodages = {encodage.split(';')[0].strip() for encodage in accept_encoding.lower().split(',')}
+    for encodage, suffixe in (('br', '.br'), ('gzip', '.gz')):
+        if encodage in encodages and os.path.isfile(chemin + suffixe):
+            return chemin + suffixe, encodage
+    return chemin, None
+
+
+def est_nom_empreinte(nom):
+    """Vrai si `nom` est un nom à empreinte produit par collectstatic."""
+    noms_empreinte = getattr(staticfiles_storage, 'hashed_files', None)
+    if noms_empreinte:
+        return nom in noms_empreinte.values()
+    return bool(EMPREINTE_RE.search(nom))
+
+
+def servir_statique(request, chemin):
+    """Sert un fichier de STATIC_ROOT, précompressé si possible, avec un cache adapté à son nom."""
+    try:
+        chemin_complet = safe_join(settings.STATIC_ROOT, chemin)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(chemin_complet) or chemin_complet.endswith(('.gz', '.br')):
+        raise Http404
+
+    fichier, encodage = _variante(chemin_complet, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    stat = os.stat(fichier)
+    etag = '"%x-%x%s"' % (int(stat.st_mtime), stat.st_size, '-' + encodage if encodage else '')
+    entetes = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': CACHE_IMMUABLE if est_nom_empreinte(chemin) else CACHE_REVALIDATION,
+        'Vary': 'Accept-Encoding',
+    }
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and etag in parse_etags(if_none_match):
+        reponse = HttpResponseNotModified()
+    else:
+        type_contenu, _encodage = mimetypes.guess_type(chemin_complet)
+        reponse = FileResponse(open(fichier, 'rb'), content_type=type_contenu or 'application/octet-stream')
+        # FileResponse déduit un nom de téléchargement (.gz / .br) inutile ici
+        reponse.headers.pop('Content-Disposition', None)
+        if encodage:
+            reponse['Content-Encoding'] = encodage
+    for cle, valeur in entetes.items():
+        reponse[cle] = valeur
+    return reponse
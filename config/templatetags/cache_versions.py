@@ -0,0 +1,15 @@
+# config/templatetags/cache_versions.py
+from django import template
+
+from config.cache import versions
+
+register = template.Library()
+
+
+@register.simple_tag
+def versions_cache(*modeles):
+    """
+    Jetons de version des modèles affichés par un fragment, à passer à `{% cache %}`.
+    Usage : {% versions_cache 'sites_gestion.SiteOrphelinat' as versions %}
+    """
+    return versions(*modeles)
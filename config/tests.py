@@ -0,0 +1,727 @@
+from datetime import date
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipIf
+import zlib
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections, transaction
+from django.http import Http404, HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.views import View
+
+from enfants_gestion.models import Document, Enfant, FichierStocke
+from enfants_gestion.suivis import reconstruire_derniers_suivis
+from enfants_gestion.tests import MediaTemporaireMixin
+from gestion_financiere.models import CompteFinancier, Parrainage, Transaction
+from sites_gestion.models import SiteOrphelinat
+from synchronisation.journal import journaliser_lot
+from synchronisation.models import Modification
+from utilisateurs.models import CustomUser
+from . import mesures
+from .cache import cle_cache, invalider, liste_en_cache, portee, versions
+from .management.commands import benchmark_vues
+from .compression import CompressionMiddleware, MinificationHTMLMiddleware, minifier_html
+from .partitions import PartitionSiteMiddleware, dans_partition, partition_active, partition_du_site, repartir
+from .routers import RepliqueLectureMixin
+from .statiques import CACHE_IMMUABLE, CACHE_REVALIDATION, servir_statique
+
+
+class SitesRepliqueView(RepliqueLectureMixin, View):
+    """Le queryset n'est évalué qu'au rendu du gabarit, comme dans une ListView."""
+
+    def get(self, request):
+        gabarit = engines.all()[0].from_string('{% for site in sites %}{{ site.nom }};{% endfor %}')
+        return TemplateResponse(request, gabarit, {'sites': SiteOrphelinat.objects.order_by('nom')})
+
+    def post(self, request):
+        SiteOrphelinat.objects.create(nom='Site C', ville='Ville', pays='Pays')
+        gabarit = engines.all()[0].from_string('{{ sites|length }}')
+        return TemplateResponse(request, gabarit, {'sites': SiteOrphelinat.objects.all()})
+
+
+@override_settings(DATABASE_REPLIQUES=['replique_test'], DATABASE_ROUTERS=['config.routers.RepliquesRouter'])
+class RepliquesRouterTests(TransactionTestCase):
+    """
+    La réplique de test est une seconde connexion sur la base de test en
+    mémoire : elle voit les données validées, d'où TransactionTestCase. Elle
+    n'existe qu'une fois la classe préparée, d'où '__all__'.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings['replique_test'] = {
+            **connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replique_test'].close()
+        del connections['replique_test']
+        del connections.settings['replique_test']
+
+    def setUp(self):
+        SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+
+    def _appeler(self, methode):
+        requete = getattr(RequestFactory(), methode)('/')
+        with CaptureQueriesContext(connections['default']) as principale, \
+                CaptureQueriesContext(connections['replique_test']) as replique:
+            # Comme le gestionnaire de requêtes : rendu après la vue (sans effet s'il a déjà eu lieu)
+            response = SitesRepliqueView.as_view()(requete).render()
+        return response, [requete['sql'] for requete in principale], [requete['sql'] for requete in replique]
+
+    def test_rendu_du_gabarit_lu_sur_la_replique(self):
+        response, principale, replique = self._appeler('get')
+        self.assertEqual(response.content, b'Site A;Site B;')
+        self.assertEqual(principale, [])
+        self.assertEqual(len(replique), 1)
+        self.assertIn('sites_gestion_siteorphelinat', replique[0])
+
+    def test_lectures_apres_ecriture_sur_la_base_principale(self):
+        SitesRepliqueView.methodes_replique = ('GET', 'HEAD', 'POST')
+        self.addCleanup(setattr, SitesRepliqueView, 'methodes_replique', RepliqueLectureMixin.methodes_replique)
+        response, principale, replique = self._appeler('post')
+        self.assertEqual(response.content, b'3')
+        self.assertEqual(replique, [])
+        self.assertTrue(any(sql.startswith('SELECT') for sql in principale))
+
+
+class InvaliderTests(TestCase):
+    """La version change à la validation de la transaction de la base écrite."""
+
+    def setUp(self):
+        patcher = mock.patch('config.cache.transaction.on_commit')
+        self.on_commit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _bases(self):
+        return [appel.kwargs['using'] for appel in self.on_commit.call_args_list]
+
+    def test_base_de_l_objet_ecrit(self):
+        site = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        enfant = Enfant.objects.create(
+            site=site, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+        self.assertEqual(self._bases()[-1], 'default')
+
+        self.on_commit.reset_mock()
+        enfant._state.db = 'partition_test'
+        journaliser_lot(Enfant, [enfant])
+        self.assertEqual(self._bases(), ['partition_test'])
+
+    @override_settings(DATABASE_ROUTERS=['config.partitions.PartitionsRouter'])
+    def test_partition_active_par_defaut(self):
+        with dans_partition('partition_test'):
+            invalider(Enfant)
+            # Les sites restent sur la base principale
+            invalider('sites_gestion.SiteOrphelinat')
+        invalider(Enfant)
+        self.assertEqual(self._bases(), ['partition_test', 'default', 'default'])
+
+
+@override_settings(SITES_PARTITIONS={7: 'site_test'}, DATABASE_ROUTERS=['config.partitions.PartitionsRouter'])
+class PartitionsTests(TransactionTestCase):
+    """
+    La partition de test est une seconde connexion sur la base de test en
+    mémoire (mêmes tables, mêmes données) : on vérifie sur quelle connexion
+    partent les requêtes.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings['site_test'] = {
+            **connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['site_test'].close()
+        del connections['site_test']
+        del connections.settings['site_test']
+
+    def setUp(self):
+        self.site = SiteOrphelinat.objects.create(pk=7, nom='Site A', ville='Ville', pays='Pays')
+        self.autre_site = SiteOrphelinat.objects.create(pk=8, nom='Site B', ville='Ville', pays='Pays')
+
+    def _requetes(self, fonction):
+        with CaptureQueriesContext(connections['default']) as principale, \
+                CaptureQueriesContext(connections['site_test']) as partition:
+            resultat = fonction()
+        return resultat, [requete['sql'] for requete in principale], [requete['sql'] for requete in partition]
+
+    def _creer_enfant(self):
+        return Enfant.objects.create(
+            site=self.site, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+
+    def test_donnees_du_site_dans_sa_partition(self):
+        with dans_partition('site_test'):
+            enfant, principale, partition = self._requetes(self._creer_enfant)
+        self.assertEqual(enfant._state.db, 'site_test')
+        self.assertTrue(any(sql.startswith('INSERT INTO "enfants_gestion_enfant"') for sql in partition))
+        self.assertFalse(any('enfants_gestion_enfant' in sql for sql in principale))
+
+        # Hors du bloc, l'objet reste attaché à sa partition ; les nouvelles requêtes vont à la base principale
+        _resultat, principale, partition = self._requetes(lambda: enfant.save(update_fields=['nom']))
+        self.assertTrue(any(sql.startswith('UPDATE "enfants_gestion_enfant"') for sql in partition))
+        self.assertFalse(any(sql.startswith('UPDATE "enfants_gestion_enfant"') for sql in principale))
+
+        _resultat, principale, partition = self._requetes(lambda: Enfant.objects.count())
+        self.assertEqual((len(principale), partition), (1, []))
+
+    def test_referentiels_ecrits_dans_la_base_principale(self):
+        def ecrire():
+            self.site.nom = 'Site A renommé'
+            self.site.save()
+            return SiteOrphelinat.objects.count()
+
+        with dans_partition('site_test'):
+            nombre, principale, partition = self._requetes(ecrire)
+        self.assertEqual(nombre, 2)
+        self.assertTrue(any(sql.startswith('UPDATE "sites_gestion_siteorphelinat"') for sql in principale))
+        self.assertEqual(partition, [])
+
+    def test_partition_du_site(self):
+        self.assertEqual(partition_du_site(7), 'site_test')
+        self.assertEqual(partition_du_site('7'), 'site_test')
+        self.assertIsNone(partition_du_site(8))
+        self.assertIsNone(partition_du_site(None))
+
+    def test_repartir_dans_chaque_base(self):
+        self._creer_enfant()
+        self.assertEqual(
+            repartir(lambda: (partition_active(), Enfant.objects.count())), [(None, 1), ('site_test', 1)],
+        )
+
+    def _partition_de_la_requete(self, user, session, **params):
+        requete = RequestFactory().get('/', params)
+        requete.user, requete.session = user, session
+        return PartitionSiteMiddleware(lambda request: partition_active())(requete)
+
+    def test_middleware_site_actif(self):
+        agent = CustomUser.objects.create_user('agent', 'agent@example.org', 'motdepasse')
+        agent.sites.add(self.site)
+        session = {}
+        self.assertEqual(self._partition_de_la_requete(agent, session), 'site_test')
+        # Site non affecté : ignoré
+        self.assertEqual(self._partition_de_la_requete(agent, session, site=8), 'site_test')
+        self.assertEqual(session, {})
+
+        admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+        session = {}
+        self.assertIsNone(self._partition_de_la_requete(admin, session))
+        self.assertEqual(self._partition_de_la_requete(admin, session, site=7), 'site_test')
+        # Mémorisé en session pour les requêtes suivantes
+        self.assertEqual(self._partition_de_la_requete(admin, session), 'site_test')
+        self.assertIsNone(self._partition_de_la_requete(admin, session, site=8))
+
+    @override_settings(SITES_PARTITIONS={})
+    def test_middleware_inutilise_sans_partitions(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            PartitionSiteMiddleware(lambda request: None)
+
+
+CACHE_MEMOIRE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+@override_settings(CACHES=CACHE_MEMOIRE)
+class CacheVersionneTests(TestCase):
+    """Versions des modèles, clés par périmètre et fragments de gabarits invalidés."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+        cls.agent = CustomUser.objects.create_user('agent', 'agent@example.org', 'motdepasse')
+        cls.agent.sites.add(cls.site_b, cls.site_a)
+
+    def setUp(self):
+        cache.clear()
+
+    def _creer_enfant(self, nom):
+        return Enfant.objects.create(
+            site=self.site_a, nom=nom, prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+
+    def test_version_changee_a_la_validation(self):
+        version_sites, version_enfants = versions(SiteOrphelinat), versions(Enfant)
+        self.assertEqual(versions(SiteOrphelinat), version_sites)
+
+        with self.captureOnCommitCallbacks() as rappels:
+            self.site_a.save()
+        # Pas avant la validation : une transaction annulée ne change rien
+        self.assertEqual(versions(SiteOrphelinat), version_sites)
+        for rappel in rappels:
+            rappel()
+        self.assertNotEqual(versions(SiteOrphelinat), version_sites)
+        self.assertEqual(versions(Enfant), version_enfants)
+
+    def test_ecritures_en_masse_journalisees(self):
+        enfant = self._creer_enfant('Nom')
+        version = versions(Enfant)
+        with self.captureOnCommitCallbacks(execute=True):
+            Enfant.objects.filter(pk=enfant.pk).update(is_active=False)
+            journaliser_lot(Enfant, Enfant.all_objects.filter(pk=enfant.pk))
+        self.assertNotEqual(versions(Enfant), version)
+
+    def test_cle_selon_portee_et_versions(self):
+        self.assertEqual(portee(self.agent, False), f'default:{self.site_a.pk}-{self.site_b.pk}')
+        self.assertEqual(portee(self.admin, True), 'default:tous')
+        with dans_partition('site_test'):
+            self.assertEqual(portee(self.admin, True), 'site_test:tous')
+
+        cle = cle_cache('liste', portee(self.agent, False), [Enfant], 2)
+        self.assertEqual(cle_cache('liste', portee(self.agent, False), [Enfant], 2), cle)
+        self.assertNotEqual(cle_cache('liste', portee(self.admin, True), [Enfant], 2), cle)
+        self.assertNotEqual(cle_cache('liste', portee(self.agent, False), [Enfant], 3), cle)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalider(Enfant)
+        self.assertNotEqual(cle_cache('liste', portee(self.agent, False), [Enfant], 2), cle)
+
+    def test_liste_evaluee_une_fois_par_version(self):
+        def lister():
+            return liste_en_cache('sites', 'default:tous', SiteOrphelinat.objects.order_by('nom'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual([site.nom for site in lister()], ['Site A', 'Site B'])
+        with self.assertNumQueries(0):
+            self.assertEqual([site.nom for site in lister()], ['Site A', 'Site B'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SiteOrphelinat.objects.create(nom='Site C', ville='Ville', pays='Pays')
+        with self.assertNumQueries(1):
+            self.assertEqual([site.nom for site in lister()], ['Site A', 'Site B', 'Site C'])
+
+    def test_fragment_du_tableau_apres_archivage(self):
+        enfant = self._creer_enfant('Archivable')
+        self._creer_enfant('Restant')
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(reverse('enfants_gestion:enfant_list')), 'Archivable')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enfant.is_active = False
+            enfant.save()
+        response = self.client.get(reverse('enfants_gestion:enfant_list'))
+        self.assertNotContains(response, 'Archivable')
+        self.assertContains(response, 'Restant')
+
+
+def _requete_lente(execute, sql, params, many, context):
+    time.sleep(0.03)
+    return execute(sql, params, many, context)
+
+
+@override_settings(MESURES_ACTIVES=True)
+class MesuresTests(TestCase):
+    """Découpage SQL / gabarits / vue de ServerTimingMiddleware et centiles par vue."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.personnel = CustomUser.objects.create_user('personnel', 'personnel@example.org', 'motdepasse', is_staff=True)
+        cls.agent = CustomUser.objects.create_user('agent', 'agent@example.org', 'motdepasse')
+
+    def setUp(self):
+        # Connexion ouverte avant MESURES_ACTIVES : le signal connection_created n'a pas joué
+        connexion = connections['default']
+        if mesures._mesurer_requete not in connexion.execute_wrappers:
+            connexion.execute_wrappers.append(mesures._mesurer_requete)
+            self.addCleanup(connexion.execute_wrappers.remove, mesures._mesurer_requete)
+        mesures._echantillons.clear()
+        self.addCleanup(mesures._echantillons.clear)
+
+    @staticmethod
+    def _vue(request):
+        SiteOrphelinat.objects.count()
+        # Requête évaluée pendant le rendu : comptée en SQL, retirée du temps des gabarits
+        gabarit = engines.all()[0].from_string('{{ sites|length }}')
+        return HttpResponse(gabarit.render({'sites': SiteOrphelinat.objects.all()}))
+
+    def _durees(self, response):
+        durees = {}
+        for metrique in response['Server-Timing'].split(', '):
+            nom, duree, *description = metrique.split(';')
+            durees[nom] = float(duree.removeprefix('dur='))
+            if description:
+                durees['description'] = description[0]
+        return durees
+
+    def test_en_tete_server_timing(self):
+        connexion = connections['default']
+        connexion.execute_wrappers.append(_requete_lente)
+        self.addCleanup(connexion.execute_wrappers.remove, _requete_lente)
+
+        with self.assertLogs('config.mesures', 'INFO') as journal:
+            response = mesures.ServerTimingMiddleware(self._vue)(RequestFactory().get('/chemin/'))
+        self.assertEqual(response.content, b'1')
+        durees = self._durees(response)
+        self.assertEqual(durees['description'], 'desc="2 req"')
+        self.assertGreaterEqual(durees['sql'], 60)
+        self.assertLess(durees['gabarits'], 30)
+        self.assertAlmostEqual(durees['sql'] + durees['gabarits'] + durees['vue'], durees['total'], delta=0.5)
+
+        ligne = json.loads(journal.records[0].getMessage())
+        self.assertEqual(
+            (ligne['nom_vue'], ligne['methode'], ligne['chemin'], ligne['statut'], ligne['requetes']),
+            ('(aucune vue)', 'GET', '/chemin/', 200, 2),
+        )
+
+    def test_vue_asynchrone(self):
+        async def vue(request):
+            return HttpResponse('ok')
+
+        middleware = mesures.ServerTimingMiddleware(vue)
+        with self.assertLogs('config.mesures', 'INFO'):
+            response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertEqual(self._durees(response)['description'], 'desc="0 req"')
+
+    @skipIf(os.environ.get('MESURES_JOURNAL') or os.environ.get('MESURES_ACTIVES'), 'journal demandé par l\'environnement')
+    def test_journal_silencieux_par_defaut(self):
+        gestionnaires = logging.getLogger('config.mesures').handlers
+        self.assertTrue(gestionnaires)
+        self.assertTrue(all(isinstance(gestionnaire, logging.NullHandler) for gestionnaire in gestionnaires))
+
+    @override_settings(MESURES_ACTIVES=False)
+    def test_inactif(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            mesures.ServerTimingMiddleware(self._vue)
+
+    def test_centile_rang_le_plus_proche(self):
+        valeurs = list(range(1, 11))
+        self.assertEqual([mesures.centile(valeurs, rang) for rang in (50, 95, 99)], [5, 10, 10])
+        self.assertEqual(mesures.centile([7], 50), 7)
+        self.assertEqual(mesures.centile(list(range(1, 101)), 95), 95)
+
+    def test_centiles_par_vue_reserves_au_personnel(self):
+        self.client.force_login(self.agent)
+        self.assertEqual(self.client.get(reverse('mesures_vues')).status_code, 403)
+
+        self.client.force_login(self.personnel)
+        for _numero in range(3):
+            self.client.get(reverse('enfants_gestion:enfant_list'))
+        response = self.client.get(reverse('mesures_vues'))
+        self.assertIn('Server-Timing', response)
+        vues = {ligne['nom_vue']: ligne for ligne in response.json()['vues']}
+        self.assertEqual(vues['enfants_gestion:enfant_list']['nombre'], 3)
+        ligne = vues['enfants_gestion:enfant_list']
+        self.assertLessEqual(ligne['total_p50'], ligne['total_p95'])
+        self.assertLessEqual(ligne['total_p95'], ligne['total_p99'])
+
+        self.assertEqual(self.client.get(reverse('mesures_vues'), {'tri': 'inconnue'}).status_code, 400)
+
+
+@override_settings(CACHES=CACHE_MEMOIRE)
+class GenererDonneesTests(MediaTemporaireMixin, TestCase):
+    """Petits volumes : cohérence des données générées et reproductibilité par la graine."""
+    OPTIONS = {
+        'sites': 2, 'enfants': 12, 'parrainages': 4, 'transactions': 30, 'employes': 4, 'utilisateurs': 5,
+        'annees': 2, 'jusqu_au': date(2025, 6, 30),
+    }
+
+    def _generer(self, **options):
+        call_command('generer_donnees', stdout=StringIO(), **{**self.OPTIONS, **options})
+        sites = SiteOrphelinat.objects.filter(nom__startswith=options.get('prefixe', 'Synthèse'))
+        return list(sites.values_list('pk', flat=True))
+
+    def _signature(self, sites):
+        """Données tirées au hasard, sans les identifiants (qui dépendent de la base de départ)."""
+        enfants = Enfant.all_objects.filter(site__in=sites).order_by('pk')
+        transactions = Transaction.all_objects.filter(compte__site__in=sites).order_by('pk')
+        return (
+            list(enfants.values_list('nom', 'prenom', 'sexe', 'date_naissance', 'date_arrivee', 'statut', 'is_active')),
+            list(transactions.values_list('type_transaction', 'categorie', 'montant', 'date_transaction')),
+        )
+
+    def test_volumes_et_coherence(self):
+        sites = self._generer()
+        self.assertEqual(len(sites), 2)
+        self.assertEqual(CompteFinancier.objects.filter(site__in=sites).count(), 6)
+        self.assertEqual(Enfant.all_objects.filter(site__in=sites).count(), 12)
+        self.assertEqual(Parrainage.objects.count(), 4)
+        self.assertFalse(Parrainage.objects.filter(enfant__is_active=False).exists())
+        self.assertEqual(CustomUser.objects.filter(username__startswith='synthese').count(), 5)
+
+        transactions = Transaction.all_objects.all()
+        self.assertGreaterEqual(transactions.filter(parrainage_lie__isnull=True).count(), 30)
+        self.assertFalse(transactions.exclude(compte__site__in=sites).exists())
+        self.assertFalse(transactions.filter(date_transaction__gt=date(2025, 6, 30)).exists())
+
+        # Ce que les signaux auraient fait
+        self.assertEqual(Modification.objects.filter(modele='enfant').count(), 12)
+        self.assertGreaterEqual(Enfant.history.count(), 12)
+        self.assertEqual(reconstruire_derniers_suivis(dry_run=True), 0)
+        for fichier in FichierStocke.objects.all():
+            self.assertEqual(fichier.references, Document.objects.filter(fichier=fichier.nom).count())
+
+    def test_meme_graine_memes_donnees(self):
+        with transaction.atomic():
+            premiere = self._signature(self._generer())
+            transaction.set_rollback(True)
+        self.assertFalse(Enfant.all_objects.exists())
+
+        self.assertEqual(self._signature(self._generer()), premiere)
+        self.assertNotEqual(self._signature(self._generer(prefixe='Autre', graine=2)), premiere)
+
+    def test_refus(self):
+        with self.assertRaisesMessage(CommandError, 'au moins un site'):
+            self._generer(sites=0)
+        self._generer()
+        with self.assertRaisesMessage(CommandError, 'choisissez un autre --prefixe'):
+            self._generer()
+        with self.settings(SITES_PARTITIONS={1: 'site_1'}), self.assertRaisesMessage(CommandError, 'partitionner_sites'):
+            self._generer(prefixe='Autre')
+
+
+def _mesure_vue(p95_ms=40.0, requetes=10, requetes_cache=4, memoire_kio=500, statut=200):
+    return {
+        'statut': statut, 'p50_ms': p95_ms / 2, 'p95_ms': p95_ms,
+        'requetes': requetes, 'requetes_cache': requetes_cache, 'memoire_kio': memoire_kio,
+    }
+
+
+class BenchmarkVuesTests(TestCase):
+    """Comparaison à la référence de `benchmark_vues` ; la génération des bases est remplacée."""
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        self.reference = os.path.join(dossier, 'reference.json')
+
+    def _resultats(self, **mesure):
+        return {'tailles': {'petit': {
+            'parametres': benchmark_vues.TAILLES['petit'],
+            'roles': {'directeur': {'liste_enfants': _mesure_vue(**mesure), 'parrainages': _mesure_vue()}},
+        }}}
+
+    def _lancer(self, mesure=None, **options):
+        taille = self._resultats(**(mesure or {}))['tailles']['petit']
+        sortie = StringIO()
+        # Déjà dans l'environnement de test du lanceur
+        with mock.patch.object(benchmark_vues.Command, 'mesurer_taille', return_value=taille), \
+                mock.patch.object(benchmark_vues, 'setup_test_environment'), \
+                mock.patch.object(benchmark_vues, 'teardown_test_environment'):
+            call_command('benchmark_vues', tailles=['petit'], reference=self.reference, stdout=sortie, **options)
+        return sortie.getvalue()
+
+    def test_comparer(self):
+        comparer = benchmark_vues.Command().comparer
+        reference = _mesure_vue()
+        self.assertEqual(comparer(_mesure_vue(), reference, 0.2), [])
+        self.assertEqual(comparer(_mesure_vue(p95_ms=60), reference, 0.2), ['p95'])
+        # Hausse relative au-delà de la tolérance, mais sous le bruit absolu
+        self.assertEqual(comparer(_mesure_vue(p95_ms=1.5), _mesure_vue(p95_ms=1.0), 0.2), [])
+        self.assertEqual(comparer(_mesure_vue(requetes_cache=5), reference, 0.2), ['requêtes'])
+        self.assertEqual(comparer(_mesure_vue(requetes=9, requetes_cache=3), reference, 0.2), [])
+        self.assertEqual(comparer(_mesure_vue(memoire_kio=700), reference, 0.2), ['mémoire'])
+        self.assertEqual(comparer(_mesure_vue(memoire_kio=700), reference, 0.5), [])
+        self.assertEqual(comparer(_mesure_vue(p95_ms=90), _mesure_vue(statut=403), 0.2), [])
+        self.assertEqual(comparer(_mesure_vue(), {}, 0.2), [])
+
+    def test_afficher_compte_les_regressions(self):
+        commande = benchmark_vues.Command(stdout=StringIO())
+        reference = self._resultats()
+        self.assertEqual(commande.afficher(self._resultats(p95_ms=90, requetes=11), reference, 0.2), 2)
+        self.assertEqual(commande.afficher(self._resultats(p95_ms=90), None, 0.2), 0)
+
+        # Autres paramètres de génération : pas de comparaison
+        reference['tailles']['petit']['parametres'] = {**benchmark_vues.TAILLES['petit'], 'enfants': 1}
+        self.assertEqual(commande.afficher(self._resultats(p95_ms=90), reference, 0.2), 0)
+        self.assertIn('paramètres différents', commande.stdout.getvalue())
+
+    def test_reference_enregistree_puis_regression_stricte(self):
+        self.assertIn('Pas de référence', self._lancer(enregistrer_reference=True))
+        with open(self.reference, encoding='utf-8') as fichier:
+            self.assertEqual(json.load(fichier)['tailles'], self._resultats()['tailles'])
+
+        # Régression affichée, sans échec hors --strict
+        self.assertIn('← p95', self._lancer({'p95_ms': 90}))
+        with self.assertRaisesMessage(CommandError, '1 régression(s)'):
+            self._lancer({'p95_ms': 90}, strict=True)
+        self._lancer(strict=True)
+
+    def test_options_et_reference_invalides(self):
+        with self.assertRaisesMessage(CommandError, 'au moins une répétition'):
+            call_command('benchmark_vues', repetitions=0, reference=self.reference, stdout=StringIO())
+        with open(self.reference, 'w', encoding='utf-8') as fichier:
+            fichier.write('{')
+        with self.assertRaisesMessage(CommandError, 'Référence illisible'):
+            self._lancer()
+
+    @override_settings(CACHES=CACHE_MEMOIRE)
+    def test_mesurer_une_vue(self):
+        admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+        self.client.force_login(admin)
+        mesure = benchmark_vues._mesurer(self.client, reverse('enfants_gestion:enfant_list'), 3)
+        self.assertEqual(mesure['statut'], 200)
+        self.assertLessEqual(mesure['p50_ms'], mesure['p95_ms'])
+        self.assertGreater(mesure['requetes'], 0)
+        self.assertLessEqual(mesure['requetes_cache'], mesure['requetes'])
+
+        self.client.logout()
+        self.assertEqual(benchmark_vues._mesurer(self.client, reverse('enfants_gestion:enfant_list'), 3), {'statut': 302})
+
+
+class StatiquesTests(SimpleTestCase):
+    """`collectstatic` avec le stockage à empreintes précompressé, puis `servir_statique`."""
+    css = ''.join(f'.bloc-{numero} {{ margin: {numero}px; }}\n' for numero in range(50))
+
+    def setUp(self):
+        sources, self.racine = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, sources, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.racine, ignore_errors=True)
+        os.makedirs(os.path.join(sources, 'css'))
+        for nom, contenu in (('css/output.css', self.css), ('css/petit.css', 'a{}'), ('image.png', '')):
+            with open(os.path.join(sources, nom), 'w') as fichier:
+                fichier.write(contenu)
+        reglages = override_settings(
+            STATICFILES_DIRS=[sources], STATIC_ROOT=self.racine,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'config.statiques.StockageStatiqueCompresse'},
+            },
+        )
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(self.racine, 'staticfiles.json')) as manifeste:
+            self.noms = json.load(manifeste)['paths']
+
+    def _servir(self, chemin, **entetes):
+        return servir_statique(RequestFactory().get('/', headers=entetes), chemin)
+
+    def test_noms_a_empreinte_et_variantes_compressees(self):
+        nom = self.noms['css/output.css']
+        self.assertRegex(nom, r'^css/output\.[0-9a-f]{12}\.css$')
+        with gzip.open(os.path.join(self.racine, nom + '.gz'), 'rt') as variante:
+            self.assertEqual(variante.read(), self.css)
+        # Trop petit, ou déjà compressé : pas de variante
+        self.assertFalse(os.path.exists(os.path.join(self.racine, self.noms['css/petit.css'] + '.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.racine, self.noms['image.png'] + '.gz')))
+
+    def test_variante_negociee(self):
+        nom = self.noms['css/output.css']
+        response = self._servir(nom, accept_encoding='gzip, deflate')
+        self.assertEqual((response['Content-Encoding'], response['Vary']), ('gzip', 'Accept-Encoding'))
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), self.css)
+        self.assertFalse(response.has_header('Content-Disposition'))
+
+        with open(os.path.join(self.racine, nom + '.br'), 'wb') as variante:
+            variante.write(b'brotli')
+        self.assertEqual(self._servir(nom, accept_encoding='gzip, br')['Content-Encoding'], 'br')
+        response = self._servir(nom, accept_encoding='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content).decode(), self.css)
+
+    def test_cache_selon_le_nom(self):
+        self.assertEqual(self._servir(self.noms['css/output.css'])['Cache-Control'], CACHE_IMMUABLE)
+        self.assertEqual(self._servir('css/output.css')['Cache-Control'], CACHE_REVALIDATION)
+
+        nom = self.noms['css/output.css']
+        etag = self._servir(nom, accept_encoding='gzip')['ETag']
+        response = self._servir(nom, accept_encoding='gzip', if_none_match=etag)
+        self.assertEqual((response.status_code, response['Cache-Control']), (304, CACHE_IMMUABLE))
+        # L'ETag dépend de la variante envoyée
+        self.assertEqual(self._servir(nom, if_none_match=etag).status_code, 200)
+
+    def test_chemins_refuses(self):
+        for chemin in (self.noms['css/output.css'] + '.gz', '../settings.py', 'absent.css', 'css'):
+            with self.subTest(chemin=chemin), self.assertRaises(Http404):
+                self._servir(chemin)
+
+
+# Le module brotli est facultatif : un substitut suffit pour vérifier la négociation
+BROTLI_FACTICE = SimpleNamespace(compress=lambda donnees, quality: b'br:' + zlib.compress(donnees))
+
+
+@mock.patch('config.compression.brotli', BROTLI_FACTICE)
+class CompressionTests(SimpleTestCase):
+    page = ('<html><body>' + '<p>Dossier de suivi</p>' * 50 + '</body></html>').encode()
+
+    def _compresser(self, accept_encoding='gzip, deflate, br', content_type='text/html; charset=utf-8', status=200, **meta):
+        requete = RequestFactory().get('/', headers={'accept-encoding': accept_encoding}, **meta)
+        response = HttpResponse(self.page, content_type=content_type, status=status, headers={'ETag': '"v1"'})
+        return CompressionMiddleware(lambda requete: response)(requete)
+
+    def test_brotli_prefere_quand_il_est_accepte(self):
+        response = self._compresser()
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.content, BROTLI_FACTICE.compress(self.page, quality=5))
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['ETag'], 'W/"v1"')
+
+    def test_gzip_sinon(self):
+        for accept_encoding in ('gzip, deflate', 'gzip, br;q=0', 'br;q=abc, gzip'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self._compresser(accept_encoding)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(gzip.decompress(response.content), self.page)
+        with mock.patch('config.compression.brotli', None):
+            self.assertEqual(self._compresser()['Content-Encoding'], 'gzip')
+        self.assertFalse(self._compresser('identity').has_header('Content-Encoding'))
+
+    def test_page_avec_jeton_csrf_jamais_en_brotli(self):
+        # Protection BREACH : gzip avec le remplissage aléatoire de Django
+        for indicateur in (True, False):
+            with self.subTest(indicateur=indicateur):
+                response = self._compresser(CSRF_COOKIE_NEEDS_UPDATE=indicateur)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(gzip.decompress(response.content), self.page)
+
+    def test_ordre_des_middlewares_pour_le_jeton_csrf(self):
+        # LoginView (csrf_protect) remet l'indicateur à False avant le passage du middleware
+        response = self.client.get(reverse('login'), headers={'accept-encoding': 'br, gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'csrfmiddlewaretoken', gzip.decompress(response.content))
+
+    def test_reponses_laissees_telles_quelles(self):
+        for content_type, status in (('image/png', 200), ('application/pdf', 200), ('text/plain', 206)):
+            with self.subTest(content_type=content_type, status=status):
+                response = self._compresser(content_type=content_type, status=status)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, self.page)
+        self.assertEqual(self._compresser(content_type='application/json')['Content-Encoding'], 'br')
+
+    def test_minification_html(self):
+        html = (
+            '<div>\n    <p>Texte</p>\n\n    <pre>\n  code\n    indenté\n</pre>\n'
+            '    <textarea>\n  saisie\n</textarea>\n    <script>\n  var a = 1;\n</script>\n</div>\n'
+        )
+        self.assertEqual(minifier_html(html), (
+            '<div>\n<p>Texte</p>\n<pre>\n  code\n    indenté\n</pre>\n'
+            '<textarea>\n  saisie\n</textarea>\n<script>\n  var a = 1;\n</script>\n</div>\n'
+        ))
+
+    @override_settings(HTML_MINIFICATION=True)
+    def test_middleware_de_minification(self):
+        def vue(content_type):
+            return lambda requete: HttpResponse('<p>\n    a\n</p>', content_type=content_type)
+        self.assertEqual(MinificationHTMLMiddleware(vue('text/html'))(RequestFactory().get('/')).content, b'<p>\na\n</p>')
+        self.assertEqual(MinificationHTMLMiddleware(vue('text/plain'))(RequestFactory().get('/')).content, b'<p>\n    a\n</p>')
+        with override_settings(HTML_MINIFICATION=False), self.assertRaises(MiddlewareNotUsed):
+            MinificationHTMLMiddleware(vue('text/html'))
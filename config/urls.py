@@ -1,9 +1,12 @@
-from django.contrib import admin
-from django.urls import path, include
+import re
+
 from django.conf import settings
-from django.conf.urls.static import static
+from django.contrib import admin
+from django.urls import path, include, re_path
 from django.contrib.auth.views import LoginView, LogoutView
 
+from config.views import MesuresVuesView, RequetesLentesView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -17,13 +20,27 @@ urlpatterns = [
 
     path('personnel/', include('gestion_personnel.urls')),
 
+    path('sync/', include('synchronisation.urls')),
+
     path('connexion/', LoginView.as_view(template_name='accounts/login.html'), name='login'),
     path('deconnexion/', LogoutView.as_view(), name='logout'),
 
+    # Diagnostic des performances, réservé au personnel
+    path('outils/mesures/', MesuresVuesView.as_view(), name='mesures_vues'),
+    path('outils/requetes-lentes/', RequetesLentesView.as_view(), name='requetes_lentes'),
+
     # Vous pouvez ajouter une page d'accueil simple ici si vous le souhaitez
     # path('', MaVueDeTableauDeBord.as_view(), name='dashboard'),
 ]
 
-# Permet de servir les fichiers media (photos uploadées) en mode développement
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Les fichiers media (photos, documents des enfants) ne sont plus servis directement :
+# ils passent par les vues protégées de enfants_gestion (contrôle du site, Range, ETag).
+
+# En débogage, runserver sert les fichiers statiques de STATICFILES_DIRS. Sinon, sans
+# serveur frontal configuré pour STATIC_ROOT, Django sert les fichiers collectés.
+if not settings.DEBUG:
+    from config.statiques import servir_statique
+
+    urlpatterns += [
+        re_path(r'^%s(?P<chemin>.+)$' % re.escape(settings.STATIC_URL.lstrip('/')), servir_statique),
+    ]
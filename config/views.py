@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import JsonResponse
+from django.views import View
+
+from .mesures import statistiques_vues
+from .requetes import rapport_requetes_lentes
+
+
+class PersonnelRequisMixin(LoginRequiredMixin, UserPassesTestMixin):
+    """Outils de diagnostic : réservés au personnel (is_staff) et aux superutilisateurs."""
+
+    def test_func(self):
+        return self.request.user.is_staff or self.request.user.is_superuser
+
+
+def _trier(request, lignes, tri_defaut, colonnes_croissantes=()):
+    """Trie `lignes` selon ?tri=<colonne> ; JsonResponse d'erreur si la colonne est inconnue."""
+    tri = request.GET.get('tri', tri_defaut)
+    if lignes and not isinstance(lignes[0].get(tri), (int, float, str)):
+        return tri, JsonResponse({'error': f"Colonne de tri inconnue : {tri}"}, status=400)
+    lignes.sort(key=lambda ligne: ligne.get(tri, 0), reverse=tri not in colonnes_croissantes)
+    return tri, None
+
+
+# =======================================================================
+# MESURES DES VUES
+# =======================================================================
+
+class MesuresVuesView(PersonnelRequisMixin, View):
+    """
+    Centiles (ms) des dernières requêtes de chaque vue, mesurées par ce
+    processus depuis son démarrage. ?tri=<colonne> (par défaut total_p95),
+    décroissant.
+    """
+
+    def get(self, request, *args, **kwargs):
+        lignes = statistiques_vues()
+        tri, erreur = _trier(request, lignes, 'total_p95', ('nom_vue',))
+        return erreur or JsonResponse({'processus': 'courant', 'tri': tri, 'vues': lignes})
+
+
+# =======================================================================
+# REQUÊTES LENTES
+# =======================================================================
+
+class RequetesLentesView(PersonnelRequisMixin, View):
+    """
+    Requêtes plus longues que REQUETES_LENTES_SEUIL vues par ce processus, une
+    ligne par forme avec son plan d'exécution. ?tri=<colonne> (par défaut
+    duree_totale, décroissant ; balayage_complet met les parcours de table en tête).
+    """
+
+    def get(self, request, *args, **kwargs):
+        lignes = rapport_requetes_lentes()
+        tri, erreur = _trier(request, lignes, 'duree_totale', ('forme', 'base'))
+        return erreur or JsonResponse({
+            'processus': 'courant', 'seuil_ms': settings.REQUETES_LENTES_SEUIL, 'tri': tri, 'requetes': lignes,
+        })
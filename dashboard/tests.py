@@ -1,3 +1,37 @@
+from datetime import date
+
 from django.test import TestCase
+from django.urls import reverse
+
+from config.requetes import BudgetRequetesMixin
+from enfants_gestion.tests import completer_enfants
+from gestion_financiere.models import CompteFinancier, Transaction
+from sites_gestion.models import SiteOrphelinat
+from utilisateurs.models import CustomUser
+
+
+class BudgetRequetesTableauDeBordTests(BudgetRequetesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.compte = CompteFinancier.objects.create(site=cls.site, nom='Caisse')
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def _completer(self, volume):
+        completer_enfants(self.site, volume)
+        existantes = Transaction.all_objects.count()
+        Transaction.all_objects.bulk_create(
+            Transaction(
+                compte=self.compte, type_transaction='entree', categorie='Don', montant=10,
+                date_transaction=date(2025, 1 + numero % 12, 1), description='Don',
+            )
+            for numero in range(existantes, volume)
+        )
 
-# Create your tests here.
+    def test_tableau_de_bord(self):
+        self.assertBudgetRequetes(reverse('dashboard:home'), 11, self._completer)
@@ -1,17 +1,24 @@
 import json
+from collections import Counter
 from datetime import date
+from itertools import chain
+from operator import attrgetter
 
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, Sum
 from django.db.models.functions import TruncMonth
 from django.views.generic import TemplateView
 
+from config.cache import mettre_en_cache, portee
+from config.partitions import repartir
+from config.routers import RepliqueLectureMixin
 from enfants_gestion.models import Enfant, SuiviMedical
-from gestion_financiere.models import Transaction
-from sites_gestion.models import SiteOrphelinat
+from gestion_financiere.models import CompteFinancier, Transaction
+from sites_gestion.registre import tous_les_sites
 
 
-class DashboardView(LoginRequiredMixin, TemplateView):
+class DashboardView(LoginRequiredMixin, RepliqueLectureMixin, TemplateView):
     template_name = 'dashboard/dashboard.html'
 
     def get_context_data(self, **kwargs):
@@ -22,8 +29,8 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # =======================================================================
         # 1. DÉFINIR LES PÉRIMÈTRES DE BASE
         # =======================================================================
-        enfant_queryset = Enfant.objects.filter(is_active=True)
-        transactions_queryset = Transaction.objects.filter(is_active=True)
+        enfant_queryset = Enfant.objects.all()
+        transactions_queryset = Transaction.objects.all()
 
         # Définir si l'utilisateur a un rôle à vision globale
         is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire', 'RH']).exists() and not user.sites.exists()
@@ -38,54 +45,95 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # =======================================================================
         # 2. CALCULER LES DONNÉES POUR LES WIDGETS
         # =======================================================================
+        est_global = user.is_superuser or is_global_role or is_global_finance
+        perimetre = portee(user, est_global)
+
+        def sur_chaque_base(calcul):
+            if est_global and settings.SITES_PARTITIONS:
+                # Une base par site : mêmes calculs dans chaque base, en parallèle
+                return repartir(calcul)
+            return [calcul()]
+
+        resultats = sur_chaque_base(lambda: self._indicateurs(enfant_queryset, transactions_queryset, today))
 
         # --- STATISTIQUES PRINCIPALES ---
-        context['total_enfants_actifs'] = enfant_queryset.count()
+        context['total_enfants_actifs'] = sum(r['total_enfants_actifs'] for r in resultats)
 
         if user.is_superuser or is_global_role:
-            context['total_sites'] = SiteOrphelinat.objects.count()
-            context['enfants_par_site'] = SiteOrphelinat.objects.annotate(
-                count=Count('enfant', filter=Q(enfant__is_active=True))
-            ).order_by('-count')
+            enfants_par_site = Counter()
+            for r in resultats:
+                enfants_par_site.update(r['enfants_par_site'])
+            sites = tous_les_sites()
+            for site in sites:
+                site.count = enfants_par_site[site.pk]
+            context['total_sites'] = len(sites)
+            context['enfants_par_site'] = sorted(sites, key=attrgetter('count'), reverse=True)
 
         # --- WIDGET ANNIVERSAIRES ---
-        anniversaires_queryset = enfant_queryset.filter(
-            date_naissance__month=today.month
-        ).order_by('date_naissance__day')
-        
         anniversaires_du_mois = []
-        for enfant in anniversaires_queryset:
+        for enfant in sorted(chain.from_iterable(r['anniversaires'] for r in resultats), key=lambda e: e.date_naissance.day):
             age = today.year - enfant.date_naissance.year - ((today.month, today.day) < (enfant.date_naissance.month, enfant.date_naissance.day))
             anniversaires_du_mois.append({
                 'enfant': enfant,
                 'age_a_feter': age + 1
             })
         context['anniversaires_du_mois'] = anniversaires_du_mois
-        
+
         # --- WIDGET SUIVIS MÉDICAUX ---
-        context['derniers_suivis_medicaux'] = SuiviMedical.objects.filter(
-            enfant__in=enfant_queryset, is_active=True
-        ).select_related('enfant').order_by('-date_consultation')[:5]
+        context['derniers_suivis_medicaux'] = sorted(
+            chain.from_iterable(r['derniers_suivis_medicaux'] for r in resultats),
+            key=attrgetter('date_consultation'), reverse=True,
+        )[:5]
 
         # --- WIDGET ACTIVITÉ RÉCENTE ---
+        context['activite_recente'] = sorted(
+            chain.from_iterable(r['activite_recente'] for r in resultats),
+            key=attrgetter('history_date'), reverse=True,
+        )[:5]
+        context['total_activites'] = sum(r['total_activites'] for r in resultats)
+
+        # --- DONNÉES POUR LE GRAPHIQUE FINANCIER ---
+        def calculer_entrees_par_mois():
+            entrees = Counter()
+            for par_mois in sur_chaque_base(lambda: self._entrees_par_mois(transactions_queryset)):
+                entrees.update(par_mois)
+            return entrees
+
+        entrees_par_mois = mettre_en_cache(
+            'graphique_entrees', perimetre, [Transaction, CompteFinancier], calculer_entrees_par_mois,
+        )
+        mois = sorted(entrees_par_mois)
+
+        chart_labels = [m.strftime('%B %Y') for m in mois]
+        chart_data = [float(entrees_par_mois[m]) for m in mois]
+        context['chart_labels'] = json.dumps(chart_labels)
+        context['chart_data'] = json.dumps(chart_data)
+
+        return context
+
+    def _indicateurs(self, enfant_queryset, transactions_queryset, today):
+        """Données des widgets pour une base (la base principale ou la partition d'un site)."""
         # Note : history.filter ne fonctionne pas avec `site__in`, on filtre donc par les IDs d'enfants autorisés
         enfants_ids_autorises = enfant_queryset.values_list('id', flat=True)
-        context['activite_recente'] = Enfant.history.filter(
-            id__in=enfants_ids_autorises
-        ).select_related('history_user').order_by('-history_date')[:5]
-        
-        context['total_activites'] = Enfant.history.filter(id__in=enfants_ids_autorises).count()
+        return {
+            'total_enfants_actifs': enfant_queryset.count(),
+            'enfants_par_site': dict(enfant_queryset.order_by().values('site').annotate(count=Count('pk')).values_list('site', 'count')),
+            'anniversaires': list(enfant_queryset.filter(date_naissance__month=today.month).order_by('date_naissance__day')),
+            # Dernière consultation de chaque enfant, via le pointeur dénormalisé Enfant.dernier_suivi_medical
+            'derniers_suivis_medicaux': list(SuiviMedical.objects.filter(
+                pk__in=enfant_queryset.filter(dernier_suivi_medical__isnull=False).values('dernier_suivi_medical')
+            ).select_related('enfant').order_by('-date_consultation')[:5]),
+            'activite_recente': list(Enfant.history.filter(
+                id__in=enfants_ids_autorises
+            ).select_related('history_user').order_by('-history_date')[:5]),
+            'total_activites': Enfant.history.filter(id__in=enfants_ids_autorises).count(),
+        }
 
-        # --- DONNÉES POUR LE GRAPHIQUE FINANCIER ---
+    def _entrees_par_mois(self, transactions_queryset):
+        """Total des entrées par mois pour une base (données du graphique, mises en cache)."""
         entrees_par_mois = transactions_queryset.filter(type_transaction='entree').annotate(
             month=TruncMonth('date_transaction')
         ).values('month').annotate(
             total=Sum('montant')
         ).order_by('month')
-
-        chart_labels = [d['month'].strftime('%B %Y') for d in entrees_par_mois]
-        chart_data = [float(d['total']) for d in entrees_par_mois]
-        context['chart_labels'] = json.dumps(chart_labels)
-        context['chart_data'] = json.dumps(chart_data)
-        
-        return context
\ No newline at end of file
+        return {d['month']: d['total'] for d in entrees_par_mois}
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class EnfantsGestionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'enfants_gestion'
+
+    def ready(self):
+        from . import signals  # noqa: F401
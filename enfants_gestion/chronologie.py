@@ -0,0 +1,255 @@
+# enfants_gestion/chronologie.py
+"""
+Chronologie d'un dossier : fusion, par date décroissante, des événements répartis
+entre les suivis, les notes, les documents, les versements de parrainage et
+l'historique (y compris sa partie archivée).
+
+Chaque source est lue par une requête déjà triée et bornée (index sur
+`(enfant, date)`), puis les flux sont fusionnés avec `heapq.merge` : une page de
+N événements ne lit jamais plus de N + 1 lignes par source, quelle que soit
+l'ancienneté du dossier.
+
+La pagination se fait par curseur (keyset) : le curseur retient, pour chaque
+source, la clé `(date, id)` du dernier élément déjà renvoyé, et la page suivante
+reprend chaque flux juste après.
+"""
+import base64
+import heapq
+import json
+from datetime import date, datetime, time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateformat import format as formater_date
+from django.utils.text import Truncator
+
+from gestion_financiere.models import Transaction
+from .models import Enfant, Document, HistoriqueEnfantArchive, NoteEvolutive, SuiviMedical, SuiviScolaire
+
+TAILLE_PAGE = 20
+TAILLE_PAGE_MAX = 100
+
+LIBELLES_HISTORIQUE = {'+': "Dossier créé", '~': "Dossier mis à jour", '-': "Dossier supprimé"}
+
+
+class CurseurInvalide(ValueError):
+    pass
+
+
+# =======================================================================
+# SOURCES
+# =======================================================================
+
+class Source:
+    """
+    Un flux d'événements : `requete(enfant)` renvoie le queryset des lignes de l'enfant,
+    trié ici par `champ_date` puis `champ_cle` décroissants ; `evenement(ligne)` le
+    transforme en dictionnaire sérialisable.
+    """
+    def __init__(self, nom, modele, champ_date, champ_cle, requete, evenement, permission=None):
+        self.nom = nom
+        self.modele = modele
+        self.champ_date = champ_date
+        self.champ_cle = champ_cle
+        self.requete = requete
+        self.evenement = evenement
+        self.permission = permission
+
+    def lignes(self, enfant, position, limite):
+        queryset = self.requete(enfant)
+        if position is not None:
+            valeur, cle = position
+            queryset = queryset.filter(
+                Q(**{f'{self.champ_date}__lt': valeur})
+                | Q(**{self.champ_date: valeur, f'{self.champ_cle}__lt': cle})
+            )
+        return queryset.order_by(f'-{self.champ_date}', f'-{self.champ_cle}')[:limite]
+
+    def lire_position(self, brute):
+        """Reconvertit la position stockée dans le curseur vers le type du champ."""
+        try:
+            valeur, cle = brute
+            return self.modele._meta.get_field(self.champ_date).to_python(valeur), int(cle)
+        except (TypeError, ValueError, ValidationError):
+            raise CurseurInvalide(f"Position invalide pour la source « {self.nom} ».")
+
+
+def _moment(valeur):
+    """Clé de fusion commune : un datetime conscient du fuseau, quel que soit le type du champ."""
+    if isinstance(valeur, datetime):
+        return valeur if timezone.is_aware(valeur) else timezone.make_aware(valeur)
+    if isinstance(valeur, date):
+        return timezone.make_aware(datetime.combine(valeur, time.min))
+    # Année scolaire « 2024-2025 » : placée à la rentrée de septembre
+    annee = str(valeur)[:4]
+    if annee.isdigit():
+        return timezone.make_aware(datetime(int(annee), 9, 1))
+    return timezone.make_aware(datetime.min.replace(year=1))
+
+
+def _date_affichee(valeur):
+    if isinstance(valeur, datetime):
+        return formater_date(timezone.localtime(valeur), 'd/m/Y à H:i')
+    if isinstance(valeur, date):
+        return formater_date(valeur, 'd/m/Y')
+    return str(valeur)
+
+
+def _evenement_historique(version):
+    auteur = version.history_user.username if version.history_user else "Utilisateur supprimé"
+    return {
+        'titre': LIBELLES_HISTORIQUE.get(version.history_type, "Modification du dossier"),
+        'detail': f"par {auteur}",
+        'url': reverse('enfants_gestion:enfant_history_detail', kwargs={'pk': version.history_id}),
+    }
+
+
+def _evenement_historique_archive(version):
+    return {
+        'titre': LIBELLES_HISTORIQUE.get(version.history_type, "Modification du dossier"),
+        'detail': "Version archivée",
+        'url': reverse('enfants_gestion:enfant_history_detail', kwargs={'pk': version.history_id}),
+    }
+
+
+def _evenement_suivi_medical(suivi):
+    return {
+        'titre': f"Consultation : {suivi.type_consultation}",
+        'detail': Truncator(suivi.diagnostic).chars(200),
+        'url': reverse('enfants_gestion:suivi_medical_update', kwargs={'pk': suivi.pk}),
+    }
+
+
+def _evenement_suivi_scolaire(suivi):
+    return {
+        'titre': f"Année scolaire {suivi.annee_scolaire} : {suivi.classe}",
+        'detail': suivi.ecole,
+        'url': reverse('enfants_gestion:suivi_scolaire_update', kwargs={'pk': suivi.pk}),
+    }
+
+
+def _evenement_note(note):
+    auteur = note.auteur.username if note.auteur else "Auteur inconnu"
+    return {
+        'titre': "Note évolutive",
+        'detail': f"{Truncator(note.note).chars(200)} ({auteur})",
+        'url': None,
+    }
+
+
+def _evenement_document(document):
+    return {
+        'titre': f"Document ajouté : {document.get_type_document_display()}",
+        'detail': document.description or '',
+        'url': reverse('enfants_gestion:document_fichier', kwargs={'pk': document.pk}),
+    }
+
+
+def _evenement_transaction(transaction):
+    sens = "Versement reçu" if transaction.type_transaction == 'entree' else "Dépense"
+    return {
+        'titre': f"{sens} : {transaction.montant} XAF",
+        'detail': f"{transaction.categorie} – {transaction.parrainage_lie.parrain_nom}",
+        'url': None,
+    }
+
+
+# L'ordre fixe le départage des événements simultanés (le premier l'emporte)
+SOURCES = {source.nom: source for source in [
+    Source('historique', Enfant.history.model, 'history_date', 'history_id',
+           lambda enfant: Enfant.history.filter(id=enfant.pk).select_related('history_user'),
+           _evenement_historique),
+    Source('historique_archive', HistoriqueEnfantArchive, 'history_date', 'history_id',
+           lambda enfant: HistoriqueEnfantArchive.objects.filter(enfant_id=enfant.pk).only(
+               'history_id', 'history_date', 'history_type'),
+           _evenement_historique_archive),
+    Source('note', NoteEvolutive, 'date_creation', 'id',
+           lambda enfant: NoteEvolutive.objects.filter(enfant=enfant).select_related('auteur'),
+           _evenement_note),
+    Source('document', Document, 'date_upload', 'id',
+           lambda enfant: Document.objects.filter(enfant=enfant),
+           _evenement_document),
+    Source('suivi_medical', SuiviMedical, 'date_consultation', 'id',
+           lambda enfant: SuiviMedical.objects.filter(enfant=enfant),
+           _evenement_suivi_medical),
+    Source('suivi_scolaire', SuiviScolaire, 'annee_scolaire', 'id',
+           lambda enfant: SuiviScolaire.objects.filter(enfant=enfant),
+           _evenement_suivi_scolaire),
+    Source('transaction', Transaction, 'date_transaction', 'id',
+           lambda enfant: Transaction.objects.filter(parrainage_lie__enfant=enfant).select_related('parrainage_lie'),
+           _evenement_transaction,
+           permission='gestion_financiere.view_transaction'),
+]}
+
+
+def sources_visibles(utilisateur):
+    return [nom for nom, source in SOURCES.items() if not source.permission or utilisateur.has_perm(source.permission)]
+
+
+# =======================================================================
+# CURSEUR
+# =======================================================================
+
+def _encoder_curseur(positions):
+    brut = json.dumps(
+        {nom: [valeur.isoformat() if hasattr(valeur, 'isoformat') else valeur, cle]
+         for nom, (valeur, cle) in positions.items()},
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(brut.encode()).decode().rstrip('=')
+
+
+def _decoder_curseur(curseur):
+    if not curseur:
+        return {}
+    try:
+        brut = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+        positions = json.loads(brut)
+    except (ValueError, TypeError):
+        raise CurseurInvalide("Curseur illisible.")
+    if not isinstance(positions, dict) or not set(positions) <= set(SOURCES):
+        raise CurseurInvalide("Curseur illisible.")
+    return {nom: SOURCES[nom].lire_position(position) for nom, position in positions.items()}
+
+
+# =======================================================================
+# FUSION
+# =======================================================================
+
+def chronologie(enfant, curseur=None, limite=TAILLE_PAGE, sources=None):
+    """
+    Retourne (evenements, curseur_suivant) : au plus `limite` événements, du plus récent
+    au plus ancien, et le curseur de la page suivante (None s'il n'y en a plus).
+    `sources` restreint les flux lus (par défaut : tous).
+    """
+    positions = _decoder_curseur(curseur)
+    flux = []
+    for rang, (nom, source) in enumerate(SOURCES.items()):
+        if sources is not None and nom not in sources:
+            continue
+        lignes = source.lignes(enfant, positions.get(nom), limite + 1)
+        # Tri décroissant sur (moment, -rang, clé) : cohérent avec l'ordre SQL de chaque flux
+        flux.append([
+            (_moment(getattr(ligne, source.champ_date)), -rang, getattr(ligne, source.champ_cle), nom, ligne)
+            for ligne in lignes
+        ])
+
+    fusion = list(islice(heapq.merge(*flux, reverse=True), limite + 1))
+    evenements = []
+    for _moment_ligne, _rang, cle, nom, ligne in fusion[:limite]:
+        source = SOURCES[nom]
+        valeur = getattr(ligne, source.champ_date)
+        positions[nom] = (valeur, cle)
+        evenements.append({
+            'type': nom,
+            'id': cle,
+            'date': valeur.isoformat() if hasattr(valeur, 'isoformat') else valeur,
+            'date_affichee': _date_affichee(valeur),
+            **source.evenement(ligne),
+        })
+
+    curseur_suivant = _encoder_curseur(positions) if len(fusion) > limite else None
+    return evenements, curseur_suivant
@@ -0,0 +1,258 @@
+# enfants_gestion/extraction.py
+"""
+Extraction du texte des documents téléversés et index de recherche plein texte.
+
+L'extraction se fait hors requête, par la commande `indexer_documents` (à lancer
+par cron ou en boucle avec --boucle). Le texte des PDF est lu avec `pypdf` s'il
+est installé ; les images (et les PDF scannés, via `pdftoppm`) peuvent passer par
+le moteur OCR `tesseract` installé localement si DOCUMENTS_OCR_ACTIF est vrai.
+Un document n'est ré-extrait que si l'empreinte de son fichier a changé.
+
+Sous SQLite, le texte est indexé dans la table FTS5 `enfants_gestion_documentfts`
+(rowid = id du document, avec le site de l'enfant pour filtrer les résultats).
+En mode partitionné (config/partitions.py), chaque base a son propre index :
+`indexer_documents` passe sur la base principale puis sur chaque partition, et
+une recherche interroge l'index de la partition active.
+"""
+import glob
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from config.partitions import dans_partition, partition_active, partitions
+
+from .models import Document, TexteDocument
+from .stockage import est_blob
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Dépendance facultative
+    PdfReader = None
+
+TABLE_FTS = 'enfants_gestion_documentfts'
+# Marqueurs (caractères de contrôle) entourant les termes trouvés dans les extraits
+DEBUT_SURLIGNAGE, FIN_SURLIGNAGE = '\x02', '\x03'
+EXTENSIONS_IMAGES = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.gif', '.webp')
+
+
+class ExtractionImpossible(Exception):
+    pass
+
+
+# =======================================================================
+# EXTRACTION
+# =======================================================================
+
+def empreinte_fichier(fichier):
+    """Empreinte SHA-256 du fichier (lue dans son nom pour les blobs dédupliqués)."""
+    if est_blob(fichier.name):
+        return os.path.splitext(os.path.basename(fichier.name))[0]
+    empreinte = hashlib.sha256()
+    with fichier.storage.open(fichier.name, 'rb') as contenu:
+        for morceau in contenu.chunks():
+            empreinte.update(morceau)
+    return empreinte.hexdigest()
+
+
+def _ocr(chemin_image):
+    if not settings.DOCUMENTS_OCR_ACTIF or not shutil.which('tesseract'):
+        return ''
+    resultat = subprocess.run(
+        ['tesseract', chemin_image, 'stdout', '-l', settings.DOCUMENTS_OCR_LANGUE],
+        capture_output=True, text=True, timeout=settings.DOCUMENTS_OCR_DELAI,
+    )
+    if resultat.returncode != 0:
+        raise ExtractionImpossible(resultat.stderr.strip() or "Échec de tesseract.")
+    return resultat.stdout
+
+
+def _ocr_pdf(chemin_pdf):
+    """OCR d'un PDF scanné : rendu des pages en images avec pdftoppm, puis tesseract."""
+    if not settings.DOCUMENTS_OCR_ACTIF or not shutil.which('pdftoppm'):
+        return ''
+    with tempfile.TemporaryDirectory() as dossier:
+        subprocess.run(
+            ['pdftoppm', '-r', '200', '-png', chemin_pdf, os.path.join(dossier, 'page')],
+            check=True, capture_output=True, timeout=settings.DOCUMENTS_OCR_DELAI,
+        )
+        return '\n'.join(_ocr(page) for page in sorted(glob.glob(os.path.join(dossier, 'page*.png'))))
+
+
+def _texte_pdf(chemin_pdf):
+    if PdfReader is None:
+        return ''
+    try:
+        lecteur = PdfReader(chemin_pdf)
+        return '\n'.join(page.extract_text() or '' for page in lecteur.pages)
+    except Exception as erreur:  # pypdf lève des exceptions variées sur les fichiers abîmés
+        raise ExtractionImpossible(f"PDF illisible : {erreur}")
+
+
+def extraire_texte(fichier):
+    """Retourne le texte d'un FieldFile (chaîne vide si le format n'est pas pris en charge)."""
+    chemin = fichier.storage.path(fichier.name)
+    extension = os.path.splitext(fichier.name)[1].lower()
+    if extension == '.pdf':
+        texte = _texte_pdf(chemin)
+        if not texte.strip():
+            texte = _ocr_pdf(chemin)
+        return texte
+    if extension in EXTENSIONS_IMAGES:
+        return _ocr(chemin)
+    if extension == '.txt':
+        with fichier.storage.open(fichier.name, 'rb') as contenu:
+            return contenu.read().decode('utf-8', errors='replace')
+    return ''
+
+
+# =======================================================================
+# INDEXATION
+# =======================================================================
+
+def _connexion(using=None):
+    """Base `using`, par défaut celle de la partition active (la base principale hors partitions)."""
+    return connections[using or partition_active() or DEFAULT_DB_ALIAS]
+
+
+def _utilise_fts(using=None):
+    return _connexion(using).vendor == 'sqlite'
+
+
+def _ecrire_index(document_id, site_id, texte, using):
+    if not _utilise_fts(using):
+        return
+    with _connexion(using).cursor() as curseur:
+        curseur.execute(f"DELETE FROM {TABLE_FTS} WHERE rowid = %s", [document_id])
+        if texte:
+            curseur.execute(
+                f"INSERT INTO {TABLE_FTS} (rowid, texte, site_id) VALUES (%s, %s, %s)",
+                [document_id, texte, site_id],
+            )
+
+
+def retirer_de_l_index(document_id, using=None):
+    if _utilise_fts(using):
+        with _connexion(using).cursor() as curseur:
+            curseur.execute(f"DELETE FROM {TABLE_FTS} WHERE rowid = %s", [document_id])
+
+
+def indexer_document(document, forcer=False):
+    """
+    Extrait et indexe le texte d'un document si son fichier a changé depuis la dernière extraction.
+    Retourne True si le document a été (ré)indexé.
+    """
+    if not document.fichier:
+        return False
+    empreinte = empreinte_fichier(document.fichier)
+    texte_existant = getattr(document, 'texte', None)
+    site_id = document.enfant.site_id
+    if not forcer and texte_existant is not None and texte_existant.empreinte == empreinte:
+        return False
+
+    texte, erreur = '', ''
+    try:
+        texte = extraire_texte(document.fichier)
+    except (ExtractionImpossible, OSError, subprocess.SubprocessError) as exception:
+        erreur = str(exception)
+
+    base = document._state.db
+    with transaction.atomic(using=base):
+        TexteDocument.objects.using(base).update_or_create(
+            document=document,
+            defaults={'empreinte': empreinte, 'texte': texte, 'erreur': erreur},
+        )
+        _ecrire_index(document.pk, site_id, texte, base)
+    return True
+
+
+def mettre_a_jour_sites_index():
+    """Répercute dans l'index les changements de site des enfants (transferts)."""
+    if not _utilise_fts():
+        return
+    with _connexion().cursor() as curseur:
+        curseur.execute(
+            f"""UPDATE {TABLE_FTS} SET site_id = (
+                    SELECT e.site_id FROM enfants_gestion_document d
+                    JOIN enfants_gestion_enfant e ON e.id = d.enfant_id
+                    WHERE d.id = {TABLE_FTS}.rowid)
+                WHERE site_id IS NOT (
+                    SELECT e.site_id FROM enfants_gestion_document d
+                    JOIN enfants_gestion_enfant e ON e.id = d.enfant_id
+                    WHERE d.id = {TABLE_FTS}.rowid)"""
+        )
+        # Documents supprimés entre deux passages
+        curseur.execute(
+            f"DELETE FROM {TABLE_FTS} WHERE rowid NOT IN (SELECT id FROM enfants_gestion_document)"
+        )
+
+
+def indexer_documents(forcer=False):
+    """
+    Passe sur tous les documents (base principale, puis chaque partition) et
+    indexe ceux qui sont nouveaux ou modifiés.
+    """
+    stats = {'indexes': 0, 'inchanges': 0, 'erreurs': 0}
+    for base in [None] + partitions():
+        with dans_partition(base):
+            documents = Document.objects.select_related('enfant', 'texte').order_by('pk')
+            for document in documents.iterator(chunk_size=200):
+                try:
+                    if indexer_document(document, forcer=forcer):
+                        stats['indexes'] += 1
+                    else:
+                        stats['inchanges'] += 1
+                except OSError:
+                    stats['erreurs'] += 1
+            mettre_a_jour_sites_index()
+    return stats
+
+
+# =======================================================================
+# RECHERCHE
+# =======================================================================
+
+def _requete_fts(recherche):
+    """Transforme la saisie libre en requête FTS5 sûre : chaque mot est cherché comme préfixe."""
+    mots = [mot.replace('"', '""') for mot in recherche.split()]
+    return ' '.join(f'"{mot}"*' for mot in mots if mot)
+
+
+def rechercher_documents(recherche, site_ids=None, limite=50):
+    """
+    Retourne une liste de (document_id, extrait) classée par pertinence.
+    `site_ids` restreint la recherche à ces sites (None : tous les sites de la
+    base interrogée, celle de la partition active en mode partitionné).
+    Les documents des enfants archivés restent indexés mais ne sont pas retournés.
+    """
+    requete = _requete_fts(recherche)
+    if not requete:
+        return []
+    if site_ids is not None and not site_ids:
+        return []
+
+    if _utilise_fts():
+        sql = (
+            f"SELECT rowid, snippet({TABLE_FTS}, 0, '{DEBUT_SURLIGNAGE}', '{FIN_SURLIGNAGE}', '…', 12) FROM {TABLE_FTS} "
+            f"WHERE {TABLE_FTS} MATCH %s AND rowid IN ("
+            "SELECT d.id FROM enfants_gestion_document d "
+            "JOIN enfants_gestion_enfant e ON e.id = d.enfant_id WHERE e.is_active)"
+        )
+        parametres = [requete]
+        if site_ids is not None:
+            sql += f" AND site_id IN ({', '.join(['%s'] * len(site_ids))})"
+            parametres += list(site_ids)
+        sql += " ORDER BY rank LIMIT %s"
+        parametres.append(limite)
+        with _connexion().cursor() as curseur:
+            curseur.execute(sql, parametres)
+            return curseur.fetchall()
+
+    textes = TexteDocument.objects.filter(texte__icontains=recherche.strip(), document__enfant__is_active=True)
+    if site_ids is not None:
+        textes = textes.filter(document__enfant__site_id__in=site_ids)
+    return [(document_id, texte[:200]) for document_id, texte in textes.values_list('document_id', 'texte')[:limite]]
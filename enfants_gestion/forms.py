@@ -1,8 +1,40 @@
 # enfants_gestion/forms.py
+import os
+
 from django import forms
+from django.urls import reverse
 from .models import Enfant, SuiviMedical, SuiviScolaire, Document
 from django.forms import inlineformset_factory
 from sites_gestion.models import SiteOrphelinat
+from sites_gestion.registre import SiteChoiceField, tous_les_sites
+
+
+class LienFichierProtege:
+    """Fichier actuel affiché par FichierProtegeInput : son nom, et l'adresse de la vue protégée."""
+
+    def __init__(self, fichier, url):
+        self.fichier = fichier
+        self.url = url
+
+    def __str__(self):
+        return str(self.fichier)
+
+
+class FichierProtegeInput(forms.ClearableFileInput):
+    """
+    ClearableFileInput dont le lien vers le fichier actuel passe par la vue
+    protégée `url_name` (clé de l'objet en argument) : /media/ n'est pas servi.
+    """
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        if context['widget']['is_initial'] and value.instance.pk:
+            context['widget']['value'] = LienFichierProtege(value, reverse(self.url_name, args=[value.instance.pk]))
+        return context
 
 
 class EnfantForm(forms.ModelForm):
@@ -24,8 +56,11 @@ class EnfantForm(forms.ModelForm):
             'statut': forms.Select(attrs={'class': 'select select-bordered select-sm w-full'}),
             'motif_admission': forms.Textarea(attrs={'class': 'textarea textarea-bordered textarea-sm w-full h-24'}),
             'histoire': forms.Textarea(attrs={'class': 'textarea textarea-bordered textarea-sm w-full h-24'}),
-            'photo': forms.ClearableFileInput(attrs={'class': 'file-input file-input-bordered file-input-sm w-full'}),
+            'photo': FichierProtegeInput(
+                'enfants_gestion:enfant_photo', attrs={'class': 'file-input file-input-bordered file-input-sm w-full'},
+            ),
         }
+        field_classes = {'site': SiteChoiceField}
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
@@ -36,7 +71,7 @@ class EnfantForm(forms.ModelForm):
             self.fields['site'].queryset = SiteOrphelinat.objects.all()
             self.fields['site'].required = True
         else:
-            del self.fields['site']
+            self.fields.pop('site', None)
 
     def clean(self):
         cleaned_data = super().clean()
@@ -56,7 +91,9 @@ class DocumentForm(forms.ModelForm):
         widgets = {
             'type_document': forms.Select(attrs={'class': 'select select-bordered select-sm w-full'}),
             'description': forms.TextInput(attrs={'class': 'input input-bordered input-sm w-full', 'placeholder': 'Description du document'}),
-            'fichier': forms.ClearableFileInput(attrs={'class': 'file-input file-input-bordered file-input-sm w-full'}),
+            'fichier': FichierProtegeInput(
+                'enfants_gestion:document_fichier', attrs={'class': 'file-input file-input-bordered file-input-sm w-full'},
+            ),
         }
 
     # CORRECTION : Remplacer __init__ par clean() est plus robuste pour la suppression.
@@ -144,10 +181,54 @@ class ExportFilterForm(forms.Form):
         super().__init__(*args, **kwargs)
 
         if user and user.is_superuser:
-            sites = [('', 'Tous les sites')] + list(SiteOrphelinat.objects.values_list('pk', 'nom'))
+            sites = [('', 'Tous les sites')] + [(site.pk, site.nom) for site in tous_les_sites()]
             self.fields['site'] = forms.ChoiceField(
                 choices=sites, 
                 required=False, 
                 label="Filtrer par site",
                 widget=forms.Select(attrs={'class': 'select select-bordered select-sm w-full'})
-            )
\ No newline at end of file
+            )
+
+class EnfantImportLigneForm(EnfantForm):
+    """Validation d'une ligne d'import : mêmes règles que EnfantForm, sans photo ni widgets stylés."""
+    class Meta(EnfantForm.Meta):
+        fields = [
+            'nom', 'prenom', 'date_naissance', 'sexe', 'lieu_naissance',
+            'date_arrivee', 'statut', 'date_depart', 'motif_admission', 'histoire',
+        ]
+        widgets = {}
+
+
+class ImportEnfantsForm(forms.Form):
+    fichier = forms.FileField(
+        label="Fichier (CSV ou XLSX)",
+        widget=forms.ClearableFileInput(attrs={'class': 'file-input file-input-bordered file-input-sm w-full', 'accept': '.csv,.xlsx'})
+    )
+    site = forms.ModelChoiceField(
+        queryset=SiteOrphelinat.objects.none(), required=False, label="Site d'accueil par défaut",
+        help_text="Utilisé pour les lignes sans colonne « Site ».",
+        widget=forms.Select(attrs={'class': 'select select-bordered select-sm w-full'})
+    )
+    mettre_a_jour = forms.BooleanField(
+        required=False, label="Mettre à jour les dossiers existants",
+        help_text="Sinon, les lignes correspondant à un dossier existant sont ignorées.",
+        widget=forms.CheckboxInput(attrs={'class': 'checkbox checkbox-sm'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        sites = kwargs.pop('sites', SiteOrphelinat.objects.none())
+        peut_modifier = kwargs.pop('peut_modifier', True)
+        super().__init__(*args, **kwargs)
+        self.fields['site'].queryset = sites
+        if not peut_modifier:
+            # Sans le droit de modification, l'import ne fait que créer des dossiers
+            del self.fields['mettre_a_jour']
+        if len(sites) == 1:
+            self.fields['site'].initial = sites[0]
+
+    def clean_fichier(self):
+        fichier = self.cleaned_data['fichier']
+        extension = os.path.splitext(fichier.name)[1].lower()
+        if extension not in ('.csv', '.xlsx'):
+            raise forms.ValidationError("Seuls les fichiers CSV et XLSX sont acceptés.")
+        return fichier
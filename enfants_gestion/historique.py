@@ -0,0 +1,176 @@
+# enfants_gestion/historique.py
+"""
+Compaction et archivage de l'historique des dossiers enfants.
+
+django-simple-history copie toute la ligne `Enfant` (y compris `histoire` et
+`motif_admission`) à chaque enregistrement. Les versions plus anciennes que
+`HISTORIQUE_ARCHIVE_AGE_JOURS` sont déplacées vers `HistoriqueEnfantArchive` :
+une copie complète toutes les `HISTORIQUE_SNAPSHOT_INTERVALLE` versions, et
+uniquement les champs modifiés entre deux. `reconstruire_version` permet de
+retrouver n'importe quelle version, qu'elle soit encore dans la table
+d'historique ou déjà archivée.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Enfant, HistoriqueEnfantArchive
+
+HistoricalEnfant = Enfant.history.model
+
+CHAMPS_METADONNEES = ('history_id', 'history_date', 'history_type', 'history_change_reason', 'history_user')
+
+
+def _champs_suivis():
+    """Champs du dossier recopiés par simple_history (hors métadonnées d'historique)."""
+    return [f for f in HistoricalEnfant._meta.fields if f.name not in CHAMPS_METADONNEES]
+
+
+def _serialiser(record):
+    """Transforme une version historique en dictionnaire compatible JSON."""
+    donnees = {}
+    for champ in _champs_suivis():
+        valeur = champ.value_from_object(record)
+        if isinstance(valeur, (datetime.date, datetime.datetime)):
+            valeur = valeur.isoformat()
+        donnees[champ.attname] = valeur
+    return donnees
+
+
+def _lignes_apres(lignes, reference, inclure=False):
+    """Filtre les lignes d'archive postérieures à `reference` dans l'ordre (history_date, history_id)."""
+    condition_id = Q(history_id__gte=reference.history_id) if inclure else Q(history_id__gt=reference.history_id)
+    return lignes.filter(
+        Q(history_date__gt=reference.history_date) | (Q(history_date=reference.history_date) & condition_id)
+    )
+
+
+def _etat_archive(enfant_id, using):
+    """
+    Retourne le dernier état archivé d'un enfant et le nombre de lignes
+    différentielles écrites depuis la dernière copie complète.
+    """
+    lignes = HistoriqueEnfantArchive.objects.using(using).filter(enfant_id=enfant_id)
+    snapshot = lignes.filter(is_snapshot=True).order_by('-history_date', '-history_id').first()
+    if snapshot is None:
+        return None, 0
+
+    etat = dict(snapshot.donnees)
+    deltas = list(_lignes_apres(lignes, snapshot).order_by('history_date', 'history_id'))
+    for ligne in deltas:
+        etat.update(ligne.donnees)
+    return etat, len(deltas)
+
+
+def compacter_historique(age_jours=None, intervalle=None, dry_run=False, taille_lot=500):
+    """
+    Déplace les versions historiques plus anciennes que `age_jours` vers la table d'archive.
+    Pour chaque enfant, l'archive est validée avant que les versions ne soient
+    supprimées de l'historique : une interruption entre les deux laisse des
+    versions en double, que la relance ne réarchive pas et supprime.
+    """
+    if age_jours is None:
+        age_jours = settings.HISTORIQUE_ARCHIVE_AGE_JOURS
+    if intervalle is None:
+        intervalle = settings.HISTORIQUE_SNAPSHOT_INTERVALLE
+    intervalle = max(1, intervalle)
+
+    limite = timezone.now() - datetime.timedelta(days=age_jours)
+    base_archive = router.db_for_write(HistoriqueEnfantArchive)
+    base_historique = router.db_for_write(HistoricalEnfant)
+
+    anciennes_versions = HistoricalEnfant.objects.using(base_historique).filter(history_date__lt=limite)
+    enfant_ids = list(anciennes_versions.order_by('id').values_list('id', flat=True).distinct())
+
+    stats = {'enfants': 0, 'versions': 0, 'snapshots': 0}
+    for enfant_id in enfant_ids:
+        versions = anciennes_versions.filter(id=enfant_id).order_by('history_date', 'history_id')
+        etat, depuis_snapshot = _etat_archive(enfant_id, base_archive)
+        deja_archivees = set(
+            HistoriqueEnfantArchive.objects.using(base_archive).filter(enfant_id=enfant_id).values_list('history_id', flat=True)
+        )
+
+        lignes, history_ids = [], []
+        for record in versions.iterator(chunk_size=taille_lot):
+            history_ids.append(record.history_id)
+            if record.history_id in deja_archivees:
+                # Déjà compté dans `etat` par _etat_archive
+                continue
+            donnees = _serialiser(record)
+            is_snapshot = etat is None or depuis_snapshot >= intervalle - 1
+            if is_snapshot:
+                contenu = donnees
+                depuis_snapshot = 0
+                stats['snapshots'] += 1
+            else:
+                contenu = {cle: valeur for cle, valeur in donnees.items() if etat.get(cle) != valeur}
+                depuis_snapshot += 1
+            lignes.append(HistoriqueEnfantArchive(
+                history_id=record.history_id,
+                enfant_id=enfant_id,
+                site_id=record.site_id,
+                history_date=record.history_date,
+                history_type=record.history_type,
+                history_change_reason=record.history_change_reason,
+                history_user_id=record.history_user_id,
+                is_snapshot=is_snapshot,
+                donnees=contenu,
+            ))
+            etat = donnees
+
+        stats['enfants'] += 1
+        stats['versions'] += len(lignes)
+        if dry_run or not history_ids:
+            continue
+
+        with transaction.atomic(using=base_archive):
+            HistoriqueEnfantArchive.objects.using(base_archive).bulk_create(lignes, batch_size=taille_lot)
+        with transaction.atomic(using=base_historique):
+            for debut in range(0, len(history_ids), taille_lot):
+                HistoricalEnfant.objects.using(base_historique).filter(
+                    history_id__in=history_ids[debut:debut + taille_lot]
+                ).delete()
+
+    return stats
+
+
+def reconstruire_version(history_id):
+    """
+    Retourne la version `history_id` du dossier sous forme d'instance `HistoricalEnfant`.
+    Si la version a été archivée, elle est reconstruite (non enregistrée) à partir de
+    la copie complète la plus proche et des lignes différentielles qui la suivent.
+    Lève `HistoricalEnfant.DoesNotExist` si la version est introuvable.
+    """
+    try:
+        return HistoricalEnfant.objects.select_related('history_user', 'site').get(history_id=history_id)
+    except HistoricalEnfant.DoesNotExist:
+        pass
+
+    cible = HistoriqueEnfantArchive.objects.filter(history_id=history_id).first()
+    if cible is None:
+        raise HistoricalEnfant.DoesNotExist(f"Version {history_id} introuvable.")
+
+    lignes = HistoriqueEnfantArchive.objects.filter(enfant_id=cible.enfant_id)
+    avant_cible = Q(history_date__lt=cible.history_date) | Q(history_date=cible.history_date, history_id__lte=cible.history_id)
+    snapshot = lignes.filter(avant_cible, is_snapshot=True).order_by('-history_date', '-history_id').first()
+
+    a_rejouer = lignes.filter(avant_cible)
+    if snapshot is not None:
+        a_rejouer = _lignes_apres(a_rejouer, snapshot, inclure=True)
+
+    etat = {}
+    for ligne in a_rejouer.order_by('history_date', 'history_id'):
+        etat.update(ligne.donnees)
+
+    valeurs = {champ.attname: champ.to_python(etat.get(champ.attname)) for champ in _champs_suivis()}
+    return HistoricalEnfant(
+        history_id=cible.history_id,
+        history_date=cible.history_date,
+        history_type=cible.history_type,
+        history_change_reason=cible.history_change_reason,
+        history_user_id=cible.history_user_id,
+        **valeurs,
+    )
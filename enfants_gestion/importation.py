@@ -0,0 +1,356 @@
+# enfants_gestion/importation.py
+"""
+Import en masse de dossiers d'enfants depuis un fichier CSV ou XLSX.
+
+Chaque ligne est validée par `EnfantImportLigneForm` (dérivé d'`EnfantForm` : mêmes règles que la saisie manuelle,
+par exemple statut / date de départ), par lots de IMPORT_TAILLE_LOT lignes.
+Les doublons sont détectés sur (site, nom, prénom, date de naissance), sans tenir
+compte de la casse ni des accents, contre la base et à l'intérieur du fichier.
+
+`analyser_import` ne modifie pas la base et produit le rapport affiché en aperçu ;
+`appliquer_import` enregistre les créations (et, sur demande, les modifications)
+avec `bulk_create_with_history` / `bulk_update_with_history`, pour que
+l'historique des dossiers reste complet.
+Entre les deux, le fichier est conservé sous un jeton dans le dossier temporaire ;
+il est supprimé à la confirmation, à l'annulation, ou après IMPORT_DUREE_ATTENTE.
+"""
+import csv
+from datetime import date, datetime
+import os
+import re
+import tempfile
+import time
+import unicodedata
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from import_export.formats.base_formats import CSV, XLSX
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from synchronisation.journal import journaliser_lot
+from .forms import EnfantImportLigneForm
+from .models import Enfant
+
+CHAMPS_IMPORT = EnfantImportLigneForm._meta.fields
+CHAMPS_DATE = ('date_naissance', 'date_arrivee', 'date_depart')
+FORMATS_DATE = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y')
+FORMATS_FICHIER = {'csv': CSV, 'xlsx': XLSX}
+RAISON_IMPORT = "Import en masse"
+
+
+class FichierImportInvalide(Exception):
+    pass
+
+
+def _normaliser(texte):
+    """Minuscules, sans accents, mots séparés par '_' : « Date d'arrivée » -> « date_d_arrivee »."""
+    texte = unicodedata.normalize('NFKD', str(texte)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', texte.lower()).strip('_')
+
+
+def _alias_colonnes():
+    """En-têtes acceptés : nom du champ ou libellé, comme dans l'export (EnfantResource)."""
+    alias = {}
+    for champ in CHAMPS_IMPORT:
+        alias[_normaliser(champ)] = champ
+        alias[_normaliser(Enfant._meta.get_field(champ).verbose_name)] = champ
+    for entete in ('site', "Site d'accueil", 'site_nom'):
+        alias[_normaliser(entete)] = 'site'
+    return alias
+
+
+def _alias_choix(champ):
+    choix = {}
+    for cle, libelle in Enfant._meta.get_field(champ).choices:
+        choix[_normaliser(cle)] = cle
+        choix[_normaliser(libelle)] = cle
+    return choix
+
+
+def _valeur_date(valeur):
+    """Ramène une date (objet, ISO ou jj/mm/aaaa) au format ISO attendu par le formulaire."""
+    if isinstance(valeur, datetime):
+        return valeur.date().isoformat()
+    if isinstance(valeur, date):
+        return valeur.isoformat()
+    if not isinstance(valeur, str):
+        return str(valeur)
+    for format_date in FORMATS_DATE:
+        try:
+            return datetime.strptime(valeur, format_date).date().isoformat()
+        except ValueError:
+            continue
+    return valeur
+
+
+def _date_iso_valide(valeur):
+    try:
+        date.fromisoformat(valeur)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _cle_doublon(site_id, nom, prenom, date_naissance):
+    return (site_id, _normaliser(nom), _normaliser(prenom), date_naissance)
+
+
+# =======================================================================
+# LECTURE DU FICHIER
+# =======================================================================
+
+def lire_fichier(contenu, format_fichier):
+    """Retourne un tablib.Dataset à partir du contenu (bytes) d'un fichier CSV ou XLSX."""
+    classe_format = FORMATS_FICHIER.get(format_fichier)
+    if classe_format is None:
+        raise FichierImportInvalide("Format non pris en charge (CSV ou XLSX uniquement).")
+    options = {}
+    if format_fichier == 'csv':
+        try:
+            contenu = contenu.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            contenu = contenu.decode('cp1252')
+        # Excel en français enregistre les CSV avec des points-virgules
+        try:
+            options['delimiter'] = csv.Sniffer().sniff(contenu.split('\n', 1)[0], delimiters=',;\t').delimiter
+        except csv.Error:
+            pass
+    try:
+        return classe_format().create_dataset(contenu, **options)
+    except ImportError:
+        raise FichierImportInvalide("La lecture des fichiers XLSX nécessite le paquet openpyxl.")
+    except Exception as erreur:  # tablib / openpyxl lèvent des exceptions variées
+        raise FichierImportInvalide(f"Fichier illisible : {erreur}")
+
+
+# =======================================================================
+# ANALYSE (SIMULATION)
+# =======================================================================
+
+def _lignes(dataset):
+    """Associe chaque ligne du fichier aux champs du modèle. Retourne (lignes, colonnes ignorées)."""
+    alias = _alias_colonnes()
+    colonnes, ignorees = [], []
+    for entete in dataset.headers or []:
+        champ = alias.get(_normaliser(entete or ''))
+        colonnes.append(champ)
+        if champ is None and entete:
+            ignorees.append(entete)
+    if not {'nom', 'prenom', 'date_naissance'} <= set(colonnes):
+        raise FichierImportInvalide("Colonnes obligatoires manquantes : nom, prénom et date de naissance.")
+
+    lignes = []
+    for numero, valeurs in enumerate(dataset, start=2):  # La ligne 1 est l'en-tête
+        donnees = {}
+        for champ, valeur in zip(colonnes, valeurs):
+            if champ is None:
+                continue
+            if valeur is None:
+                valeur = ''
+            if champ in CHAMPS_DATE and valeur != '':
+                valeur = _valeur_date(valeur.strip() if isinstance(valeur, str) else valeur)
+            donnees[champ] = valeur.strip() if isinstance(valeur, str) else str(valeur)
+        if any(donnees.values()):
+            lignes.append((numero, donnees))
+    return lignes, ignorees
+
+
+def _valider_lot(lot, sites_par_nom, site_defaut, colonnes, existants, deja_vus, choix):
+    # Colonnes absentes pour un nouveau dossier : valeur par défaut du modèle (statut « accueilli »...)
+    defauts = {champ: Enfant._meta.get_field(champ).get_default() or '' for champ in CHAMPS_IMPORT}
+    resultats = []
+    for numero, donnees in lot:
+        ligne = {'numero': numero, 'action': 'erreur', 'erreurs': [], 'differences': [], 'enfant': None}
+        resultats.append(ligne)
+
+        site = site_defaut
+        if donnees.get('site'):
+            site = sites_par_nom.get(_normaliser(donnees['site']))
+            if site is None:
+                ligne['erreurs'].append(f"Site inconnu ou non autorisé : {donnees['site']}")
+                continue
+        if site is None:
+            ligne['erreurs'].append("Site d'accueil manquant.")
+            continue
+
+        for champ, alias in choix.items():
+            if donnees.get(champ):
+                donnees[champ] = alias.get(_normaliser(donnees[champ]), donnees[champ])
+
+        cle = _cle_doublon(site.pk, donnees.get('nom', ''), donnees.get('prenom', ''), donnees.get('date_naissance'))
+        if cle in deja_vus:
+            ligne['action'] = 'doublon'
+            ligne['erreurs'].append(f"Doublon de la ligne {deja_vus[cle]} du fichier.")
+            continue
+        deja_vus[cle] = numero
+
+        existant = existants.get(cle)
+        if existant is not None:
+            # Les colonnes absentes du fichier gardent la valeur du dossier existant
+            anciennes = {champ: getattr(existant, champ) for champ in CHAMPS_IMPORT}
+            donnees_formulaire = {
+                champ: anciennes[champ] if anciennes[champ] is not None else '' for champ in CHAMPS_IMPORT
+            }
+            donnees_formulaire.update({champ: donnees[champ] for champ in colonnes if champ in donnees})
+            # Le nom et le prénom ont servi à la correspondance : on garde leur graphie actuelle
+            donnees_formulaire.update(nom=anciennes['nom'], prenom=anciennes['prenom'])
+            form = EnfantImportLigneForm(data=donnees_formulaire, instance=existant)
+        else:
+            form = EnfantImportLigneForm(data={champ: donnees.get(champ, defauts[champ]) for champ in CHAMPS_IMPORT})
+
+        if not form.is_valid():
+            ligne['erreurs'] = [
+                f"{form.fields[champ].label if champ in form.fields else champ} : {message}"
+                for champ, messages_champ in form.errors.items() for message in messages_champ
+            ]
+            continue
+
+        enfant = form.instance
+        enfant.site = site
+        ligne['enfant'] = enfant
+        if existant is None:
+            ligne['action'] = 'creation'
+            continue
+        ligne['differences'] = [
+            {
+                'champ': champ,
+                'libelle': Enfant._meta.get_field(champ).verbose_name,
+                'ancien': anciennes[champ],
+                'nouveau': getattr(enfant, champ),
+            }
+            for champ in CHAMPS_IMPORT if getattr(enfant, champ) != anciennes[champ]
+        ]
+        ligne['action'] = 'modification' if ligne['differences'] else 'inchange'
+    return resultats
+
+
+def analyser_import(dataset, sites, site_defaut=None, taille_lot=None):
+    """
+    Valide toutes les lignes sans rien enregistrer.
+
+    `sites` : sites sur lesquels l'utilisateur peut importer ; `site_defaut` : site
+    utilisé pour les lignes sans colonne « site ». Chaque ligne du rapport a une
+    action parmi creation, modification, inchange, doublon et erreur.
+    """
+    taille_lot = taille_lot or settings.IMPORT_TAILLE_LOT
+    purger_en_attente()
+    lignes, ignorees = _lignes(dataset)
+    colonnes = {champ for _, donnees in lignes for champ in donnees}
+    sites_par_nom = {_normaliser(site.nom): site for site in sites}
+    site_ids = [site.pk for site in sites_par_nom.values()]
+    choix = {'sexe': _alias_choix('sexe'), 'statut': _alias_choix('statut')}
+
+    resultats, deja_vus = [], {}
+    for debut in range(0, len(lignes), taille_lot):
+        lot = lignes[debut:debut + taille_lot]
+        # Doublons potentiels du lot : une seule requête sur les dates de naissance
+        dates = {donnees.get('date_naissance') for _, donnees in lot if _date_iso_valide(donnees.get('date_naissance'))}
+        existants = {
+            _cle_doublon(enfant.site_id, enfant.nom, enfant.prenom, enfant.date_naissance.isoformat()): enfant
+            for enfant in Enfant.all_objects.filter(site_id__in=site_ids, date_naissance__in=dates)
+        } if dates else {}
+        resultats.extend(_valider_lot(lot, sites_par_nom, site_defaut, colonnes, existants, deja_vus, choix))
+
+    compteurs = {action: 0 for action in ('creation', 'modification', 'inchange', 'doublon', 'erreur')}
+    for ligne in resultats:
+        compteurs[ligne['action']] += 1
+    return {'lignes': resultats, 'compteurs': compteurs, 'colonnes_ignorees': ignorees}
+
+
+# =======================================================================
+# ENREGISTREMENT
+# =======================================================================
+
+def appliquer_import(rapport, utilisateur=None, mettre_a_jour=False, taille_lot=None):
+    """Enregistre les lignes valides d'un rapport produit par `analyser_import`."""
+    taille_lot = taille_lot or settings.IMPORT_TAILLE_LOT
+    a_creer = [ligne['enfant'] for ligne in rapport['lignes'] if ligne['action'] == 'creation']
+    a_modifier, champs_modifies = [], set()
+    if mettre_a_jour:
+        for ligne in rapport['lignes']:
+            if ligne['action'] == 'modification':
+                a_modifier.append(ligne['enfant'])
+                champs_modifies.update(difference['champ'] for difference in ligne['differences'])
+
+    with transaction.atomic():
+        if a_creer:
+            crees = bulk_create_with_history(
+                a_creer, Enfant, batch_size=taille_lot,
+                default_user=utilisateur, default_change_reason=RAISON_IMPORT,
+            )
+            # Les écritures en masse ne déclenchent pas les signaux du journal de synchronisation
+            journaliser_lot(Enfant, crees, action='creation')
+        if a_modifier:
+            bulk_update_with_history(
+                a_modifier, Enfant, sorted(champs_modifies), batch_size=taille_lot,
+                default_user=utilisateur, default_change_reason=RAISON_IMPORT,
+            )
+            journaliser_lot(Enfant, a_modifier)
+    return {'crees': len(a_creer), 'modifies': len(a_modifier)}
+
+
+# =======================================================================
+# FICHIERS EN ATTENTE DE CONFIRMATION
+# =======================================================================
+
+def _dossier_en_attente():
+    return os.path.join(tempfile.gettempdir(), 'imports_enfants')
+
+
+def _chemin_en_attente(jeton, format_fichier):
+    if not re.fullmatch(r'[0-9a-f]{32}', jeton or '') or format_fichier not in FORMATS_FICHIER:
+        raise FichierImportInvalide("Import introuvable ou expiré.")
+    return os.path.join(_dossier_en_attente(), f"{jeton}.{format_fichier}")
+
+
+def _expire(chemin):
+    return time.time() - os.path.getmtime(chemin) > settings.IMPORT_DUREE_ATTENTE
+
+
+def mettre_en_attente(contenu, format_fichier):
+    """Conserve le fichier analysé jusqu'à la confirmation de l'import. Retourne son jeton."""
+    jeton = uuid.uuid4().hex
+    chemin = _chemin_en_attente(jeton, format_fichier)
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with open(chemin, 'wb') as fichier:
+        fichier.write(contenu)
+    return jeton
+
+
+def reprendre_en_attente(jeton, format_fichier, supprimer=False):
+    chemin = _chemin_en_attente(jeton, format_fichier)
+    try:
+        if _expire(chemin):
+            os.unlink(chemin)
+            raise FileNotFoundError(chemin)
+        with open(chemin, 'rb') as fichier:
+            contenu = fichier.read()
+    except FileNotFoundError:
+        raise FichierImportInvalide("Import introuvable ou expiré.")
+    if supprimer:
+        os.unlink(chemin)
+    return contenu
+
+
+def abandonner_en_attente(jeton, format_fichier):
+    """Supprime le fichier d'un import annulé (ou remplacé par un nouvel envoi)."""
+    try:
+        os.unlink(_chemin_en_attente(jeton, format_fichier))
+    except (FichierImportInvalide, FileNotFoundError):
+        pass
+
+
+def purger_en_attente():
+    """Supprime les fichiers d'imports jamais confirmés, au-delà de IMPORT_DUREE_ATTENTE."""
+    try:
+        noms = os.listdir(_dossier_en_attente())
+    except FileNotFoundError:
+        return
+    for nom in noms:
+        chemin = os.path.join(_dossier_en_attente(), nom)
+        try:
+            if _expire(chemin):
+                os.unlink(chemin)
+        except FileNotFoundError:  # Confirmé ou purgé entre-temps par une autre requête
+            pass
@@ -0,0 +1,43 @@
+# enfants_gestion/management/commands/compacter_historique.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from enfants_gestion.historique import compacter_historique
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace l'historique ancien des enfants vers la table d'archive "
+        "(copies complètes à intervalle régulier, différences entre deux)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age-jours', type=int, default=settings.HISTORIQUE_ARCHIVE_AGE_JOURS,
+            help="Archiver les versions plus anciennes que ce nombre de jours.",
+        )
+        parser.add_argument(
+            '--intervalle', type=int, default=settings.HISTORIQUE_SNAPSHOT_INTERVALLE,
+            help="Nombre de versions entre deux copies complètes dans l'archive.",
+        )
+        parser.add_argument(
+            '--taille-lot', type=int, default=500,
+            help="Nombre de lignes lues, écrites et supprimées par requête.",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche ce qui serait archivé sans rien modifier.",
+        )
+
+    def handle(self, *args, **options):
+        stats = compacter_historique(
+            age_jours=options['age_jours'],
+            intervalle=options['intervalle'],
+            dry_run=options['dry_run'],
+            taille_lot=options['taille_lot'],
+        )
+        prefixe = "[Simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixe}{stats['versions']} version(s) archivée(s) pour {stats['enfants']} enfant(s) "
+            f"dont {stats['snapshots']} copie(s) complète(s)."
+        ))
@@ -0,0 +1,119 @@
+# enfants_gestion/management/commands/dedupliquer_medias.py
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from config.cache import invalider
+from enfants_gestion.historique import HistoricalEnfant
+from enfants_gestion.miniatures import supprimer_miniatures, DOSSIER_MINIATURES
+from enfants_gestion.models import Enfant, Document, FichierStocke, HistoriqueEnfantArchive
+from enfants_gestion.stockage import stockage_deduplique, est_blob, recalculer_references
+
+
+class Command(BaseCommand):
+    help = (
+        "Migre les photos et documents existants vers le stockage dédupliqué, "
+        "recalcule les compteurs de références et purge (sur demande) les blobs orphelins."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Calcule le gain sans rien modifier.")
+        parser.add_argument(
+            '--conserver-originaux', action='store_true',
+            help="Ne supprime pas les anciens fichiers après leur migration.",
+        )
+        parser.add_argument(
+            '--purger', action='store_true',
+            help="Supprime les blobs qui ne sont plus référencés (ni par un dossier, ni par l'historique).",
+        )
+
+    def handle(self, *args, **options):
+        self.stockage = stockage_deduplique()
+        self.dry_run = options['dry_run']
+
+        noms = self._fichiers_a_migrer()
+        correspondances, taille_avant = {}, 0
+        for nom in sorted(noms):
+            if not self.stockage.exists(nom):
+                self.stderr.write(f"Fichier introuvable, ignoré : {nom}")
+                continue
+            taille_avant += self.stockage.size(nom)
+            if self.dry_run:
+                correspondances[nom] = self._empreinte(nom)
+            else:
+                with self.stockage.open(nom, 'rb') as fichier:
+                    correspondances[nom] = self.stockage.save(nom, fichier)
+
+        taille_apres = sum(self.stockage.size(nom) for nom in set(correspondances.values())) if not self.dry_run else None
+        if not self.dry_run:
+            self._mettre_a_jour_references(correspondances)
+            if not options['conserver_originaux']:
+                for ancien in correspondances:
+                    supprimer_miniatures(self.stockage, ancien)
+                    self.stockage.delete(ancien)
+            recalculer_references()
+
+        blobs = len(set(correspondances.values()))
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[Simulation] ' if self.dry_run else ''}{len(correspondances)} fichier(s) migré(s) "
+            f"vers {blobs} blob(s) unique(s) ({taille_avant} octets avant"
+            f"{'' if taille_apres is None else f', {taille_apres} octets après'})."
+        ))
+
+        if options['purger']:
+            self._purger()
+
+    def _fichiers_a_migrer(self):
+        noms = set(Enfant.all_objects.exclude(photo='').exclude(photo__isnull=True).values_list('photo', flat=True))
+        noms |= set(Document.objects.exclude(fichier='').values_list('fichier', flat=True))
+        # Les versions historiques doivent continuer à pointer vers un fichier existant
+        noms |= set(HistoricalEnfant.objects.exclude(photo='').exclude(photo__isnull=True).values_list('photo', flat=True))
+        return {nom for nom in noms if not est_blob(nom)}
+
+    def _empreinte(self, nom):
+        empreinte = hashlib.sha256()
+        with self.stockage.open(nom, 'rb') as fichier:
+            for morceau in fichier.chunks():
+                empreinte.update(morceau)
+        return self.stockage.nom_pour_empreinte(empreinte.hexdigest(), os.path.splitext(nom)[1])
+
+    def _mettre_a_jour_references(self, correspondances):
+        # update() n'émet ni signaux ni nouvelle version d'historique : il s'agit d'un simple déplacement
+        with transaction.atomic():
+            for ancien, nouveau in correspondances.items():
+                Enfant.all_objects.filter(photo=ancien).update(photo=nouveau)
+                Document.objects.filter(fichier=ancien).update(fichier=nouveau)
+                HistoricalEnfant.objects.filter(photo=ancien).update(photo=nouveau)
+            invalider(Enfant)
+        for ancien, nouveau in correspondances.items():
+            for ligne in HistoriqueEnfantArchive.objects.filter(donnees__photo=ancien):
+                ligne.donnees['photo'] = nouveau
+                ligne.save(update_fields=['donnees'])
+
+    def _purger(self):
+        references = set(Enfant.all_objects.values_list('photo', flat=True))
+        references |= set(Document.objects.values_list('fichier', flat=True))
+        references |= set(HistoricalEnfant.objects.values_list('photo', flat=True))
+        references |= {
+            donnees.get('photo') for donnees in HistoriqueEnfantArchive.objects.values_list('donnees', flat=True)
+        }
+
+        dossier = settings.STOCKAGE_DEDUPLIQUE_DOSSIER
+        orphelins = []
+        for racine, sous_dossiers, fichiers in os.walk(self.stockage.path(dossier)):
+            sous_dossiers[:] = [d for d in sous_dossiers if d not in ('.tmp', DOSSIER_MINIATURES)]
+            for fichier in fichiers:
+                nom = os.path.relpath(os.path.join(racine, fichier), self.stockage.location).replace(os.sep, '/')
+                if nom not in references:
+                    orphelins.append(nom)
+
+        for nom in orphelins:
+            self.stdout.write(f"{'[Simulation] ' if self.dry_run else ''}Blob orphelin supprimé : {nom}")
+            if not self.dry_run:
+                supprimer_miniatures(self.stockage, nom)
+                self.stockage.delete(nom)
+                FichierStocke.objects.filter(nom=nom).delete()
+        self.stdout.write(self.style.SUCCESS(f"{len(orphelins)} blob(s) orphelin(s)."))
@@ -0,0 +1,27 @@
+# enfants_gestion/management/commands/generer_miniatures.py
+from django.core.management.base import BaseCommand
+
+from enfants_gestion.miniatures import generer_miniatures
+from enfants_gestion.models import Enfant
+
+
+class Command(BaseCommand):
+    help = "Génère (ou régénère) les miniatures des photos d'enfants déjà téléversées."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forcer', action='store_true',
+            help="Régénère toutes les miniatures, même celles qui sont à jour.",
+        )
+
+    def handle(self, *args, **options):
+        generees, erreurs = 0, 0
+        enfants = Enfant.all_objects.exclude(photo='').exclude(photo__isnull=True).only('pk', 'photo')
+        for enfant in enfants.iterator():
+            try:
+                if generer_miniatures(enfant.photo, forcer=options['forcer']):
+                    generees += 1
+            except OSError as erreur:
+                erreurs += 1
+                self.stderr.write(f"Photo illisible pour l'enfant {enfant.pk} ({enfant.photo.name}) : {erreur}")
+        self.stdout.write(self.style.SUCCESS(f"Miniatures générées pour {generees} photo(s), {erreurs} erreur(s)."))
@@ -0,0 +1,66 @@
+# enfants_gestion/management/commands/importer_enfants.py
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from enfants_gestion.importation import analyser_import, appliquer_import, lire_fichier, FichierImportInvalide
+from sites_gestion.models import SiteOrphelinat
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des dossiers d'enfants depuis un fichier CSV ou XLSX "
+        "(mêmes règles de validation et détection des doublons que l'import web)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Chemin du fichier CSV ou XLSX.")
+        parser.add_argument('--site', help="Nom ou identifiant du site pour les lignes sans colonne « Site ».")
+        parser.add_argument('--dry-run', action='store_true', help="Affiche le rapport sans rien enregistrer.")
+        parser.add_argument('--mettre-a-jour', action='store_true', help="Met à jour les dossiers existants modifiés.")
+        parser.add_argument('--utilisateur', help="Nom d'utilisateur enregistré comme auteur dans l'historique.")
+
+    def handle(self, *args, **options):
+        sites = list(SiteOrphelinat.objects.all())
+        site_defaut = None
+        if options['site']:
+            site_defaut = next(
+                (site for site in sites if options['site'] in (str(site.pk), site.nom)), None
+            )
+            if site_defaut is None:
+                raise CommandError(f"Site introuvable : {options['site']}")
+
+        utilisateur = None
+        if options['utilisateur']:
+            try:
+                utilisateur = get_user_model().objects.get(username=options['utilisateur'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Utilisateur introuvable : {options['utilisateur']}")
+
+        format_fichier = os.path.splitext(options['fichier'])[1].lower().lstrip('.')
+        try:
+            with open(options['fichier'], 'rb') as fichier:
+                rapport = analyser_import(lire_fichier(fichier.read(), format_fichier), sites, site_defaut)
+        except (OSError, FichierImportInvalide) as erreur:
+            raise CommandError(str(erreur))
+
+        for ligne in rapport['lignes']:
+            if ligne['erreurs']:
+                self.stderr.write(f"Ligne {ligne['numero']} : {' ; '.join(ligne['erreurs'])}")
+        if rapport['colonnes_ignorees']:
+            self.stderr.write(f"Colonnes ignorées : {', '.join(rapport['colonnes_ignorees'])}")
+
+        compteurs = rapport['compteurs']
+        self.stdout.write(
+            f"{compteurs['creation']} à créer, {compteurs['modification']} à mettre à jour, "
+            f"{compteurs['inchange']} inchangé(s), {compteurs['doublon']} doublon(s), {compteurs['erreur']} erreur(s)."
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("[Simulation] Aucune modification enregistrée."))
+            return
+
+        resultat = appliquer_import(rapport, utilisateur=utilisateur, mettre_a_jour=options['mettre_a_jour'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultat['crees']} dossier(s) créé(s), {resultat['modifies']} mis à jour."
+        ))
@@ -0,0 +1,32 @@
+# enfants_gestion/management/commands/indexer_documents.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from enfants_gestion.extraction import indexer_documents, PdfReader
+
+
+class Command(BaseCommand):
+    help = "Extrait le texte des documents nouveaux ou modifiés et met à jour l'index de recherche."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forcer', action='store_true', help="Ré-extrait tous les documents.")
+        parser.add_argument(
+            '--boucle', type=int, metavar='SECONDES',
+            help="Tourne en continu en repassant toutes les SECONDES secondes.",
+        )
+
+    def handle(self, *args, **options):
+        if PdfReader is None:
+            self.stderr.write("pypdf n'est pas installé : le texte des PDF ne sera pas extrait.")
+
+        while True:
+            stats = indexer_documents(forcer=options['forcer'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{stats['indexes']} document(s) indexé(s), {stats['inchanges']} inchangé(s), "
+                f"{stats['erreurs']} erreur(s)."
+            ))
+            if not options['boucle']:
+                break
+            options['forcer'] = False
+            time.sleep(options['boucle'])
@@ -0,0 +1,21 @@
+# enfants_gestion/management/commands/reconstruire_derniers_suivis.py
+from django.core.management.base import BaseCommand
+
+from enfants_gestion.suivis import reconstruire_derniers_suivis
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les pointeurs dénormalisés des enfants vers leur dernier suivi médical "
+        "et leur suivi scolaire actuel (après un import SQL, une restauration, etc.)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Compte les enfants à corriger sans rien modifier.")
+
+    def handle(self, *args, **options):
+        nombre = reconstruire_derniers_suivis(dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"{nombre} enfant(s) ont des pointeurs de suivi à corriger.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{nombre} enfant(s) corrigé(s)."))
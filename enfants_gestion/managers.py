@@ -0,0 +1,16 @@
+# enfants_gestion/managers.py
+from django.db import models
+
+
+class ActiveManager(models.Manager):
+    """
+    Manager `objects` des modèles archivables : ne retourne que les lignes actives.
+
+    Les lignes archivées (`is_active=False`) restent accessibles par `all_objects`,
+    déclaré comme manager par défaut (`Meta.default_manager_name`) pour que l'admin,
+    les contrôles d'unicité et `dumpdata` continuent de voir toutes les lignes.
+    Chaque modèle a un index partiel `WHERE is_active` correspondant à ses filtres courants.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
@@ -0,0 +1,135 @@
+# enfants_gestion/medias.py
+"""
+Envoi des fichiers protégés (photos, documents) après contrôle d'accès par la vue.
+
+Selon MEDIA_SERVEUR_FRONTAL, le transfert est délégué au serveur frontal
+(X-Accel-Redirect pour nginx, X-Sendfile pour Apache) ou assuré par Django avec
+prise en charge des requêtes conditionnelles (ETag / If-None-Match) et partielles
+(Range / If-Range), pour que les gros PDF puissent reprendre et rester en cache.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags
+
+from .stockage import est_blob
+
+TAILLE_MORCEAU = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _etag(nom, taille, modifie_le):
+    if est_blob(nom):
+        # Le nom d'un blob est l'empreinte de son contenu : l'ETag est fort et ne change jamais
+        return '"%s"' % os.path.splitext(os.path.basename(nom))[0]
+    return '"%x-%x"' % (int(modifie_le), taille)
+
+
+def _plage(entete, taille):
+    """
+    Interprète un en-tête Range à plage unique. Retourne (début, fin) inclusifs,
+    None pour ignorer l'en-tête, ou False si la plage est insatisfiable.
+    """
+    correspondance = RANGE_RE.match(entete.strip())
+    if not correspondance:
+        return None
+    debut, fin = correspondance.groups()
+    if not debut and not fin:
+        return None
+    if not debut:
+        # bytes=-N : les N derniers octets
+        longueur = int(fin)
+        if longueur == 0:
+            return False
+        return max(0, taille - longueur), taille - 1
+    debut = int(debut)
+    fin = min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or debut > fin:
+        return False
+    return debut, fin
+
+
+def _lire_plage(fichier, debut, longueur):
+    try:
+        fichier.seek(debut)
+        while longueur > 0:
+            morceau = fichier.read(min(TAILLE_MORCEAU, longueur))
+            if not morceau:
+                break
+            longueur -= len(morceau)
+            yield morceau
+    finally:
+        fichier.close()
+
+
+def servir_fichier(request, storage, nom, nom_telechargement=None, cache_immuable=False):
+    """Construit la réponse HTTP pour le fichier `nom` du stockage `storage`."""
+    chemin = storage.path(nom)
+    try:
+        stat = os.stat(chemin)
+    except FileNotFoundError:
+        return HttpResponse("Fichier introuvable.", status=404)
+
+    taille = stat.st_size
+    etag = _etag(nom, taille, stat.st_mtime)
+    type_contenu = mimetypes.guess_type(chemin)[0] or 'application/octet-stream'
+    nom_telechargement = nom_telechargement or os.path.basename(nom)
+
+    entetes = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        # Données personnelles des enfants : jamais dans un cache partagé
+        'Cache-Control': 'private, max-age=31536000, immutable' if cache_immuable else 'private, no-cache',
+        'Content-Disposition': "inline; filename*=UTF-8''%s" % quote(nom_telechargement),
+    }
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        reponse = HttpResponseNotModified()
+        for cle in ('ETag', 'Last-Modified', 'Cache-Control'):
+            reponse[cle] = entetes[cle]
+        return reponse
+
+    frontal = settings.MEDIA_SERVEUR_FRONTAL
+    if frontal:
+        # Le serveur frontal gère lui-même Range et les requêtes conditionnelles
+        reponse = HttpResponse(content_type=type_contenu)
+        if frontal == 'nginx':
+            reponse['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(nom.replace(os.sep, '/'))
+        else:
+            reponse['X-Sendfile'] = chemin
+        for cle, valeur in entetes.items():
+            reponse[cle] = valeur
+        return reponse
+
+    plage = None
+    entete_range = request.META.get('HTTP_RANGE')
+    if entete_range and request.method in ('GET', 'HEAD'):
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range or if_range.strip() == etag:
+            plage = _plage(entete_range, taille)
+
+    if plage is False:
+        reponse = HttpResponse(status=416)
+        reponse['Content-Range'] = f'bytes */{taille}'
+        return reponse
+
+    if plage is None:
+        reponse = FileResponse(open(chemin, 'rb'), content_type=type_contenu)
+    else:
+        debut, fin = plage
+        longueur = fin - debut + 1
+        reponse = StreamingHttpResponse(
+            _lire_plage(open(chemin, 'rb'), debut, longueur), status=206, content_type=type_contenu
+        )
+        reponse['Content-Range'] = f'bytes {debut}-{fin}/{taille}'
+        reponse['Content-Length'] = str(longueur)
+
+    for cle, valeur in entetes.items():
+        reponse[cle] = valeur
+    return reponse
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enfants_gestion', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoriqueEnfantArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('history_id', models.BigIntegerField(unique=True)),
+                ('enfant_id', models.BigIntegerField(db_index=True)),
+                ('site_id', models.BigIntegerField(blank=True, null=True)),
+                ('history_date', models.DateTimeField()),
+                ('history_type', models.CharField(max_length=1)),
+                ('history_change_reason', models.CharField(blank=True, max_length=100, null=True)),
+                ('history_user_id', models.BigIntegerField(blank=True, null=True)),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('donnees', models.JSONField(default=dict, verbose_name='Données (complètes ou différentielles)')),
+            ],
+            options={
+                'verbose_name': 'Historique Archivé',
+                'verbose_name_plural': 'Historiques Archivés',
+                'ordering': ['enfant_id', 'history_date', 'history_id'],
+                'indexes': [models.Index(fields=['enfant_id', 'history_date', 'history_id'], name='enfants_ges_enfant__1c0265_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:16
+
+import enfants_gestion.stockage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enfants_gestion', '0003_historiqueenfantarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FichierStocke',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=255, unique=True)),
+                ('taille', models.BigIntegerField(default=0)),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Fichier Stocké',
+                'verbose_name_plural': 'Fichiers Stockés',
+            },
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='fichier',
+            field=models.FileField(storage=enfants_gestion.stockage.stockage_deduplique, upload_to='documents_enfants/'),
+        ),
+        migrations.AlterField(
+            model_name='enfant',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=enfants_gestion.stockage.stockage_deduplique, upload_to='photos_enfants/'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enfants_gestion', '0004_fichierstocke_alter_document_fichier_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TexteDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('empreinte', models.CharField(max_length=64, verbose_name='Empreinte du fichier indexé')),
+                ('texte', models.TextField(blank=True)),
+                ('erreur', models.TextField(blank=True)),
+                ('date_extraction', models.DateTimeField(auto_now=True)),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='texte', to='enfants_gestion.document')),
+            ],
+            options={
+                'verbose_name': 'Texte de Document',
+                'verbose_name_plural': 'Textes de Documents',
+            },
+        ),
+    ]
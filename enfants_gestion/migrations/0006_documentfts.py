@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def creer_index_fts(apps, schema_editor):
+    # Index plein texte SQLite (FTS5). Les autres bases utilisent une recherche simple sur TexteDocument.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS enfants_gestion_documentfts "
+        "USING fts5(texte, site_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def supprimer_index_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS enfants_gestion_documentfts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enfants_gestion', '0005_textedocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index_fts, supprimer_index_fts),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:29
+
+import django.db.models.manager
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enfants_gestion', '0006_documentfts'),
+        ('sites_gestion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='enfant',
+            options={'default_manager_name': 'all_objects', 'ordering': ['nom', 'prenom'], 'verbose_name': 'Enfant', 'verbose_name_plural': 'Enfants'},
+        ),
+        migrations.AlterModelOptions(
+            name='suivimedical',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-date_consultation'], 'verbose_name': 'Suivi Médical'},
+        ),
+        migrations.AlterModelOptions(
+            name='suiviscolaire',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-annee_scolaire'], 'verbose_name': 'Suivi Scolaire'},
+        ),
+        migrations.AlterModelManagers(
+            name='enfant',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='suivimedical',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='suiviscolaire',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='enfant',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['site', 'nom', 'prenom'], name='enfant_actif_site_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enfant',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['nom', 'prenom'], name='enfant_actif_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suivimedical',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['enfant', '-date_consultation'], name='suivimed_actif_enfant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suivimedical',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-date_consultation'], name='suivimed_actif_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suiviscolaire',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['enfant', '-annee_scolaire'], name='suivisco_actif_enfant_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def remplir_derniers_suivis(apps, schema_editor):
+    Enfant = apps.get_model('enfants_gestion', 'Enfant')
+    SuiviMedical = apps.get_model('enfants_gestion', 'SuiviMedical')
+    SuiviScolaire = apps.get_model('enfants_gestion', 'SuiviScolaire')
+    Enfant._base_manager.update(
+        dernier_suivi_medical=Subquery(
+            SuiviMedical._base_manager.filter(enfant_id=OuterRef('pk'), is_active=True)
+            .order_by('-date_consultation', '-pk').values('pk')[:1]
+        ),
+        suivi_scolaire_actuel=Subquery(
+            SuiviScolaire._base_manager.filter(enfant_id=OuterRef('pk'), is_active=True)
+            .order_by('-annee_scolaire', '-pk').values('pk')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enfants_gestion', '0007_managers_actifs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enfant',
+            name='dernier_suivi_medical',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='enfants_gestion.suivimedical', verbose_name='Dernier suivi médical'),
+        ),
+        migrations.AddField(
+            model_name='enfant',
+            name='suivi_scolaire_actuel',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='enfants_gestion.suiviscolaire', verbose_name='Suivi scolaire actuel'),
+        ),
+        migrations.RunPython(remplir_derniers_suivis, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enfants_gestion', '0008_derniers_suivis'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['enfant', '-date_upload', '-id'], name='document_enfant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noteevolutive',
+            index=models.Index(fields=['enfant', '-date_creation', '-id'], name='note_enfant_date_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# enfants_gestion/miniatures.py
+"""
+Miniatures des photos d'enfants.
+
+Les photos téléversées sont des JPEG de plusieurs mégaoctets. On dérive des
+miniatures carrées de tailles fixes, rangées dans un sous-dossier `miniatures/`
+à côté de l'original. Elles sont générées à l'enregistrement de la photo, ou à
+la première demande pour les fichiers existants, et régénérées si l'original
+est plus récent.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+DOSSIER_MINIATURES = 'miniatures'
+
+
+def tailles_miniatures():
+    return sorted(settings.MINIATURES_TAILLES)
+
+
+def chemin_miniature(nom_photo, taille):
+    """Chemin (relatif au stockage) de la miniature `taille` d'une photo."""
+    dossier, fichier = os.path.split(nom_photo)
+    racine, _ = os.path.splitext(fichier)
+    return os.path.join(dossier, DOSSIER_MINIATURES, f"{racine}_{taille}.jpg")
+
+
+def _est_a_jour(storage, nom_photo, nom_miniature):
+    if not storage.exists(nom_miniature):
+        return False
+    try:
+        return storage.get_modified_time(nom_miniature) >= storage.get_modified_time(nom_photo)
+    except NotImplementedError:
+        return True
+
+
+def generer_miniatures(photo, forcer=False):
+    """
+    Génère toutes les tailles de miniature pour le FieldFile `photo`.
+    Retourne la liste des tailles (re)générées.
+    """
+    storage = photo.storage
+    a_generer = [
+        taille for taille in tailles_miniatures()
+        if forcer or not _est_a_jour(storage, photo.name, chemin_miniature(photo.name, taille))
+    ]
+    if not a_generer:
+        return []
+
+    with storage.open(photo.name, 'rb') as original:
+        image = Image.open(original)
+        # Le décodeur JPEG peut réduire l'image dès la lecture, bien plus rapide qu'un redimensionnement complet
+        image.draft('RGB', (max(a_generer), max(a_generer)))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    for taille in a_generer:
+        miniature = ImageOps.fit(image, (taille, taille), Image.Resampling.LANCZOS)
+        tampon = BytesIO()
+        miniature.save(tampon, format='JPEG', quality=settings.MINIATURES_QUALITE, optimize=True, progressive=True)
+        nom_miniature = chemin_miniature(photo.name, taille)
+        if storage.exists(nom_miniature):
+            storage.delete(nom_miniature)
+        storage.save(nom_miniature, ContentFile(tampon.getvalue()))
+    return a_generer
+
+
+def supprimer_miniatures(storage, nom_photo):
+    """Supprime les miniatures d'une photo qui a été remplacée ou retirée."""
+    for taille in tailles_miniatures():
+        nom_miniature = chemin_miniature(nom_photo, taille)
+        if storage.exists(nom_miniature):
+            storage.delete(nom_miniature)
+
+
+def taille_miniature(taille):
+    """Plus petite taille de miniature d'au moins `taille` pixels, ou None si aucune ne suffit."""
+    return next((t for t in tailles_miniatures() if t >= taille), None)
+
+
+def miniature(photo, taille):
+    """
+    Nom (dans le stockage) de la miniature `taille` de la photo, générée à la demande.
+    Revient au nom de l'original si l'image ne peut pas être lue.
+    """
+    nom_miniature = chemin_miniature(photo.name, taille)
+    try:
+        if not _est_a_jour(photo.storage, photo.name, nom_miniature):
+            generer_miniatures(photo)
+    except (OSError, Image.DecompressionBombError):
+        return photo.name
+    return nom_miniature
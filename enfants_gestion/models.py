@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 from sites_gestion.models import SiteOrphelinat
 from simple_history.models import HistoricalRecords
+from .managers import ActiveManager
+from .stockage import stockage_deduplique
 
 # Modèle principal pour l'enfant
 class Enfant(models.Model):
@@ -22,7 +24,7 @@ class Enfant(models.Model):
 
     sexe = models.CharField(max_length=1, choices=SEXE_CHOICES)
     lieu_naissance = models.CharField("Lieu de naissance", max_length=150, blank=True)
-    photo = models.ImageField(upload_to='photos_enfants/', blank=True, null=True)
+    photo = models.ImageField(upload_to='photos_enfants/', storage=stockage_deduplique, blank=True, null=True)
     date_arrivee = models.DateField("Date d'arrivée")
     motif_admission = models.TextField("Motif d'admission", blank=True)
     histoire = models.TextField("Histoire de l'enfant", blank=True)
@@ -30,13 +32,30 @@ class Enfant(models.Model):
     date_depart = models.DateField("Date de départ", null=True, blank=True)
     is_active = models.BooleanField(default=True)
 
+    # --- Derniers suivis actifs (dénormalisés, tenus à jour par signals.py, voir suivis.py) ---
+    dernier_suivi_medical = models.ForeignKey(
+        'SuiviMedical', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', verbose_name="Dernier suivi médical",
+    )
+    suivi_scolaire_actuel = models.ForeignKey(
+        'SuiviScolaire', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', verbose_name="Suivi scolaire actuel",
+    )
 
-    history = HistoricalRecords()
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    history = HistoricalRecords(excluded_fields=['dernier_suivi_medical', 'suivi_scolaire_actuel'])
     
     class Meta:
         ordering = ['nom', 'prenom']
         verbose_name = "Enfant"
         verbose_name_plural = "Enfants"
+        default_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['site', 'nom', 'prenom'], condition=models.Q(is_active=True), name='enfant_actif_site_idx'),
+            models.Index(fields=['nom', 'prenom'], condition=models.Q(is_active=True), name='enfant_actif_nom_idx'),
+        ]
 
     def __str__(self):
         return f"{self.prenom} {self.nom}"
@@ -53,9 +72,12 @@ class Document(models.Model):
     enfant = models.ForeignKey(Enfant, on_delete=models.CASCADE, related_name='documents')
     type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
     description = models.CharField(max_length=255,  null=True, blank=True)
-    fichier = models.FileField(upload_to='documents_enfants/')
+    fichier = models.FileField(upload_to='documents_enfants/', storage=stockage_deduplique)
     date_upload = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['enfant', '-date_upload', '-id'], name='document_enfant_date_idx')]
+
     def __str__(self):
         return f"{self.get_type_document_display()} pour {self.enfant}"
 
@@ -71,9 +93,17 @@ class SuiviMedical(models.Model):
 
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ['-date_consultation']
         verbose_name = "Suivi Médical"
+        default_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['enfant', '-date_consultation'], condition=models.Q(is_active=True), name='suivimed_actif_enfant_idx'),
+            models.Index(fields=['-date_consultation'], condition=models.Q(is_active=True), name='suivimed_actif_date_idx'),
+        ]
 
     def __str__(self):
         return f"Consultation du {self.date_consultation} pour {self.enfant}"
@@ -87,10 +117,17 @@ class SuiviScolaire(models.Model):
     resultats = models.TextField("Résultats et appréciations", blank=True)
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ['-annee_scolaire']
         unique_together = ('enfant', 'annee_scolaire') # Un seul suivi par an par enfant
         verbose_name = "Suivi Scolaire"
+        default_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['enfant', '-annee_scolaire'], condition=models.Q(is_active=True), name='suivisco_actif_enfant_idx'),
+        ]
 
     def __str__(self):
         return f"Scolarité {self.annee_scolaire} pour {self.enfant}"
@@ -105,6 +142,67 @@ class NoteEvolutive(models.Model):
     class Meta:
         ordering = ['-date_creation']
         verbose_name = "Note Évolutive"
+        indexes = [models.Index(fields=['enfant', '-date_creation', '-id'], name='note_enfant_date_idx')]
     
     def __str__(self):
-        return f"Note du {self.date_creation.strftime('%d/%m/%Y')} pour {self.enfant}"
\ No newline at end of file
+        return f"Note du {self.date_creation.strftime('%d/%m/%Y')} pour {self.enfant}"
+
+# Modèle d'archive pour l'historique ancien des enfants (voir la commande `compacter_historique`)
+class HistoriqueEnfantArchive(models.Model):
+    """
+    Version archivée d'une ligne de `HistoricalEnfant`.
+    Une ligne sur `HISTORIQUE_SNAPSHOT_INTERVALLE` contient une copie complète du dossier
+    (`is_snapshot=True`), les autres ne stockent que les champs modifiés depuis la version précédente.
+    Les identifiants sont de simples entiers (sans clé étrangère) pour que la table puisse
+    vivre dans une base SQLite séparée.
+    """
+    history_id = models.BigIntegerField(unique=True)
+    enfant_id = models.BigIntegerField(db_index=True)
+    site_id = models.BigIntegerField(null=True, blank=True)
+    history_date = models.DateTimeField()
+    history_type = models.CharField(max_length=1)
+    history_change_reason = models.CharField(max_length=100, null=True, blank=True)
+    history_user_id = models.BigIntegerField(null=True, blank=True)
+    is_snapshot = models.BooleanField(default=False)
+    donnees = models.JSONField("Données (complètes ou différentielles)", default=dict)
+
+    class Meta:
+        ordering = ['enfant_id', 'history_date', 'history_id']
+        indexes = [models.Index(fields=['enfant_id', 'history_date', 'history_id'])]
+        verbose_name = "Historique Archivé"
+        verbose_name_plural = "Historiques Archivés"
+
+    def __str__(self):
+        type_ligne = "complète" if self.is_snapshot else "différentielle"
+        return f"Version {self.history_id} (archive {type_ligne}) de l'enfant {self.enfant_id}"
+
+
+# Compteur de références des blobs du stockage dédupliqué (voir stockage.py)
+class FichierStocke(models.Model):
+    nom = models.CharField(max_length=255, unique=True)
+    taille = models.BigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=0)
+    date_creation = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Fichier Stocké"
+        verbose_name_plural = "Fichiers Stockés"
+
+    def __str__(self):
+        return f"{self.nom} ({self.references} référence(s))"
+
+
+# Texte extrait des documents pour la recherche plein texte (voir extraction.py)
+class TexteDocument(models.Model):
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, related_name='texte')
+    empreinte = models.CharField("Empreinte du fichier indexé", max_length=64)
+    texte = models.TextField(blank=True)
+    erreur = models.TextField(blank=True)
+    date_extraction = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Texte de Document"
+        verbose_name_plural = "Textes de Documents"
+
+    def __str__(self):
+        return f"Texte extrait de {self.document}"
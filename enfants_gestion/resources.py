@@ -23,19 +23,20 @@ class EnfantResource(resources.ModelResource):
     
         # Le dictionnaire widgets n'est plus nécessaire pour ce cas
     
-    # Les fonctions "dehydrate" permettent de calculer la valeur de nos champs personnalisés
+    # Les fonctions "dehydrate" permettent de calculer la valeur de nos champs personnalisés.
+    # Elles lisent les pointeurs dénormalisés de l'enfant (à charger avec select_related)
     def dehydrate_dernier_suivi_medical_date(self, enfant):
-        dernier_suivi = enfant.suivis_medicaux.filter(is_active=True).order_by('-date_consultation').first()
+        dernier_suivi = enfant.dernier_suivi_medical
         return dernier_suivi.date_consultation if dernier_suivi else ''
 
     def dehydrate_dernier_suivi_medical_diag(self, enfant):
-        dernier_suivi = enfant.suivis_medicaux.filter(is_active=True).order_by('-date_consultation').first()
+        dernier_suivi = enfant.dernier_suivi_medical
         return dernier_suivi.diagnostic if dernier_suivi else ''
 
     def dehydrate_derniere_annee_scolaire(self, enfant):
-        dernier_suivi = enfant.suivis_scolaires.filter(is_active=True).order_by('-annee_scolaire').first()
+        dernier_suivi = enfant.suivi_scolaire_actuel
         return dernier_suivi.annee_scolaire if dernier_suivi else ''
 
     def dehydrate_derniere_classe(self, enfant):
-        dernier_suivi = enfant.suivis_scolaires.filter(is_active=True).order_by('-annee_scolaire').first()
+        dernier_suivi = enfant.suivi_scolaire_actuel
         return dernier_suivi.classe if dernier_suivi else ''
\ No newline at end of file
@@ -0,0 +1,31 @@
+# enfants_gestion/routers.py
+
+
+class HistoriqueArchiveRouter:
+    """
+    Place la table `HistoriqueEnfantArchive` dans la base SQLite séparée
+    'historique_archive' lorsqu'elle est configurée (HISTORIQUE_ARCHIVE_DB_PATH).
+    Créer la table avec : python manage.py migrate --database historique_archive
+    """
+    alias = 'historique_archive'
+    model_name = 'historiqueenfantarchive'
+
+    def _est_archive(self, model):
+        return model._meta.app_label == 'enfants_gestion' and model._meta.model_name == self.model_name
+
+    def db_for_read(self, model, **hints):
+        if self._est_archive(model):
+            return self.alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        if self._est_archive(model):
+            return self.alias
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == 'enfants_gestion' and model_name == self.model_name:
+            return db == self.alias
+        if db == self.alias:
+            return False
+        return None
@@ -0,0 +1,106 @@
+# enfants_gestion/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .extraction import retirer_de_l_index
+from .miniatures import generer_miniatures, supprimer_miniatures
+from .models import Enfant, Document, SuiviMedical, SuiviScolaire
+from .stockage import ajouter_reference, retirer_reference, est_blob
+from .suivis import actualiser_dernier_suivi
+
+
+# =======================================================================
+# PHOTOS DES ENFANTS
+# =======================================================================
+
+@receiver(pre_save, sender=Enfant)
+def memoriser_ancienne_photo(sender, instance, raw=False, **kwargs):
+    """Retient le nom de la photo actuelle pour détecter un remplacement au post_save."""
+    instance._ancienne_photo = None
+    if raw or not instance.pk:
+        return
+    instance._ancienne_photo = sender.all_objects.filter(pk=instance.pk).values_list('photo', flat=True).first()
+
+
+@receiver(post_save, sender=Enfant)
+def compter_references_photo(sender, instance, raw=False, **kwargs):
+    """Tient à jour le compteur de références du stockage dédupliqué."""
+    if raw:
+        return
+    ancienne_photo = getattr(instance, '_ancienne_photo', None)
+    if ancienne_photo == (instance.photo.name or None):
+        return
+    retirer_reference(ancienne_photo)
+    ajouter_reference(instance.photo.name)
+
+
+@receiver(post_save, sender=Enfant)
+def mettre_a_jour_miniatures(sender, instance, raw=False, **kwargs):
+    """Génère les miniatures d'une nouvelle photo et supprime celles de l'ancienne."""
+    if raw:
+        return
+    ancienne_photo = getattr(instance, '_ancienne_photo', None)
+    if ancienne_photo == (instance.photo.name or None):
+        return
+    # Un blob dédupliqué peut être partagé : ses miniatures partent avec lui lors de la purge
+    if ancienne_photo and not est_blob(ancienne_photo):
+        supprimer_miniatures(instance.photo.storage, ancienne_photo)
+    if instance.photo:
+        try:
+            generer_miniatures(instance.photo)
+        except OSError:
+            # Image illisible : le gabarit retombera sur l'original
+            pass
+
+
+@receiver(post_delete, sender=Enfant)
+def liberer_photo(sender, instance, **kwargs):
+    retirer_reference(instance.photo.name)
+
+
+# =======================================================================
+# DOCUMENTS
+# =======================================================================
+
+@receiver(pre_save, sender=Document)
+def memoriser_ancien_fichier(sender, instance, raw=False, **kwargs):
+    instance._ancien_fichier = None
+    if raw or not instance.pk:
+        return
+    instance._ancien_fichier = sender.objects.filter(pk=instance.pk).values_list('fichier', flat=True).first()
+
+
+@receiver(post_save, sender=Document)
+def compter_references_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ancien_fichier = getattr(instance, '_ancien_fichier', None)
+    if ancien_fichier == (instance.fichier.name or None):
+        return
+    retirer_reference(ancien_fichier)
+    ajouter_reference(instance.fichier.name)
+
+
+@receiver(post_delete, sender=Document)
+def liberer_document(sender, instance, using, **kwargs):
+    retirer_reference(instance.fichier.name)
+    retirer_de_l_index(instance.pk, using)
+
+
+# =======================================================================
+# DERNIERS SUIVIS (pointeurs dénormalisés, voir suivis.py)
+# =======================================================================
+
+@receiver(post_save, sender=SuiviMedical)
+@receiver(post_save, sender=SuiviScolaire)
+def actualiser_dernier_suivi_enregistre(sender, instance, raw=False, **kwargs):
+    """Création, modification ou archivage (is_active=False) d'un suivi."""
+    if raw:
+        return
+    actualiser_dernier_suivi(sender, instance.enfant_id)
+
+
+@receiver(post_delete, sender=SuiviMedical)
+@receiver(post_delete, sender=SuiviScolaire)
+def actualiser_dernier_suivi_supprime(sender, instance, **kwargs):
+    actualiser_dernier_suivi(sender, instance.enfant_id)
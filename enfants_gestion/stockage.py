@@ -0,0 +1,124 @@
+# enfants_gestion/stockage.py
+"""
+Stockage dédupliqué (adressé par le contenu) pour les photos et documents des enfants.
+
+Chaque fichier téléversé est haché (SHA-256) pendant son écriture dans un fichier
+temporaire, puis rangé sous `fichiers/<2 premiers caractères>/<empreinte><extension>`.
+Un fichier déjà présent n'est jamais réécrit : les envois identiques partagent le même blob.
+
+Le modèle `FichierStocke` compte les enregistrements (actifs ou archivés) qui pointent
+vers chaque blob. Les blobs ne sont jamais supprimés automatiquement : la commande
+`dedupliquer_medias --purger` retire ceux qui ne sont plus référencés nulle part,
+historique compris.
+"""
+from collections import Counter
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+
+
+class StockageDeduplique(FileSystemStorage):
+
+    def nom_pour_empreinte(self, empreinte, extension):
+        return os.path.join(settings.STOCKAGE_DEDUPLIQUE_DOSSIER, empreinte[:2], f"{empreinte}{extension.lower()}")
+
+    def _est_derive(self, name):
+        # Les fichiers dérivés d'un blob (miniatures...) sont rangés à côté de lui sous leur propre nom
+        return est_blob(name.replace(os.sep, '/'))
+
+    def get_available_name(self, name, max_length=None):
+        if self._est_derive(name):
+            return super().get_available_name(name, max_length)
+        # Le nom définitif dépend du contenu, il est calculé dans _save()
+        return name
+
+    def _save(self, name, content):
+        if self._est_derive(name):
+            return super()._save(name, content)
+
+        dossier_temporaire = self.path(os.path.join(settings.STOCKAGE_DEDUPLIQUE_DOSSIER, '.tmp'))
+        os.makedirs(dossier_temporaire, exist_ok=True)
+
+        empreinte = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=dossier_temporaire, delete=False) as temporaire:
+            for morceau in content.chunks():
+                empreinte.update(morceau)
+                temporaire.write(morceau)
+
+        nom_final = self.nom_pour_empreinte(empreinte.hexdigest(), os.path.splitext(name)[1])
+        chemin_final = self.path(nom_final)
+        if os.path.exists(chemin_final):
+            os.unlink(temporaire.name)
+        else:
+            os.makedirs(os.path.dirname(chemin_final), exist_ok=True)
+            os.replace(temporaire.name, chemin_final)
+            if self.file_permissions_mode is not None:
+                os.chmod(chemin_final, self.file_permissions_mode)
+        return nom_final
+
+
+_stockage = StockageDeduplique()
+
+
+def stockage_deduplique():
+    """Callable utilisé par les champs fichier (évite de sérialiser l'instance dans les migrations)."""
+    return _stockage
+
+
+def est_blob(nom):
+    return bool(nom) and nom.startswith(settings.STOCKAGE_DEDUPLIQUE_DOSSIER + '/')
+
+
+def ajouter_reference(nom):
+    from .models import FichierStocke
+
+    if not est_blob(nom):
+        return
+    if FichierStocke.objects.filter(nom=nom).update(references=F('references') + 1):
+        return
+    # Premier enregistrement du blob : un envoi concurrent peut créer la ligne en même temps,
+    # d'où l'insertion sans erreur en cas de conflit, puis l'incrément sur la ligne existante
+    taille = _stockage.size(nom) if _stockage.exists(nom) else 0
+    FichierStocke.objects.bulk_create([FichierStocke(nom=nom, taille=taille, references=0)], ignore_conflicts=True)
+    FichierStocke.objects.filter(nom=nom).update(references=F('references') + 1)
+
+
+def retirer_reference(nom):
+    from .models import FichierStocke
+
+    if not est_blob(nom):
+        return
+    FichierStocke.objects.filter(nom=nom, references__gt=0).update(references=F('references') - 1)
+
+
+def recalculer_references():
+    """Recompte les références de tous les blobs à partir des enregistrements existants."""
+    from .models import Document, Enfant, FichierStocke
+
+    compteur = Counter(
+        nom for nom in Enfant.all_objects.values_list('photo', flat=True).iterator() if est_blob(nom)
+    )
+    compteur.update(
+        nom for nom in Document.objects.values_list('fichier', flat=True).iterator() if est_blob(nom)
+    )
+
+    existants = {fichier.nom: fichier for fichier in FichierStocke.objects.all()}
+    a_creer, a_modifier = [], []
+    for nom, fichier in existants.items():
+        if fichier.references != compteur.get(nom, 0):
+            fichier.references = compteur.get(nom, 0)
+            a_modifier.append(fichier)
+    for nom, references in compteur.items():
+        if nom not in existants:
+            taille = _stockage.size(nom) if _stockage.exists(nom) else 0
+            a_creer.append(FichierStocke(nom=nom, taille=taille, references=references))
+
+    FichierStocke.objects.bulk_update(a_modifier, ['references'], batch_size=500)
+    FichierStocke.objects.bulk_create(a_creer, batch_size=500)
+    return compteur
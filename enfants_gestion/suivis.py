@@ -0,0 +1,70 @@
+# enfants_gestion/suivis.py
+"""
+Pointeurs dénormalisés vers les derniers suivis actifs d'un enfant.
+
+`Enfant.dernier_suivi_medical` et `Enfant.suivi_scolaire_actuel` évitent de trier
+les suivis de chaque enfant pour afficher la liste, le dossier ou les exports :
+une simple jointure suffit. Ils sont recalculés par signals.py à chaque création,
+modification, archivage ou suppression d'un suivi, et peuvent être reconstruits
+en masse par la commande `reconstruire_derniers_suivis`.
+
+Les écritures passent par `QuerySet.update()` : elles ne créent pas de version
+dans l'historique et ne redéclenchent pas les signaux de l'enfant (le cache des
+enfants est donc invalidé explicitement).
+"""
+from django.db.models import OuterRef, Subquery
+
+from config.cache import invalider
+
+from .models import Enfant, SuiviMedical, SuiviScolaire
+
+# Champ de l'enfant -> (modèle du suivi, tri du plus récent au plus ancien)
+POINTEURS_SUIVIS = {
+    'dernier_suivi_medical': (SuiviMedical, ('-date_consultation', '-pk')),
+    'suivi_scolaire_actuel': (SuiviScolaire, ('-annee_scolaire', '-pk')),
+}
+
+
+def _pointeur_du_modele(modele):
+    for champ, (modele_suivi, tri) in POINTEURS_SUIVIS.items():
+        if modele_suivi is modele:
+            return champ, tri
+    raise ValueError(f"Aucun pointeur dénormalisé pour {modele.__name__}.")
+
+
+def _sous_requete(champ):
+    modele, tri = POINTEURS_SUIVIS[champ]
+    return Subquery(
+        modele.objects.filter(enfant_id=OuterRef('pk')).order_by(*tri).values('pk')[:1]
+    )
+
+
+def actualiser_dernier_suivi(modele, enfant_id):
+    """Recalcule le pointeur d'un enfant vers son dernier suivi actif de ce modèle."""
+    champ, tri = _pointeur_du_modele(modele)
+    dernier_id = modele.objects.filter(enfant_id=enfant_id).order_by(*tri).values_list('pk', flat=True).first()
+    if Enfant.all_objects.filter(pk=enfant_id).exclude(**{f'{champ}_id': dernier_id}).update(**{champ: dernier_id}):
+        invalider(Enfant)
+
+
+def reconstruire_derniers_suivis(dry_run=False):
+    """
+    Recalcule les pointeurs de tous les enfants (archivés compris).
+    Retourne le nombre d'enfants dont au moins un pointeur était faux.
+    """
+    enfants = Enfant.all_objects.annotate(
+        **{f'{champ}_calcule': _sous_requete(champ) for champ in POINTEURS_SUIVIS}
+    )
+    a_corriger = [
+        enfant for enfant in enfants.only('pk', *POINTEURS_SUIVIS).iterator(chunk_size=1000)
+        if any(getattr(enfant, f'{champ}_id') != getattr(enfant, f'{champ}_calcule') for champ in POINTEURS_SUIVIS)
+    ]
+    if dry_run or not a_corriger:
+        return len(a_corriger)
+
+    for enfant in a_corriger:
+        for champ in POINTEURS_SUIVIS:
+            setattr(enfant, f'{champ}_id', getattr(enfant, f'{champ}_calcule'))
+    Enfant.all_objects.bulk_update(a_corriger, list(POINTEURS_SUIVIS), batch_size=500)
+    invalider(Enfant)
+    return len(a_corriger)
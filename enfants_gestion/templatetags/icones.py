@@ -0,0 +1,21 @@
+# enfants_gestion/templatetags/icones.py
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+# Planche de symboles SVG : téléchargée une fois, gardée en cache (nom à empreinte)
+PLANCHE_ICONES = 'img/icones.svg'
+
+
+@register.simple_tag
+def icone(nom, classes=''):
+    """
+    Affiche une icône de la planche static/img/icones.svg.
+    Usage : {% icone 'coeur' 'w-6 h-6 mr-2 text-red-500' %}
+    """
+    return format_html(
+        '<svg class="{}" aria-hidden="true"><use href="{}#{}"></use></svg>',
+        classes, static(PLANCHE_ICONES), nom,
+    )
@@ -0,0 +1,41 @@
+# enfants_gestion/templatetags/photo_tags.py
+import os
+
+from django import template
+from django.urls import reverse
+from django.utils.html import format_html
+
+from enfants_gestion.miniatures import taille_miniature
+
+register = template.Library()
+
+
+def _url_photo(photo, taille):
+    """URL protégée de la miniature adaptée (ou de l'original), versionnée par le nom du fichier."""
+    taille_retenue = taille_miniature(taille)
+    if taille_retenue is None:
+        url = reverse('enfants_gestion:enfant_photo', kwargs={'pk': photo.instance.pk})
+    else:
+        url = reverse('enfants_gestion:enfant_photo_miniature', kwargs={'pk': photo.instance.pk, 'taille': taille_retenue})
+    version = os.path.splitext(os.path.basename(photo.name))[0][:16]
+    return f"{url}?v={version}"
+
+
+@register.simple_tag
+def photo_miniature(photo, taille, alt=''):
+    """
+    Affiche une photo d'enfant via ses miniatures : la taille demandée en 1x,
+    le double pour les écrans haute densité, avec chargement différé.
+    Usage : {% photo_miniature enfant.photo 40 alt="Photo de ..." %}
+    """
+    taille = int(taille)
+    url_1x = _url_photo(photo, taille)
+    return format_html(
+        '<img src="{}" srcset="{} 1x, {} 2x" width="{}" height="{}" alt="{}" loading="lazy" decoding="async" />',
+        url_1x,
+        url_1x,
+        _url_photo(photo, taille * 2),
+        taille,
+        taille,
+        alt,
+    )
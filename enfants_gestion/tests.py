@@ -1,3 +1,932 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connections
+from django.db.models.query import QuerySet
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from config.requetes import BudgetRequetesMixin
+from gestion_financiere.models import CompteFinancier, Parrainage, Transaction
+from sites_gestion.models import SiteOrphelinat
+from utilisateurs.models import CustomUser
+from . import importation
+from .chronologie import SOURCES, CurseurInvalide, _encoder_curseur, chronologie
+from .extraction import DEBUT_SURLIGNAGE, FIN_SURLIGNAGE, _ecrire_index, indexer_documents, rechercher_documents
+from .forms import DocumentForm, EnfantForm
+from .historique import HistoricalEnfant, compacter_historique, reconstruire_version
+from .importation import (
+    FichierImportInvalide, analyser_import, appliquer_import, lire_fichier, mettre_en_attente, reprendre_en_attente,
+)
+from .medias import servir_fichier
+from .miniatures import chemin_miniature, generer_miniatures, miniature
+from .models import (
+    Document, Enfant, FichierStocke, HistoriqueEnfantArchive, NoteEvolutive, SuiviMedical, SuiviScolaire, TexteDocument,
+)
+from .stockage import ajouter_reference, est_blob, recalculer_references, stockage_deduplique
+from .suivis import reconstruire_derniers_suivis
+from .templatetags.icones import icone
+from .templatetags.photo_tags import photo_miniature
+
+
+def completer_enfants(site, volume):
+    """Porte le nombre d'enfants à `volume` (sans signaux ni historique)."""
+    existants = Enfant.all_objects.count()
+    Enfant.all_objects.bulk_create(
+        Enfant(
+            site=site, nom=f'Nom{numero:05d}', prenom='Prénom', sexe='M',
+            date_naissance=date(2012, 1 + numero % 12, 1 + numero % 28), date_arrivee=date(2020, 1, 1),
+        )
+        for numero in range(existants, volume)
+    )
+
+
+def image_jpeg(largeur=300, hauteur=200, couleur='red'):
+    tampon = BytesIO()
+    Image.new('RGB', (largeur, hauteur), couleur).save(tampon, 'JPEG')
+    return tampon.getvalue()
+
+
+class MediaTemporaireMixin:
+    """MEDIA_ROOT dans un dossier temporaire, supprimé après chaque test."""
+
+    def setUp(self):
+        super().setUp()
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        reglages = override_settings(MEDIA_ROOT=dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+
+class BudgetRequetesEnfantsTests(BudgetRequetesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def _completer_suivis(self, enfant, volume):
+        """Porte le nombre de suivis médicaux et scolaires de l'enfant à `volume` chacun."""
+        deja = enfant.suivis_medicaux.count()
+        SuiviMedical.objects.bulk_create(
+            SuiviMedical(enfant=enfant, date_consultation=date(2020, 1, 1), type_consultation='Généraliste', diagnostic=f'D{numero}')
+            for numero in range(deja, volume)
+        )
+        SuiviScolaire.objects.bulk_create(
+            SuiviScolaire(enfant=enfant, annee_scolaire=f'{1000 + numero}-{1001 + numero}', ecole='École', classe='CM2')
+            for numero in range(deja, volume)
+        )
+
+    def test_liste(self):
+        self.assertBudgetRequetes(
+            reverse('enfants_gestion:enfant_list'), 8, lambda volume: completer_enfants(self.site, volume),
+        )
+
+    def test_dossier(self):
+        completer_enfants(self.site, 1)
+        enfant = Enfant.objects.get()
+        self.assertBudgetRequetes(
+            reverse('enfants_gestion:enfant_detail', args=[enfant.pk]), 8,
+            lambda volume: self._completer_suivis(enfant, volume),
+        )
+
+    def test_export(self):
+        self.assertBudgetRequetes(
+            reverse('enfants_gestion:enfant_download_export') + '?format=csv', 4,
+            lambda volume: completer_enfants(self.site, volume),
+        )
+
+
+class FichierProtegeInputTests(TestCase):
+
+    def test_liens_vers_les_vues_protegees(self):
+        enfant = Enfant(pk=5, photo='fichiers/ab/photo.jpg')
+        document = Document(pk=7, enfant=enfant, fichier='fichiers/cd/acte.pdf')
+        self.assertInHTML(
+            f'<a href="{reverse("enfants_gestion:enfant_photo", args=[5])}">fichiers/ab/photo.jpg</a>',
+            str(EnfantForm(instance=enfant)['photo']),
+        )
+        self.assertInHTML(
+            f'<a href="{reverse("enfants_gestion:document_fichier", args=[7])}">fichiers/cd/acte.pdf</a>',
+            str(DocumentForm(instance=document)['fichier']),
+        )
+
+
+class CompacterHistoriqueTests(TestCase):
+    """Compaction dans la base principale, puis reconstruction de chaque version."""
+
+    def setUp(self):
+        site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        enfant = Enfant.objects.create(
+            site=site_a, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+        modifications = [
+            {'histoire': 'Arrivé en janvier.'},
+            {'statut': 'adopte', 'date_depart': date(2023, 1, 1)},
+            {'site': site_b},
+            {'histoire': '', 'lieu_naissance': 'Douala'},
+            {'statut': 'accueilli', 'date_depart': None},
+            {'is_active': False},
+        ]
+        for champs in modifications:
+            for champ, valeur in champs.items():
+                setattr(enfant, champ, valeur)
+            enfant.save()
+        enfant.delete()
+
+        # Une version par jour, la plus récente il y a 400 jours et demi
+        self.history_ids = list(HistoricalEnfant.objects.order_by('history_date', 'history_id').values_list('history_id', flat=True))
+        for rang, history_id in enumerate(self.history_ids):
+            HistoricalEnfant.objects.filter(history_id=history_id).update(
+                history_date=timezone.now() - timedelta(days=400 + len(self.history_ids) - rang, hours=12),
+            )
+        self.attendues = {version.history_id: self._valeurs(version) for version in HistoricalEnfant.objects.all()}
+
+    def _valeurs(self, version):
+        return {
+            champ.attname: getattr(version, champ.attname)
+            for champ in HistoricalEnfant._meta.fields if champ.name != 'history_date'
+        }
+
+    def _verifier_reconstructions(self):
+        for history_id in self.history_ids:
+            with self.subTest(history_id=history_id):
+                self.assertEqual(self._valeurs(reconstruire_version(history_id)), self.attendues[history_id])
+
+    def test_chaque_version_reconstruite_a_l_identique(self):
+        stats = compacter_historique(age_jours=365, intervalle=3)
+        self.assertEqual(stats, {'enfants': 1, 'versions': 8, 'snapshots': 3})
+        self.assertFalse(HistoricalEnfant.objects.exists())
+        self.assertEqual(
+            list(HistoriqueEnfantArchive.objects.values_list('is_snapshot', flat=True)),
+            [True, False, False, True, False, False, True, False],
+        )
+        # Les lignes différentielles ne contiennent que les champs modifiés
+        self.assertEqual(HistoriqueEnfantArchive.objects.get(history_id=self.history_ids[1]).donnees, {'histoire': 'Arrivé en janvier.'})
+        self._verifier_reconstructions()
+
+    def test_compaction_en_deux_passages(self):
+        stats = compacter_historique(age_jours=405, intervalle=3)
+        self.assertEqual(stats['versions'], 4)
+        self.assertEqual(HistoricalEnfant.objects.count(), 4)
+        # Versions encore dans l'historique et versions archivées se lisent de la même façon
+        self._verifier_reconstructions()
+
+        stats = compacter_historique(age_jours=365, intervalle=3)
+        self.assertEqual(stats, {'enfants': 1, 'versions': 4, 'snapshots': 1})
+        self.assertFalse(HistoricalEnfant.objects.exists())
+        self._verifier_reconstructions()
+
+    def test_simulation_sans_ecriture(self):
+        stats = compacter_historique(age_jours=365, intervalle=3, dry_run=True)
+        self.assertEqual(stats['versions'], 8)
+        self.assertEqual(HistoricalEnfant.objects.count(), 8)
+        self.assertFalse(HistoriqueEnfantArchive.objects.exists())
+
+    def test_version_introuvable(self):
+        with self.assertRaises(HistoricalEnfant.DoesNotExist):
+            reconstruire_version(max(self.history_ids) + 1)
+
+    def test_vue_d_une_version_archivee_limitee_au_site(self):
+        compacter_historique(age_jours=365, intervalle=3)
+        agent = CustomUser.objects.create_user('agent', 'agent@example.org', 'motdepasse')
+        agent.sites.add(SiteOrphelinat.objects.get(nom='Site A'))
+        agent.user_permissions.add(Permission.objects.get(codename='view_enfant'))
+        self.client.force_login(agent)
+
+        response = self.client.get(reverse('enfants_gestion:enfant_history_detail', args=[self.history_ids[1]]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['historical_enfant'].histoire, 'Arrivé en janvier.')
+        # Version postérieure au transfert vers le site B
+        response = self.client.get(reverse('enfants_gestion:enfant_history_detail', args=[self.history_ids[4]]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(DATABASE_ROUTERS=['enfants_gestion.routers.HistoriqueArchiveRouter'])
+class CompacterHistoriqueDeuxBasesTests(TestCase):
+    """Archive dans sa propre base (HISTORIQUE_ARCHIVE_DB_PATH), ici une seconde base en mémoire."""
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings['historique_archive'] = {
+            **connections['default'].settings_dict, 'NAME': 'file:memorydb_historique_archive?mode=memory&cache=shared',
+        }
+        with connections['historique_archive'].schema_editor() as editeur:
+            editeur.create_model(HistoriqueEnfantArchive)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connections['historique_archive'].schema_editor() as editeur:
+            editeur.delete_model(HistoriqueEnfantArchive)
+        del connections['historique_archive']
+        del connections.settings['historique_archive']
+
+    def setUp(self):
+        site = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        self.enfant = Enfant.objects.create(
+            site=site, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+        for numero in range(4):
+            self.enfant.histoire = f'Version {numero}'
+            self.enfant.save()
+        HistoricalEnfant.objects.update(history_date=timezone.now() - timedelta(days=400))
+        self.history_ids = sorted(HistoricalEnfant.objects.values_list('history_id', flat=True))
+
+    def _archivees(self):
+        return sorted(HistoriqueEnfantArchive.objects.using('historique_archive').values_list('history_id', flat=True))
+
+    def test_versions_deplacees_vers_la_base_d_archive(self):
+        stats = compacter_historique(age_jours=365, intervalle=2)
+        self.assertEqual(stats['versions'], 5)
+        self.assertFalse(HistoricalEnfant.objects.exists())
+        self.assertEqual(self._archivees(), self.history_ids)
+        self.assertEqual(reconstruire_version(self.history_ids[2]).histoire, 'Version 1')
+
+    def test_echec_de_l_archive_sans_perte_d_historique(self):
+        with mock.patch.object(QuerySet, 'bulk_create', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            compacter_historique(age_jours=365)
+        self.assertEqual(HistoricalEnfant.objects.count(), 5)
+        self.assertEqual(self._archivees(), [])
+
+    def test_relance_apres_interruption_avant_suppression(self):
+        with mock.patch.object(QuerySet, 'delete', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            compacter_historique(age_jours=365, intervalle=2)
+        self.assertEqual(self._archivees(), self.history_ids)
+        self.assertEqual(HistoricalEnfant.objects.count(), 5)
+
+        stats = compacter_historique(age_jours=365, intervalle=2)
+        self.assertEqual(stats['versions'], 0)
+        self.assertFalse(HistoricalEnfant.objects.exists())
+        self.assertEqual(self._archivees(), self.history_ids)
+        self.assertEqual(reconstruire_version(self.history_ids[-1]).histoire, 'Version 3')
+
+
+class ImportEnfantsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        cls.existant = Enfant.objects.create(
+            site=cls.site_a, nom='Mbala', prenom='Éric', sexe='M',
+            date_naissance=date(2012, 3, 4), date_arrivee=date(2020, 1, 1), lieu_naissance='Douala',
+        )
+        cls.autre_site = Enfant.objects.create(
+            site=cls.site_b, nom='Ngo', prenom='Awa', sexe='F', date_naissance=date(2013, 5, 6), date_arrivee=date(2020, 1, 1),
+        )
+        cls.saisie = CustomUser.objects.create_user('saisie', 'saisie@example.org', 'motdepasse')
+        cls.saisie.sites.add(cls.site_a)
+        cls.saisie.user_permissions.add(*Permission.objects.filter(codename__in=['view_enfant', 'add_enfant']))
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        patcher = mock.patch('enfants_gestion.importation._dossier_en_attente', return_value=dossier)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _csv(self, *lignes):
+        entete = "Nom;Prénom;Date de naissance;Sexe;Date d'arrivée;Lieu de naissance;Site d'accueil"
+        return '\n'.join((entete,) + lignes).encode()
+
+    def _analyser(self, contenu, sites=None):
+        sites = sites or [self.site_a]
+        return analyser_import(lire_fichier(contenu, 'csv'), sites, sites[0])
+
+    def test_erreurs_de_validation_par_ligne(self):
+        rapport = self._analyser(self._csv(
+            "Kamga;Paul;31/02/2012;M;01/01/2021;;",
+            ";Lina;2012-01-01;F;2021-01-01;;",
+            "Kamga;Jean;2012-01-01;X;2021-01-01;;",
+            "Kamga;Luc;2012-01-01;Masculin;2021-01-01;;",
+            "KAMGA;Luc;01/01/2012;M;2021-01-01;;",
+        ))
+        self.assertEqual([ligne['action'] for ligne in rapport['lignes']], ['erreur', 'erreur', 'erreur', 'creation', 'doublon'])
+        self.assertEqual([ligne['numero'] for ligne in rapport['lignes']], [2, 3, 4, 5, 6])
+        self.assertIn('Date de naissance', rapport['lignes'][0]['erreurs'][0])
+        self.assertEqual(rapport['lignes'][3]['enfant'].sexe, 'M')
+        self.assertIn('ligne 5', rapport['lignes'][4]['erreurs'][0])
+        self.assertEqual(rapport['compteurs'], {'creation': 1, 'modification': 0, 'inchange': 0, 'doublon': 1, 'erreur': 3})
+
+    def test_creation_et_mise_a_jour(self):
+        contenu = self._csv(
+            "MBALA;Eric;04/03/2012;M;2020-01-01;Yaoundé;Site A",
+            "Kamga;Luc;2012-01-01;M;2021-01-01;;Site A",
+        )
+        rapport = self._analyser(contenu)
+        self.assertEqual([ligne['action'] for ligne in rapport['lignes']], ['modification', 'creation'])
+        self.assertEqual(
+            rapport['lignes'][0]['differences'],
+            [{'champ': 'lieu_naissance', 'libelle': 'Lieu de naissance', 'ancien': 'Douala', 'nouveau': 'Yaoundé'}],
+        )
+
+        self.assertEqual(appliquer_import(rapport), {'crees': 1, 'modifies': 0})
+        self.existant.refresh_from_db()
+        self.assertEqual(self.existant.lieu_naissance, 'Douala')
+
+        rapport = self._analyser(contenu)
+        self.assertEqual([ligne['action'] for ligne in rapport['lignes']], ['modification', 'inchange'])
+        self.assertEqual(appliquer_import(rapport, mettre_a_jour=True), {'crees': 0, 'modifies': 1})
+        self.existant.refresh_from_db()
+        # La graphie du dossier existant est conservée
+        self.assertEqual((self.existant.nom, self.existant.prenom, self.existant.lieu_naissance), ('Mbala', 'Éric', 'Yaoundé'))
+        self.assertEqual(self.existant.history.first().history_change_reason, 'Import en masse')
+        self.assertEqual(Enfant.objects.filter(nom='Kamga').count(), 1)
+
+    def test_sites_non_autorises(self):
+        rapport = self._analyser(self._csv(
+            "Ngo;Awa;2013-05-06;F;2020-01-01;;Site B",
+            "Ngo;Awa;2013-05-06;F;2020-01-01;;",
+        ))
+        self.assertEqual([ligne['action'] for ligne in rapport['lignes']], ['erreur', 'creation'])
+        self.assertIn('Site B', rapport['lignes'][0]['erreurs'][0])
+        # Le dossier homonyme de l'autre site n'est pas proposé à la mise à jour
+        self.assertEqual(rapport['lignes'][1]['enfant'].site, self.site_a)
+
+    def test_jeton_falsifie_ou_expire(self):
+        for jeton in ('../../etc/passwd', 'A' * 32, ''):
+            with self.assertRaises(FichierImportInvalide):
+                reprendre_en_attente(jeton, 'csv')
+        with self.assertRaises(FichierImportInvalide):
+            reprendre_en_attente(mettre_en_attente(b'contenu', 'csv'), 'exe')
+        self.assertEqual(reprendre_en_attente(mettre_en_attente(b'contenu', 'csv'), 'csv', supprimer=True), b'contenu')
+
+        jeton = mettre_en_attente(b'contenu', 'csv')
+        chemin = os.path.join(importation._dossier_en_attente(), f'{jeton}.csv')
+        vieux = time.time() - settings.IMPORT_DUREE_ATTENTE - 1
+        os.utime(chemin, (vieux, vieux))
+        with self.assertRaises(FichierImportInvalide):
+            reprendre_en_attente(jeton, 'csv')
+        self.assertFalse(os.path.exists(chemin))
+
+    def test_fichiers_expires_purges_a_l_analyse(self):
+        recent = mettre_en_attente(b'contenu', 'csv')
+        ancien = mettre_en_attente(b'contenu', 'csv')
+        vieux = time.time() - settings.IMPORT_DUREE_ATTENTE - 1
+        os.utime(os.path.join(importation._dossier_en_attente(), f'{ancien}.csv'), (vieux, vieux))
+        self._analyser(self._csv())
+        self.assertEqual(os.listdir(importation._dossier_en_attente()), [f'{recent}.csv'])
+
+    def test_vue_sans_droit_de_modification(self):
+        self.client.force_login(self.saisie)
+        fichier = SimpleUploadedFile('enfants.csv', self._csv(
+            "Mbala;Éric;2012-03-04;M;2020-01-01;Yaoundé;",
+            "Kamga;Luc;2012-01-01;M;2021-01-01;;",
+        ))
+        response = self.client.post(reverse('enfants_gestion:enfant_import'), {'fichier': fichier, 'mettre_a_jour': 'on'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['mettre_a_jour'])
+        jeton = response.context['jeton']
+
+        # Un jeton qui n'est pas celui de la session est refusé et l'import en attente abandonné
+        response = self.client.post(reverse('enfants_gestion:enfant_import'), {'jeton': 'f' * 32})
+        self.assertRedirects(response, reverse('enfants_gestion:enfant_import'))
+        self.assertEqual(os.listdir(importation._dossier_en_attente()), [])
+        with self.assertRaises(FichierImportInvalide):
+            reprendre_en_attente(jeton, 'csv')
+        self.assertFalse(Enfant.objects.filter(nom='Kamga').exists())
+
+        fichier.seek(0)
+        response = self.client.post(reverse('enfants_gestion:enfant_import'), {'fichier': fichier, 'mettre_a_jour': 'on'})
+        self.client.post(reverse('enfants_gestion:enfant_import'), {'jeton': response.context['jeton']})
+        self.existant.refresh_from_db()
+        self.assertEqual(self.existant.lieu_naissance, 'Douala')
+        self.assertTrue(Enfant.objects.filter(nom='Kamga').exists())
+
+    def test_confirmation_et_annulation(self):
+        self.client.force_login(self.saisie)
+        url = reverse('enfants_gestion:enfant_import')
+        contenu = self._csv("Kamga;Luc;2012-01-01;M;2021-01-01;;")
+
+        self.client.post(url, {'fichier': SimpleUploadedFile('enfants.csv', contenu)})
+        response = self.client.post(url, {'annuler': '1'})
+        self.assertRedirects(response, url)
+        self.assertEqual(os.listdir(importation._dossier_en_attente()), [])
+
+        response = self.client.post(url, {'fichier': SimpleUploadedFile('enfants.csv', contenu)})
+        response = self.client.post(url, {'jeton': response.context['jeton']})
+        self.assertRedirects(response, reverse('enfants_gestion:enfant_list'), fetch_redirect_response=False)
+        self.assertEqual(os.listdir(importation._dossier_en_attente()), [])
+        self.assertEqual(Enfant.objects.get(nom='Kamga').site, self.site_a)
+
+
+class StockageDedupliqueTests(MediaTemporaireMixin, TestCase):
+    nom = 'fichiers/ab/' + 'ab' * 32 + '.pdf'
+
+    def test_premiere_reference_creee_par_un_envoi_concurrent(self):
+        update = QuerySet.update
+        appels = []
+
+        def update_concurrent(queryset, **champs):
+            if not appels:
+                # L'autre envoi crée la ligne entre l'incrément manqué et l'insertion
+                appels.append(queryset)
+                FichierStocke.objects.create(nom=self.nom, references=1)
+                return 0
+            return update(queryset, **champs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_concurrent):
+            ajouter_reference(self.nom)
+        self.assertEqual(FichierStocke.objects.get(nom=self.nom).references, 2)
+
+    def _enfant(self, photo=None):
+        return Enfant.objects.create(
+            site=SiteOrphelinat.objects.get_or_create(nom='Site A', ville='Ville', pays='Pays')[0], nom='Nom',
+            prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1), photo=photo,
+        )
+
+    def _references(self, nom):
+        return FichierStocke.objects.get(nom=nom).references
+
+    def test_envois_identiques_partages_et_decomptes_a_la_suppression(self):
+        enfant = self._enfant()
+        documents = [
+            Document.objects.create(enfant=enfant, type_document='autre', fichier=SimpleUploadedFile(nom, b'%PDF-1.4 acte'))
+            for nom in ('acte.pdf', 'copie.PDF')
+        ]
+        nom = documents[0].fichier.name
+        self.assertEqual(documents[1].fichier.name, nom)
+        self.assertRegex(nom, r'^fichiers/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(os.listdir(os.path.dirname(documents[0].fichier.path)), [os.path.basename(nom)])
+        self.assertEqual((self._references(nom), FichierStocke.objects.get(nom=nom).taille), (2, 13))
+
+        documents[0].delete()
+        self.assertEqual(self._references(nom), 1)
+        documents[1].delete()
+        self.assertEqual(self._references(nom), 0)
+        # Le blob n'est supprimé que par `dedupliquer_medias --purger`
+        self.assertTrue(documents[1].fichier.storage.exists(nom))
+
+    def test_remplacement_de_la_photo(self):
+        enfant = self._enfant(SimpleUploadedFile('photo.jpg', image_jpeg()))
+        ancienne = enfant.photo.name
+        enfant.photo = SimpleUploadedFile('photo.jpg', image_jpeg(couleur='blue'))
+        enfant.save()
+        self.assertEqual((self._references(ancienne), self._references(enfant.photo.name)), (0, 1))
+        # Archiver le dossier garde sa référence ; le supprimer la libère
+        enfant.is_active = False
+        enfant.save()
+        self.assertEqual(self._references(enfant.photo.name), 1)
+        enfant.delete()
+        self.assertEqual(self._references(enfant.photo.name), 0)
+
+    def test_recalcul_des_references(self):
+        enfant = self._enfant(SimpleUploadedFile('photo.jpg', image_jpeg()))
+        Document.objects.create(enfant=enfant, type_document='autre', fichier=SimpleUploadedFile('a.pdf', b'a'))
+        FichierStocke.objects.update(references=7)
+        FichierStocke.objects.filter(nom=enfant.photo.name).delete()
+        compteur = recalculer_references()
+        self.assertEqual(sorted(compteur.values()), [1, 1])
+        self.assertEqual(sorted(FichierStocke.objects.values_list('references', flat=True)), [1, 1])
+
+    def test_migration_puis_purge_des_blobs_orphelins(self):
+        stockage = stockage_deduplique()
+        enfant = self._enfant()
+        # Fichiers téléversés avant le stockage dédupliqué
+        for nom in ('documents_enfants/a.pdf', 'documents_enfants/b.pdf'):
+            FileSystemStorage().save(nom, ContentFile(b'meme contenu'))
+            Document.objects.create(enfant=enfant, type_document='autre', fichier=nom)
+
+        call_command('dedupliquer_medias', stdout=StringIO(), stderr=StringIO())
+        noms = set(Document.objects.values_list('fichier', flat=True))
+        self.assertEqual(len(noms), 1)
+        blob = noms.pop()
+        self.assertTrue(est_blob(blob))
+        self.assertFalse(stockage.exists('documents_enfants/a.pdf'))
+        self.assertEqual(self._references(blob), 2)
+
+        # Blob encore cité par l'historique d'un dossier : conservé
+        enfant.photo = SimpleUploadedFile('photo.jpg', image_jpeg())
+        enfant.save()
+        photo = enfant.photo.name
+        enfant.photo = None
+        enfant.save()
+        Document.objects.all().delete()
+        call_command('dedupliquer_medias', '--purger', stdout=StringIO())
+        self.assertFalse(stockage.exists(blob))
+        self.assertFalse(FichierStocke.objects.filter(nom=blob).exists())
+        self.assertTrue(stockage.exists(photo))
+
+
+class RechercheDocumentsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        cls.agent = CustomUser.objects.create_user('agent', 'agent@example.org', 'motdepasse')
+        cls.agent.sites.add(cls.site_a)
+        cls.agent.user_permissions.add(Permission.objects.get(codename='view_enfant'))
+        cls.documents = {
+            cle: cls._indexer(site, cle, actif)
+            for cle, site, actif in (('actif', cls.site_a, True), ('archive', cls.site_a, False), ('autre', cls.site_b, True))
+        }
+
+    @classmethod
+    def _indexer(cls, site, cle, actif):
+        enfant = Enfant.objects.create(
+            site=site, nom=cle, prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+        document = Document.objects.create(enfant=enfant, type_document='jugement', fichier=f'documents_enfants/{cle}.pdf')
+        texte = f"Jugement d'admission rendu à Yaoundé ({cle})"
+        TexteDocument.objects.create(document=document, empreinte='0' * 64, texte=texte)
+        _ecrire_index(document.pk, site.pk, texte, 'default')
+        if not actif:
+            Enfant.all_objects.filter(pk=enfant.pk).update(is_active=False)
+        return document
+
+    def _trouves(self, **kwargs):
+        return {document_id for document_id, _extrait in rechercher_documents('Yaoundé', **kwargs)}
+
+    def test_documents_des_enfants_archives_exclus(self):
+        attendus = {self.documents['actif'].pk, self.documents['autre'].pk}
+        self.assertEqual(self._trouves(), attendus)
+        self.assertEqual(self._trouves(site_ids=[self.site_a.pk]), {self.documents['actif'].pk})
+        # Sans FTS5 (autre moteur de base de données) : même filtre
+        with mock.patch('enfants_gestion.extraction._utilise_fts', return_value=False):
+            self.assertEqual(self._trouves(), attendus)
+
+    def test_vue_limitee_aux_sites_et_aux_enfants_actifs(self):
+        self.client.force_login(self.agent)
+        response = self.client.get(reverse('enfants_gestion:document_search'), {'q': 'Yaoundé'})
+        self.assertEqual([resultat['document'] for resultat in response.context['resultats']], [self.documents['actif']])
+        self.assertIn('<mark>Yaoundé</mark>', str(response.context['resultats'][0]['extrait']))
+
+
+class MiniaturesTests(MediaTemporaireMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.site = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        self.enfant = Enfant.objects.create(
+            site=self.site, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1),
+            date_arrivee=date(2020, 1, 1), photo=SimpleUploadedFile('photo.jpg', image_jpeg()),
+        )
+        self.stockage = self.enfant.photo.storage
+
+    def test_miniatures_carrees_generees_a_l_enregistrement(self):
+        for taille in settings.MINIATURES_TAILLES:
+            with self.subTest(taille=taille), self.stockage.open(chemin_miniature(self.enfant.photo.name, taille)) as fichier:
+                image = Image.open(fichier)
+                self.assertEqual((image.format, image.size), ('JPEG', (taille, taille)))
+
+    def test_regeneration_si_l_original_est_plus_recent(self):
+        self.assertEqual(generer_miniatures(self.enfant.photo), [])
+        futur = time.time() + 60
+        os.utime(self.stockage.path(self.enfant.photo.name), (futur, futur))
+        self.assertEqual(generer_miniatures(self.enfant.photo), sorted(settings.MINIATURES_TAILLES))
+
+    def test_generation_a_la_demande_et_image_illisible(self):
+        nom = chemin_miniature(self.enfant.photo.name, 48)
+        self.stockage.delete(nom)
+        self.assertEqual(miniature(self.enfant.photo, 48), nom)
+        self.assertTrue(self.stockage.exists(nom))
+
+        Enfant.all_objects.filter(pk=self.enfant.pk).update(photo=self.stockage.save('photos_enfants/illisible.jpg', ContentFile(b'x')))
+        self.enfant.refresh_from_db()
+        # Le gabarit retombe sur l'original
+        self.assertEqual(miniature(self.enfant.photo, 48), self.enfant.photo.name)
+
+    def test_balise_img_avec_srcset(self):
+        version = os.path.basename(self.enfant.photo.name)[:16]
+        url = reverse('enfants_gestion:enfant_photo_miniature', args=[self.enfant.pk, 48])
+        url_2x = reverse('enfants_gestion:enfant_photo_miniature', args=[self.enfant.pk, 96])
+        self.assertHTMLEqual(
+            photo_miniature(self.enfant.photo, 40, alt='Photo'),
+            f'<img src="{url}?v={version}" srcset="{url}?v={version} 1x, {url_2x}?v={version} 2x" width="40" height="40" '
+            'alt="Photo" loading="lazy" decoding="async">',
+        )
+        # Au-delà de la plus grande miniature : l'original
+        self.assertIn(reverse('enfants_gestion:enfant_photo', args=[self.enfant.pk]), photo_miniature(self.enfant.photo, 200))
+
+    def test_vue_des_miniatures(self):
+        self.client.force_login(CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse'))
+        response = self.client.get(reverse('enfants_gestion:enfant_photo_miniature', args=[self.enfant.pk, 96]), {'v': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(Image.open(BytesIO(b''.join(response.streaming_content))).size, (96, 96))
+        response = self.client.get(reverse('enfants_gestion:enfant_photo_miniature', args=[self.enfant.pk, 50]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ServirFichierTests(MediaTemporaireMixin, TestCase):
+    contenu = b'abcdefghijklmnopqrstuvwxyz'
+
+    def setUp(self):
+        super().setUp()
+        self.stockage = stockage_deduplique()
+        self.nom = self.stockage.save('acte.pdf', ContentFile(self.contenu))
+        self.etag = '"%s"' % os.path.splitext(os.path.basename(self.nom))[0]
+
+    def _servir(self, nom=None, **entetes):
+        return servir_fichier(RequestFactory().get('/', headers=entetes), self.stockage, nom or self.nom, 'Acte.pdf')
+
+    def _corps(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_fichier_complet(self):
+        response = self._servir()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._corps(response), self.contenu)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(response['Content-Disposition'], "inline; filename*=UTF-8''Acte.pdf")
+
+    def test_requete_conditionnelle(self):
+        for if_none_match in (self.etag, f'"autre", {self.etag}', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                response = self._servir(if_none_match=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual((response['ETag'], response.content), (self.etag, b''))
+        self.assertEqual(self._servir(if_none_match='"autre"').status_code, 200)
+
+    def test_plages(self):
+        for entete, contenu, content_range in (
+            ('bytes=2-5', b'cdef', 'bytes 2-5/26'),
+            ('bytes=20-', b'uvwxyz', 'bytes 20-25/26'),
+            ('bytes=-3', b'xyz', 'bytes 23-25/26'),
+            ('bytes=24-100', b'yz', 'bytes 24-25/26'),
+        ):
+            with self.subTest(entete=entete):
+                response = self._servir(range=entete)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(self._corps(response), contenu)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(contenu)))
+
+    def test_plage_insatisfiable_ou_ignoree(self):
+        for entete in ('bytes=26-', 'bytes=5-2', 'bytes=-0'):
+            with self.subTest(entete=entete):
+                response = self._servir(range=entete)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */26')
+        # Plages multiples non prises en charge, ou fichier modifié depuis (If-Range) : fichier complet
+        self.assertEqual(self._servir(range='bytes=0-1,4-5').status_code, 200)
+        self.assertEqual(self._servir(range='bytes=2-5', if_range='"ancien"').status_code, 200)
+        self.assertEqual(self._servir(range='bytes=2-5', if_range=self.etag).status_code, 206)
+
+    def test_etag_d_un_fichier_hors_stockage_deduplique(self):
+        nom = FileSystemStorage().save('documents_enfants/ancien.pdf', ContentFile(self.contenu))
+        stat = os.stat(self.stockage.path(nom))
+        self.assertEqual(self._servir(nom)['ETag'], '"%x-%x"' % (int(stat.st_mtime), 26))
+        self.assertEqual(self._servir('documents_enfants/absent.pdf').status_code, 404)
+
+    @override_settings(MEDIA_SERVEUR_FRONTAL='nginx', MEDIA_ACCEL_PREFIX='/media-protege/')
+    def test_transfert_delegue_au_serveur_frontal(self):
+        response = self._servir(range='bytes=2-5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/media-protege/{self.nom}')
+        self.assertEqual((response['ETag'], response.content), (self.etag, b''))
+
+    def test_vue_reservee_aux_sites_de_l_utilisateur(self):
+        site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        agent = CustomUser.objects.create_user('agent', 'agent@example.org', 'motdepasse')
+        agent.sites.add(site_a)
+        agent.user_permissions.add(Permission.objects.get(codename='view_enfant'))
+        self.client.force_login(agent)
+        for site, statut in ((site_a, 206), (site_b, 404)):
+            enfant = Enfant.objects.create(
+                site=site, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+            )
+            document = Document.objects.create(enfant=enfant, type_document='jugement', fichier=self.nom)
+            with self.subTest(site=site.nom):
+                response = self.client.get(reverse('enfants_gestion:document_fichier', args=[document.pk]), headers={'range': 'bytes=0-2'})
+                self.assertEqual(response.status_code, statut)
+
+
+class IndexationDocumentsTests(MediaTemporaireMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        self.site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        self.enfant = Enfant.objects.create(
+            site=self.site_a, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+        self.jugement = self._document('jugement.txt', "Jugement d'admission rendu à Yaoundé le 3 mars.")
+        self.bulletin = self._document('bulletin.txt', "Bulletin scolaire : excellents résultats en mathématiques.")
+
+    def _document(self, nom, texte):
+        return Document.objects.create(
+            enfant=self.enfant, type_document='autre', fichier=SimpleUploadedFile(nom, texte.encode()),
+        )
+
+    def _trouves(self, recherche, **kwargs):
+        return [document_id for document_id, _extrait in rechercher_documents(recherche, **kwargs)]
+
+    def test_indexation_incrementale(self):
+        self.assertEqual(indexer_documents(), {'indexes': 2, 'inchanges': 0, 'erreurs': 0})
+        self.assertEqual(indexer_documents(), {'indexes': 0, 'inchanges': 2, 'erreurs': 0})
+
+        self.bulletin.fichier = SimpleUploadedFile('bulletin.txt', b'Bulletin du second trimestre.')
+        self.bulletin.save()
+        Document.objects.create(enfant=self.enfant, type_document='autre', fichier='documents_enfants/absent.txt')
+        self.assertEqual(indexer_documents(), {'indexes': 1, 'inchanges': 1, 'erreurs': 1})
+        self.assertEqual(TexteDocument.objects.get(document=self.bulletin).texte, 'Bulletin du second trimestre.')
+        self.assertEqual(self._trouves('mathématiques'), [])
+        self.assertEqual(self._trouves('trimestre'), [self.bulletin.pk])
+
+    def test_recherche_sans_accents_par_prefixe(self):
+        indexer_documents()
+        self.assertEqual(self._trouves('yaounde'), [self.jugement.pk])
+        self.assertEqual(self._trouves('JUGE yaoun'), [self.jugement.pk])
+        extrait = rechercher_documents('mathematiques')[0][1]
+        self.assertIn(f'{DEBUT_SURLIGNAGE}mathématiques{FIN_SURLIGNAGE}', extrait)
+        # Guillemets et opérateurs FTS5 de la saisie sont cherchés comme du texte
+        self.assertEqual(self._trouves('"rendu OR NEAR('), [])
+        self.assertEqual(self._trouves('   '), [])
+
+    def test_transfert_et_suppression(self):
+        indexer_documents()
+        self.enfant.site = self.site_b
+        self.enfant.save()
+        indexer_documents()
+        self.assertEqual(self._trouves('yaounde', site_ids=[self.site_a.pk]), [])
+        self.assertEqual(self._trouves('yaounde', site_ids=[self.site_b.pk]), [self.jugement.pk])
+
+        self.jugement.delete()
+        self.assertEqual(self._trouves('yaounde'), [])
+
+
+class DerniersSuivisTests(TestCase):
+
+    def setUp(self):
+        site = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        self.enfant = Enfant.objects.create(
+            site=site, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+
+    def _consultation(self, jour):
+        return SuiviMedical.objects.create(
+            enfant=self.enfant, date_consultation=jour, type_consultation='Généraliste', diagnostic='Rhume',
+        )
+
+    def _annee(self, annee):
+        return SuiviScolaire.objects.create(enfant=self.enfant, annee_scolaire=annee, ecole='École', classe='CM2')
+
+    def _pointeurs(self):
+        enfant = Enfant.all_objects.get(pk=self.enfant.pk)
+        return enfant.dernier_suivi_medical_id, enfant.suivi_scolaire_actuel_id
+
+    def test_pointeurs_suivent_les_suivis_actifs(self):
+        versions = self.enfant.history.count()
+        recente = self._consultation(date(2024, 5, 2))
+        ancienne = self._consultation(date(2023, 1, 10))
+        annee = self._annee('2024-2025')
+        self._annee('2023-2024')
+        self.assertEqual(self._pointeurs(), (recente.pk, annee.pk))
+
+        recente.is_active = False
+        recente.save()
+        self.assertEqual(self._pointeurs(), (ancienne.pk, annee.pk))
+        ancienne.delete()
+        annee.delete()
+        self.assertEqual(self._pointeurs()[0], None)
+        self.assertEqual(Enfant.all_objects.get(pk=self.enfant.pk).suivi_scolaire_actuel.annee_scolaire, '2023-2024')
+        # Les pointeurs ne créent pas de version dans l'historique du dossier
+        self.assertEqual(self.enfant.history.count(), versions)
+
+    def test_reconstruction_en_masse(self):
+        consultation = self._consultation(date(2024, 5, 2))
+        annee = self._annee('2024-2025')
+        Enfant.all_objects.update(dernier_suivi_medical=None, suivi_scolaire_actuel=None)
+
+        self.assertEqual(reconstruire_derniers_suivis(dry_run=True), 1)
+        self.assertEqual(self._pointeurs(), (None, None))
+        sortie = StringIO()
+        call_command('reconstruire_derniers_suivis', stdout=sortie)
+        self.assertIn('1 enfant(s) corrigé(s)', sortie.getvalue())
+        self.assertEqual(self._pointeurs(), (consultation.pk, annee.pk))
+        self.assertEqual(reconstruire_derniers_suivis(), 0)
+
+
+class ChronologieTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.enfant = Enfant.objects.create(
+            site=cls.site, nom='Nom', prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+        # Trois consultations le même jour : départagées par leur identifiant
+        for jour in (date(2024, 5, 2), date(2024, 5, 2), date(2024, 5, 2), date(2023, 1, 10), date(2021, 6, 1)):
+            SuiviMedical.objects.create(enfant=cls.enfant, date_consultation=jour, type_consultation='Généraliste', diagnostic='Rhume')
+        for annee in ('2022-2023', '2023-2024'):
+            SuiviScolaire.objects.create(enfant=cls.enfant, annee_scolaire=annee, ecole='École', classe='CM2')
+        NoteEvolutive.objects.create(enfant=cls.enfant, note='Progrès en lecture.')
+        Document.objects.create(enfant=cls.enfant, type_document='jugement', fichier='documents_enfants/jugement.pdf')
+        parrainage = Parrainage.objects.create(
+            enfant=cls.enfant, parrain_nom='Parrain', montant_mensuel=15000, date_debut=date(2023, 1, 1),
+        )
+        compte = CompteFinancier.objects.create(site=cls.site, nom='Caisse')
+        Transaction.objects.create(
+            compte=compte, type_transaction='entree', categorie='Parrainage', montant=15000,
+            date_transaction=date(2023, 2, 1), description='Versement', parrainage_lie=parrainage,
+        )
+        cls.agent = CustomUser.objects.create_user('agent', 'agent@example.org', 'motdepasse')
+        cls.agent.sites.add(cls.site)
+        cls.agent.user_permissions.add(Permission.objects.get(codename='view_enfant'))
+
+    def _cles(self, evenements):
+        return [(evenement['type'], evenement['id']) for evenement in evenements]
+
+    def _parcourir(self, limite, **kwargs):
+        evenements, curseur, pages = [], None, 0
+        while True:
+            page, curseur = chronologie(self.enfant, curseur=curseur, limite=limite, **kwargs)
+            evenements += page
+            pages += 1
+            if curseur is None:
+                return evenements, pages
+
+    def test_pages_successives_sans_doublon_ni_oubli(self):
+        tous, suivant = chronologie(self.enfant, limite=100)
+        self.assertIsNone(suivant)
+        self.assertEqual(self._cles(tous), [
+            ('document', 1), ('note', 1), ('historique', 1),
+            ('suivi_medical', 3), ('suivi_medical', 2), ('suivi_medical', 1),
+            ('suivi_scolaire', 2), ('transaction', 1), ('suivi_medical', 4), ('suivi_scolaire', 1), ('suivi_medical', 5),
+        ])
+        for limite in (1, 2, 3, 5, 11):
+            with self.subTest(limite=limite):
+                evenements, pages = self._parcourir(limite)
+                self.assertEqual(evenements, tous)
+                self.assertEqual(pages, -(-11 // limite))
+
+    def test_ecritures_entre_deux_pages(self):
+        page, curseur = chronologie(self.enfant, limite=4)
+        # Plus récent que la page déjà lue : n'apparaît pas ; plus ancien : arrive dans la suite
+        NoteEvolutive.objects.create(enfant=self.enfant, note='Nouvelle note.')
+        ancien = SuiviMedical.objects.create(
+            enfant=self.enfant, date_consultation=date(2020, 3, 1), type_consultation='Généraliste', diagnostic='Toux',
+        )
+        suite, _curseur = chronologie(self.enfant, curseur=curseur, limite=100)
+        self.assertEqual(self._cles(suite)[-1], ('suivi_medical', ancien.pk))
+        self.assertEqual(len(page) + len(suite), 12)
+
+    def test_une_requete_bornee_par_source(self):
+        with self.assertNumQueries(len(SOURCES)):
+            chronologie(self.enfant, limite=2)
+        sans_finances = [nom for nom in SOURCES if nom != 'transaction']
+        evenements, _pages = self._parcourir(3, sources=sans_finances)
+        self.assertNotIn('transaction', {evenement['type'] for evenement in evenements})
+        self.assertEqual(len(evenements), 10)
+
+    def test_curseur_invalide(self):
+        for curseur in ('%%%', _encoder_curseur({'inconnue': (date(2024, 1, 1), 1)}), _encoder_curseur({'note': ('x', 1)})):
+            with self.subTest(curseur=curseur), self.assertRaises(CurseurInvalide):
+                chronologie(self.enfant, curseur=curseur)
+
+    def test_vue(self):
+        self.client.force_login(self.agent)
+        url = reverse('enfants_gestion:enfant_timeline', args=[self.enfant.pk])
+        page = self.client.get(url, {'limite': 6}).json()
+        suite = self.client.get(url, {'limite': 6, 'apres': page['suivant']}).json()
+        self.assertIsNone(suite['suivant'])
+        # Sans permission sur les finances, les versements ne sont pas listés
+        self.assertEqual(len(page['evenements']) + len(suite['evenements']), 10)
+        self.assertEqual(self.client.get(url, {'apres': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limite': 'dix'}).status_code, 400)
+
+        autre = Enfant.objects.create(
+            site=SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays'), nom='Nom', prenom='Prénom',
+            sexe='F', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+        self.assertEqual(self.client.get(reverse('enfants_gestion:enfant_timeline', args=[autre.pk])).status_code, 404)
+
+
+class IconesTests(SimpleTestCase):
+
+    def test_symbole_de_la_planche(self):
+        self.assertHTMLEqual(
+            icone('coeur', 'w-6 h-6'),
+            f'<svg class="w-6 h-6" aria-hidden="true"><use href="{static("img/icones.svg")}#coeur"></use></svg>',
+        )
+        with open(os.path.join(settings.BASE_DIR, 'static', 'img', 'icones.svg')) as planche:
+            self.assertIn('id="coeur"', planche.read())
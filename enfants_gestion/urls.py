@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import EnfantListView, EnfantDetailView, EnfantCreateView, EnfantUpdateView, SuiviMedicalCreateView, SuiviScolaireCreateView, SuiviMedicalUpdateView, SuiviMedicalDeleteView, SuiviScolaireUpdateView, SuiviScolaireDeleteView, EnfantHistoryDetailView, EnfantHistoryListView, EnfantDeleteView, ReportView, DownloadExportView
+from .views import EnfantListView, EnfantDetailView, EnfantCreateView, EnfantUpdateView, SuiviMedicalCreateView, SuiviScolaireCreateView, SuiviMedicalUpdateView, SuiviMedicalDeleteView, SuiviScolaireUpdateView, SuiviScolaireDeleteView, EnfantHistoryDetailView, EnfantHistoryListView, EnfantDeleteView, ReportView, DownloadExportView, EnfantImportView, DocumentFichierView, EnfantPhotoView, DocumentSearchView, EnfantTimelineView
 
 app_name = 'enfants_gestion'
 
@@ -22,12 +22,20 @@ urlpatterns = [
     path('suivi-scolaire/<int:pk>/supprimer/', SuiviScolaireDeleteView.as_view(), name='suivi_scolaire_delete'),
     path('historique/<int:pk>/', EnfantHistoryDetailView.as_view(), name='enfant_history_detail'),
     path('<int:pk>/historique/', EnfantHistoryListView.as_view(), name='enfant_history_list'),
+    path('<int:pk>/chronologie/', EnfantTimelineView.as_view(), name='enfant_timeline'),
 
     # ===================== IMPORT / EXPORT ===================
     # MODIFIEZ CETTE LIGNE
     path('export/', ReportView.as_view(), name='enfant_export'),
     # AJOUTEZ CETTE LIGNE
     path('export/download/', DownloadExportView.as_view(), name='enfant_download_export'),
+    path('import/', EnfantImportView.as_view(), name='enfant_import'),
+
+    # ===================== FICHIERS PROTÉGÉS ===================
+    path('<int:pk>/photo/', EnfantPhotoView.as_view(), name='enfant_photo'),
+    path('<int:pk>/photo/<int:taille>/', EnfantPhotoView.as_view(), name='enfant_photo_miniature'),
+    path('documents/<int:pk>/fichier/', DocumentFichierView.as_view(), name='document_fichier'),
+    path('documents/recherche/', DocumentSearchView.as_view(), name='document_search'),
 
     # Nous ajouterons les autres URLs (détail, création, etc.) ici plus tard
 ]
\ No newline at end of file
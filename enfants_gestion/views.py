@@ -1,23 +1,42 @@
 # =======================================================================
 # IMPORTS
 # =======================================================================
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.db import transaction
-from django.http import HttpResponse
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
 from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from urllib.parse import urlencode
+from datetime import date
+import os
 
-from .models import Enfant, SuiviMedical, SuiviScolaire, Document
+from .models import Enfant, SuiviMedical, SuiviScolaire, Document, HistoriqueEnfantArchive
 from .forms import (
     EnfantForm, DocumentFormSet, SuiviMedicalForm,
-    SuiviScolaireForm, ExportFilterForm
+    SuiviScolaireForm, ExportFilterForm, ImportEnfantsForm
 )
+from .chronologie import chronologie, sources_visibles, CurseurInvalide, TAILLE_PAGE, TAILLE_PAGE_MAX
+from .extraction import rechercher_documents, DEBUT_SURLIGNAGE, FIN_SURLIGNAGE
+from .historique import reconstruire_version
+from .importation import (
+    abandonner_en_attente, analyser_import, appliquer_import, lire_fichier, mettre_en_attente,
+    reprendre_en_attente, FichierImportInvalide
+)
+from .medias import servir_fichier
+from .miniatures import miniature
 from .resources import EnfantResource
+from config.base_donnees import RepriseEcritureMixin
+from config.cache import portee
+from config.routers import RepliqueLectureMixin
 from sites_gestion.models import SiteOrphelinat
+from sites_gestion.registre import site_par_id, tous_les_sites
 
 
 # =======================================================================
@@ -33,7 +52,7 @@ class EnfantListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
 
     def get_queryset(self):
         user = self.request.user
-        base_queryset = Enfant.objects.filter(is_active=True).select_related('site')
+        base_queryset = Enfant.objects.select_related('site', 'suivi_scolaire_actuel')
         site_id_from_url = self.request.GET.get('site')
 
         # 1. Déterminer la liste complète des sites auxquels l'utilisateur a droit
@@ -47,8 +66,12 @@ class EnfantListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
 
         # 2. Si un site spécifique est demandé dans l'URL (via le filtre)
         if site_id_from_url:
-            # On vérifie d'abord si l'utilisateur a le droit de voir ce site
-            if allowed_sites.filter(pk=site_id_from_url).exists():
+            # On vérifie d'abord si l'utilisateur a le droit de voir ce site (registre en mémoire pour les rôles globaux)
+            if user.is_superuser or is_global_role:
+                site_autorise = site_par_id(site_id_from_url) is not None
+            else:
+                site_autorise = allowed_sites.filter(pk=site_id_from_url).exists()
+            if site_autorise:
                 # Si oui, on filtre la liste des enfants par ce site unique
                 return base_queryset.filter(site__id=site_id_from_url).order_by('nom', 'prenom')
             else:
@@ -71,10 +94,12 @@ class EnfantListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         
         show_filter = user.is_superuser or is_global_role or is_multi_site_user
         context['show_site_filter'] = show_filter
+        # Clé des fragments mis en cache (menu des sites, tableau des enfants)
+        context['portee_cache'] = portee(user, user.is_superuser or is_global_role)
 
         if show_filter:
             if user.is_superuser or is_global_role:
-                context['sites_for_filter'] = SiteOrphelinat.objects.all()
+                context['sites_for_filter'] = tous_les_sites()
             else:
                 context['sites_for_filter'] = user.sites.all()
             
@@ -91,13 +116,17 @@ class EnfantDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Enfant.objects.prefetch_related('documents', 'suivis_medicaux', 'suivis_scolaires')
+        queryset = Enfant.objects.select_related('dernier_suivi_medical', 'suivi_scolaire_actuel').prefetch_related(
+            'documents',
+            Prefetch('suivis_medicaux', queryset=SuiviMedical.objects.all()),
+            Prefetch('suivis_scolaires', queryset=SuiviScolaire.objects.all()),
+        )
         is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
         if user.is_superuser or is_global_role:
             return queryset
         return queryset.filter(site__in=user.sites.all())
 
-class EnfantCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class EnfantCreateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = Enfant
     form_class = EnfantForm
     template_name = 'enfants_gestion/enfant_form.html'
@@ -138,8 +167,9 @@ class EnfantCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
             self.get_context_data(form=form, document_formset=document_formset)
         )
 
-class EnfantUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class EnfantUpdateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     model = Enfant
+    queryset = Enfant.objects.all()
     form_class = EnfantForm
     template_name = 'enfants_gestion/enfant_form.html'
     permission_required = 'enfants_gestion.change_enfant'
@@ -190,7 +220,7 @@ class EnfantDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = 'enfants_gestion.delete_enfant'
     
     def post(self, request, *args, **kwargs):
-        enfant = get_object_or_404(Enfant, pk=kwargs['pk'])
+        enfant = get_object_or_404(Enfant.objects, pk=kwargs['pk'])
         can_delete = False
         user = request.user
         is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
@@ -211,7 +241,7 @@ class EnfantDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
 # VUES CONCERNANT LE MODÈLE SUIVI MEDICAL
 # =======================================================================
 
-class SuiviMedicalCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class SuiviMedicalCreateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = SuiviMedical
     form_class = SuiviMedicalForm
     template_name = 'enfants_gestion/related_item_form.html'
@@ -219,20 +249,21 @@ class SuiviMedicalCreateView(LoginRequiredMixin, PermissionRequiredMixin, Create
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['enfant'] = get_object_or_404(Enfant, pk=self.kwargs['pk'])
+        context['enfant'] = get_object_or_404(Enfant.objects, pk=self.kwargs['pk'])
         context['view_title'] = "Ajouter un Suivi Médical pour"
-        context['icon_svg'] = """<svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke-width="1.5" stroke="currentColor" class="w-6 h-6 mr-2 text-red-500"><path stroke-linecap="round" stroke-linejoin="round" d="M21 8.25c0-2.485-2.099-4.5-4.688-4.5-1.935 0-3.597 1.126-4.312 2.733-.715-1.607-2.377-2.733-4.313-2.733C5.1 3.75 3 5.765 3 8.25c0 7.22 9 12 9 12s9-4.78 9-12z" /></svg>"""
+        context['icone'] = 'coeur'
+        context['icone_classes'] = 'w-6 h-6 mr-2 text-red-500'
         return context
 
     def form_valid(self, form):
-        form.instance.enfant = get_object_or_404(Enfant, pk=self.kwargs['pk'])
+        form.instance.enfant = get_object_or_404(Enfant.objects, pk=self.kwargs['pk'])
         messages.success(self.request, "La nouvelle entrée du suivi médical a été ajoutée.")
         return super().form_valid(form)
     
     def get_success_url(self):
         return reverse_lazy('enfants_gestion:enfant_detail', kwargs={'pk': self.kwargs['pk']})
 
-class SuiviMedicalUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class SuiviMedicalUpdateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     model = SuiviMedical
     form_class = SuiviMedicalForm
     template_name = 'enfants_gestion/related_item_form.html'
@@ -242,7 +273,8 @@ class SuiviMedicalUpdateView(LoginRequiredMixin, PermissionRequiredMixin, Update
         context = super().get_context_data(**kwargs)
         context['enfant'] = self.object.enfant
         context['view_title'] = "Modifier le Suivi Médical pour"
-        context['icon_svg'] = """<svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke-width="1.5" stroke="currentColor" class="w-6 h-6 mr-2 text-red-500"><path stroke-linecap="round" stroke-linejoin="round" d="M21 8.25c0-2.485-2.099-4.5-4.688-4.5-1.935 0-3.597 1.126-4.312 2.733-.715-1.607-2.377-2.733-4.313-2.733C5.1 3.75 3 5.765 3 8.25c0 7.22 9 12 9 12s9-4.78 9-12z" /></svg>"""
+        context['icone'] = 'coeur'
+        context['icone_classes'] = 'w-6 h-6 mr-2 text-red-500'
         return context
 
     def get_queryset(self):
@@ -261,7 +293,7 @@ class SuiviMedicalDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = 'enfants_gestion.delete_suivimedical'
 
     def post(self, request, *args, **kwargs):
-        suivi = get_object_or_404(SuiviMedical, pk=kwargs['pk'])
+        suivi = get_object_or_404(SuiviMedical.objects, pk=kwargs['pk'])
         can_delete = False
         user = request.user
         is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
@@ -282,7 +314,7 @@ class SuiviMedicalDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
 # VUES CONCERNANT LE MODÈLE SUIVI SCOLAIRE
 # =======================================================================
 
-class SuiviScolaireCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class SuiviScolaireCreateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = SuiviScolaire
     form_class = SuiviScolaireForm
     template_name = 'enfants_gestion/related_item_form.html'
@@ -290,20 +322,21 @@ class SuiviScolaireCreateView(LoginRequiredMixin, PermissionRequiredMixin, Creat
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['enfant'] = get_object_or_404(Enfant, pk=self.kwargs['pk'])
+        context['enfant'] = get_object_or_404(Enfant.objects, pk=self.kwargs['pk'])
         context['view_title'] = "Ajouter un Suivi Scolaire pour"
-        context['icon_svg'] = """<svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke-width="1.5" stroke="currentColor" class="w-6 h-6 mr-2 text-sky-500"><path stroke-linecap="round" stroke-linejoin="round" d="M4.26 10.147a60.436 60.436 0 00-.491 6.347A48.627 48.627 0 0112 20.904a48.627 48.627 0 018.232-4.41 60.46 60.46 0 00-.491-6.347m-15.482 0a50.57 50.57 0 00-2.658-.813A59.905 59.905 0 0112 3.493a59.905 59.905 0 0110.399 5.84c-.896.248-1.783.52-2.658.814m-15.482 0l-.07.003-.02.001-.044.002-.087.004-.176.008a51.994 51.994 0 00-2.299 1.25c-.12.08-.235.166-.346.257m15.482 0l.07.003.02.001.044.002.087.004.176.008a51.994 51.994 0 012.299 1.25c.12.08.235.166.346.257m0 0a48.627 48.627 0 01-10.399-5.84a50.57 50.57 0 01-2.658.813m15.482 0a50.57 50.57 0 002.658.813a59.905 59.905 0 00-10.399-5.84a59.905 59.905 0 00-10.399 5.84c.896-.248 1.783-.52 2.658-.814m15.482 0l-.07-.003-.02-.001-.044-.002-.087-.004-.176-.008a51.994 51.994 0 00-2.299-1.25c-.12-.08-.235-.166-.346-.257m-15.482 0l.07-.003.02-.001.044-.002.087-.004.176-.008a51.994 51.994 0 01-2.299-1.25c-.12-.08-.235-.166-.346-.257m0 0a48.627 48.627 0 0010.399 5.84a50.57 50.57 0 002.658-.813m-15.482 0a50.57 50.57 0 012.658-.813m12.823 0l-12.823 0" /></svg>"""
+        context['icone'] = 'ecole'
+        context['icone_classes'] = 'w-6 h-6 mr-2 text-sky-500'
         return context
 
     def form_valid(self, form):
-        form.instance.enfant = get_object_or_404(Enfant, pk=self.kwargs['pk'])
+        form.instance.enfant = get_object_or_404(Enfant.objects, pk=self.kwargs['pk'])
         messages.success(self.request, "La nouvelle entrée du suivi scolaire a été ajoutée.")
         return super().form_valid(form)
 
     def get_success_url(self):
         return reverse_lazy('enfants_gestion:enfant_detail', kwargs={'pk': self.kwargs['pk']})
 
-class SuiviScolaireUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class SuiviScolaireUpdateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     model = SuiviScolaire
     form_class = SuiviScolaireForm
     template_name = 'enfants_gestion/related_item_form.html'
@@ -313,7 +346,8 @@ class SuiviScolaireUpdateView(LoginRequiredMixin, PermissionRequiredMixin, Updat
         context = super().get_context_data(**kwargs)
         context['enfant'] = self.object.enfant
         context['view_title'] = "Modifier le Suivi Scolaire pour"
-        context['icon_svg'] = """<svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke-width="1.5" stroke="currentColor" class="w-6 h-6 mr-2 text-sky-500"><path stroke-linecap="round" stroke-linejoin="round" d="M4.26 10.147a60.436 60.436 0 00-.491 6.347A48.627 48.627 0 0112 20.904a48.627 48.627 0 018.232-4.41 60.46 60.46 0 00-.491-6.347m-15.482 0a50.57 50.57 0 00-2.658-.813A59.905 59.905 0 0112 3.493a59.905 59.905 0 0110.399 5.84c-.896.248-1.783.52-2.658.814m-15.482 0l-.07.003-.02.001-.044.002-.087.004-.176.008a51.994 51.994 0 00-2.299 1.25c-.12.08-.235.166-.346.257m15.482 0l.07.003.02.001.044.002.087.004.176.008a51.994 51.994 0 012.299 1.25c.12.08.235.166.346.257m0 0a48.627 48.627 0 01-10.399-5.84a50.57 50.57 0 01-2.658.813m15.482 0a50.57 50.57 0 002.658.813a59.905 59.905 0 00-10.399-5.84a59.905 59.905 0 00-10.399 5.84c.896-.248 1.783-.52 2.658-.814m15.482 0l-.07-.003-.02-.001-.044-.002-.087-.004-.176-.008a51.994 51.994 0 00-2.299-1.25c-.12-.08-.235-.166-.346-.257m-15.482 0l.07-.003.02-.001.044-.002.087-.004.176-.008a51.994 51.994 0 01-2.299-1.25c-.12-.08-.235-.166-.346-.257m0 0a48.627 48.627 0 0010.399 5.84a50.57 50.57 0 002.658-.813m-15.482 0a50.57 50.57 0 012.658-.813m12.823 0l-12.823 0" /></svg>"""
+        context['icone'] = 'ecole'
+        context['icone_classes'] = 'w-6 h-6 mr-2 text-sky-500'
         return context
 
     def get_queryset(self):
@@ -332,7 +366,7 @@ class SuiviScolaireDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View)
     permission_required = 'enfants_gestion.delete_suiviscolaire'
 
     def post(self, request, *args, **kwargs):
-        suivi = get_object_or_404(SuiviScolaire, pk=kwargs['pk'])
+        suivi = get_object_or_404(SuiviScolaire.objects, pk=kwargs['pk'])
         can_delete = False
         user = request.user
         is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
@@ -353,7 +387,7 @@ class SuiviScolaireDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View)
 # VUES D'HISTORIQUE ET D'EXPORT
 # =======================================================================
 
-class EnfantHistoryDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+class EnfantHistoryDetailView(LoginRequiredMixin, PermissionRequiredMixin, RepliqueLectureMixin, DetailView):
     model = Enfant.history.model
     template_name = 'enfants_gestion/enfant_history_detail.html'
     context_object_name = 'historical_enfant'
@@ -367,7 +401,25 @@ class EnfantHistoryDetailView(LoginRequiredMixin, PermissionRequiredMixin, Detai
             return queryset
         return queryset.filter(site__in=user.sites.all())
 
-class EnfantHistoryListView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            pass
+
+        # La version n'est plus dans la table d'historique : on la reconstruit depuis l'archive
+        try:
+            version = reconstruire_version(self.kwargs['pk'])
+        except self.model.DoesNotExist:
+            raise Http404("Version introuvable.")
+
+        user = self.request.user
+        is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
+        if not (user.is_superuser or is_global_role) and not user.sites.filter(pk=version.site_id).exists():
+            raise Http404("Version introuvable.")
+        return version
+
+class EnfantHistoryListView(LoginRequiredMixin, PermissionRequiredMixin, RepliqueLectureMixin, DetailView):
     model = Enfant
     template_name = 'enfants_gestion/enfant_history_list.html'
     context_object_name = 'enfant'
@@ -375,20 +427,29 @@ class EnfantHistoryListView(LoginRequiredMixin, PermissionRequiredMixin, DetailV
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Enfant.objects.prefetch_related('history__history_user')
+        queryset = Enfant.all_objects.all()
         is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
         if user.is_superuser or is_global_role:
             return queryset
         return queryset.filter(site__in=user.sites.all())
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # `history` n'est pas une relation : prefetch_related() ne s'y applique pas
+        context['historique'] = self.object.history.select_related('history_user')
+        context['nombre_versions_archivees'] = HistoriqueEnfantArchive.objects.filter(enfant_id=self.object.pk).count()
+        return context
+
 # =======================================================================
 # VUES POUR LES RAPPORTS ET EXPORTS
 # =======================================================================
 
-class ReportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+class ReportView(LoginRequiredMixin, PermissionRequiredMixin, RepliqueLectureMixin, View):
     form_class = ExportFilterForm
     template_name = 'enfants_gestion/export_page.html'
     permission_required = 'enfants_gestion.view_enfant'
+    # Le POST n'affiche qu'un aperçu
+    methodes_replique = ('GET', 'HEAD', 'POST')
 
     def get_queryset(self, user, filter_data):
         """
@@ -398,14 +459,14 @@ class ReportView(LoginRequiredMixin, PermissionRequiredMixin, View):
         # 1. Définir le périmètre de base en fonction des permissions
         is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
         if user.is_superuser or is_global_role:
-            queryset = Enfant.objects.all()
+            queryset = Enfant.all_objects.all()
             # Un utilisateur global peut en plus filtrer par site
             site_id = filter_data.get('site')
             if site_id:
                 queryset = queryset.filter(site__id=site_id)
         else:
             # Un utilisateur local ne voit que les données de ses sites
-            queryset = Enfant.objects.filter(site__in=user.sites.all())
+            queryset = Enfant.all_objects.filter(site__in=user.sites.all())
         
         # 2. Appliquer les filtres du formulaire
         statut = filter_data.get('statut')
@@ -423,7 +484,7 @@ class ReportView(LoginRequiredMixin, PermissionRequiredMixin, View):
             queryset = queryset.filter(date_arrivee__lte=date_fin)
             
         # 3. Optimiser la requête
-        return queryset.select_related('site').order_by('nom')
+        return queryset.select_related('site', 'dernier_suivi_medical', 'suivi_scolaire_actuel').order_by('nom')
 
     def get(self, request, *args, **kwargs):
         # Affiche le formulaire de filtres initial
@@ -478,4 +539,223 @@ class DownloadExportView(ReportView): # Hérite de ReportView pour réutiliser g
             response = HttpResponse(dataset.csv, content_type='text/csv')
             response['Content-Disposition'] = 'attachment; filename="export_enfants.csv"'
         
-        return response
\ No newline at end of file
+        return response
+
+
+class EnfantImportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Import en masse : le premier envoi analyse le fichier et affiche l'aperçu
+    (simulation), le second (avec le jeton) enregistre les lignes valides.
+    """
+    form_class = ImportEnfantsForm
+    template_name = 'enfants_gestion/enfant_import.html'
+    permission_required = 'enfants_gestion.add_enfant'
+    cle_session = 'import_enfants'
+    lignes_apercu = 200
+
+    def get_sites(self):
+        user = self.request.user
+        is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
+        if user.is_superuser or is_global_role:
+            return SiteOrphelinat.objects.all()
+        return user.sites.all()
+
+    def get_form(self, *args):
+        return self.form_class(
+            *args, sites=self.get_sites(), peut_modifier=self.request.user.has_perm('enfants_gestion.change_enfant'),
+        )
+
+    def analyser(self, contenu, format_fichier, site_id):
+        sites = list(self.get_sites())
+        site_defaut = next((site for site in sites if site.pk == site_id), None)
+        if site_defaut is None and len(sites) == 1:
+            site_defaut = sites[0]
+        return analyser_import(lire_fichier(contenu, format_fichier), sites, site_defaut)
+
+    def get(self, request, *args, **kwargs):
+        return render(request, self.template_name, {'form': self.get_form()})
+
+    def abandonner(self, request):
+        en_attente = request.session.pop(self.cle_session, None)
+        if en_attente:
+            abandonner_en_attente(en_attente['jeton'], en_attente['format'])
+
+    def post(self, request, *args, **kwargs):
+        if 'annuler' in request.POST:
+            self.abandonner(request)
+            messages.info(request, "Import annulé.")
+            return redirect('enfants_gestion:enfant_import')
+        if 'jeton' in request.POST:
+            return self.confirmer(request)
+
+        form = self.get_form(request.POST, request.FILES)
+        if not form.is_valid():
+            return render(request, self.template_name, {'form': form})
+
+        fichier = form.cleaned_data['fichier']
+        format_fichier = os.path.splitext(fichier.name)[1].lower().lstrip('.')
+        site = form.cleaned_data.get('site')
+        contenu = fichier.read()
+        try:
+            rapport = self.analyser(contenu, format_fichier, site.pk if site else None)
+        except FichierImportInvalide as erreur:
+            form.add_error('fichier', str(erreur))
+            return render(request, self.template_name, {'form': form})
+
+        mettre_a_jour = form.cleaned_data.get('mettre_a_jour', False)
+        # Un nouvel envoi remplace l'import en attente de la session
+        self.abandonner(request)
+        jeton = mettre_en_attente(contenu, format_fichier)
+        request.session[self.cle_session] = {
+            'jeton': jeton,
+            'format': format_fichier,
+            'nom': fichier.name,
+            'site_id': site.pk if site else None,
+            'mettre_a_jour': mettre_a_jour,
+        }
+        lignes = [ligne for ligne in rapport['lignes'] if ligne['action'] != 'inchange']
+        context = {
+            'rapport': rapport,
+            'lignes': lignes[:self.lignes_apercu],
+            'lignes_masquees': max(0, len(lignes) - self.lignes_apercu),
+            'jeton': jeton,
+            'nom_fichier': fichier.name,
+            'mettre_a_jour': mettre_a_jour,
+        }
+        return render(request, 'enfants_gestion/enfant_import_preview.html', context)
+
+    def confirmer(self, request):
+        en_attente = request.session.get(self.cle_session)
+        if not en_attente or en_attente['jeton'] != request.POST.get('jeton'):
+            self.abandonner(request)
+            messages.error(request, "Cet import a expiré. Veuillez renvoyer le fichier.")
+            return redirect('enfants_gestion:enfant_import')
+        try:
+            contenu = reprendre_en_attente(en_attente['jeton'], en_attente['format'], supprimer=True)
+            # Nouvelle analyse : la base a pu changer depuis l'aperçu
+            rapport = self.analyser(contenu, en_attente['format'], en_attente['site_id'])
+        except FichierImportInvalide as erreur:
+            messages.error(request, str(erreur))
+            return redirect('enfants_gestion:enfant_import')
+        finally:
+            del request.session[self.cle_session]
+
+        # Le droit de modification est vérifié à nouveau : il a pu être retiré depuis l'aperçu
+        mettre_a_jour = en_attente['mettre_a_jour'] and request.user.has_perm('enfants_gestion.change_enfant')
+        resultat = appliquer_import(rapport, utilisateur=request.user, mettre_a_jour=mettre_a_jour)
+        messages.success(
+            request,
+            f"Import de « {en_attente['nom']} » terminé : {resultat['crees']} dossier(s) créé(s), "
+            f"{resultat['modifies']} mis à jour."
+        )
+        return redirect('enfants_gestion:enfant_list')
+
+
+# =======================================================================
+# RECHERCHE DANS LE CONTENU DES DOCUMENTS
+# =======================================================================
+
+class DocumentSearchView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    template_name = 'enfants_gestion/document_search.html'
+    permission_required = 'enfants_gestion.view_enfant'
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        recherche = request.GET.get('q', '').strip()
+
+        is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
+        site_ids = None if (user.is_superuser or is_global_role) else list(user.sites.values_list('pk', flat=True))
+
+        resultats = []
+        if recherche:
+            trouves = rechercher_documents(recherche, site_ids=site_ids)
+            documents = Document.objects.filter(enfant__is_active=True).select_related('enfant__site').in_bulk(
+                [document_id for document_id, _ in trouves]
+            )
+            for document_id, extrait in trouves:
+                document = documents.get(document_id)
+                # L'index peut avoir un passage de retard sur un transfert de site ou un archivage : on revérifie
+                if document is None or (site_ids is not None and document.enfant.site_id not in site_ids):
+                    continue
+                extrait = escape(extrait).replace(DEBUT_SURLIGNAGE, '<mark>').replace(FIN_SURLIGNAGE, '</mark>')
+                resultats.append({'document': document, 'extrait': mark_safe(extrait)})
+
+        return render(request, self.template_name, {'recherche': recherche, 'resultats': resultats})
+
+
+# =======================================================================
+# VUES DE TÉLÉCHARGEMENT DES FICHIERS PROTÉGÉS
+# =======================================================================
+
+class FichierProtegeMixin(LoginRequiredMixin, PermissionRequiredMixin):
+    """Vérifie que l'utilisateur a accès au site de l'enfant avant d'envoyer un fichier."""
+    permission_required = 'enfants_gestion.view_enfant'
+
+    def verifier_site(self, site_id):
+        user = self.request.user
+        is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
+        if not (user.is_superuser or is_global_role) and not user.sites.filter(pk=site_id).exists():
+            raise Http404("Fichier introuvable.")
+
+
+class DocumentFichierView(FichierProtegeMixin, View):
+
+    def get(self, request, *args, **kwargs):
+        document = get_object_or_404(Document.objects.select_related('enfant'), pk=kwargs['pk'])
+        self.verifier_site(document.enfant.site_id)
+        if not document.fichier:
+            raise Http404("Fichier introuvable.")
+        nom_telechargement = f"{document.get_type_document_display()}{os.path.splitext(document.fichier.name)[1]}"
+        return servir_fichier(request, document.fichier.storage, document.fichier.name, nom_telechargement)
+
+
+class EnfantPhotoView(FichierProtegeMixin, View):
+
+    def get(self, request, *args, **kwargs):
+        # Les dossiers archivés restent consultables dans l'historique
+        enfant = get_object_or_404(Enfant.all_objects, pk=kwargs['pk'])
+        self.verifier_site(enfant.site_id)
+        if not enfant.photo:
+            raise Http404("Photo introuvable.")
+
+        nom = enfant.photo.name
+        taille = kwargs.get('taille')
+        if taille is not None:
+            if taille not in settings.MINIATURES_TAILLES:
+                raise Http404("Taille de miniature inconnue.")
+            nom = miniature(enfant.photo, taille)
+        # Les URL des gabarits sont versionnées (?v=...) : elles changent avec la photo
+        return servir_fichier(request, enfant.photo.storage, nom, cache_immuable='v' in request.GET)
+
+
+# =======================================================================
+# CHRONOLOGIE DU DOSSIER (API JSON)
+# =======================================================================
+
+class EnfantTimelineView(LoginRequiredMixin, PermissionRequiredMixin, RepliqueLectureMixin, View):
+    """
+    Événements du dossier du plus récent au plus ancien, par pages de `limite`.
+    La page suivante s'obtient en repassant le curseur `suivant` dans le paramètre `apres`.
+    """
+    permission_required = 'enfants_gestion.view_enfant'
+
+    def get(self, request, pk, *args, **kwargs):
+        user = request.user
+        enfants = Enfant.objects.all()
+        is_global_role = user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
+        if not (user.is_superuser or is_global_role):
+            enfants = enfants.filter(site__in=user.sites.all())
+        enfant = get_object_or_404(enfants, pk=pk)
+
+        try:
+            limite = min(max(int(request.GET.get('limite', TAILLE_PAGE)), 1), TAILLE_PAGE_MAX)
+        except ValueError:
+            return JsonResponse({'error': "Paramètre « limite » invalide."}, status=400)
+        try:
+            evenements, suivant = chronologie(
+                enfant, curseur=request.GET.get('apres'), limite=limite, sources=sources_visibles(user),
+            )
+        except CurseurInvalide as erreur:
+            return JsonResponse({'error': str(erreur)}, status=400)
+
+        return JsonResponse({'evenements': evenements, 'suivant': suivant})
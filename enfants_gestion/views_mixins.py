@@ -13,9 +13,9 @@ class SiteFilteredQuerysetMixin:
     def get_queryset(self):
         user = self.request.user
         
-        # On commence par ne prendre que les objets actifs du modèle de la vue.
+        # On commence par ne prendre que les objets actifs du modèle de la vue (manager `objects`).
         # Le modèle est défini dans la vue elle-même (ex: model = Enfant)
-        queryset = self.model.objects.filter(is_active=True)
+        queryset = self.model.objects.all()
 
         # Définit si l'utilisateur a un rôle global
         is_global_role = user.groups.filter(name__in=self.global_role_groups).exists() and not user.sites.exists()
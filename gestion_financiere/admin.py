@@ -5,3 +5,4 @@ from .models import *
 admin.site.register(CompteFinancier)
 admin.site.register(Parrainage)
 
+admin.site.register(Paie)
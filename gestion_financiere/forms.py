@@ -1,7 +1,9 @@
 from django import forms
+from django.db.models import Q
 from .models import Transaction, CompteFinancier, Parrainage, Enfant
 from utilisateurs.models import CustomUser
 from sites_gestion.models import SiteOrphelinat
+from sites_gestion.registre import SiteChoiceField
 
 class TransactionForm(forms.ModelForm):
     CATEGORIE_ENTREE_CHOICES = [('', '---------')] + Transaction.CATEGORIE_ENTREE_CHOICES
@@ -34,8 +36,13 @@ class TransactionForm(forms.ModelForm):
         if user and not user.is_superuser:
             sites_autorises = user.sites.all()
         
-        self.fields['compte'].queryset = CompteFinancier.objects.filter(site__in=sites_autorises)
-        self.fields['parrainage_lie'].queryset = Parrainage.objects.filter(enfant__site__in=sites_autorises)
+        # Comptes et parrainages actifs, plus ceux déjà liés à la transaction modifiée (même archivés)
+        self.fields['compte'].queryset = CompteFinancier.all_objects.filter(
+            Q(is_active=True) | Q(pk=self.instance.compte_id), site__in=sites_autorises
+        )
+        self.fields['parrainage_lie'].queryset = Parrainage.all_objects.filter(
+            Q(is_active=True) | Q(pk=self.instance.parrainage_lie_id), enfant__site__in=sites_autorises
+        )
 
         if transaction_type == 'entree':
             self.fields['categorie'].choices = self.CATEGORIE_ENTREE_CHOICES
@@ -58,13 +65,13 @@ class ParrainageForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # On ne propose que les enfants qui n'ont pas de parrainage actif
-        enfants_parraines_ids = Parrainage.objects.filter(is_active=True).values_list('enfant_id', flat=True)
+        enfants_parraines_ids = Parrainage.objects.values_list('enfant_id', flat=True)
         
         # Si on modifie un parrainage existant, on n'exclut pas l'enfant actuel de la liste
         if self.instance and self.instance.pk:
             enfants_parraines_ids = [pk for pk in enfants_parraines_ids if pk != self.instance.enfant.pk]
 
-        self.fields['enfant'].queryset = Enfant.objects.filter(is_active=True).exclude(id__in=enfants_parraines_ids)
+        self.fields['enfant'].queryset = Enfant.objects.exclude(id__in=enfants_parraines_ids)
 
 
 class FinanceExportForm(forms.Form):
@@ -80,4 +87,38 @@ class FinanceExportForm(forms.Form):
     type_donnees = forms.ChoiceField(choices=TYPE_CHOICES, label="Type de données à exporter")
     date_debut = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}), label="Date de début")
     date_fin = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}), label="Date de fin")
-    format_fichier = forms.ChoiceField(choices=FORMAT_CHOICES, label="Format du fichier")
\ No newline at end of file
+    format_fichier = forms.ChoiceField(choices=FORMAT_CHOICES, label="Format du fichier")
+
+class PaieForm(forms.Form):
+    site = SiteChoiceField(
+        queryset=SiteOrphelinat.objects.none(), label="Site",
+        widget=forms.Select(attrs={'class': 'select select-bordered select-sm w-full'}),
+    )
+    compte = forms.ModelChoiceField(
+        queryset=CompteFinancier.objects.none(), label="Compte débité",
+        widget=forms.Select(attrs={'class': 'select select-bordered select-sm w-full'}),
+    )
+    periode = forms.DateField(
+        label="Mois payé", input_formats=['%Y-%m'],
+        widget=forms.DateInput(attrs={'type': 'month', 'class': 'input input-bordered input-sm w-full'}, format='%Y-%m'),
+    )
+    date_paiement = forms.DateField(
+        label="Date du paiement",
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'input input-bordered input-sm w-full'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user')
+        super().__init__(*args, **kwargs)
+        sites_autorises = SiteOrphelinat.objects.all()
+        if not (user.is_superuser or user.is_comptable_central):
+            sites_autorises = user.sites.all()
+        self.fields['site'].queryset = sites_autorises
+        self.fields['compte'].queryset = CompteFinancier.objects.filter(site__in=sites_autorises).select_related('site')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        site, compte = cleaned_data.get('site'), cleaned_data.get('compte')
+        if site and compte and compte.site_id != site.pk:
+            self.add_error('compte', "Ce compte n'appartient pas au site choisi.")
+        return cleaned_data
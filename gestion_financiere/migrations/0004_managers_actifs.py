@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:29
+
+import django.db.models.manager
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enfants_gestion', '0007_managers_actifs'),
+        ('gestion_financiere', '0003_alter_parrainage_date_fin'),
+        ('sites_gestion', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comptefinancier',
+            options={'default_manager_name': 'all_objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='parrainage',
+            options={'default_manager_name': 'all_objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='transaction',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-date_transaction']},
+        ),
+        migrations.AlterModelManagers(
+            name='comptefinancier',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='parrainage',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='transaction',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='comptefinancier',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['site'], name='compte_actif_site_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parrainage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['enfant'], name='parrainage_actif_enfant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parrainage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-date_debut'], name='parrainage_actif_debut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-date_transaction'], name='transaction_actif_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['compte', 'type_transaction'], name='transaction_actif_compte_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['parrainage_lie', 'type_transaction'], name='transaction_actif_parr_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_financiere', '0004_managers_actifs'),
+        ('gestion_personnel', '0004_managers_actifs'),
+        ('sites_gestion', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='employe',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='salaires', to='gestion_personnel.employe'),
+        ),
+        migrations.CreateModel(
+            name='Paie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periode', models.DateField(help_text='Premier jour du mois.', verbose_name='Mois payé')),
+                ('date_paiement', models.DateField()),
+                ('statut', models.CharField(choices=[('validee', 'Validée'), ('annulee', 'Annulée')], default='validee', max_length=10)),
+                ('nombre_employes', models.PositiveIntegerField(default=0)),
+                ('montant_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_annulation', models.DateTimeField(blank=True, null=True)),
+                ('annulee_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('compte', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='paies', to='gestion_financiere.comptefinancier')),
+                ('cree_par', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='paies', to='sites_gestion.siteorphelinat')),
+            ],
+            options={
+                'ordering': ['-periode', '-pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='paie',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='transactions', to='gestion_financiere.paie'),
+        ),
+        migrations.AddConstraint(
+            model_name='paie',
+            constraint=models.UniqueConstraint(condition=models.Q(('statut', 'validee')), fields=('site', 'periode'), name='paie_site_periode_unique'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.contrib.auth.management import create_permissions
+from django.db import migrations
+
+PERMISSIONS_PAIE = ['view_paie', 'add_paie', 'change_paie']
+ROLES_PAIE = ['Directeur', 'Comptable']
+
+
+def _permissions_paie(apps):
+    # Les permissions ne sont créées qu'après toutes les migrations (post_migrate) :
+    # sur une base neuve, on les crée ici pour pouvoir les attribuer
+    app_config = apps.get_app_config('gestion_financiere')
+    app_config.models_module = True
+    create_permissions(app_config, apps=apps, verbosity=0)
+    app_config.models_module = None
+
+    Permission = apps.get_model('auth', 'Permission')
+    return Permission.objects.filter(content_type__app_label='gestion_financiere', codename__in=PERMISSIONS_PAIE)
+
+
+def ajouter_permissions_paie(apps, schema_editor):
+    """Le Directeur et le Comptable gèrent la paie, comme le reste des finances."""
+    Group = apps.get_model('auth', 'Group')
+    permissions = list(_permissions_paie(apps))
+    for nom in ROLES_PAIE:
+        groupe, created = Group.objects.get_or_create(name=nom)
+        groupe.permissions.add(*permissions)
+
+
+def retirer_permissions_paie(apps, schema_editor):
+    Group = apps.get_model('auth', 'Group')
+    Permission = apps.get_model('auth', 'Permission')
+    permissions = Permission.objects.filter(content_type__app_label='gestion_financiere', codename__in=PERMISSIONS_PAIE)
+    for groupe in Group.objects.filter(name__in=ROLES_PAIE):
+        groupe.permissions.remove(*permissions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_financiere', '0005_paie'),
+        ('utilisateurs', '0005_align_roles_and_groups'),
+    ]
+
+    operations = [
+        migrations.RunPython(ajouter_permissions_paie, retirer_permissions_paie),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from enfants_gestion.managers import ActiveManager
 from enfants_gestion.models import Enfant
 from sites_gestion.models import SiteOrphelinat
 from django.db.models import Sum
@@ -15,6 +16,15 @@ class CompteFinancier(models.Model):
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        default_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['site'], condition=models.Q(is_active=True), name='compte_actif_site_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nom} ({self.site.nom})"
 
@@ -26,6 +36,16 @@ class Parrainage(models.Model):
     date_fin = models.DateField(null=True, blank=True, help_text="Laissez vide si le parrainage est toujours actif.")
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        default_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['enfant'], condition=models.Q(is_active=True), name='parrainage_actif_enfant_idx'),
+            models.Index(fields=['-date_debut'], condition=models.Q(is_active=True), name='parrainage_actif_debut_idx'),
+        ]
+
     def __str__(self):
         return f"Parrainage de {self.enfant} par {self.parrain_nom}"
 
@@ -44,7 +64,11 @@ class Parrainage(models.Model):
         montant_attendu = mois_ecoules * self.montant_mensuel
 
         # CORRECTION : On somme les transactions liées à ce parrainage
-        total_verse = self.transactions.filter(is_active=True, type_transaction='entree').aggregate(total=Sum('montant'))['total'] or 0
+        # (déjà annotée par la liste des parrainages : une requête pour toute la page)
+        if hasattr(self, 'total_verse'):
+            total_verse = self.total_verse or 0
+        else:
+            total_verse = self.transactions.filter(is_active=True, type_transaction='entree').aggregate(total=Sum('montant'))['total'] or 0
 
         difference = total_verse - montant_attendu
 
@@ -55,6 +79,42 @@ class Parrainage(models.Model):
         else:
             return {'statut': 'Partiel', 'couleur': 'warning', 'difference': difference}
 
+class Paie(models.Model):
+    """
+    Paie mensuelle d'un site : un salaire (transaction « Salaires ») par employé payé,
+    créés ensemble par gestion_financiere/paie.py et annulables ensemble.
+    """
+    STATUT_CHOICES = [
+        ('validee', 'Validée'),
+        ('annulee', 'Annulée'),
+    ]
+
+    site = models.ForeignKey(SiteOrphelinat, on_delete=models.PROTECT, related_name='paies')
+    compte = models.ForeignKey(CompteFinancier, on_delete=models.PROTECT, related_name='paies')
+    periode = models.DateField("Mois payé", help_text="Premier jour du mois.")
+    date_paiement = models.DateField()
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default='validee')
+    nombre_employes = models.PositiveIntegerField(default=0)
+    montant_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    cree_par = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    date_creation = models.DateTimeField(auto_now_add=True)
+    annulee_par = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    date_annulation = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-periode', '-pk']
+        constraints = [
+            # Une seule paie validée par site et par mois
+            models.UniqueConstraint(
+                fields=['site', 'periode'], condition=models.Q(statut='validee'), name='paie_site_periode_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Paie {self.periode:%m/%Y} – {self.site.nom}"
+
+
 # NOUVEAU MODÈLE CENTRAL
 class Transaction(models.Model):
     TYPE_CHOICES = [
@@ -86,12 +146,23 @@ class Transaction(models.Model):
     
     # Liens optionnels pour plus de détails
     parrainage_lie = models.ForeignKey(Parrainage, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
+    paie = models.ForeignKey(Paie, on_delete=models.PROTECT, null=True, blank=True, related_name='transactions')
+    employe = models.ForeignKey('gestion_personnel.Employe', on_delete=models.SET_NULL, null=True, blank=True, related_name='salaires')
     
     is_active = models.BooleanField(default=True)
     cree_par = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ['-date_transaction']
+        default_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['-date_transaction'], condition=models.Q(is_active=True), name='transaction_actif_date_idx'),
+            models.Index(fields=['compte', 'type_transaction'], condition=models.Q(is_active=True), name='transaction_actif_compte_idx'),
+            models.Index(fields=['parrainage_lie', 'type_transaction'], condition=models.Q(is_active=True), name='transaction_actif_parr_idx'),
+        ]
 
     def __str__(self):
         prefix = "+" if self.type_transaction == 'entree' else "-"
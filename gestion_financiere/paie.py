@@ -0,0 +1,109 @@
+# gestion_financiere/paie.py
+"""
+Paie mensuelle par site : tous les salaires du mois enregistrés en une opération.
+
+Les employés payés sont les employés actifs affectés au site, avec un salaire
+renseigné, hors bénévoles et hors employés déjà payés pour ce mois (un employé
+affecté à plusieurs sites n'est payé qu'une fois). L'aperçu et la validation
+utilisent la même sélection ; la validation crée la `Paie` puis toutes les
+transactions « Salaires » en un seul `bulk_create`, dans une transaction.
+
+Une paie annulée archive ses transactions (elles restent consultables) et
+libère le mois pour une nouvelle paie.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from gestion_personnel.models import Employe
+from synchronisation.journal import journaliser_lot
+from .models import Paie, Transaction
+
+CATEGORIE_SALAIRES = 'Salaires'
+TAILLE_LOT = 500
+
+
+class PaieImpossible(Exception):
+    pass
+
+
+def employes_a_payer(site, periode):
+    """Employés à payer pour `site` et le mois commençant le `periode`, triés par nom."""
+    affectes = Employe.sites.through.objects.filter(employe_id=OuterRef('pk'), siteorphelinat_id=site.pk)
+    deja_payes = Transaction.objects.filter(
+        employe_id=OuterRef('pk'), paie__periode=periode, paie__statut='validee',
+    )
+    return (
+        Employe.objects.filter(Exists(affectes), salaire__gt=0)
+        .exclude(type_contrat='Benevole')
+        .exclude(Exists(deja_payes))
+        .only('pk', 'nom', 'prenom', 'poste', 'type_contrat', 'salaire')
+        .order_by('nom', 'prenom')
+    )
+
+
+def apercu_paie(site, periode):
+    """Retourne (employes, montant_total, paie_existante) pour l'affichage avant validation."""
+    employes = list(employes_a_payer(site, periode))
+    montant_total = sum((employe.salaire for employe in employes), Decimal('0'))
+    paie_existante = Paie.objects.filter(site=site, periode=periode, statut='validee').first()
+    return employes, montant_total, paie_existante
+
+
+def executer_paie(utilisateur, site, compte, periode, date_paiement, montant_attendu=None):
+    """
+    Crée la paie et ses transactions. `montant_attendu` (le total de l'aperçu) protège
+    contre une fiche modifiée entre l'aperçu et la validation.
+    """
+    deja_validee = f"La paie de {periode:%m/%Y} est déjà validée pour ce site."
+    with transaction.atomic():
+        if Paie.objects.filter(site=site, periode=periode, statut='validee').exists():
+            raise PaieImpossible(deja_validee)
+        employes = list(employes_a_payer(site, periode))
+        if not employes:
+            raise PaieImpossible("Aucun employé salarié à payer pour ce site et ce mois.")
+        montant_total = sum((employe.salaire for employe in employes), Decimal('0'))
+        if montant_attendu is not None and montant_total != montant_attendu:
+            raise PaieImpossible("Les salaires ont changé depuis l'aperçu : vérifiez le nouveau total.")
+
+        try:
+            with transaction.atomic():
+                paie = Paie.objects.create(
+                    site=site, compte=compte, periode=periode, date_paiement=date_paiement,
+                    nombre_employes=len(employes), montant_total=montant_total, cree_par=utilisateur,
+                )
+        except IntegrityError:
+            # Paie du même mois validée en parallèle
+            raise PaieImpossible(deja_validee)
+
+        salaires = Transaction.objects.bulk_create([
+            Transaction(
+                compte=compte, type_transaction='sortie', categorie=CATEGORIE_SALAIRES,
+                montant=employe.salaire, date_transaction=date_paiement,
+                description=f"Salaire {periode:%m/%Y} – {employe.prenom} {employe.nom} ({employe.poste})",
+                paie=paie, employe=employe, cree_par=utilisateur,
+            )
+            for employe in employes
+        ], batch_size=TAILLE_LOT)
+        journaliser_lot(Transaction, salaires, action='creation')
+    return paie
+
+
+def annuler_paie(utilisateur, paie):
+    """Archive les transactions de la paie et la marque comme annulée."""
+    with transaction.atomic():
+        paie = Paie.objects.select_for_update().get(pk=paie.pk)
+        if paie.statut == 'annulee':
+            raise PaieImpossible("Cette paie est déjà annulée.")
+        salaires = list(paie.transactions.filter(is_active=True).only('pk', 'is_active'))
+        Transaction.all_objects.filter(pk__in=[salaire.pk for salaire in salaires]).update(is_active=False)
+        journaliser_lot(Transaction, salaires, action='archivage')
+
+        paie.statut = 'annulee'
+        paie.annulee_par = utilisateur
+        paie.date_annulation = timezone.now()
+        paie.save(update_fields=['statut', 'annulee_par', 'date_annulation'])
+    return paie
+
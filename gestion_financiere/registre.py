@@ -0,0 +1,24 @@
+# gestion_financiere/registre.py
+"""
+Comptes actifs de chaque site, gardés en mémoire (voir RegistreReference dans
+config/cache.py) pour les listes dépendantes site → compte des formulaires.
+"""
+import copy
+
+from django.db import DEFAULT_DB_ALIAS
+
+from config.cache import RegistreReference
+from config.partitions import partition_du_site
+from .models import CompteFinancier
+
+_registre = RegistreReference('gestion_financiere.CompteFinancier')
+
+
+def comptes_du_site(site_id):
+    """Comptes actifs du site, par nom."""
+    site_id = int(site_id)
+
+    def charger():
+        base = partition_du_site(site_id) or DEFAULT_DB_ALIAS
+        return list(CompteFinancier.objects.using(base).filter(site_id=site_id).order_by('nom', 'pk'))
+    return [copy.copy(compte) for compte in _registre.obtenir(site_id, charger)]
@@ -26,6 +26,13 @@ class TransactionResource(resources.ModelResource):
         # On définit l'ordre des colonnes dans le fichier exporté
         export_order = fields
 
+    def filter_export(self, queryset, **kwargs):
+        """
+        Charge avec chaque transaction les relations lues par les colonnes
+        (compte, auteur, parrain et enfant) : une jointure plutôt qu'une requête par ligne.
+        """
+        return super().filter_export(queryset, **kwargs).select_related('compte', 'cree_par', 'parrainage_lie__enfant')
+
     def dehydrate_montant(self, transaction):
         """
         Méthode pour formater le montant : positif pour les entrées, négatif pour les sorties.
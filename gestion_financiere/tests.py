@@ -1,3 +1,220 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from config.requetes import BudgetRequetesMixin
+from config.tests import CACHE_MEMOIRE
+from enfants_gestion.models import Enfant
+from enfants_gestion.tests import completer_enfants
+from gestion_personnel.models import Employe
+from sites_gestion.models import SiteOrphelinat
+from utilisateurs.models import CustomUser
+from .models import CompteFinancier, Paie, Parrainage, Transaction
+from .paie import PaieImpossible, annuler_paie, executer_paie
+from .registre import comptes_du_site
+
+
+class BudgetRequetesFinancesTests(BudgetRequetesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def _completer_comptes(self, volume):
+        existants = CompteFinancier.all_objects.count()
+        CompteFinancier.all_objects.bulk_create(
+            CompteFinancier(site=self.site, nom=f'Compte {numero}') for numero in range(existants, volume)
+        )
+
+    def _completer_transactions(self, volume):
+        self._completer_comptes(2)
+        comptes = list(CompteFinancier.objects.all())
+        existantes = Transaction.all_objects.count()
+        Transaction.all_objects.bulk_create(
+            Transaction(
+                compte=comptes[numero % 2], type_transaction='entree' if numero % 3 else 'sortie',
+                categorie='Don', montant=10 + numero, date_transaction=date(2025, 1 + numero % 12, 1),
+                description=f'Opération {numero}', cree_par=self.admin,
+            )
+            for numero in range(existantes, volume)
+        )
+
+    def _completer_parrainages(self, volume):
+        completer_enfants(self.site, volume)
+        parraines = Parrainage.all_objects.values('enfant_id')
+        Parrainage.all_objects.bulk_create(
+            Parrainage(enfant=enfant, parrain_nom='Parrain', montant_mensuel=30, date_debut=date(2024, 1, 1))
+            for enfant in Enfant.all_objects.exclude(pk__in=parraines)
+        )
+
+    def _completer_transactions_parrainees(self, volume):
+        self._completer_parrainages(volume)
+        self._completer_transactions(volume)
+        transactions = list(Transaction.all_objects.filter(parrainage_lie=None))
+        for transaction, parrainage in zip(transactions, Parrainage.all_objects.filter(transactions=None)):
+            transaction.parrainage_lie = parrainage
+        Transaction.all_objects.bulk_update(transactions, ['parrainage_lie'])
+
+    def test_grand_livre(self):
+        self.assertBudgetRequetes(
+            reverse('gestion_financiere:transaction_list'), 6, self._completer_transactions,
+        )
+
+    def test_parrainages(self):
+        self.assertBudgetRequetes(
+            reverse('gestion_financiere:parrainage_list'), 3, self._completer_parrainages,
+        )
+
+    def test_rapport_financier_transactions(self):
+        self.assertBudgetRequetes(
+            reverse('gestion_financiere:rapport_financier'), 7, self._completer_transactions,
+        )
+
+    def test_rapport_financier_comptes(self):
+        self.assertBudgetRequetes(
+            reverse('gestion_financiere:rapport_financier'), 7, self._completer_comptes,
+        )
+
+    def test_export_transactions(self):
+        self.assertBudgetRequetes(
+            reverse('gestion_financiere:transaction_export') + '?format=csv', 3, self._completer_transactions_parrainees,
+        )
+
+
+class PaieTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        cls.compte_a = CompteFinancier.objects.create(site=cls.site_a, nom='Caisse A')
+        cls.compte_b = CompteFinancier.objects.create(site=cls.site_b, nom='Caisse B')
+        cls.comptable = CustomUser.objects.create_user('comptable', 'comptable@example.org', 'motdepasse')
+        cls.comptable.sites.add(cls.site_a)
+        cls.comptable.user_permissions.add(*Permission.objects.filter(codename__in=['view_paie', 'add_paie', 'change_paie']))
+
+        cls.payes = [
+            cls._creer_employe(cls.site_a, 'Alpha', 100000),
+            cls._creer_employe(cls.site_a, 'Bravo', 150000, type_contrat='CDD'),
+        ]
+        cls._creer_employe(cls.site_a, 'Benevole', 50000, type_contrat='Benevole')
+        cls._creer_employe(cls.site_a, 'Sans salaire', None)
+        cls._creer_employe(cls.site_a, 'Parti', 90000, is_active=False)
+        cls._creer_employe(cls.site_b, 'Autre site', 80000)
+
+    @classmethod
+    def _creer_employe(cls, site, nom, salaire, **champs):
+        employe = Employe.objects.create(
+            nom=nom, prenom='Prénom', poste='Éducateur', date_embauche=date(2020, 1, 1), salaire=salaire, **champs,
+        )
+        employe.sites.add(site)
+        return employe
+
+    def _payer(self, site=None, compte=None):
+        return executer_paie(
+            self.comptable, site or self.site_a, compte or self.compte_a, date(2025, 3, 1), date(2025, 3, 28),
+        )
+
+    def test_une_transaction_par_employe_salarie_actif(self):
+        paie = self._payer()
+        salaires = Transaction.objects.filter(paie=paie)
+        self.assertEqual(sorted(salaires.values_list('employe_id', flat=True)), sorted(e.pk for e in self.payes))
+        self.assertEqual((paie.nombre_employes, paie.montant_total), (2, Decimal('250000')))
+        self.assertTrue(all(s.type_transaction == 'sortie' and s.compte_id == self.compte_a.pk for s in salaires))
+
+    def test_second_passage_du_mois_refuse(self):
+        self._payer()
+        with self.assertRaises(PaieImpossible):
+            self._payer()
+        self.assertEqual(Paie.objects.count(), 1)
+        self.assertEqual(Transaction.objects.filter(categorie='Salaires').count(), 2)
+
+        # Sans la vérification préalable, la contrainte partielle refuse la seconde paie validée
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Paie.objects.create(
+                site=self.site_a, compte=self.compte_a, periode=date(2025, 3, 1), date_paiement=date(2025, 3, 28),
+            )
+
+    def test_annulation_libere_le_mois(self):
+        paie = self._payer()
+        annuler_paie(self.comptable, paie)
+        paie.refresh_from_db()
+        self.assertEqual(paie.statut, 'annulee')
+        self.assertFalse(Transaction.objects.filter(paie=paie).exists())
+        self.assertEqual(Transaction.all_objects.filter(paie=paie).count(), 2)
+        with self.assertRaises(PaieImpossible):
+            annuler_paie(self.comptable, paie)
+
+        nouvelle = self._payer()
+        self.assertEqual(Transaction.objects.filter(paie=nouvelle).count(), 2)
+
+    def test_pas_d_acces_aux_autres_sites(self):
+        paie_b = self._payer(self.site_b, self.compte_b)
+        self.client.force_login(self.comptable)
+
+        response = self.client.get(reverse('gestion_financiere:paie_list'))
+        self.assertNotIn(paie_b, response.context['paies'])
+        self.assertEqual(self.client.get(reverse('gestion_financiere:paie_detail', args=[paie_b.pk])).status_code, 404)
+
+        self.client.post(reverse('gestion_financiere:paie_annuler', args=[paie_b.pk]))
+        paie_b.refresh_from_db()
+        self.assertEqual(paie_b.statut, 'validee')
+
+        response = self.client.post(reverse('gestion_financiere:paie_create'), {
+            'site': self.site_b.pk, 'compte': self.compte_b.pk, 'periode': '2025-04',
+            'date_paiement': '2025-04-28', 'valider': '1', 'montant_attendu': '80000',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('site', response.context['form'].errors)
+        self.assertEqual(Paie.objects.filter(site=self.site_b).count(), 1)
+
+
+@override_settings(CACHES=CACHE_MEMOIRE)
+class RegistreComptesTests(TestCase):
+    """Comptes actifs de chaque site servis par l'API des listes dépendantes, gardés en mémoire."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        cls.caisse = CompteFinancier.objects.create(site=cls.site_a, nom='Caisse')
+        cls.banque = CompteFinancier.objects.create(site=cls.site_a, nom='Banque')
+        CompteFinancier.objects.create(site=cls.site_a, nom='Ancien', is_active=False)
+        CompteFinancier.objects.create(site=cls.site_b, nom='Caisse B')
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+
+    def setUp(self):
+        cache.clear()
+
+    def _noms(self, site):
+        return [compte.nom for compte in comptes_du_site(site.pk)]
+
+    def test_comptes_actifs_par_site_lus_une_fois(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self._noms(self.site_a), ['Banque', 'Caisse'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._noms(self.site_a), ['Banque', 'Caisse'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self._noms(self.site_b), ['Caisse B'])
+
+    def test_archivage_vide_le_registre(self):
+        self._noms(self.site_a)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.banque.is_active = False
+            self.banque.save()
+        self.assertEqual(self._noms(self.site_a), ['Caisse'])
+
+    def test_api_des_comptes(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('gestion_financiere:api_get_comptes_for_site', args=[self.site_a.pk]))
+        self.assertEqual(response.json(), [{'id': self.banque.pk, 'nom': 'Banque'}, {'id': self.caisse.pk, 'nom': 'Caisse'}])
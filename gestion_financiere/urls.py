@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     TransactionListView, EntreeCreateView, SortieCreateView, TransactionUpdateView, TransactionDeleteView,
     ParrainageListView, ParrainageDetailView, ParrainageCreateView, ParrainageUpdateView, ParrainageDeleteView,
+    PaieListView, PaieCreateView, PaieDetailView, PaieAnnulerView,
     RapportFinancierView,
     get_comptes_for_site,
     TransactionExportView # <-- Assurez-vous que cet import est présent
@@ -27,6 +28,12 @@ urlpatterns = [
     path('parrainages/<int:pk>/modifier/', ParrainageUpdateView.as_view(), name='parrainage_update'),
     path('parrainages/<int:pk>/supprimer/', ParrainageDeleteView.as_view(), name='parrainage_delete'),
     
+    # URLs pour la Paie
+    path('paies/', PaieListView.as_view(), name='paie_list'),
+    path('paies/nouvelle/', PaieCreateView.as_view(), name='paie_create'),
+    path('paies/<int:pk>/', PaieDetailView.as_view(), name='paie_detail'),
+    path('paies/<int:pk>/annuler/', PaieAnnulerView.as_view(), name='paie_annuler'),
+
     # URLs pour les Rapports et API
     path('rapports/', RapportFinancierView.as_view(), name='rapport_financier'),
     path('api/get-comptes/<int:site_id>/', get_comptes_for_site, name='api_get_comptes_for_site'),
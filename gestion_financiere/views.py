@@ -1,21 +1,29 @@
 import json
 from datetime import date
+from decimal import Decimal
 from itertools import chain
 from operator import attrgetter
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.db.models import Sum, Q, F
-from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
+from django.db.models import Sum, Q, F, Prefetch
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DetailView
 
-from .models import CompteFinancier, Parrainage, Transaction, Enfant
-from .forms import TransactionForm, ParrainageForm, FinanceExportForm
+from .models import CompteFinancier, Paie, Parrainage, Transaction, Enfant
+from .forms import TransactionForm, ParrainageForm, FinanceExportForm, PaieForm
+from .paie import PaieImpossible, annuler_paie, apercu_paie, executer_paie
+from .registre import comptes_du_site
 from .resources import TransactionResource
-from sites_gestion.models import SiteOrphelinat
+from config.base_donnees import RepriseEcritureMixin
+from config.cache import portee
+from config.partitions import repartir
+from config.routers import RepliqueLectureMixin
+from sites_gestion.registre import site_par_id, tous_les_sites
 
 
 # =======================================================================
@@ -32,7 +40,7 @@ class TransactionListView(LoginRequiredMixin, PermissionRequiredMixin, ListView)
     def get_queryset(self):
         # Cette méthode gère maintenant TOUS les filtres (permissions, site et recherche)
         user = self.request.user
-        queryset = Transaction.objects.filter(is_active=True).select_related('compte', 'cree_par')
+        queryset = Transaction.objects.select_related('compte', 'cree_par')
 
         is_global_finance = (user.is_superuser or user.is_comptable_central)
         if not is_global_finance:
@@ -62,10 +70,11 @@ class TransactionListView(LoginRequiredMixin, PermissionRequiredMixin, ListView)
         is_multi_site_user = user.sites.count() > 1
         show_filter = is_global_finance or is_multi_site_user
         context['show_site_filter'] = show_filter
+        context['portee_cache'] = portee(user, is_global_finance)
 
         if show_filter:
             if is_global_finance:
-                context['sites_for_filter'] = SiteOrphelinat.objects.all()
+                context['sites_for_filter'] = tous_les_sites()
             else:
                 context['sites_for_filter'] = user.sites.all()
             context['selected_site_id'] = self.request.GET.get('site')
@@ -103,7 +112,7 @@ class TransactionListView(LoginRequiredMixin, PermissionRequiredMixin, ListView)
         return self.get(request, *args, **kwargs)
     
 
-class EntreeCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class EntreeCreateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = Transaction
     form_class = TransactionForm
     template_name = 'gestion_financiere/transaction_form.html'
@@ -129,7 +138,7 @@ class EntreeCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
         messages.success(self.request, "L'entrée a été enregistrée avec succès.")
         return super().form_valid(form)
 
-class SortieCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class SortieCreateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = Transaction
     form_class = TransactionForm
     template_name = 'gestion_financiere/transaction_form.html'
@@ -155,8 +164,9 @@ class SortieCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
         messages.success(self.request, "La sortie a été enregistrée avec succès.")
         return super().form_valid(form)
 
-class TransactionUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class TransactionUpdateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     model = Transaction
+    queryset = Transaction.objects.all()
     form_class = TransactionForm
     template_name = 'gestion_financiere/transaction_form.html'
     permission_required = 'gestion_financiere.change_transaction'
@@ -183,7 +193,7 @@ class TransactionDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = 'gestion_financiere.delete_transaction'
 
     def post(self, request, *args, **kwargs):
-        transaction_obj = get_object_or_404(Transaction, pk=kwargs['pk'])
+        transaction_obj = get_object_or_404(Transaction.objects, pk=kwargs['pk'])
         can_delete = False
         user = request.user
         is_global_finance = (user.is_superuser or user.is_comptable_central)
@@ -212,7 +222,10 @@ class ParrainageListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Parrainage.objects.filter(is_active=True).select_related('enfant__site').order_by('-date_debut')
+        queryset = Parrainage.objects.select_related('enfant__site').annotate(
+            # Lu par get_statut_paiement
+            total_verse=Sum('transactions__montant', filter=Q(transactions__is_active=True, transactions__type_transaction='entree')),
+        ).order_by('-date_debut')
         is_global_finance = (user.is_superuser or user.is_comptable_central)
         if is_global_finance:
             return queryset
@@ -226,7 +239,9 @@ class ParrainageDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailVi
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Parrainage.objects.select_related('enfant__site').prefetch_related('transactions__compte')
+        queryset = Parrainage.objects.select_related('enfant__site').prefetch_related(
+            Prefetch('transactions', queryset=Transaction.objects.select_related('compte'))
+        )
         is_global_finance = (user.is_superuser or user.is_comptable_central)
         if is_global_finance:
             return queryset
@@ -260,7 +275,7 @@ class ParrainageDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailVi
             messages.error(request, f"Erreur dans le formulaire de versement : {form.errors.as_text()}")
         return redirect('gestion_financiere:parrainage_detail', pk=self.object.pk)
 
-class ParrainageCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class ParrainageCreateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = Parrainage
     form_class = ParrainageForm
     template_name = 'gestion_financiere/parrainage_form.html'
@@ -271,8 +286,9 @@ class ParrainageCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateVi
         messages.success(self.request, f"Le parrainage pour {form.instance.enfant} a été créé avec succès.")
         return super().form_valid(form)
 
-class ParrainageUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class ParrainageUpdateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     model = Parrainage
+    queryset = Parrainage.objects.all()
     form_class = ParrainageForm
     template_name = 'gestion_financiere/parrainage_form.html'
     permission_required = 'gestion_financiere.change_parrainage'
@@ -295,7 +311,7 @@ class ParrainageDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = 'gestion_financiere.delete_parrainage'
 
     def post(self, request, *args, **kwargs):
-        parrainage = get_object_or_404(Parrainage, pk=kwargs['pk'])
+        parrainage = get_object_or_404(Parrainage.objects, pk=kwargs['pk'])
         can_delete = False
         user = request.user
         is_global_finance = (user.is_superuser or user.is_comptable_central)
@@ -311,56 +327,186 @@ class ParrainageDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
             messages.error(request, "Action non autorisée.")
         return redirect('gestion_financiere:parrainage_list')
 
+# =======================================================================
+# VUES CONCERNANT LA PAIE
+# =======================================================================
+
+class PaieListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+    model = Paie
+    template_name = 'gestion_financiere/paie_list.html'
+    context_object_name = 'paies'
+    permission_required = 'gestion_financiere.view_paie'
+    paginate_by = 25
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Paie.objects.select_related('site', 'compte', 'cree_par')
+        is_global_finance = (user.is_superuser or user.is_comptable_central)
+        if is_global_finance:
+            return queryset
+        return queryset.filter(site__in=user.sites.all())
+
+class PaieCreateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Premier envoi : aperçu des employés à payer et du total. Second envoi (bouton
+    « Valider », même formulaire + total affiché) : création de la paie.
+    """
+    template_name = 'gestion_financiere/paie_form.html'
+    permission_required = 'gestion_financiere.add_paie'
+
+    def get(self, request, *args, **kwargs):
+        form = PaieForm(user=request.user, initial={'periode': date.today().replace(day=1), 'date_paiement': date.today()})
+        return render(request, self.template_name, {'form': form})
+
+    def post(self, request, *args, **kwargs):
+        form = PaieForm(request.POST, user=request.user)
+        if not form.is_valid():
+            return render(request, self.template_name, {'form': form})
+
+        donnees = form.cleaned_data
+        if 'valider' in request.POST:
+            try:
+                montant_attendu = Decimal(request.POST.get('montant_attendu', ''))
+            except ArithmeticError:
+                montant_attendu = None
+            try:
+                paie = executer_paie(
+                    request.user, donnees['site'], donnees['compte'], donnees['periode'],
+                    donnees['date_paiement'], montant_attendu=montant_attendu,
+                )
+            except PaieImpossible as erreur:
+                messages.error(request, str(erreur))
+            else:
+                messages.success(
+                    request,
+                    f"Paie de {paie.periode:%m/%Y} validée : {paie.nombre_employes} salaires, {paie.montant_total} XAF.",
+                )
+                return redirect('gestion_financiere:paie_detail', pk=paie.pk)
+
+        employes, montant_total, paie_existante = apercu_paie(donnees['site'], donnees['periode'])
+        return render(request, self.template_name, {
+            'form': form,
+            'apercu': True,
+            'employes': employes,
+            'montant_total': montant_total,
+            'paie_existante': paie_existante,
+        })
+
+class PaieDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+    model = Paie
+    template_name = 'gestion_financiere/paie_detail.html'
+    context_object_name = 'paie'
+    permission_required = 'gestion_financiere.view_paie'
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Paie.objects.select_related('site', 'compte', 'cree_par', 'annulee_par').prefetch_related(
+            Prefetch('transactions', queryset=Transaction.all_objects.select_related('employe').order_by('employe__nom', 'employe__prenom'))
+        )
+        is_global_finance = (user.is_superuser or user.is_comptable_central)
+        if is_global_finance:
+            return queryset
+        return queryset.filter(site__in=user.sites.all())
+
+class PaieAnnulerView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = 'gestion_financiere.change_paie'
+
+    def post(self, request, *args, **kwargs):
+        paie = get_object_or_404(Paie, pk=kwargs['pk'])
+        user = request.user
+        is_global_finance = (user.is_superuser or user.is_comptable_central)
+        if not is_global_finance and not user.sites.filter(pk=paie.site_id).exists():
+            messages.error(request, "Action non autorisée.")
+            return redirect('gestion_financiere:paie_list')
+        try:
+            annuler_paie(user, paie)
+        except PaieImpossible as erreur:
+            messages.error(request, str(erreur))
+        else:
+            messages.success(request, "La paie a été annulée et ses salaires archivés.")
+        return redirect('gestion_financiere:paie_detail', pk=paie.pk)
+
 # =======================================================================
 # VUES DES RAPPORTS ET API
 # =======================================================================
 
-class RapportFinancierView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class RapportFinancierView(LoginRequiredMixin, PermissionRequiredMixin, RepliqueLectureMixin, TemplateView):
     template_name = 'gestion_financiere/rapport_financier.html'
     permission_required = 'gestion_financiere.view_transaction'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
-        comptes_queryset = CompteFinancier.objects.filter(is_active=True)
-        transactions_queryset = Transaction.objects.filter(is_active=True)
+        comptes_queryset = CompteFinancier.objects.all()
+        transactions_queryset = Transaction.objects.all()
         
         is_global_finance = (user.is_superuser or user.is_comptable_central)
         if is_global_finance:
-            context['all_sites'] = SiteOrphelinat.objects.all()
+            context['all_sites'] = tous_les_sites()
             site_id = self.request.GET.get('site')
             if site_id:
+                context['selected_site'] = site_par_id(site_id)
+                if context['selected_site'] is None:
+                    raise Http404("Site introuvable.")
                 comptes_queryset = comptes_queryset.filter(site__id=site_id)
                 transactions_queryset = transactions_queryset.filter(compte__site__id=site_id)
-                context['selected_site'] = get_object_or_404(SiteOrphelinat, pk=site_id)
         else:
             sites_autorises = user.sites.all()
             comptes_queryset = comptes_queryset.filter(site__in=sites_autorises)
             transactions_queryset = transactions_queryset.filter(compte__site__in=sites_autorises)
         
-        comptes_data = []
-        for compte in comptes_queryset:
-            entrees = transactions_queryset.filter(compte=compte, type_transaction='entree').aggregate(total=Sum('montant'))['total'] or 0
-            sorties = transactions_queryset.filter(compte=compte, type_transaction='sortie').aggregate(total=Sum('montant'))['total'] or 0
-            solde_actuel = (compte.solde_initial + entrees) - sorties
-            comptes_data.append({'nom': compte.nom, 'solde_actuel': solde_actuel, 'total_entrees': entrees, 'total_depenses': sorties, 'solde_initial': compte.solde_initial})
-            
-        total_entrees_general = transactions_queryset.filter(type_transaction='entree').aggregate(total=Sum('montant'))['total'] or 0
-        total_depenses_general = transactions_queryset.filter(type_transaction='sortie').aggregate(total=Sum('montant'))['total'] or 0
-        solde_initial_general = comptes_queryset.aggregate(total=Sum('solde_initial'))['total'] or 0
+        if is_global_finance and not self.request.GET.get('site') and settings.SITES_PARTITIONS:
+            # Une base par site : synthèse de chaque base en parallèle, puis fusion
+            syntheses = repartir(lambda: self._synthese(comptes_queryset, transactions_queryset))
+        else:
+            syntheses = [self._synthese(comptes_queryset, transactions_queryset)]
+
+        total_entrees_general = sum(synthese['total_entrees'] for synthese in syntheses)
+        total_depenses_general = sum(synthese['total_depenses'] for synthese in syntheses)
+        solde_initial_general = sum(synthese['solde_initial'] for synthese in syntheses)
         solde_final_general = (solde_initial_general + total_entrees_general) - total_depenses_general
 
-        toutes_transactions = transactions_queryset.order_by('-date_transaction')
-        context['comptes_data'] = comptes_data
+        context['comptes_data'] = [compte for synthese in syntheses for compte in synthese['comptes_data']]
         context['total_entrees_general'] = total_entrees_general
         context['total_depenses_general'] = total_depenses_general
         context['solde_final_general'] = solde_final_general
-        context['transactions_recentes'] = toutes_transactions[:10]
+        context['transactions_recentes'] = sorted(
+            chain.from_iterable(synthese['transactions_recentes'] for synthese in syntheses),
+            key=attrgetter('date_transaction'), reverse=True,
+        )[:10]
         context['chart_labels'] = json.dumps(['Total des Entrées', 'Total des Dépenses'])
         context['chart_data'] = json.dumps([float(total_entrees_general), float(total_depenses_general)])
 
         return context
 
+    def _synthese(self, comptes_queryset, transactions_queryset):
+        """Soldes par compte et totaux pour une base (la base principale ou la partition d'un site)."""
+        comptes_data = []
+        # Entrées et sorties de tous les comptes en une requête (au lieu de deux par compte)
+        totaux_par_compte = {
+            ligne['compte']: ligne
+            for ligne in transactions_queryset.order_by().values('compte').annotate(
+                entrees=Sum('montant', filter=Q(type_transaction='entree')),
+                sorties=Sum('montant', filter=Q(type_transaction='sortie')),
+            )
+        }
+        # .all() : le queryset est partagé entre les fils de `repartir`, chacun doit avoir sa copie
+        for compte in comptes_queryset.all():
+            totaux = totaux_par_compte.get(compte.pk, {})
+            entrees = totaux.get('entrees') or 0
+            sorties = totaux.get('sorties') or 0
+            solde_actuel = (compte.solde_initial + entrees) - sorties
+            comptes_data.append({'nom': compte.nom, 'solde_actuel': solde_actuel, 'total_entrees': entrees, 'total_depenses': sorties, 'solde_initial': compte.solde_initial})
+
+        return {
+            'comptes_data': comptes_data,
+            # Tous comptes confondus (archivés compris), comme les totaux par compte
+            'total_entrees': sum(totaux['entrees'] or 0 for totaux in totaux_par_compte.values()),
+            'total_depenses': sum(totaux['sorties'] or 0 for totaux in totaux_par_compte.values()),
+            'solde_initial': comptes_queryset.aggregate(total=Sum('solde_initial'))['total'] or 0,
+            'transactions_recentes': list(transactions_queryset.order_by('-date_transaction')[:10]),
+        }
+
 def get_comptes_for_site(request, site_id):
     user = request.user
     if not user.is_authenticated:
@@ -376,14 +522,14 @@ def get_comptes_for_site(request, site_id):
     if not can_view:
         return JsonResponse({'error': 'Action non autorisée'}, status=403)
     
-    comptes = CompteFinancier.objects.filter(site__id=site_id, is_active=True).values('id', 'nom')
-    return JsonResponse(list(comptes), safe=False)
+    comptes = [{'id': compte.pk, 'nom': compte.nom} for compte in comptes_du_site(site_id)]
+    return JsonResponse(comptes, safe=False)
 
 # =======================================================================
 # VUE POUR L'EXPORTATION
 # =======================================================================
 
-class TransactionExportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+class TransactionExportView(LoginRequiredMixin, PermissionRequiredMixin, RepliqueLectureMixin, View):
     permission_required = 'gestion_financiere.view_transaction'
 
     def get(self, request, *args, **kwargs):
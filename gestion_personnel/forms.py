@@ -3,6 +3,7 @@ from django.db import transaction
 from .models import Employe
 from utilisateurs.models import CustomUser
 from sites_gestion.models import SiteOrphelinat
+from sites_gestion.registre import SitesMultipleChoiceField
 
 class EmployeForm(forms.ModelForm):
     # --- Champs pour la gestion du compte utilisateur (maintenant sans le champ 'user_action') ---
@@ -30,6 +31,7 @@ class EmployeForm(forms.ModelForm):
             'adresse': forms.Textarea(attrs={'class': 'textarea textarea-bordered textarea-sm w-full h-16 border-slate-300'}),
             'sites': forms.CheckboxSelectMultiple, # Widget simple de cases à cocher
         }
+        field_classes = {'sites': SitesMultipleChoiceField}
 
     def __init__(self, *args, **kwargs):
         self.request_user = kwargs.pop('user', None)
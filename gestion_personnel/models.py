@@ -1,6 +1,7 @@
 # gestion_personnel/models.py
 from django.db import models
 from django.conf import settings
+from enfants_gestion.managers import ActiveManager
 from sites_gestion.models import SiteOrphelinat
 from utilisateurs.models import CustomUser
 
@@ -36,5 +37,14 @@ class Employe(models.Model):
     
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        default_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['nom', 'prenom'], condition=models.Q(is_active=True), name='employe_actif_nom_idx'),
+        ]
+
     def __str__(self):
         return f"{self.prenom} {self.nom}"
\ No newline at end of file
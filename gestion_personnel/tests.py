@@ -1,3 +1,35 @@
+from datetime import date
+
 from django.test import TestCase
+from django.urls import reverse
+
+from config.requetes import BudgetRequetesMixin
+from sites_gestion.models import SiteOrphelinat
+from utilisateurs.models import CustomUser
+from .models import Employe
+
+
+class BudgetRequetesPersonnelTests(BudgetRequetesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sites = [SiteOrphelinat.objects.create(nom=f'Site {nom}', ville='Ville', pays='Pays') for nom in 'AB']
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def _completer_employes(self, volume):
+        existants = Employe.objects.count()
+        employes = Employe.objects.bulk_create(
+            Employe(nom=f'Nom{numero:05d}', prenom='Prénom', poste='Éducateur', date_embauche=date(2020, 1, 1))
+            for numero in range(existants, volume)
+        )
+        Employe.sites.through.objects.bulk_create(
+            Employe.sites.through(employe_id=employe.pk, siteorphelinat_id=site.pk)
+            for employe in employes for site in self.sites
+        )
 
-# Create your tests here.
+    def test_liste(self):
+        self.assertBudgetRequetes(reverse('gestion_personnel:employe_list'), 6, self._completer_employes)
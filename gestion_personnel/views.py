@@ -1,25 +1,135 @@
+import base64
+import json
+
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.db.models import Exists, OuterRef, Prefetch, Q
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
+from django.utils.functional import cached_property
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, View
 
+from config.base_donnees import RepriseEcritureMixin
+from sites_gestion.models import SiteOrphelinat
+from sites_gestion.registre import site_par_id, tous_les_sites
 from .models import Employe
 from .forms import EmployeForm
 
+TAILLE_PAGE = 25
+
+
+def _est_global(user):
+    is_global_role = user.groups.filter(name__in=['Directeur', 'RH']).exists() and not user.sites.exists()
+    return user.is_superuser or is_global_role
+
+
+def _affectations(user, site_id=None, est_global=None):
+    """
+    Sous-requête EXISTS sur la table d'affectation (employé, site), à la place d'une
+    jointure sur `sites` suivie de DISTINCT. Retourne None si aucun filtre n'est nécessaire.
+    """
+    affectations = Employe.sites.through.objects.filter(employe_id=OuterRef('pk'))
+    if est_global is None:
+        est_global = _est_global(user)
+    if site_id is not None:
+        affectations = affectations.filter(siteorphelinat_id=site_id)
+    elif not est_global:
+        affectations = affectations.filter(siteorphelinat_id__in=user.sites.values('pk'))
+    else:
+        return None
+    return Exists(affectations)
+
+
+def _encoder_curseur(employe):
+    brut = json.dumps([employe.nom, employe.prenom, employe.pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(brut.encode()).decode().rstrip('=')
+
+
+def _decoder_curseur(curseur):
+    try:
+        nom, prenom, pk = json.loads(base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4)))
+        return str(nom), str(prenom), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
 class EmployeListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+    """
+    Liste paginée par curseur (keyset) sur (nom, prénom, id) : le paramètre `apres`
+    reprend juste après le dernier employé affiché, sans OFFSET ni COUNT.
+    """
     model = Employe
     template_name = 'gestion_personnel/employe_list.html'
     context_object_name = 'employes'
     permission_required = 'gestion_personnel.view_employe'
 
+    @cached_property
+    def est_global(self):
+        return _est_global(self.request.user)
+
+    def get_sites_autorises(self):
+        if self.est_global:
+            return tous_les_sites()
+        return list(self.request.user.sites.only('pk', 'nom'))
+
+    def get_site_selectionne(self):
+        site_id = self.request.GET.get('site')
+        if not site_id or not site_id.isdigit():
+            return None
+        if self.est_global:
+            return site_par_id(site_id)
+        return self.request.user.sites.filter(pk=site_id).first()
+
     def get_queryset(self):
-        user = self.request.user
-        queryset = Employe.objects.filter(is_active=True).prefetch_related('sites', 'utilisateur')
-        is_global_role = user.groups.filter(name__in=['Directeur', 'RH']).exists() and not user.sites.exists()
-        if user.is_superuser or is_global_role:
-            return queryset.order_by('nom', 'prenom')
-        return queryset.filter(sites__in=user.sites.all()).order_by('nom', 'prenom').distinct()
+        queryset = Employe.objects.select_related('utilisateur').only(
+            'pk', 'nom', 'prenom', 'poste', 'date_embauche', 'utilisateur__email',
+        ).prefetch_related(
+            Prefetch('sites', queryset=SiteOrphelinat.objects.only('pk', 'nom').order_by('nom')),
+        )
+
+        site_demande = self.request.GET.get('site')
+        site = self.get_site_selectionne()
+        if site_demande and site is None:
+            # Site inconnu ou non autorisé
+            return queryset.none()
+        filtre_sites = _affectations(self.request.user, site.pk if site else None, self.est_global)
+        if filtre_sites is not None:
+            queryset = queryset.filter(filtre_sites)
+
+        for terme in self.request.GET.get('q', '').split():
+            queryset = queryset.filter(Q(nom__icontains=terme) | Q(prenom__icontains=terme))
+
+        curseur = _decoder_curseur(self.request.GET.get('apres', ''))
+        if curseur:
+            nom, prenom, pk = curseur
+            queryset = queryset.filter(
+                Q(nom__gt=nom) | Q(nom=nom, prenom__gt=prenom) | Q(nom=nom, prenom=prenom, pk__gt=pk)
+            )
+        return queryset.order_by('nom', 'prenom', 'pk')
+
+    def get_context_data(self, **kwargs):
+        # Une ligne de plus que la page pour savoir s'il reste des employés
+        employes = list(self.object_list[:TAILLE_PAGE + 1])
+        page_suivante = None
+        if len(employes) > TAILLE_PAGE:
+            employes = employes[:TAILLE_PAGE]
+            parametres = self.request.GET.copy()
+            parametres['apres'] = _encoder_curseur(employes[-1])
+            page_suivante = parametres.urlencode()
+        self.object_list = employes
+
+        context = super().get_context_data(object_list=employes, **kwargs)
+        sites_autorises = self.get_sites_autorises()
+        show_filter = self.est_global or len(sites_autorises) > 1
+        context['is_global_user'] = self.est_global
+        context['show_site_filter'] = show_filter
+        if show_filter:
+            context['sites_for_filter'] = sites_autorises
+            context['selected_site_id'] = self.request.GET.get('site')
+        context['search_query'] = self.request.GET.get('q', '')
+        context['page_suivante'] = page_suivante
+        context['est_premiere_page'] = 'apres' not in self.request.GET
+        return context
 
 class EmployeDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
     model = Employe
@@ -28,14 +138,13 @@ class EmployeDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView)
     permission_required = 'gestion_personnel.view_employe'
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Employe.objects.filter(is_active=True).select_related('utilisateur').prefetch_related('sites')
-        is_global_role = user.groups.filter(name__in=['Directeur', 'RH']).exists() and not user.sites.exists()
-        if user.is_superuser or is_global_role:
+        queryset = Employe.objects.select_related('utilisateur').prefetch_related('sites')
+        filtre_sites = _affectations(self.request.user)
+        if filtre_sites is None:
             return queryset
-        return queryset.filter(sites__in=user.sites.all()).distinct()
+        return queryset.filter(filtre_sites)
 
-class EmployeCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+class EmployeCreateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = Employe
     form_class = EmployeForm
     template_name = 'gestion_personnel/employe_form.html'
@@ -57,8 +166,9 @@ class EmployeCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView)
         messages.error(self.request, "Le formulaire contient des erreurs. Veuillez corriger les champs indiqués.")
         return super().form_invalid(form)
 
-class EmployeUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class EmployeUpdateView(RepriseEcritureMixin, LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     model = Employe
+    queryset = Employe.objects.all()
     form_class = EmployeForm
     template_name = 'gestion_personnel/employe_form.html'
     permission_required = 'gestion_personnel.change_employe'
@@ -79,6 +189,6 @@ class EmployeDeleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
     permission_required = 'gestion_personnel.delete_employe'
 
     def post(self, request, *args, **kwargs):
-        employe = get_object_or_404(Employe, pk=kwargs['pk'])
+        employe = get_object_or_404(Employe.objects, pk=kwargs['pk'])
         # ... (logique de suppression)
         return redirect('gestion_personnel:employe_list')
\ No newline at end of file
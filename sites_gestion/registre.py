@@ -0,0 +1,94 @@
+# sites_gestion/registre.py
+"""
+Registre des sites en mémoire : les menus de filtre, les listes de choix des
+formulaires et les contrôles d'accès des rôles globaux lisent les sites ici,
+sans requête SQL (voir RegistreReference dans config/cache.py).
+
+Les objets rendus sont des copies : une vue peut les annoter (`site.count`)
+sans modifier le registre.
+"""
+import copy
+
+from django import forms
+from django.db import DEFAULT_DB_ALIAS
+from django.forms.models import ModelChoiceIterator
+
+from config.cache import RegistreReference
+from .models import SiteOrphelinat
+
+_registre = RegistreReference('sites_gestion.SiteOrphelinat')
+
+
+def _charger():
+    # Base principale : les partitions n'en ont qu'une copie
+    sites = list(SiteOrphelinat.objects.using(DEFAULT_DB_ALIAS).order_by('pk'))
+    return sites, {site.pk: site for site in sites}
+
+
+def tous_les_sites():
+    """Tous les sites, dans l'ordre de création."""
+    return [copy.copy(site) for site in _registre.obtenir('sites', _charger)[0]]
+
+
+def site_par_id(site_id):
+    """Le site `site_id` (entier ou chaîne), ou None s'il n'existe pas."""
+    try:
+        site = _registre.obtenir('sites', _charger)[1].get(int(site_id))
+    except (TypeError, ValueError):
+        return None
+    return copy.copy(site) if site is not None else None
+
+
+def _tous_les_sites_demandes(queryset):
+    """Vrai pour `SiteOrphelinat.objects.all()` (ni filtre, ni `none()`, ni tranche)."""
+    requete = queryset.query
+    return (
+        queryset.model is SiteOrphelinat and not requete.where
+        and not requete.low_mark and requete.high_mark is None
+    )
+
+
+# =======================================================================
+# CHAMPS DE FORMULAIRE
+# =======================================================================
+
+class IterateurSites(ModelChoiceIterator):
+    """Choix lus dans le registre quand le champ propose tous les sites."""
+
+    def __iter__(self):
+        if not _tous_les_sites_demandes(self.queryset):
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for site in tous_les_sites():
+            yield self.choice(site)
+
+    def __len__(self):
+        if not _tous_les_sites_demandes(self.queryset):
+            return super().__len__()
+        return len(tous_les_sites()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        if not _tous_les_sites_demandes(self.queryset):
+            return super().__bool__()
+        return self.field.empty_label is not None or bool(tous_les_sites())
+
+
+class SiteChoiceField(forms.ModelChoiceField):
+    iterator = IterateurSites
+
+    def to_python(self, value):
+        if value in self.empty_values or self.to_field_name or not _tous_les_sites_demandes(self.queryset):
+            return super().to_python(value)
+        site = site_par_id(value.pk if isinstance(value, SiteOrphelinat) else value)
+        if site is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+            )
+        return site
+
+
+class SitesMultipleChoiceField(forms.ModelMultipleChoiceField):
+    # La validation (envoi du formulaire) garde sa requête ; seul l'affichage lit le registre
+    iterator = IterateurSites
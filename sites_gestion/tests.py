@@ -1,3 +1,80 @@
-from django.test import TestCase
+from django import forms
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from config.tests import CACHE_MEMOIRE
+from . import registre
+from .models import SiteOrphelinat
+from .registre import SiteChoiceField, site_par_id, tous_les_sites
+
+
+@override_settings(CACHES=CACHE_MEMOIRE)
+class RegistreSitesTests(TestCase):
+    """Sites lus en mémoire, rechargés quand la version du modèle change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+
+    def setUp(self):
+        cache.clear()
+        registre._registre.vider()
+
+    def _noms(self):
+        return [site.nom for site in tous_les_sites()]
+
+    def test_une_requete_au_premier_acces(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self._noms(), ['Site A', 'Site B'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._noms(), ['Site A', 'Site B'])
+            self.assertEqual(site_par_id(str(self.site_b.pk)).nom, 'Site B')
+            self.assertIsNone(site_par_id(0))
+            self.assertIsNone(site_par_id('x'))
+
+    def test_copies_rendues(self):
+        site = tous_les_sites()[0]
+        site.count = 3
+        site.nom = 'Modifié'
+        self.assertEqual(self._noms(), ['Site A', 'Site B'])
+        self.assertFalse(hasattr(tous_les_sites()[0], 'count'))
+
+    def test_vide_par_un_enregistrement_dans_le_processus(self):
+        self._noms()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site_a.nom = 'Site A renommé'
+            self.site_a.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self._noms(), ['Site A renommé', 'Site B'])
+
+    def test_recharge_apres_ecriture_d_un_autre_processus(self):
+        self._noms()
+        # Un autre processus écrit (sans signal ici) puis change la version dans le cache partagé
+        SiteOrphelinat.objects.filter(pk=self.site_b.pk).update(nom='Site B renommé')
+        with self.assertNumQueries(0):
+            self.assertEqual(self._noms(), ['Site A', 'Site B'])
+        cache.set('version:sites_gestion.siteorphelinat', 'autre_processus', timeout=None)
+        with self.assertNumQueries(1):
+            self.assertEqual(self._noms(), ['Site A', 'Site B renommé'])
+
+    def test_champ_de_choix_sans_requete(self):
+        class SiteForm(forms.Form):
+            site = SiteChoiceField(queryset=SiteOrphelinat.objects.all())
+
+        self._noms()
+        with self.assertNumQueries(0):
+            choix = [libelle for _valeur, libelle in SiteForm().fields['site'].choices]
+            self.assertEqual(choix, ['---------', str(self.site_a), str(self.site_b)])
+            formulaire = SiteForm({'site': self.site_b.pk})
+            self.assertTrue(formulaire.is_valid())
+        self.assertEqual(formulaire.cleaned_data['site'], self.site_b)
+        self.assertFalse(SiteForm({'site': 0}).is_valid())
+
+        # Un queryset filtré garde sa requête
+        class SiteLocalForm(forms.Form):
+            site = SiteChoiceField(queryset=SiteOrphelinat.objects.filter(pk=self.site_a.pk))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(SiteLocalForm().fields['site'].choices), 2)
+        self.assertFalse(SiteLocalForm({'site': self.site_b.pk}).is_valid())
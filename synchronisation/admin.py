@@ -0,0 +1,5 @@
+from django.contrib import admin
+from .models import Modification, OperationTraitee
+
+admin.site.register(Modification)
+admin.site.register(OperationTraitee)
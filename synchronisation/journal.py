@@ -0,0 +1,221 @@
+# synchronisation/journal.py
+"""
+Flux de modifications pour les postes des sites à connexion intermittente.
+
+Chaque écriture sur un modèle synchronisé ajoute une ligne au journal
+`Modification` (par signals.py, ou explicitement pour les écritures en masse
+avec `journaliser_lot`). Un client garde le dernier numéro de séquence reçu et
+ne demande ensuite que les changements suivants, limités aux sites qu'il voit.
+
+Le flux renvoie l'état *actuel* de chaque objet (pas l'état au moment de
+l'écriture) : plusieurs écritures sur un même objet dans une page n'en donnent
+qu'une, et un client qui rejoue deux fois la même page obtient le même résultat.
+
+Les actions possibles pour le client :
+- creation / modification / archivage : remplacer sa copie par `donnees` ;
+- suppression : l'objet n'existe plus ;
+- sortie : l'objet a quitté les sites de l'utilisateur (transfert d'un enfant,
+  changement d'affectation d'un employé) et doit être retiré de la copie locale.
+
+Sous SQLite les écritures sont sérialisées : un numéro de séquence ne peut pas
+être validé après un numéro supérieur déjà lu par un client.
+"""
+from django.db.models import Q
+
+from config.cache import invalider
+from enfants_gestion.models import Enfant, SuiviMedical, SuiviScolaire
+from gestion_financiere.models import Parrainage, Transaction
+from gestion_personnel.models import Employe
+from .models import Modification
+
+TAILLE_PAGE = 500
+TAILLE_PAGE_MAX = 2000
+# Nombre d'identifiants par requête `pk__in` (limite de paramètres SQL de SQLite)
+TAILLE_LOT = 500
+
+
+def global_enfants(user):
+    return user.is_superuser or (
+        user.groups.filter(name__in=['Directeur', 'Gestionnaire']).exists() and not user.sites.exists()
+    )
+
+
+def global_finances(user):
+    return user.is_superuser or user.is_comptable_central
+
+
+def global_personnel(user):
+    return user.is_superuser or (
+        user.groups.filter(name__in=['Directeur', 'RH']).exists() and not user.sites.exists()
+    )
+
+
+class ModeleSynchronise:
+    """
+    `chemin_site` mène de l'objet à son (ou ses) site(s) ; `est_global(user)` dit si
+    l'utilisateur voit tous les sites pour ce modèle, comme dans les vues correspondantes.
+    """
+    def __init__(self, modele, chemin_site, permission, est_global, exclure=()):
+        self.modele = modele
+        self.chemin_site = chemin_site
+        self.permission = permission
+        self.est_global = est_global
+        self.exclure = set(exclure)
+
+    def sites(self, pks):
+        """Retourne {pk: {site_id, ...}} d'après l'état actuel en base."""
+        pks = list(pks)
+        sites = {pk: set() for pk in pks}
+        for debut in range(0, len(pks), TAILLE_LOT):
+            lot = self.modele.all_objects.filter(pk__in=pks[debut:debut + TAILLE_LOT])
+            for pk, site_id in lot.values_list('pk', self.chemin_site):
+                if site_id is not None:
+                    sites[pk].add(site_id)
+        return sites
+
+    def donnees(self, objet):
+        donnees = {}
+        for champ in self.modele._meta.concrete_fields:
+            if champ.name in self.exclure:
+                continue
+            valeur = getattr(objet, champ.attname)
+            donnees[champ.attname] = (valeur.name or None) if hasattr(valeur, 'storage') else valeur
+        if self.chemin_site == 'sites':
+            donnees['sites'] = sorted(site.pk for site in objet.sites.all())
+        return donnees
+
+
+MODELES_SYNCHRONISES = {
+    'enfant': ModeleSynchronise(
+        Enfant, 'site', 'enfants_gestion.view_enfant', global_enfants,
+        # Pointeurs dénormalisés, tenus à jour sans signal : le client les recalcule
+        exclure=('dernier_suivi_medical', 'suivi_scolaire_actuel'),
+    ),
+    'suivi_medical': ModeleSynchronise(SuiviMedical, 'enfant__site', 'enfants_gestion.view_enfant', global_enfants),
+    'suivi_scolaire': ModeleSynchronise(SuiviScolaire, 'enfant__site', 'enfants_gestion.view_enfant', global_enfants),
+    'parrainage': ModeleSynchronise(Parrainage, 'enfant__site', 'gestion_financiere.view_parrainage', global_finances),
+    'transaction': ModeleSynchronise(Transaction, 'compte__site', 'gestion_financiere.view_transaction', global_finances),
+    'employe': ModeleSynchronise(Employe, 'sites', 'gestion_personnel.view_employe', global_personnel),
+}
+NOMS_PAR_MODELE = {spec.modele: nom for nom, spec in MODELES_SYNCHRONISES.items()}
+# Modèles dont le site est celui de l'enfant : ils le suivent lors d'un transfert
+DEPENDANTS_ENFANT = [nom for nom, spec in MODELES_SYNCHRONISES.items() if spec.chemin_site == 'enfant__site']
+
+
+# =======================================================================
+# ÉCRITURE DU JOURNAL
+# =======================================================================
+
+def action_pour(objet, creation=False):
+    if creation:
+        return 'creation'
+    return 'modification' if objet.is_active else 'archivage'
+
+
+def journaliser(nom, objet_id, action, sites_apres, sites_avant=()):
+    """Journalise une écriture : `action` pour les sites actuels, `sortie` pour les sites quittés."""
+    lignes = [
+        Modification(modele=nom, objet_id=objet_id, site_id=site_id, action='sortie')
+        for site_id in sorted(set(sites_avant) - set(sites_apres))
+    ]
+    lignes += [
+        Modification(modele=nom, objet_id=objet_id, site_id=site_id, action=action)
+        for site_id in (sorted(sites_apres) or [None])
+    ]
+    Modification.objects.bulk_create(lignes)
+
+
+def journaliser_lot(modele, objets, action=None):
+    """
+    Journalise des écritures faites sans signaux (bulk_create, bulk_update, update).
+    Sans `action`, elle est déduite de `is_active` (modification ou archivage).
+    Invalide aussi les données de ce modèle mises en cache.
+    """
+    objets = list(objets)
+    invalider(modele, using=objets[0]._state.db if objets else None)
+    nom = NOMS_PAR_MODELE[modele]
+    sites = MODELES_SYNCHRONISES[nom].sites(objet.pk for objet in objets)
+    Modification.objects.bulk_create([
+        Modification(modele=nom, objet_id=objet.pk, site_id=site_id, action=action or action_pour(objet))
+        for objet in objets
+        for site_id in (sorted(sites[objet.pk]) or [None])
+    ], batch_size=TAILLE_LOT)
+
+
+# =======================================================================
+# LECTURE DU FLUX
+# =======================================================================
+
+def modeles_visibles(utilisateur):
+    """Retourne {nom: None (tous les sites) ou [site_id, ...]} pour les modèles que l'utilisateur peut lire."""
+    sites_utilisateur = None
+    # Plusieurs modèles partagent la même règle (une requête sur les groupes chacune)
+    globaux = {}
+    visibles = {}
+    for nom, spec in MODELES_SYNCHRONISES.items():
+        if not utilisateur.has_perm(spec.permission):
+            continue
+        if spec.est_global not in globaux:
+            globaux[spec.est_global] = spec.est_global(utilisateur)
+        if globaux[spec.est_global]:
+            visibles[nom] = None
+        else:
+            if sites_utilisateur is None:
+                sites_utilisateur = list(utilisateur.sites.values_list('pk', flat=True))
+            visibles[nom] = sites_utilisateur
+    return visibles
+
+
+def changements(utilisateur, depuis=0, limite=TAILLE_PAGE):
+    """
+    Retourne (changements, curseur, complet) : les changements de numéro > `depuis`
+    visibles par l'utilisateur, le curseur à repasser au prochain appel et un booléen
+    indiquant que le client est à jour.
+    """
+    visibles = modeles_visibles(utilisateur)
+    filtre = Q(pk__in=[])
+    for nom, site_ids in visibles.items():
+        if site_ids is None:
+            # Une sortie ne concerne pas un utilisateur qui voit tous les sites
+            filtre |= Q(modele=nom) & ~Q(action='sortie')
+        else:
+            filtre |= Q(modele=nom, site_id__in=site_ids)
+
+    lignes = list(Modification.objects.filter(filtre, pk__gt=depuis).order_by('pk')[:limite])
+    curseur = lignes[-1].pk if lignes else depuis
+
+    # Seule la dernière écriture de chaque objet compte
+    dernieres = {}
+    for ligne in lignes:
+        dernieres.pop((ligne.modele, ligne.objet_id), None)
+        dernieres[(ligne.modele, ligne.objet_id)] = ligne
+
+    objets_par_modele = {}
+    for nom in {modele for modele, _objet_id in dernieres}:
+        spec = MODELES_SYNCHRONISES[nom]
+        pks = [objet_id for modele, objet_id in dernieres if modele == nom]
+        queryset = spec.modele.all_objects.all()
+        if spec.chemin_site == 'sites':
+            queryset = queryset.prefetch_related('sites')
+        objets_par_modele[nom] = (queryset.in_bulk(pks), spec.sites(pks) if visibles[nom] is not None else None)
+
+    resultats = []
+    for (nom, objet_id), ligne in dernieres.items():
+        objets, sites = objets_par_modele[nom]
+        objet = objets.get(objet_id)
+        action = ligne.action
+        if objet is None:
+            action = 'suppression'
+        elif sites is not None and not sites[objet_id] & set(visibles[nom]):
+            # L'objet a changé de site depuis cette écriture
+            action = 'sortie'
+        elif action in ('suppression', 'sortie'):
+            # L'objet est revenu (ou a été recréé) depuis : on renvoie son état actuel
+            action = action_pour(objet)
+
+        changement = {'seq': ligne.pk, 'modele': nom, 'id': objet_id, 'action': action}
+        if action not in ('suppression', 'sortie'):
+            changement['donnees'] = MODELES_SYNCHRONISES[nom].donnees(objet)
+        resultats.append(changement)
+
+    return resultats, curseur, len(lignes) < limite
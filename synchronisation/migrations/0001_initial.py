@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Modification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modele', models.CharField(max_length=30)),
+                ('objet_id', models.BigIntegerField()),
+                ('site_id', models.BigIntegerField(blank=True, null=True)),
+                ('action', models.CharField(choices=[('creation', 'Création'), ('modification', 'Modification'), ('archivage', 'Archivage'), ('suppression', 'Suppression'), ('sortie', 'Sortie du site')], max_length=12)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Modification Journalisée',
+                'verbose_name_plural': 'Modifications Journalisées',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['site_id', 'id'], name='modification_site_seq_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Nom dans le journal -> (application, modèle, chemin vers le site)
+MODELES = [
+    ('enfant', 'enfants_gestion', 'Enfant', 'site_id'),
+    ('suivi_medical', 'enfants_gestion', 'SuiviMedical', 'enfant__site_id'),
+    ('suivi_scolaire', 'enfants_gestion', 'SuiviScolaire', 'enfant__site_id'),
+    ('parrainage', 'gestion_financiere', 'Parrainage', 'enfant__site_id'),
+    ('transaction', 'gestion_financiere', 'Transaction', 'compte__site_id'),
+    ('employe', 'gestion_personnel', 'Employe', 'sites'),
+]
+
+
+def amorcer_journal(apps, schema_editor):
+    """Une ligne de création par objet actif existant : un nouveau client part de la séquence 0."""
+    Modification = apps.get_model('synchronisation', 'Modification')
+    lignes = []
+    for nom, application, modele, chemin_site in MODELES:
+        objets = apps.get_model(application, modele)._base_manager.filter(is_active=True)
+        for objet_id, site_id in objets.values_list('pk', chemin_site).order_by('pk').iterator():
+            lignes.append(Modification(modele=nom, objet_id=objet_id, site_id=site_id, action='creation'))
+    Modification.objects.bulk_create(lignes, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('synchronisation', '0001_initial'),
+        ('enfants_gestion', '0009_index_chronologie'),
+        ('gestion_financiere', '0004_managers_actifs'),
+        ('gestion_personnel', '0004_managers_actifs'),
+    ]
+
+    operations = [
+        migrations.RunPython(amorcer_journal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('synchronisation', '0002_amorcer_journal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationTraitee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=64, verbose_name="Clé d'idempotence")),
+                ('modele', models.CharField(max_length=30)),
+                ('objet_id', models.BigIntegerField()),
+                ('statut', models.CharField(max_length=12)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='operations_traitees', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Opération Traitée',
+                'verbose_name_plural': 'Opérations Traitées',
+                'constraints': [models.UniqueConstraint(fields=('utilisateur', 'cle'), name='operation_cle_unique')],
+            },
+        ),
+    ]
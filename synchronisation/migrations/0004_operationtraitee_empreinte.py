@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('synchronisation', '0003_operationtraitee'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operationtraitee',
+            name='empreinte',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
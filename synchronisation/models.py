@@ -0,0 +1,59 @@
+# synchronisation/models.py
+from django.conf import settings
+from django.db import models
+
+
+# Journal des écritures lu par le flux de synchronisation (voir journal.py)
+class Modification(models.Model):
+    """
+    Une ligne par écriture sur un modèle synchronisé et par site concerné.
+    L'identifiant, strictement croissant (AUTOINCREMENT sous SQLite), sert de
+    numéro de séquence aux clients. Les identifiants d'objet et de site sont de
+    simples entiers : le journal doit survivre à la suppression des objets.
+    """
+    ACTION_CHOICES = [
+        ('creation', 'Création'),
+        ('modification', 'Modification'),
+        ('archivage', 'Archivage'),
+        ('suppression', 'Suppression'),
+        ('sortie', 'Sortie du site'),
+    ]
+
+    modele = models.CharField(max_length=30)
+    objet_id = models.BigIntegerField()
+    site_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=12, choices=ACTION_CHOICES)
+    date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['site_id', 'id'], name='modification_site_seq_idx')]
+        verbose_name = "Modification Journalisée"
+        verbose_name_plural = "Modifications Journalisées"
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_action_display()} {self.modele} {self.objet_id}"
+
+
+# Opérations déjà appliquées par le point d'envoi par lots (voir soumission.py)
+class OperationTraitee(models.Model):
+    """
+    Retient la clé d'idempotence fournie par le client pour chaque opération appliquée :
+    un lot renvoyé après une coupure ne crée pas de doublon.
+    """
+    utilisateur = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='operations_traitees')
+    cle = models.CharField("Clé d'idempotence", max_length=64)
+    modele = models.CharField(max_length=30)
+    objet_id = models.BigIntegerField()
+    statut = models.CharField(max_length=12)
+    # Empreinte de l'opération reçue : une clé réutilisée pour une autre saisie est refusée
+    empreinte = models.CharField(max_length=64, blank=True)
+    date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['utilisateur', 'cle'], name='operation_cle_unique')]
+        verbose_name = "Opération Traitée"
+        verbose_name_plural = "Opérations Traitées"
+
+    def __str__(self):
+        return f"{self.cle} ({self.modele} {self.objet_id})"
@@ -0,0 +1,63 @@
+# synchronisation/signals.py
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+
+from enfants_gestion.models import Enfant
+from gestion_personnel.models import Employe
+from .journal import MODELES_SYNCHRONISES, DEPENDANTS_ENFANT, NOMS_PAR_MODELE, action_pour, journaliser
+
+
+def memoriser_sites(sender, instance, raw=False, **kwargs):
+    """Retient les sites de l'objet avant l'écriture pour journaliser une éventuelle sortie."""
+    instance._sites_avant_synchro = set()
+    if raw or not instance.pk:
+        return
+    spec = MODELES_SYNCHRONISES[NOMS_PAR_MODELE[sender]]
+    instance._sites_avant_synchro = spec.sites([instance.pk])[instance.pk]
+
+
+def journaliser_enregistrement(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    nom = NOMS_PAR_MODELE[sender]
+    sites_avant = getattr(instance, '_sites_avant_synchro', set())
+    sites_apres = MODELES_SYNCHRONISES[nom].sites([instance.pk])[instance.pk]
+    journaliser(nom, instance.pk, action_pour(instance, created), sites_apres, sites_avant)
+
+    # Un enfant transféré emmène ses suivis et parrainages vers son nouveau site
+    if sender is Enfant and not created and sites_avant and sites_avant != sites_apres:
+        for nom_dependant in DEPENDANTS_ENFANT:
+            modele = MODELES_SYNCHRONISES[nom_dependant].modele
+            for dependant in modele.all_objects.filter(enfant=instance).only('pk', 'is_active'):
+                journaliser(nom_dependant, dependant.pk, action_pour(dependant), sites_apres, sites_avant)
+
+
+def journaliser_suppression(sender, instance, **kwargs):
+    journaliser(NOMS_PAR_MODELE[sender], instance.pk, 'suppression', getattr(instance, '_sites_avant_synchro', set()))
+
+
+def journaliser_affectations(sender, instance, action, reverse, pk_set, **kwargs):
+    """Changement des sites d'affectation d'un employé (relation plusieurs-à-plusieurs)."""
+    if reverse:
+        # Modification depuis le site : on journalise chaque employé concerné
+        for employe in Employe.all_objects.filter(pk__in=pk_set or []):
+            journaliser_affectations(sender, employe, action, False, {instance.pk}, **kwargs)
+        return
+    if action == 'pre_clear':
+        instance._sites_avant_synchro = MODELES_SYNCHRONISES['employe'].sites([instance.pk])[instance.pk]
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    sites_apres = MODELES_SYNCHRONISES['employe'].sites([instance.pk])[instance.pk]
+    if action == 'post_clear':
+        sites_avant = getattr(instance, '_sites_avant_synchro', set())
+    else:
+        sites_avant = sites_apres | set(pk_set or ())
+    journaliser('employe', instance.pk, action_pour(instance), sites_apres, sites_avant)
+
+
+for modele in NOMS_PAR_MODELE:
+    pre_save.connect(memoriser_sites, sender=modele, dispatch_uid=f'synchro_pre_save_{modele.__name__}')
+    post_save.connect(journaliser_enregistrement, sender=modele, dispatch_uid=f'synchro_post_save_{modele.__name__}')
+    pre_delete.connect(memoriser_sites, sender=modele, dispatch_uid=f'synchro_pre_delete_{modele.__name__}')
+    post_delete.connect(journaliser_suppression, sender=modele, dispatch_uid=f'synchro_post_delete_{modele.__name__}')
+m2m_changed.connect(journaliser_affectations, sender=Employe.sites.through, dispatch_uid='synchro_employe_sites')
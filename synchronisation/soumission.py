@@ -0,0 +1,226 @@
+# synchronisation/soumission.py
+"""
+Envoi par lots des saisies faites hors connexion (suivis, transactions).
+
+Le client accumule ses créations et modifications, chacune avec une clé
+d'idempotence qu'il génère lui-même (un UUID), puis les envoie en une requête :
+
+    {"operations": [
+        {"cle": "…", "modele": "suivi_medical", "action": "creation", "enfant": 12,
+         "donnees": {"date_consultation": "2024-05-02", "type_consultation": "Vaccin", …}},
+        {"cle": "…", "modele": "transaction", "action": "modification", "id": 57,
+         "donnees": {…}},
+    ]}
+
+Chaque opération est validée par le formulaire de la vue web correspondante,
+avec les mêmes droits et le même périmètre de sites. Le lot est appliqué dans
+une seule transaction : si une opération échoue, rien n'est enregistré et le
+résultat de chaque opération est renvoyé pour correction.
+
+Une clé déjà appliquée n'est pas rejouée : le client peut renvoyer tout le lot
+après une coupure sans risquer de doublon. Renvoyée avec une opération
+différente, elle est refusée (le client a réutilisé une clé par erreur).
+"""
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+
+from enfants_gestion.forms import SuiviMedicalForm, SuiviScolaireForm
+from enfants_gestion.models import Enfant, SuiviMedical, SuiviScolaire
+from gestion_financiere.forms import TransactionForm
+from gestion_financiere.models import Transaction
+from .journal import global_enfants, global_finances
+from .models import OperationTraitee
+
+TAILLE_LOT_MAX = 200
+LONGUEUR_CLE_MAX = OperationTraitee._meta.get_field('cle').max_length
+
+
+class LotInvalide(Exception):
+    pass
+
+
+class OperationInvalide(Exception):
+    def __init__(self, erreurs):
+        super().__init__(erreurs)
+        self.erreurs = erreurs if isinstance(erreurs, dict) else {'__all__': [erreurs]}
+
+
+# =======================================================================
+# TYPES D'OPÉRATIONS
+# =======================================================================
+
+def _suivis_autorises(modele):
+    def autorises(utilisateur):
+        queryset = modele.objects.all()
+        if global_enfants(utilisateur):
+            return queryset
+        return queryset.filter(enfant__site__in=utilisateur.sites.all())
+    return autorises
+
+
+def _transactions_autorisees(utilisateur):
+    queryset = Transaction.objects.all()
+    if global_finances(utilisateur):
+        return queryset
+    return queryset.filter(compte__site__in=utilisateur.sites.all())
+
+
+def _formulaire_suivi(modele, classe_formulaire):
+    def formulaire(utilisateur, operation, instance):
+        if instance is None:
+            enfants = Enfant.objects.all()
+            if not global_enfants(utilisateur):
+                enfants = enfants.filter(site__in=utilisateur.sites.all())
+            enfant = enfants.filter(pk=operation.get('enfant')).first() if str(operation.get('enfant', '')).isdigit() else None
+            if enfant is None:
+                raise OperationInvalide("Enfant introuvable ou non autorisé.")
+            instance = modele(enfant=enfant)
+        return classe_formulaire(data=operation['donnees'], instance=instance)
+    return formulaire
+
+
+def _formulaire_transaction(utilisateur, operation, instance):
+    donnees = dict(operation['donnees'])
+    if instance is None:
+        type_transaction = donnees.get('type_transaction')
+        if type_transaction not in ('entree', 'sortie'):
+            raise OperationInvalide({'type_transaction': ["« entree » ou « sortie » attendu."]})
+        instance = Transaction(cree_par=utilisateur)
+    else:
+        # Comme dans TransactionUpdateView, le type d'une transaction existante ne change pas
+        type_transaction = donnees['type_transaction'] = instance.type_transaction
+    return TransactionForm(data=donnees, instance=instance, user=utilisateur, transaction_type=type_transaction)
+
+
+class TypeOperation:
+    def __init__(self, formulaire, objets_autorises, permission_creation, permission_modification):
+        self.formulaire = formulaire
+        self.objets_autorises = objets_autorises
+        self.permissions = {'creation': permission_creation, 'modification': permission_modification}
+
+
+TYPES_OPERATIONS = {
+    'suivi_medical': TypeOperation(
+        _formulaire_suivi(SuiviMedical, SuiviMedicalForm), _suivis_autorises(SuiviMedical),
+        'enfants_gestion.add_suivimedical', 'enfants_gestion.change_suivimedical',
+    ),
+    'suivi_scolaire': TypeOperation(
+        _formulaire_suivi(SuiviScolaire, SuiviScolaireForm), _suivis_autorises(SuiviScolaire),
+        'enfants_gestion.add_suiviscolaire', 'enfants_gestion.change_suiviscolaire',
+    ),
+    'transaction': TypeOperation(
+        _formulaire_transaction, _transactions_autorisees,
+        'gestion_financiere.add_transaction', 'gestion_financiere.change_transaction',
+    ),
+}
+
+
+# =======================================================================
+# APPLICATION D'UN LOT
+# =======================================================================
+
+def _verifier_lot(operations):
+    if not isinstance(operations, list) or not operations:
+        raise LotInvalide("« operations » doit être une liste non vide.")
+    if len(operations) > TAILLE_LOT_MAX:
+        raise LotInvalide(f"Au plus {TAILLE_LOT_MAX} opérations par lot.")
+    cles = set()
+    for numero, operation in enumerate(operations, start=1):
+        if not isinstance(operation, dict):
+            raise LotInvalide(f"Opération {numero} : objet attendu.")
+        cle = operation.get('cle')
+        if not isinstance(cle, str) or not cle or len(cle) > LONGUEUR_CLE_MAX:
+            raise LotInvalide(f"Opération {numero} : « cle » manquante ou trop longue ({LONGUEUR_CLE_MAX} caractères au plus).")
+        if cle in cles:
+            raise LotInvalide(f"Opération {numero} : la clé « {cle} » apparaît plusieurs fois dans le lot.")
+        cles.add(cle)
+        if operation.get('modele') not in TYPES_OPERATIONS:
+            raise LotInvalide(f"Opération {numero} : « modele » parmi {', '.join(TYPES_OPERATIONS)}.")
+        if operation.get('action') not in ('creation', 'modification'):
+            raise LotInvalide(f"Opération {numero} : « action » parmi creation, modification.")
+        if not isinstance(operation.get('donnees'), dict):
+            raise LotInvalide(f"Opération {numero} : « donnees » doit être un objet.")
+    return cles
+
+
+def _empreinte(operation):
+    """Empreinte de l'opération telle que reçue (clé comprise, ordre des champs indifférent)."""
+    return hashlib.sha256(json.dumps(operation, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _appliquer(utilisateur, operation):
+    type_operation = TYPES_OPERATIONS[operation['modele']]
+    action = operation['action']
+    if not utilisateur.has_perm(type_operation.permissions[action]):
+        raise OperationInvalide("Action non autorisée.")
+
+    instance = None
+    if action == 'modification':
+        objet_id = operation.get('id')
+        if str(objet_id).isdigit():
+            instance = type_operation.objets_autorises(utilisateur).filter(pk=objet_id).first()
+        if instance is None:
+            raise OperationInvalide("Objet introuvable ou non autorisé.")
+
+    formulaire = type_operation.formulaire(utilisateur, operation, instance)
+    if not formulaire.is_valid():
+        raise OperationInvalide({champ: list(erreurs) for champ, erreurs in formulaire.errors.items()})
+    try:
+        with transaction.atomic():
+            return formulaire.save()
+    except IntegrityError:
+        # Ex. : deux suivis scolaires pour la même année (contrainte non vérifiée par le formulaire)
+        raise OperationInvalide("Cette saisie entre en conflit avec une donnée existante.")
+
+
+def appliquer_lot(utilisateur, operations):
+    """
+    Applique un lot d'opérations. Retourne (resultats, applique) : un résultat par opération,
+    dans l'ordre reçu, et un booléen indiquant si le lot a été enregistré.
+    Lève LotInvalide si le lot est mal formé, IntegrityError si le même lot est traité en parallèle.
+    """
+    cles = _verifier_lot(operations)
+    resultats, traitees = [], []
+    with transaction.atomic():
+        deja_traitees = {
+            operation.cle: operation
+            for operation in OperationTraitee.objects.filter(utilisateur=utilisateur, cle__in=cles)
+        }
+        for operation in operations:
+            cle = operation['cle']
+            empreinte = _empreinte(operation)
+            if cle in deja_traitees:
+                deja_traitee = deja_traitees[cle]
+                # Sans empreinte : opération enregistrée avant qu'elles ne soient conservées
+                if deja_traitee.empreinte and deja_traitee.empreinte != empreinte:
+                    resultats.append({
+                        'cle': cle, 'statut': 'erreur',
+                        'erreurs': {'__all__': ["Clé déjà utilisée pour une autre opération."]},
+                    })
+                else:
+                    resultats.append({'cle': cle, 'statut': 'deja_traite', 'id': deja_traitee.objet_id})
+                continue
+            try:
+                objet = _appliquer(utilisateur, operation)
+            except OperationInvalide as erreur:
+                resultats.append({'cle': cle, 'statut': 'erreur', 'erreurs': erreur.erreurs})
+                continue
+            statut = 'cree' if operation['action'] == 'creation' else 'modifie'
+            resultats.append({'cle': cle, 'statut': statut, 'id': objet.pk})
+            traitees.append(OperationTraitee(
+                utilisateur=utilisateur, cle=cle, modele=operation['modele'], objet_id=objet.pk, statut=statut,
+                empreinte=empreinte,
+            ))
+
+        applique = not any(resultat['statut'] == 'erreur' for resultat in resultats)
+        if applique:
+            OperationTraitee.objects.bulk_create(traitees)
+        else:
+            transaction.set_rollback(True)
+            for resultat in resultats:
+                if resultat['statut'] in ('cree', 'modifie'):
+                    resultat['statut'] = 'annule'
+                    del resultat['id']
+    return resultats, applique
@@ -0,0 +1,162 @@
+from datetime import date
+
+from django.contrib.auth.models import Permission
+from django.test import TestCase
+from django.urls import reverse
+
+from enfants_gestion.models import Enfant, SuiviMedical
+from sites_gestion.models import SiteOrphelinat
+from utilisateurs.models import CustomUser
+from .journal import changements
+from .models import Modification, OperationTraitee
+from .soumission import appliquer_lot
+
+
+class SynchronisationTestCase(TestCase):
+    """Deux sites, un utilisateur affecté à chacun, un superutilisateur."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site_a = SiteOrphelinat.objects.create(nom='Site A', ville='Ville', pays='Pays')
+        cls.site_b = SiteOrphelinat.objects.create(nom='Site B', ville='Ville', pays='Pays')
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@example.org', 'motdepasse')
+        cls.agent_a = cls._creer_agent('agent_a', cls.site_a)
+        cls.agent_b = cls._creer_agent('agent_b', cls.site_b)
+
+    @classmethod
+    def _creer_agent(cls, username, site, permissions=('view_enfant',)):
+        agent = CustomUser.objects.create_user(username, f'{username}@example.org', 'motdepasse')
+        agent.sites.add(site)
+        agent.user_permissions.add(*Permission.objects.filter(codename__in=permissions))
+        return agent
+
+    def _creer_enfant(self, site, nom='Nom'):
+        return Enfant.objects.create(
+            site=site, nom=nom, prenom='Prénom', sexe='M', date_naissance=date(2012, 1, 1), date_arrivee=date(2020, 1, 1),
+        )
+
+    def _changements(self, utilisateur, depuis=0):
+        # Nouvelle instance : les permissions sont mises en cache sur l'objet utilisateur
+        resultats, curseur, _complet = changements(CustomUser.objects.get(pk=utilisateur.pk), depuis=depuis)
+        return {(changement['modele'], changement['id']): changement for changement in resultats}, curseur
+
+
+class ChangementsTests(SynchronisationTestCase):
+
+    def test_perimetre_des_sites(self):
+        enfant_a = self._creer_enfant(self.site_a)
+        enfant_b = self._creer_enfant(self.site_b)
+
+        flux_a, _curseur = self._changements(self.agent_a)
+        self.assertEqual(set(flux_a), {('enfant', enfant_a.pk)})
+        self.assertEqual(flux_a[('enfant', enfant_a.pk)]['action'], 'creation')
+        self.assertEqual(flux_a[('enfant', enfant_a.pk)]['donnees']['site_id'], self.site_a.pk)
+
+        flux_admin, _curseur = self._changements(self.admin)
+        self.assertEqual(set(flux_admin), {('enfant', enfant_a.pk), ('enfant', enfant_b.pk)})
+
+    def test_sortie_lors_d_un_transfert(self):
+        enfant = self._creer_enfant(self.site_a)
+        _flux, curseur_a = self._changements(self.agent_a)
+        _flux, curseur_b = self._changements(self.agent_b)
+
+        enfant.site = self.site_b
+        enfant.save()
+
+        flux_a, _curseur = self._changements(self.agent_a, curseur_a)
+        self.assertEqual(flux_a[('enfant', enfant.pk)]['action'], 'sortie')
+        self.assertNotIn('donnees', flux_a[('enfant', enfant.pk)])
+
+        flux_b, _curseur = self._changements(self.agent_b, curseur_b)
+        self.assertEqual(flux_b[('enfant', enfant.pk)]['action'], 'modification')
+        self.assertEqual(flux_b[('enfant', enfant.pk)]['donnees']['site_id'], self.site_b.pk)
+
+        # Un utilisateur qui voit tous les sites ne reçoit pas la sortie
+        flux_admin, _curseur = self._changements(self.admin)
+        self.assertEqual(flux_admin[('enfant', enfant.pk)]['action'], 'modification')
+
+    def test_vue_pages_successives_avec_le_curseur(self):
+        enfants = [self._creer_enfant(self.site_a, f'Nom{numero}') for numero in range(5)]
+        self._creer_enfant(self.site_b)
+        self.client.force_login(self.agent_a)
+
+        recus, depuis, pages = [], 0, 0
+        while True:
+            response = self.client.get(reverse('synchronisation:changements'), {'depuis': depuis, 'limite': 2})
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            pages += 1
+            recus += [changement['id'] for changement in page['changements']]
+            self.assertGreaterEqual(page['curseur'], depuis)
+            depuis = page['curseur']
+            if page['complet']:
+                break
+            if pages == 1:
+                # Une écriture entre deux pages arrive dans une page suivante
+                enfants.append(self._creer_enfant(self.site_a, 'Nouveau'))
+
+        self.assertEqual(recus, [enfant.pk for enfant in enfants])
+
+        # À jour : une nouvelle page est vide et garde le curseur
+        page = self.client.get(reverse('synchronisation:changements'), {'depuis': depuis}).json()
+        self.assertEqual((page['changements'], page['curseur'], page['complet']), ([], depuis, True))
+
+
+class AppliquerLotTests(SynchronisationTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.saisie = cls._creer_agent('saisie', cls.site_a, ('view_enfant', 'add_suivimedical'))
+
+    def setUp(self):
+        self.enfant_a = self._creer_enfant(self.site_a)
+        self.enfant_b = self._creer_enfant(self.site_b)
+
+    def _suivi(self, cle, enfant, diagnostic='Rhume'):
+        return {
+            'cle': cle, 'modele': 'suivi_medical', 'action': 'creation', 'enfant': enfant.pk,
+            'donnees': {'date_consultation': '2024-05-02', 'type_consultation': 'Généraliste', 'diagnostic': diagnostic},
+        }
+
+    def _appliquer(self, operations):
+        return appliquer_lot(CustomUser.objects.get(pk=self.saisie.pk), operations)
+
+    def test_cle_rejouee_sans_seconde_ecriture(self):
+        resultats, applique = self._appliquer([self._suivi('c1', self.enfant_a)])
+        self.assertTrue(applique)
+        self.assertEqual(resultats[0]['statut'], 'cree')
+        journal = Modification.objects.count()
+
+        resultats_rejoues, applique = self._appliquer([self._suivi('c1', self.enfant_a)])
+        self.assertTrue(applique)
+        self.assertEqual(resultats_rejoues, [{'cle': 'c1', 'statut': 'deja_traite', 'id': resultats[0]['id']}])
+        self.assertEqual(SuiviMedical.objects.count(), 1)
+        self.assertEqual(OperationTraitee.objects.count(), 1)
+        self.assertEqual(Modification.objects.count(), journal)
+
+    def test_operation_en_echec_annule_tout_le_lot(self):
+        journal = Modification.objects.count()
+        resultats, applique = self._appliquer([
+            self._suivi('c1', self.enfant_a),
+            # Enfant d'un autre site que celui de l'utilisateur
+            self._suivi('c2', self.enfant_b),
+        ])
+        self.assertFalse(applique)
+        self.assertEqual([resultat['statut'] for resultat in resultats], ['annule', 'erreur'])
+        self.assertNotIn('id', resultats[0])
+        self.assertFalse(SuiviMedical.objects.exists())
+        self.assertFalse(OperationTraitee.objects.exists())
+        self.assertEqual(Modification.objects.count(), journal)
+
+    def test_cle_reutilisee_pour_une_autre_operation(self):
+        self._appliquer([self._suivi('c1', self.enfant_a)])
+
+        resultats, applique = self._appliquer([
+            self._suivi('c2', self.enfant_a),
+            self._suivi('c1', self.enfant_a, diagnostic='Grippe'),
+        ])
+        self.assertFalse(applique)
+        self.assertEqual([resultat['statut'] for resultat in resultats], ['annule', 'erreur'])
+        self.assertEqual(list(SuiviMedical.objects.values_list('diagnostic', flat=True)), ['Rhume'])
+        self.assertEqual(OperationTraitee.objects.count(), 1)
@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import ChangementsView, SoumissionView
+
+app_name = 'synchronisation'
+
+urlpatterns = [
+    path('changements/', ChangementsView.as_view(), name='changements'),
+    path('soumissions/', SoumissionView.as_view(), name='soumissions'),
+]
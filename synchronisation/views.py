@@ -0,0 +1,73 @@
+# synchronisation/views.py
+import json
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.gzip import gzip_page
+
+from .journal import changements, modeles_visibles, TAILLE_PAGE, TAILLE_PAGE_MAX
+from .soumission import appliquer_lot, LotInvalide
+
+# JSON sans espaces superflus : la réponse est en plus compressée par gzip_page
+JSON_COMPACT = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+# =======================================================================
+# FLUX DE MODIFICATIONS (SYNCHRONISATION DES POSTES DE SITE)
+# =======================================================================
+
+@method_decorator(gzip_page, name='dispatch')
+class ChangementsView(LoginRequiredMixin, View):
+    """
+    GET ?depuis=<seq>&limite=<n> : changements postérieurs au numéro `depuis`.
+    Le client rappelle avec `depuis=<curseur>` tant que `complet` est faux.
+    """
+    def get(self, request, *args, **kwargs):
+        if not modeles_visibles(request.user):
+            return JsonResponse({'error': 'Action non autorisée'}, status=403)
+        try:
+            depuis = max(int(request.GET.get('depuis', 0)), 0)
+            limite = min(max(int(request.GET.get('limite', TAILLE_PAGE)), 1), TAILLE_PAGE_MAX)
+        except ValueError:
+            return JsonResponse({'error': "Paramètres « depuis » et « limite » : entiers attendus."}, status=400)
+
+        resultats, curseur, complet = changements(request.user, depuis=depuis, limite=limite)
+        return JsonResponse(
+            {'curseur': curseur, 'complet': complet, 'changements': resultats},
+            json_dumps_params=JSON_COMPACT,
+        )
+
+
+# =======================================================================
+# ENVOI PAR LOTS DES SAISIES HORS CONNEXION
+# =======================================================================
+
+class SoumissionView(LoginRequiredMixin, View):
+    """
+    POST {"operations": [...]} (voir soumission.py) : applique le lot en une transaction.
+    200 si tout est enregistré, 400 avec le résultat de chaque opération sinon.
+    Authentification par la session : le jeton CSRF est attendu dans l'en-tête X-CSRFToken.
+    """
+    def post(self, request, *args, **kwargs):
+        try:
+            corps = json.loads(request.body)
+        except (ValueError, UnicodeDecodeError):
+            return JsonResponse({'error': "Corps JSON invalide."}, status=400)
+        if not isinstance(corps, dict):
+            return JsonResponse({'error': "Objet JSON attendu."}, status=400)
+
+        try:
+            resultats, applique = appliquer_lot(request.user, corps.get('operations'))
+        except LotInvalide as erreur:
+            return JsonResponse({'error': str(erreur)}, status=400)
+        except IntegrityError:
+            # Le même lot est en cours de traitement (double envoi simultané)
+            return JsonResponse({'error': "Lot déjà en cours de traitement, réessayez."}, status=409)
+
+        return JsonResponse(
+            {'applique': applique, 'resultats': resultats},
+            status=200 if applique else 400, json_dumps_params=JSON_COMPACT,
+        )